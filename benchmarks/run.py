@@ -0,0 +1,462 @@
+#!/usr/bin/env python
+"""
+Runs the offline benchmark suite against synthetic model datasets.
+
+The synthetic datasets are generated in the work directory on the first run
+and reused afterwards. Each case is run once to warm up and then timed
+--repeat times; the results are written as JSON and, when a baseline result
+file is given, any case whose median time grew by more than --threshold is
+reported as a regression and the script exits with a non-zero status.
+
+Usage:
+    python -m benchmarks.run [--size small] [--workdir /tmp/onav_bench] \
+        [--output results.json] [--baseline old.json] [--threshold 0.25] \
+        [--repeat 5] [--cases get_point tile]
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import traceback
+from pathlib import Path
+
+import numpy as np
+
+from .synthetic import LAT_RANGE, LON_RANGE, SIZES, START_TIME, TIME_STEP, generate
+
+DATASETS = {
+    "nemo": ("synthetic_nemo", "votemper"),
+    "mercator": ("synthetic_mercator", "votemper"),
+    "fvcom": ("synthetic_fvcom", "temp"),
+}
+
+# Point inside the FVCOM mesh (44-46N, 66-63W)
+FVCOM_POINT = (45.1, -64.4)
+
+STATION = [50.0, -55.0, None]
+PATH = [[45.0, -60.0], [55.0, -50.0]]
+TRACK = [[45.0, -60.0], [45.5, -58.0], [47.0, -57.0], [50.0, -40.0], [60.0, -30.0]]
+AREA = [[45.0, -60.0], [45.0, -50.0], [55.0, -50.0], [55.0, -60.0], [45.0, -60.0]]
+TILE_ZOOM = 8
+# Topography and bathymetry tiles rendered per case and zoom
+ETOPO_TILES = 16
+PLOT_OPTIONS = {"format": "png", "size": "10x7", "dpi": 72}
+
+PLOTS = {
+    "map": {
+        "area": [{"innerrings": [], "name": "", "polygons": [AREA]}],
+        "bathymetry": False,
+        "colormap": "default",
+        "contour": {"variable": "none"},
+        "depth": 0,
+        "interp": "gaussian",
+        "neighbours": 10,
+        "projection": "EPSG:3857",
+        "quantum": "day",
+        "quiver": {"variable": "none"},
+        "radius": 25,
+        "scale": "-5,30,auto",
+        "showarea": False,
+        "time": START_TIME,
+        "variable": "votemper",
+    },
+    "transect": {
+        "colormap": "default",
+        "depth_limit": False,
+        "linearthresh": 200,
+        "path": PATH,
+        "quantum": "day",
+        "scale": "-5,30,auto",
+        "selectedPlots": "0,1,1",
+        "showmap": False,
+        "surfacevariable": "none",
+        "time": START_TIME,
+        "variable": "votemper",
+        "profile_distance": -1,
+    },
+    "timeseries": {
+        "colormap": "default",
+        "depth": "all",
+        "starttime": START_TIME,
+        "endtime": START_TIME + 3 * TIME_STEP,
+        "names": [""],
+        "quantum": "day",
+        "scale": "-5,30,auto",
+        "showmap": False,
+        "station": [STATION],
+        "variable": "votemper",
+    },
+    "profile": {
+        "names": [""],
+        "quantum": "day",
+        "showmap": False,
+        "station": [STATION],
+        "time": START_TIME,
+        "variable": ["votemper", "magwatervel"],
+    },
+    "ts": {
+        "names": [""],
+        "showmap": False,
+        "station": [STATION],
+        "time": START_TIME,
+    },
+    "sound": {
+        "names": [""],
+        "quantum": "day",
+        "showmap": False,
+        "station": [STATION],
+        "time": START_TIME,
+    },
+    "hovmoller": {
+        "colormap": "default",
+        "depth": 0,
+        "starttime": START_TIME,
+        "endtime": START_TIME + 3 * TIME_STEP,
+        "path": PATH,
+        "quantum": "day",
+        "scale": "-5,30,auto",
+        "showmap": False,
+        "variable": "votemper",
+    },
+}
+
+# Exporters timed on already loaded plot data
+EXPORTS = {
+    "map": ["csv", "odv"],
+    "transect": ["csv", "odv"],
+    "timeseries": ["csv"],
+    "profile": ["csv", "odv"],
+}
+
+PLOTTERS = {
+    "map": ("plotting.map", "MapPlotter"),
+    "transect": ("plotting.transect", "TransectPlotter"),
+    "timeseries": ("plotting.timeseries", "TimeseriesPlotter"),
+    "profile": ("plotting.profile", "ProfilePlotter"),
+    "ts": ("plotting.ts", "TemperatureSalinityPlotter"),
+    "sound": ("plotting.sound", "SoundSpeedPlotter"),
+    "hovmoller": ("plotting.hovmoller", "HovmollerPlotter"),
+}
+
+
+def get_cases(n_points: int, area_size: int, etopo_zoom: int) -> dict:
+    """Returns the benchmark cases by name. Repo modules are imported here so
+    the settings pick up the synthetic dataset environment.
+    """
+    import importlib
+
+    import plotting.tile
+    from data import geo, open_dataset
+    from oceannavigator import DatasetConfig
+
+    rng = np.random.default_rng(0)
+    area_lat, area_lon = np.meshgrid(
+        np.linspace(LAT_RANGE[0] + 5, LAT_RANGE[1] - 5, area_size),
+        np.linspace(LON_RANGE[0] + 10, LON_RANGE[1] - 10, area_size),
+    )
+    tile_x, tile_y = plotting.tile.deg2num(STATION[0], STATION[1], TILE_ZOOM)
+
+    def opened(dataset, variable, func):
+        def run():
+            with open_dataset(
+                DatasetConfig(dataset), variable=variable, timestamp=START_TIME
+            ) as ds:
+                return func(ds)
+
+        return run
+
+    def points(ds, variable, lat, lon):
+        return ds.get_point(lat, lon, 0, variable, START_TIME)
+
+    cases = {}
+    for model, (dataset, variable) in DATASETS.items():
+        if model == "fvcom":
+            lat = FVCOM_POINT[0] + rng.uniform(-0.5, 0.5, n_points)
+            lon = FVCOM_POINT[1] + rng.uniform(-0.5, 0.5, n_points)
+            station = FVCOM_POINT
+        else:
+            lat = rng.uniform(LAT_RANGE[0] + 2, LAT_RANGE[1] - 2, n_points)
+            lon = rng.uniform(LON_RANGE[0] + 2, LON_RANGE[1] - 2, n_points)
+            station = STATION[:2]
+
+        cases[f"open_dataset[{model}]"] = opened(dataset, variable, lambda ds: ds)
+        cases[f"get_point[{model}]"] = opened(
+            dataset,
+            variable,
+            lambda ds, v=variable, lat=lat, lon=lon: points(ds, v, lat, lon),
+        )
+        cases[f"get_profile[{model}]"] = opened(
+            dataset,
+            variable,
+            lambda ds, v=variable, s=station: ds.get_profile(*s, v, START_TIME),
+        )
+        if model == "fvcom":
+            continue
+
+        cases[f"get_area[{model}]"] = opened(
+            dataset,
+            variable,
+            lambda ds, v=variable: ds.get_area(
+                np.array([area_lat, area_lon]),
+                0,
+                START_TIME,
+                v,
+                "gaussian",
+                25000,
+                10,
+            ),
+        )
+        cases[f"get_path_profile[{model}]"] = opened(
+            dataset,
+            variable,
+            lambda ds, v=variable: ds.get_path_profile(np.array(PATH), v, START_TIME),
+        )
+        cases[f"get_point[{model},magwatervel]"] = opened(
+            dataset,
+            "magwatervel",
+            lambda ds, lat=lat, lon=lon: points(ds, "magwatervel", lat, lon),
+        )
+        cases[f"tile[{model}]"] = lambda dataset=dataset: asyncio.run(
+            plotting.tile.plot(
+                "EPSG:3857",
+                tile_x,
+                tile_y,
+                TILE_ZOOM,
+                {
+                    "interp": "gaussian",
+                    "radius": 25000,
+                    "neighbours": 10,
+                    "dataset": dataset,
+                    "variable": "votemper",
+                    "time": START_TIME,
+                    "depth": 0,
+                    "scale": "-5,30",
+                },
+            )
+        )
+        cases[f"quiver_tile[{model}]"] = lambda dataset=dataset: asyncio.run(
+            plotting.tile.quiver(
+                dataset,
+                "magwatervel",
+                START_TIME,
+                "0",
+                1,
+                tile_x,
+                tile_y,
+                TILE_ZOOM,
+                "EPSG:3857",
+            )
+        )
+
+    def etopo_tiles(render, z):
+        n = 2**z
+        tiles = [(i % n, i * 7 // n % n) for i in range(min(ETOPO_TILES, n * n))]
+
+        def run():
+            for x, y in tiles:
+                render(x, y, z)
+            # Tiles rendered, reported as rows/s
+            return len(tiles)
+
+        return run
+
+    for z in range(etopo_zoom + 1):
+        cases[f"topo_tile[z{z}]"] = etopo_tiles(
+            lambda x, y, z: plotting.tile.topo("EPSG:3857", x, y, z, True), z
+        )
+        cases[f"bathymetry_tile[z{z}]"] = etopo_tiles(
+            lambda x, y, z: asyncio.run(plotting.tile.bathymetry("EPSG:3857", x, y, z)),
+            z,
+        )
+
+    def path_to_points(n):
+        def run():
+            # Not memoized, so revisions before the memoization compare
+            getattr(geo, "_paths", {}).clear()
+            return len(geo.path_to_points(TRACK, n)[0])
+
+        return run
+
+    for n in (100, 1000, 10000):
+        cases[f"path_to_points[{n}]"] = path_to_points(n)
+
+    def plot(plot_type):
+        def run():
+            module, name = PLOTTERS[plot_type]
+            plotter = getattr(importlib.import_module(module), name)
+            query = dict(PLOTS[plot_type], dataset=DATASETS["nemo"][0])
+            return plotter(query["dataset"], query, **PLOT_OPTIONS).run()
+
+        return run
+
+    for plot_type in PLOTS:
+        cases[f"plot[{plot_type}]"] = plot(plot_type)
+
+    def export(plot_type, fmt):
+        plotter = None
+
+        def run():
+            nonlocal plotter
+            # The first (warm up) run loads the data
+            if plotter is None:
+                module, name = PLOTTERS[plot_type]
+                query = dict(PLOTS[plot_type], dataset=DATASETS["nemo"][0])
+                plotter = getattr(importlib.import_module(module), name)(
+                    query["dataset"], query, **dict(PLOT_OPTIONS, format=fmt)
+                )
+                plotter.prepare_plot()
+
+            output = plotter.odv_ascii() if fmt == "odv" else plotter.csv()
+            return _count_rows(output[0])
+
+        return run
+
+    for plot_type, formats in EXPORTS.items():
+        for fmt in formats:
+            cases[f"export[{plot_type},{fmt}]"] = export(plot_type, fmt)
+
+    return cases
+
+
+def _count_rows(output: str) -> int:
+    """Returns the number of lines of an export, given as its text or as the
+    path of the file it was written to, which is removed.
+    """
+    if not os.path.isfile(output):
+        return output.count("\n")
+
+    with open(output) as f:
+        rows = sum(1 for _ in f)
+    os.remove(output)
+
+    return rows
+
+
+def time_case(func, repeat: int) -> dict:
+    """Times a case. Cases returning a number of rows (or tiles) also get a rows/s
+    rate.
+    """
+    func()
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+
+    stats = {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "repeat": repeat,
+    }
+    if isinstance(result, int):
+        stats["rows"] = result
+        stats["rows_per_second"] = result / stats["median"]
+
+    return stats
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Returns the (case, baseline median, median) of each case that is slower
+    than its baseline by more than threshold.
+    """
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get(name)
+        if not old or "median" not in old or "median" not in result:
+            continue
+        if result["median"] > old["median"] * (1 + threshold):
+            regressions.append((name, old["median"], result["median"]))
+
+    return regressions
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--size", default="small", choices=["small", "medium", "large"])
+    parser.add_argument("--workdir", default="/tmp/onav_bench")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Result file to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--points", type=int, default=100)
+    parser.add_argument("--area-size", type=int, default=256)
+    parser.add_argument(
+        "--cases", nargs="*", help="Only run cases whose name starts with these."
+    )
+    args = parser.parse_args()
+
+    os.environ.update(generate(f"{args.workdir}/{args.size}", args.size))
+
+    import matplotlib
+
+    matplotlib.use("AGG")
+
+    cases = get_cases(args.points, args.area_size, SIZES[args.size]["etopo_zoom"])
+    if args.cases:
+        cases = {
+            k: v for k, v in cases.items() if any(k.startswith(c) for c in args.cases)
+        }
+
+    results = {}
+    print(f"{'case':<40}{'min (s)':>10}{'median (s)':>12}")
+    for name, func in cases.items():
+        try:
+            results[name] = time_case(func, args.repeat)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"{name:<40}{'failed':>10}  {results[name]['error']}")
+            traceback.print_exc(limit=-3)
+            continue
+        rate = results[name].get("rows_per_second")
+        print(
+            f"{name:<40}{results[name]['min']:>10.4f}{results[name]['median']:>12.4f}"
+            + (f"{rate:>14.0f} rows/s" if rate else "")
+        )
+
+    output = {
+        "meta": {
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "size": args.size,
+            "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(output, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+        regressions = compare(results, baseline, args.threshold)
+        for name, old, new in regressions:
+            print(f"REGRESSION {name}: {old:.4f}s -> {new:.4f}s ({new / old - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
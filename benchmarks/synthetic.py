@@ -0,0 +1,526 @@
+"""
+Generates synthetic NEMO-, Mercator- and FVCOM-shaped NetCDF files, a SQLite
+timestamp index for the NEMO files and a matching dataset config so the data and
+plotting code can be benchmarked without access to real model output.
+"""
+
+import json
+import sqlite3
+from pathlib import Path
+
+import netCDF4
+import numpy as np
+
+TIME_UNITS = "seconds since 1950-01-01 00:00:00"
+START_TIME = 2212444800  # 2020-02-10
+TIME_STEP = 86400
+
+LAT_RANGE = (40.0, 60.0)
+LON_RANGE = (-70.0, -40.0)
+
+SIZES = {
+    "small": {"nx": 120, "ny": 100, "nz": 20, "nt": 4, "mesh": 40, "etopo_zoom": 3},
+    "medium": {"nx": 360, "ny": 300, "nz": 40, "nt": 8, "mesh": 120, "etopo_zoom": 5},
+    "large": {"nx": 1000, "ny": 800, "nz": 50, "nt": 24, "mesh": 300, "etopo_zoom": 6},
+}
+
+FILL_VALUE = np.float32(1.0e20)
+
+VARIABLES = {
+    "votemper": {"name": "Temperature", "units": "Celsius", "scale": [-5, 30]},
+    "vosaline": {"name": "Salinity", "units": "PSU", "scale": [30, 40]},
+    "vozocrtx": {"name": "Water X Velocity", "units": "m/s", "scale": [-3, 3]},
+    "vomecrty": {"name": "Water Y Velocity", "units": "m/s", "scale": [-3, 3]},
+}
+
+
+def timestamps(nt: int) -> np.ndarray:
+    return START_TIME + TIME_STEP * np.arange(nt, dtype=np.int64)
+
+
+def _depths(nz: int) -> np.ndarray:
+    # Stretched levels from ~0.5m to ~5000m like the NEMO/Mercator grids
+    return (0.5 + 5000.0 * (np.linspace(0, 1, nz) ** 2.5)).astype(np.float32)
+
+
+def _bathymetry(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    """Smooth synthetic sea floor with a coastline along the western edge."""
+    x = (lon - LON_RANGE[0]) / (LON_RANGE[1] - LON_RANGE[0])
+    y = (lat - LAT_RANGE[0]) / (LAT_RANGE[1] - LAT_RANGE[0])
+    return 5000.0 * np.clip(4 * x - 0.2, -1, 1) + 500.0 * np.sin(6 * y) * x
+
+
+def _fields(lat, lon, depth, t, seed=0) -> dict:
+    """Returns smooth temperature, salinity and velocity fields shaped
+    (depth,) + lat.shape for time step t.
+    """
+    rng = np.random.default_rng(seed + t)
+    z = depth.reshape((-1,) + (1,) * lat.ndim)
+    decay = np.exp(-z / 800.0)
+    phase = 0.3 * t
+
+    temp = (
+        2
+        + 18 * decay * np.cos(np.radians(lat) * 3 + phase)
+        + 0.1 * rng.random(lat.shape)
+    )
+    sal = 35 - 2 * decay * np.sin(np.radians(lon) * 2 + phase)
+    u = decay * np.sin(np.radians(lat) * 8 + phase)
+    v = decay * np.cos(np.radians(lon) * 8 - phase)
+
+    mask = z > _bathymetry(lat, lon)
+    return {
+        "votemper": np.where(mask, FILL_VALUE, temp).astype(np.float32),
+        "vosaline": np.where(mask, FILL_VALUE, sal).astype(np.float32),
+        "vozocrtx": np.where(mask, FILL_VALUE, u).astype(np.float32),
+        "vomecrty": np.where(mask, FILL_VALUE, v).astype(np.float32),
+    }
+
+
+def _add_time(ds, name: str, values) -> None:
+    ds.createDimension(name, None)
+    var = ds.createVariable(name, "f8", (name,))
+    var.units = TIME_UNITS
+    var.calendar = "gregorian"
+    var.long_name = "Time axis"
+    var[:] = values
+
+
+def _add_depth(ds, name: str, values) -> None:
+    ds.createDimension(name, len(values))
+    var = ds.createVariable(name, "f4", (name,))
+    var.units = "m"
+    var.positive = "down"
+    var.long_name = "Vertical Levels"
+    var[:] = values
+
+
+def _add_data_vars(
+    ds, dims: tuple, fields: dict, nt_index=None, coordinates=None
+) -> None:
+    for key, attrs in VARIABLES.items():
+        if key not in ds.variables:
+            var = ds.createVariable(
+                key, "f4", dims, fill_value=FILL_VALUE, zlib=False, chunksizes=None
+            )
+            var.units = attrs["units"]
+            var.long_name = attrs["name"]
+            if coordinates:
+                var.coordinates = coordinates
+        var = ds.variables[key]
+        if nt_index is None:
+            var[0] = fields[key]
+        else:
+            var[nt_index] = fields[key]
+
+
+def make_nemo(out_dir: Path, nx: int, ny: int, nz: int, nt: int, **_) -> list:
+    """Writes one NEMO-shaped file per time step on a slightly rotated
+    curvilinear grid. Returns the file paths.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    j, i = np.meshgrid(np.linspace(0, 1, ny), np.linspace(0, 1, nx), indexing="ij")
+    lat = LAT_RANGE[0] + (LAT_RANGE[1] - LAT_RANGE[0]) * (j + 0.05 * i)
+    lon = LON_RANGE[0] + (LON_RANGE[1] - LON_RANGE[0]) * (i - 0.05 * j)
+    depth = _depths(nz)
+
+    files = []
+    for t, timestamp in enumerate(timestamps(nt)):
+        path = out_dir.joinpath(f"nemo_{timestamp}.nc")
+        with netCDF4.Dataset(path, "w") as ds:
+            ds.createDimension("y", ny)
+            ds.createDimension("x", nx)
+            _add_time(ds, "time_counter", [timestamp])
+            _add_depth(ds, "deptht", depth)
+
+            for name, values, units in [
+                ("nav_lat", lat, "degrees_north"),
+                ("nav_lon", lon, "degrees_east"),
+            ]:
+                var = ds.createVariable(name, "f4", ("y", "x"))
+                var.units = units
+                var[:] = values
+
+            _add_data_vars(
+                ds,
+                ("time_counter", "deptht", "y", "x"),
+                _fields(lat, lon, depth, t),
+                coordinates="nav_lat nav_lon",
+            )
+        files.append(str(path))
+
+    return files
+
+
+def make_mercator(out_dir: Path, nx: int, ny: int, nz: int, nt: int, **_) -> str:
+    """Writes a single Mercator-shaped file on a regular lat/lon grid."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir.joinpath("mercator.nc")
+
+    lat_1d = np.linspace(*LAT_RANGE, ny)
+    lon_1d = np.linspace(*LON_RANGE, nx)
+    lat, lon = np.meshgrid(lat_1d, lon_1d, indexing="ij")
+    depth = _depths(nz)
+
+    with netCDF4.Dataset(path, "w") as ds:
+        _add_time(ds, "time", timestamps(nt))
+        _add_depth(ds, "depth", depth)
+        for name, values, units in [
+            ("latitude", lat_1d, "degrees_north"),
+            ("longitude", lon_1d, "degrees_east"),
+        ]:
+            ds.createDimension(name, len(values))
+            var = ds.createVariable(name, "f4", (name,))
+            var.units = units
+            var[:] = values
+
+        for t in range(nt):
+            _add_data_vars(
+                ds,
+                ("time", "depth", "latitude", "longitude"),
+                _fields(lat, lon, depth, t),
+                nt_index=t,
+            )
+
+    return str(path)
+
+
+def make_fvcom(out_dir: Path, nz: int, nt: int, mesh: int, **_) -> str:
+    """Writes a single FVCOM-shaped file on a triangulated mesh of
+    mesh x mesh nodes with sigma layers.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir.joinpath("fvcom.nc")
+
+    lat_1d = np.linspace(44.0, 46.0, mesh)
+    lon_1d = np.linspace(-66.0, -63.0, mesh)
+    node_lat, node_lon = (a.ravel() for a in np.meshgrid(lat_1d, lon_1d, indexing="ij"))
+
+    # Two triangles per grid cell
+    corner = (np.arange(mesh - 1)[:, None] * mesh + np.arange(mesh - 1)).ravel()
+    nv = np.concatenate(
+        [
+            np.stack([corner, corner + 1, corner + mesh + 1], axis=-1),
+            np.stack([corner, corner + mesh + 1, corner + mesh], axis=-1),
+        ]
+    )
+    elem_lat = node_lat[nv].mean(axis=1)
+    elem_lon = node_lon[nv].mean(axis=1)
+
+    h = 10 + 190 * (node_lon - lon_1d[0]) / (lon_1d[-1] - lon_1d[0])
+    siglev = -np.linspace(0, 1, nz + 1)
+    siglay = (siglev[:-1] + siglev[1:]) / 2
+    times = timestamps(nt)
+
+    with netCDF4.Dataset(path, "w") as ds:
+        ds.createDimension("node", len(node_lat))
+        ds.createDimension("nele", len(nv))
+        ds.createDimension("three", 3)
+        ds.createDimension("siglay", nz)
+        ds.createDimension("siglev", nz + 1)
+        ds.createDimension("DateStrLen", 26)
+        _add_time(ds, "time", times)
+
+        def add(name, dtype, dims, values, **attrs):
+            var = ds.createVariable(name, dtype, dims)
+            var.setncatts(attrs)
+            var[:] = values
+            return var
+
+        add("lat", "f4", ("node",), node_lat, units="degrees_north")
+        add("lon", "f4", ("node",), node_lon, units="degrees_east")
+        add("latc", "f4", ("nele",), elem_lat, units="degrees_north")
+        add("lonc", "f4", ("nele",), elem_lon, units="degrees_east")
+        add(
+            "nv",
+            "i4",
+            ("three", "nele"),
+            nv.T + 1,
+            long_name="nodes surrounding element",
+        )
+        add("h", "f4", ("node",), h, units="m", long_name="Bathymetry")
+        add(
+            "siglay",
+            "f4",
+            ("siglay", "node"),
+            np.repeat(siglay[:, None], len(node_lat), axis=1),
+        )
+        add(
+            "siglev",
+            "f4",
+            ("siglev", "node"),
+            np.repeat(siglev[:, None], len(node_lat), axis=1),
+        )
+        times_str = [
+            np.datetime_as_string(
+                np.datetime64("1950-01-01") + np.timedelta64(int(t), "s"), unit="us"
+            ).ljust(26)
+            for t in times
+        ]
+        add(
+            "Times",
+            "S1",
+            ("time", "DateStrLen"),
+            netCDF4.stringtochar(np.array(times_str, dtype="S26")),
+            time_zone="UTC",
+        )
+
+        zeta = ds.createVariable("zeta", "f4", ("time", "node"))
+        zeta.units = "m"
+        temp = ds.createVariable("temp", "f4", ("time", "siglay", "node"))
+        temp.units = "degrees_C"
+        temp.long_name = "temperature"
+        u = ds.createVariable("u", "f4", ("time", "siglay", "nele"))
+        u.units = "m/s"
+        v = ds.createVariable("v", "f4", ("time", "siglay", "nele"))
+        v.units = "m/s"
+
+        for t in range(nt):
+            zeta[t] = 0.5 * np.sin(node_lon + 0.3 * t)
+            depth = -siglay[:, None] * h
+            temp[t] = 4 + 10 * np.exp(-depth / 50) * np.cos(np.radians(node_lat) * 20)
+            u[t] = np.repeat(
+                [0.5 * np.sin(np.radians(elem_lat) * 40 + 0.3 * t)], nz, axis=0
+            )
+            v[t] = np.repeat(
+                [0.5 * np.cos(np.radians(elem_lon) * 40 - 0.3 * t)], nz, axis=0
+            )
+
+    return str(path)
+
+
+def make_bathymetry(out_dir: Path, **_) -> str:
+    """Writes an ETOPO-shaped (x, y, z) elevation grid covering the synthetic
+    domain at 2 arc-minute resolution.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir.joinpath("bathymetry.nc")
+
+    x = np.arange(LON_RANGE[0] - 1, LON_RANGE[1] + 1, 1 / 30)
+    y = np.arange(LAT_RANGE[0] - 1, LAT_RANGE[1] + 1, 1 / 30)
+    lat, lon = np.meshgrid(y, x, indexing="ij")
+
+    with netCDF4.Dataset(path, "w") as ds:
+        for name, values in [("x", x), ("y", y)]:
+            ds.createDimension(name, len(values))
+            ds.createVariable(name, "f8", (name,))[:] = values
+        ds.createVariable("z", "f4", ("y", "x"))[:] = -_bathymetry(lat, lon)
+
+    return str(path)
+
+
+def make_etopo(out_dir: Path, etopo_zoom: int, **_) -> str:
+    """Writes the ETOPO grids of the topography and bathymetry tiles of
+    EPSG:3857 for zooms 0 to etopo_zoom, as int16 elevations of 256x256 pixels
+    per tile.
+
+    Returns:
+        str -- The settings.etopo_file pattern of the grids.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    pattern = str(out_dir.joinpath("etopo_%s_%d.nc"))
+
+    for z in range(etopo_zoom + 1):
+        size = 256 * 2**z
+        with netCDF4.Dataset(pattern % ("EPSG:3857", z), "w") as ds:
+            ds.createDimension("y", size)
+            ds.createDimension("x", size)
+            var = ds.createVariable("z", "i2", ("y", "x"), fill_value=-32767)
+
+            # The synthetic domain stretched over the whole grid, north up
+            lon = np.linspace(*LON_RANGE, size)
+            lat = np.linspace(LAT_RANGE[1], LAT_RANGE[0], size)[:, np.newaxis]
+            for row in range(0, size, 1024):
+                elevation = -_bathymetry(lat[row : row + 1024], lon)
+                var[row : row + 1024] = np.rint(elevation).astype(np.int16)
+
+    return pattern
+
+
+def make_index(db_path: Path, files: list) -> str:
+    """Builds a SQLite timestamp/variable/file index (the schema read by
+    data.sqlite_database.SQLiteDatabase) for the given NetCDF files.
+    """
+    db_path.unlink(missing_ok=True)
+    with sqlite3.connect(db_path) as conn:
+        conn.executescript("""
+            CREATE TABLE Dimensions (
+                id INTEGER PRIMARY KEY,
+                name TEXT UNIQUE NOT NULL ON CONFLICT IGNORE
+            );
+            CREATE TABLE Variables (
+                id INTEGER PRIMARY KEY,
+                variable TEXT UNIQUE NOT NULL ON CONFLICT IGNORE,
+                units TEXT,
+                longName TEXT,
+                validMin REAL,
+                validMax REAL
+            );
+            CREATE TABLE VarsDims (
+                variable_id INTEGER,
+                dim_id INTEGER,
+                PRIMARY KEY(variable_id, dim_id)
+            );
+            CREATE TABLE Filepaths (
+                id INTEGER PRIMARY KEY,
+                filepath TEXT UNIQUE NOT NULL ON CONFLICT IGNORE
+            );
+            CREATE TABLE Timestamps (
+                id INTEGER PRIMARY KEY,
+                timestamp INTEGER UNIQUE NOT NULL ON CONFLICT IGNORE
+            );
+            CREATE TABLE TimestampVariableFilepath (
+                filepath_id INTEGER,
+                variable_id INTEGER,
+                timestamp_id INTEGER,
+                PRIMARY KEY(filepath_id, variable_id, timestamp_id)
+            );
+            CREATE INDEX idx_timestamp ON Timestamps(timestamp);
+            CREATE INDEX idx_filepath ON Filepaths(filepath);
+            """)
+
+        def row_id(table, column, value):
+            conn.execute(
+                f"INSERT OR IGNORE INTO {table} ({column}) VALUES (?)", (value,)
+            )
+            return conn.execute(
+                f"SELECT id FROM {table} WHERE {column} = ?", (value,)
+            ).fetchone()[0]
+
+        for path in files:
+            with netCDF4.Dataset(path) as ds:
+                file_id = row_id("Filepaths", "filepath", str(Path(path).resolve()))
+                time_ids = [
+                    row_id("Timestamps", "timestamp", int(t))
+                    for t in ds.variables["time_counter"][:]
+                ]
+                for name, var in ds.variables.items():
+                    conn.execute(
+                        "INSERT OR IGNORE INTO Variables (variable, units, longName) "
+                        "VALUES (?, ?, ?)",
+                        (
+                            name,
+                            getattr(var, "units", None),
+                            getattr(var, "long_name", name),
+                        ),
+                    )
+                    var_id = row_id("Variables", "variable", name)
+                    for dim in var.dimensions:
+                        dim_id = row_id("Dimensions", "name", dim)
+                        conn.execute(
+                            "INSERT OR IGNORE INTO VarsDims VALUES (?, ?)",
+                            (var_id, dim_id),
+                        )
+                    for time_id in time_ids:
+                        conn.execute(
+                            "INSERT OR IGNORE INTO TimestampVariableFilepath "
+                            "VALUES (?, ?, ?)",
+                            (file_id, var_id, time_id),
+                        )
+
+    return str(db_path)
+
+
+def _dataset_config(name: str, url: str, model_class: str, dims: list, **extra) -> dict:
+    variables = {k: dict(v) for k, v in VARIABLES.items()}
+    variables["magwatervel"] = {
+        "name": "Water Velocity",
+        "units": "m/s",
+        "scale": [0, 3],
+        "equation": "magnitude(vozocrtx, vomecrty)",
+        "dims": dims,
+        "east_vector_component": "vozocrtx",
+        "north_vector_component": "vomecrty",
+    }
+
+    config = {
+        "enabled": 1,
+        "name": name,
+        "url": url,
+        "quantum": "day",
+        "time_dim_units": TIME_UNITS,
+        "model_class": model_class,
+        "attribution": "Synthetic benchmark data",
+        "vector_variables": ["magwatervel"],
+        "variables": variables,
+    }
+    config.update(extra)
+    return config
+
+
+def generate(out_dir: str, size: str = "small") -> dict:
+    """Generates the synthetic datasets and dataset config in out_dir, reusing
+    them if they were already generated at the same size.
+
+    Returns:
+        dict -- Environment variables pointing the Navigator settings at the
+        synthetic data.
+    """
+    out_dir = Path(out_dir).resolve()
+    dims = SIZES[size]
+    marker = out_dir.joinpath("synthetic.json")
+
+    env = {
+        "ONAV_DATASET_CONFIG_FILE": str(out_dir.joinpath("datasetconfig.json")),
+        "ONAV_DATASET_CONFIG_STUB_PATH": f"{out_dir.joinpath('stubs')}/",
+        "ONAV_CACHE_DIR": str(out_dir.joinpath("cache")),
+        "ONAV_TILE_CACHE_DIR": str(out_dir.joinpath("cache", "tiles")),
+        "ONAV_BATHYMETRY_FILE": str(out_dir.joinpath("bathymetry", "bathymetry.nc")),
+        "ONAV_ETOPO_FILE": str(out_dir.joinpath("etopo", "etopo_%s_%d.nc")),
+        "ONAV_SQLALCHEMY_DATABASE_URI": "sqlite://",
+        "ONAV_DASK_SCHEDULER": "synchronous",
+    }
+
+    if (
+        marker.exists()
+        and json.loads(marker.read_text()).get("size") == size
+        # Generated before the ETOPO grids were added
+        and Path(env["ONAV_ETOPO_FILE"] % ("EPSG:3857", 0)).exists()
+    ):
+        return env
+
+    nemo_files = make_nemo(out_dir.joinpath("nemo"), **dims)
+    nemo_index = make_index(out_dir.joinpath("nemo.sqlite3"), nemo_files)
+    mercator_file = make_mercator(out_dir.joinpath("mercator"), **dims)
+    fvcom_file = make_fvcom(out_dir.joinpath("fvcom"), **dims)
+    make_bathymetry(out_dir.joinpath("bathymetry"))
+    make_etopo(out_dir.joinpath("etopo"), **dims)
+
+    configs = {
+        "synthetic_nemo": _dataset_config(
+            "Synthetic NEMO",
+            nemo_index,
+            "Nemo",
+            ["time_counter", "deptht", "y", "x"],
+        ),
+        "synthetic_mercator": _dataset_config(
+            "Synthetic Mercator",
+            mercator_file,
+            "Mercator",
+            ["time", "depth", "latitude", "longitude"],
+            lat_var_key="latitude",
+            lon_var_key="longitude",
+        ),
+        "synthetic_fvcom": _dataset_config(
+            "Synthetic FVCOM", fvcom_file, "Fvcom", ["time", "siglay", "nele"]
+        ),
+    }
+    fvcom_vars = configs["synthetic_fvcom"]["variables"]
+    configs["synthetic_fvcom"]["variables"] = {
+        "temp": {"name": "Temperature", "units": "Celsius", "scale": [-5, 30]},
+        "u": fvcom_vars["vozocrtx"],
+        "v": fvcom_vars["vomecrty"],
+    }
+    del configs["synthetic_fvcom"]["vector_variables"]
+
+    stubs = out_dir.joinpath("stubs")
+    stubs.mkdir(parents=True, exist_ok=True)
+    for key, config in configs.items():
+        stubs.joinpath(f"{key}.json").write_text(json.dumps({key: config}, indent=2))
+    Path(env["ONAV_DATASET_CONFIG_FILE"]).write_text(
+        json.dumps({key: {} for key in configs}, indent=2)
+    )
+
+    marker.write_text(json.dumps({"size": size, **dims}))
+    return env
@@ -34,6 +34,9 @@ def open_dataset(dataset: Union[DatasetConfig, str], **kwargs):
             starttime (and endtime) do not exactly correspond to a timestamp integer
             in the dataset, and will perform a binary search to find the nearest
             timestamp that is less-than-or-equal-to the given starttime (and endtime).
+        * timeseries {bool} -- When true, the request reads points or paths over the
+            time range, so it's read from the dataset's time-series store if it
+            holds the whole range (see data.timeseries_store).
     """
     MODEL_CLASSES = {
         "mercator": Mercator,
@@ -2,6 +2,7 @@ import numpy as np
 import xarray as xr
 
 import data.calculated_parser.parser
+import oceannavigator.timing as timing
 from data.netcdf_data import NetCDFData
 from data.variable import Variable
 from data.variable_list import VariableList
@@ -125,6 +126,7 @@ class CalculatedArray:
         for _ in self._parser.lexer.lexer:
             pass
 
+    @timing.timed("calculate")
     def __getitem__(self, key: str) -> xr.DataArray:
         # This is where the magic happens.
 
@@ -0,0 +1,130 @@
+"""
+Process-wide cache of decoded NetCDF chunks.
+
+Neighbouring tiles, repeated clicks on a point and successive zoom levels read
+windows from the same chunks of the same files, and each request opens the data
+afresh, so every one of them decompresses and decodes those chunks again. The
+direct reads of data.hyperslab instead assemble windows from whole decoded
+chunks kept here, keyed by (file path, mtime, variable, chunk index) in an LRU
+bounded by chunk_cache_mb. A modified file has a new mtime, so its chunks are
+never served from the cache.
+"""
+
+import os
+import threading
+from typing import Callable
+
+import numpy as np
+from cachetools import LRUCache
+
+import oceannavigator.timing as timing
+from oceannavigator.settings import get_settings
+
+_lock = threading.Lock()
+# (path, mtime, variable, chunk index) -> read-only decoded chunk
+_chunks = None
+_metrics = {"hits": 0, "misses": 0, "bytes_read": 0}
+
+
+def clear() -> None:
+    """Forgets all chunks and counters, and picks up the configured budget."""
+    global _chunks
+
+    with _lock:
+        _chunks = None
+        for key in _metrics:
+            _metrics[key] = 0
+
+
+def _after_fork() -> None:
+    global _lock
+
+    _lock = threading.Lock()
+    clear()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def enabled() -> bool:
+    return get_settings().chunk_cache_mb > 0
+
+
+def _cache() -> LRUCache:
+    global _chunks
+
+    if _chunks is None:
+        _chunks = LRUCache(
+            maxsize=get_settings().chunk_cache_mb * 1024 * 1024,
+            getsizeof=lambda chunk: chunk.nbytes,
+        )
+
+    return _chunks
+
+
+def get(key: tuple, load: Callable[[], np.ndarray]) -> np.ndarray:
+    """Returns a cached chunk, calling load() to read and decode it on a miss.
+
+    Returns:
+        ndarray -- The read-only decoded chunk.
+    """
+    with _lock:
+        chunk = _cache().get(key)
+        if chunk is not None:
+            _metrics["hits"] += 1
+            return chunk
+
+    chunk = load()
+    chunk.setflags(write=False)
+
+    with _lock:
+        _metrics["misses"] += 1
+        _metrics["bytes_read"] += chunk.nbytes
+        cache = _cache()
+        if chunk.nbytes <= cache.maxsize:
+            cache[key] = chunk
+
+    return chunk
+
+
+def metrics() -> dict:
+    """Returns the hits and misses of the cache, its hit ratio, the bytes of
+    chunks read on misses and the bytes currently cached.
+    """
+    with _lock:
+        result = dict(_metrics)
+        result["bytes"] = _chunks.currsize if _chunks is not None else 0
+        result["chunks"] = len(_chunks) if _chunks is not None else 0
+
+    requests = result["hits"] + result["misses"]
+    result["hit_ratio"] = result["hits"] / requests if requests else 0.0
+
+    return result
+
+
+def prometheus_text() -> str:
+    """Returns the cache metrics in the Prometheus text format."""
+    current = metrics()
+    lines = timing.format_metric(
+        "navigator_chunk_cache_requests_total",
+        "counter",
+        "Decoded chunk lookups by result.",
+        [
+            ("", {"result": "hit"}, current["hits"]),
+            ("", {"result": "miss"}, current["misses"]),
+        ],
+    )
+    lines += timing.format_metric(
+        "navigator_chunk_cache_read_bytes_total",
+        "counter",
+        "Decoded bytes of the chunks read on cache misses.",
+        [("", {}, current["bytes_read"])],
+    )
+    lines += timing.format_metric(
+        "navigator_chunk_cache_bytes",
+        "gauge",
+        "Decoded bytes of the cached chunks.",
+        [("", {}, current["bytes"])],
+    )
+
+    return "\n".join(lines) + "\n"
@@ -1,22 +1,154 @@
-import warnings
+import hashlib
+import os
+import threading
+import zipfile
+from pathlib import Path
 from typing import Union
 
 import dateutil.parser
 import netCDF4 as netcdf
 import numpy as np
-import pyresample
 import pytz
-from cachetools import TTLCache
+from cachetools import LRUCache, TTLCache
 from pykdtree.kdtree import KDTree
 
+import oceannavigator.timing as timing
 from data.calculated import CalculatedData
 from data.model import Model
 from data.netcdf_data import NetCDFData
+from oceannavigator.settings import get_settings
 from utils.errors import ServerError
 
 RAD_FACTOR = np.pi / 180.0
 EARTH_RADIUS = 6378137.0
 
+_mesh_cache = LRUCache(maxsize=16)
+
+
+def _to_cartesian(lat, lon):
+    """Converts lat/lon in degrees to points on the unit sphere."""
+    lat_rad = np.asarray(lat, dtype=np.float64) * RAD_FACTOR
+    lon_rad = np.asarray(lon, dtype=np.float64) * RAD_FACTOR
+    clat = np.cos(lat_rad)
+    return np.stack(
+        [clat * np.cos(lon_rad), clat * np.sin(lon_rad), np.sin(lat_rad)], axis=-1
+    )
+
+
+class FvcomMesh:
+    """Triangular mesh of an FVCOM dataset, built from the nv connectivity.
+
+    Locates the element containing a point and the barycentric weights of the
+    element's nodes. Meshes are cached in memory per process and as .npz files
+    in the cache directory so they are only read from the dataset once.
+    """
+
+    def __init__(self, node_lat, node_lon, element_lat, element_lon, nv) -> None:
+        self.node_lat = node_lat
+        self.node_lon = node_lon
+        self.element_lat = element_lat
+        self.element_lon = element_lon
+        # Zero-based node indices of each element, shape (nele, 3)
+        self.nv = nv
+        self._kdt = KDTree(_to_cartesian(element_lat, element_lon))
+
+    @classmethod
+    @timing.timed("resample")
+    def from_dataset(cls, nc_data: NetCDFData) -> "FvcomMesh":
+        """Returns the cached mesh for the dataset, loading it from the cache
+        directory or building it from the dataset's variables if needed.
+        """
+        nv = nc_data.get_dataset_variable("nv")
+        lat = nc_data.get_dataset_variable("lat")
+        key = hashlib.sha1(f"{nc_data.url};{lat.shape};{nv.shape}".encode()).hexdigest()
+
+        mesh = _mesh_cache.get(key)
+        if mesh is not None:
+            return mesh
+
+        cache_file = Path(get_settings().cache_dir).joinpath("fvcom_mesh", f"{key}.npz")
+        try:
+            with np.load(cache_file) as arrays:
+                mesh = cls(**arrays)
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            arrays = {
+                "node_lat": np.asarray(lat[:], dtype=np.float64),
+                "node_lon": np.asarray(
+                    nc_data.get_dataset_variable("lon")[:], dtype=np.float64
+                ),
+                "element_lat": np.asarray(
+                    nc_data.get_dataset_variable("latc")[:], dtype=np.float64
+                ),
+                "element_lon": np.asarray(
+                    nc_data.get_dataset_variable("lonc")[:], dtype=np.float64
+                ),
+                "nv": np.asarray(nv[:], dtype=np.int64).transpose() - 1,
+            }
+            mesh = cls(**arrays)
+
+            def do_save(filename: Path, arrays: dict) -> None:
+                filename.parent.mkdir(parents=True, exist_ok=True)
+                tmp_file = filename.with_name(f"{filename.stem}.{os.getpid()}.npz")
+                np.savez(tmp_file, **arrays)
+                os.replace(tmp_file, filename)
+
+            t = threading.Thread(target=do_save, args=(cache_file, arrays))
+            t.daemon = True
+            t.start()
+
+        _mesh_cache[key] = mesh
+        return mesh
+
+    def nearest_elements(self, lat, lon, n: int = 1):
+        """Returns the indices of the n elements with the nearest centroids."""
+        query = _to_cartesian(np.atleast_1d(lat), np.atleast_1d(lon))
+        _, elements = self._kdt.query(query, k=n)
+        return elements.astype(np.int64)
+
+    def locate(self, lat, lon, candidates: int = 8):
+        """Finds the elements containing the given points.
+
+        Arguments:
+            lat, lon -- Point coordinates in degrees.
+            candidates -- Number of nearby elements to test for each point.
+
+        Returns:
+            Tuple of the element index of each point (-1 when the point is
+            outside the mesh) and the barycentric weights of the element's nodes,
+            shape (points, 3), NaN when the point is outside the mesh.
+        """
+        lat = np.atleast_1d(np.asarray(lat, dtype=np.float64))
+        lon = np.atleast_1d(np.asarray(lon, dtype=np.float64))
+
+        elements = self.nearest_elements(lat, lon, candidates).reshape(
+            lat.size, candidates
+        )
+        triangles = self.nv[elements]
+
+        # Local equirectangular coordinates relative to each point
+        dlon = (self.node_lon[triangles] - lon[:, None, None] + 180) % 360 - 180
+        x = dlon * np.cos(lat * RAD_FACTOR)[:, None, None]
+        y = self.node_lat[triangles] - lat[:, None, None]
+
+        x1, x2, x3 = x[..., 0], x[..., 1], x[..., 2]
+        y1, y2, y3 = y[..., 0], y[..., 1], y[..., 2]
+        det = (y2 - y3) * (x1 - x3) + (x3 - x2) * (y1 - y3)
+        det = np.where(det == 0, np.nan, det)
+
+        w1 = ((y2 - y3) * -x3 + (x3 - x2) * -y3) / det
+        w2 = ((y3 - y1) * -x3 + (x1 - x3) * -y3) / det
+        weights = np.stack([w1, w2, 1 - w1 - w2], axis=-1)
+
+        inside = np.all(weights >= -1e-9, axis=-1)
+        found = inside.any(axis=1)
+        first = np.argmax(inside, axis=1)
+        rows = np.arange(lat.size)
+
+        element = np.where(found, elements[rows, first], -1)
+        weights = np.where(found[:, np.newaxis], weights[rows, first], np.nan)
+
+        return element, weights
+
 
 class Fvcom(Model):
     """FVCOM datasets have a non-uniform grid,
@@ -29,7 +161,7 @@ class Fvcom(Model):
         super().__init__(nc_data)
         self.nc_data = nc_data
         self.variables = nc_data.variables
-        self._kdt: KDTree = [None, None]
+        self._mesh: FvcomMesh = None
         self.__timestamp_cache: TTLCache = TTLCache(1, 3600)
 
     def __enter__(self):
@@ -59,13 +191,15 @@ class Fvcom(Model):
             [int] -- Time index.
         """
 
-        time_var = self.nc_data.time_variable
+        time_axis = self.nc_data.time_axis
+        index = time_axis.nearest(timestamp)
 
         # https: // stackoverflow.com/a/41022847/2231969
         # We use 1.e-7 since the default 1.e-5 doesn't provide enough precision
-        return next(
-            i for i, _ in enumerate(time_var) if np.isclose(_, timestamp, 1.0e-7)
-        )
+        if not np.isclose(time_axis.values[index], timestamp, 1.0e-7):
+            raise IndexError(f"{timestamp} isn't in the time dimension.")
+
+        return index
 
     @property
     def depths(self):
@@ -104,323 +238,210 @@ class Fvcom(Model):
 
         return None
 
-    def __find_index(self, lat, lon, element=False, n=10):
-        index = int(element)
-
-        if element:
-            latvar = self.nc_data.get_dataset_variable("latc")
-            lonvar = self.nc_data.get_dataset_variable("lonc")
-        else:
-            latvar = self.nc_data.get_dataset_variable("lat")
-            lonvar = self.nc_data.get_dataset_variable("lon")
-
-        if self._kdt[index] is None:
-            latvals = latvar[:] * RAD_FACTOR
-            lonvals = lonvar[:] * RAD_FACTOR
-            clat, clon = np.cos(latvals), np.cos(lonvals)
-            slat, slon = np.sin(latvals), np.sin(lonvals)
-            triples = np.array(
-                [np.ravel(clat * clon), np.ravel(clat * slon), np.ravel(slat)]
-            ).transpose()
-            self._kdt[index] = KDTree(triples)
-            del clat, clon
-            del slat, slon
-            del triples
-
-        if not hasattr(lat, "__len__"):
-            lat = [lat]
-            lon = [lon]
-
-        lat = np.array(lat)
-        lon = np.array(lon)
-
-        lat_rad = lat * RAD_FACTOR
-        lon_rad = lon * RAD_FACTOR
-        clat, clon = np.cos(lat_rad), np.cos(lon_rad)
-        slat, slon = np.sin(lat_rad), np.sin(lon_rad)
-        q = np.array([clat * clon, clat * slon, slat]).transpose()
-
-        dist_sq_min, minindex_1d = self._kdt[index].query(np.float32(q), k=n)
-        return np.squeeze(minindex_1d), dist_sq_min * EARTH_RADIUS
-
-    def __bounding_box(self, lat, lon, element=False, n=10):
-        index, d = self.__find_index(lat, lon, element, n)
-
-        def fix_limits(data, limit):
-            mx = np.amax(data)
-            mn = np.amin(data)
-            d = mx - mn
-
-            if d < 2:
-                mn -= 2
-                mx += 2
-
-            mn = int(mn - d / 4.0)
-            mx = int(mx + d / 4.0)
-
-            mn = np.clip(mn, 0, limit)
-            mx = np.clip(mx, 0, limit)
-
-            return mn, mx
+    @property
+    def mesh(self) -> FvcomMesh:
+        if self._mesh is None:
+            self._mesh = FvcomMesh.from_dataset(self.nc_data)
 
-        if element:
-            latvar = self.nc_data.get_dataset_variable("latc")
-        else:
-            latvar = self.nc_data.get_dataset_variable("lat")
-        mini, maxi = fix_limits(index, latvar.shape)
+        return self._mesh
 
-        return mini[0], maxi[0], np.clip(np.amax(d), 5000, 50000)
+    def __time_index(self, starttime, endtime=None):
+        if endtime is not None:
+            return slice(
+                self.timestamp_to_time_index(starttime),
+                self.timestamp_to_time_index(endtime) + 1,
+            )
 
-    def __latlon_vars(self, data_var):
-        var = self.nc_data.get_dataset_variable(data_var)
-        if "latc" in var.coordinates:
-            latvar = self.nc_data.get_dataset_variable("latc")
-            lonvar = self.nc_data.get_dataset_variable("lonc")
-        else:
-            latvar = self.nc_data.get_dataset_variable("lat")
-            lonvar = self.nc_data.get_dataset_variable("lon")
+        return self.timestamp_to_time_index(starttime)
 
-        return latvar, lonvar
+    def __read(self, variable, *index):
+        """Reads the given index of a variable as a float array with NaN for
+        missing values.
+        """
+        values = np.ma.masked_invalid(self.nc_data.read(variable, index))
 
-    def __resample(self, lat_in, lon_in, lat_out, lon_out, var, radius=50000):
-        if len(var.shape) == 2:
-            var = np.rollaxis(var, 0, 2)
-        elif len(var.shape) == 3:
-            var = np.rollaxis(var, 0, 3)
-            var = np.rollaxis(var, 0, 3)
+        return np.ma.filled(values.astype(np.float64), np.nan)
 
-        origshape = var.shape
-        var = var.reshape([var.shape[0], -1])
+    @timing.timed("resample")
+    def __locate(self, latitude, longitude, element):
+        """Finds the nodes (or the element) each point is interpolated from.
 
-        def weight(r):
-            r = np.clip(r, np.finfo(r.dtype).eps, np.finfo(r.dtype).max)
-            return 1.0 / r  # ** 2
+        Returns:
+            Tuple of the sorted node or element indices to read, the position of
+            each point's nodes in those indices, shape (points, 3) or (points, 1),
+            and the matching weights.
+        """
+        elements, weights = self.mesh.locate(latitude, longitude)
+        found = elements >= 0
 
-        data = np.squeeze(var[:])
+        if element:
+            # Element variables are constant across an element
+            cells = np.where(found, elements, 0)[:, np.newaxis]
+            weights = np.where(found, 1.0, np.nan)[:, np.newaxis]
+        else:
+            cells = self.mesh.nv[np.where(found, elements, 0)]
 
-        masked_lon_in = np.ma.array(lon_in)
-        masked_lat_in = np.ma.array(lat_in)
+        indices, positions = np.unique(cells, return_inverse=True)
 
-        output_def = pyresample.geometry.SwathDefinition(
-            lons=np.ma.array(lon_out), lats=np.ma.array(lat_out)
-        )
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", UserWarning)
-
-            if len(data.shape) == 2 and data.shape[1] != 1:
-                output = []
-                # multiple depths
-                for d in range(0, data.shape[1]):
-                    masked_lon_in.mask = masked_lat_in.mask = (
-                        data[:, d].view(np.ma.MaskedArray).mask
-                    )
-                    input_def = pyresample.geometry.SwathDefinition(
-                        lons=masked_lon_in, lats=masked_lat_in
-                    )
-                    output.append(
-                        pyresample.kd_tree.resample_custom(
-                            input_def,
-                            data[:, d],
-                            output_def,
-                            radius_of_influence=float(radius),
-                            neighbours=10,
-                            weight_funcs=weight,
-                            fill_value=None,
-                        )
-                    )
-
-                output = np.ma.array(output).transpose()
-            else:
-                masked_lon_in.mask = masked_lat_in.mask = (
-                    var[:].view(np.ma.MaskedArray).mask
-                )
-                input_def = pyresample.geometry.SwathDefinition(
-                    lons=masked_lon_in, lats=masked_lat_in
-                )
-                output = pyresample.kd_tree.resample_custom(
-                    input_def,
-                    data,
-                    output_def,
-                    radius_of_influence=float(radius),
-                    neighbours=10,
-                    weight_funcs=weight,
-                    fill_value=None,
-                )
+        return indices, positions.reshape(cells.shape), weights
 
-        if len(origshape) == 3:
-            output = output.reshape(origshape[1:])
+    @staticmethod
+    @timing.timed("resample")
+    def __interpolate(values, positions, weights):
+        """Interpolates values read at the located indices (last axis) to the
+        points, giving an array of shape values.shape[:-1] + (points,).
+        """
+        result = np.sum(values[..., positions] * weights, axis=-1)
 
-        return np.squeeze(output)
+        return np.ma.masked_invalid(result)
 
+    @timing.timed("read")
     def get_raw_point(self, latitude, longitude, depth, timestamp, variable):
-        min_i, max_i, radius = self.__bounding_box(latitude, longitude, False, 10)
-
-        if not hasattr(latitude, "__len__"):
-            latitude = np.array([latitude])
-            longitude = np.array([longitude])
-
         var = self.nc_data.get_dataset_variable(variable)
-        time = self.nc_data.timestamp_to_time_index(timestamp)
-        latvar, lonvar = self.__latlon_vars(variable)
+        time = self.timestamp_to_time_index(timestamp)
+
+        elements = np.unique(self.mesh.nearest_elements(latitude, longitude, 10))
 
         if depth == "bottom":
             depth = -1
 
+        if "nele" in var.dimensions:
+            indices = elements
+            lat, lon = self.mesh.element_lat[indices], self.mesh.element_lon[indices]
+        else:
+            indices = np.unique(self.mesh.nv[elements])
+            lat, lon = self.mesh.node_lat[indices], self.mesh.node_lon[indices]
+
         if len(var.shape) == 3:
-            data = var[time, depth, min_i:max_i]
+            data = self.__read(variable, time, depth, indices)
         else:
-            data = var[time, min_i:max_i]
+            data = self.__read(variable, time, indices)
 
-        return (latvar[min_i:max_i], lonvar[min_i:max_i], data)
+        return (lat, lon, np.ma.masked_invalid(data))
 
+    @timing.timed("read")
     def get_point(
-        self, latitude, longitude, depth, timestamp, variable, return_depth=False
+        self,
+        latitude,
+        longitude,
+        depth,
+        variable,
+        starttime,
+        endtime=None,
+        return_depth=False,
+        resolution=None,
     ):
+        # Unstructured grids are always read at their own resolution
         var = self.nc_data.get_dataset_variable(variable)
-        time = self.nc_data.timestamp_to_time_index(timestamp)
-        latvar, lonvar = self.__latlon_vars(variable)
-
-        min_i, max_i, radius = self.__bounding_box(
-            latitude,
-            longitude,
-            "nele" in self.nc_data.get_dataset_variable(variable).dimensions,
-            10,
+        time = self.__time_index(starttime, endtime)
+
+        indices, positions, weights = self.__locate(
+            latitude, longitude, "nele" in var.dimensions
         )
 
-        if not hasattr(latitude, "__len__"):
-            latitude = np.array([latitude])
-            longitude = np.array([longitude])
+        if isinstance(depth, list):
+            return self.__get_point_levels(
+                variable, time, depth, indices, positions, weights, return_depth
+            )
 
         if depth == "bottom":
             depth = -1
 
         if len(var.shape) == 3:
-            data = var[time, depth, min_i:max_i]
+            data = self.__read(variable, time, depth, indices)
         else:
-            data = var[time, min_i:max_i]
+            data = self.__read(variable, time, indices)
 
-        res = self.__resample(
-            latvar[min_i:max_i], lonvar[min_i:max_i], latitude, longitude, data, radius
+        res = np.squeeze(
+            np.moveaxis(self.__interpolate(data, positions, weights), -1, 0)
         )
 
         if return_depth:
-            d = self.__get_depths(variable, time, min_i, max_i)
+            z = self.__get_depths(variable, time, indices)
+            level = depth if z.shape[-2] > 1 else 0
+            dep = self.__interpolate(z[..., level, :], positions, weights)
+
+            return res, np.squeeze(np.moveaxis(dep, -1, 0))
+        return res
+
+    def __get_point_levels(
+        self, variable, time, depths, indices, positions, weights, return_depth
+    ):
+        """Interpolates the variable at several depths (sigma level indices or
+        "bottom") from a single read of the columns at the located indices.
+        """
+        var = self.nc_data.get_dataset_variable(variable)
+        levels = [-1 if d == "bottom" else int(d) for d in depths]
 
-            res_d = self.__resample(
-                latvar[min_i:max_i], lonvar[min_i:max_i], latitude, longitude, d, radius
+        if len(var.shape) == 3:
+            data = self.__read(variable, time, slice(None), indices)
+        else:
+            data = self.__read(variable, time, indices)[..., np.newaxis, :]
+            levels = [0] * len(levels)
+
+        def stack(values):
+            # Each level shaped like the result of get_point at a single depth
+            return np.ma.stack(
+                [
+                    np.squeeze(np.moveaxis(values[..., i, :], -1, 0))
+                    for i in range(len(levels))
+                ]
             )
 
-            if len(latitude) > 1:
-                dep = res_d[:, depth]
-            else:
-                dep = res_d[depth]
+        res = stack(self.__interpolate(data[..., levels, :], positions, weights))
 
-            return res, dep
+        if return_depth:
+            z = self.__get_depths(variable, time, indices)
+            if z.shape[-2] == 1:
+                levels = [0] * len(levels)
+            dep = self.__interpolate(z[..., levels, :], positions, weights)
+
+            return res, stack(dep)
         return res
 
-    def __get_depths(self, variable, timestamp, min_i, max_i):
+    def __get_depths(self, variable, time, indices):
+        """Computes the depths of the sigma levels at the given node or element
+        indices, with shape ([time,] levels, indices).
+        """
         var = self.nc_data.get_dataset_variable(variable)
-        time = self.nc_data.timestamp_to_time_index(timestamp)
 
-        if "nele" in var.dimensions:
-            # First, find indicies to cover the nodes
-            nv = self.nc_data.get_dataset_variable("nv")[:, min_i:max_i]
-            min_n, max_n = np.amin(nv), np.amax(nv)
-
-            if "siglay" in var.dimensions:
-                sigma_var = "siglay"
-            elif "siglev" in var.dimensions:
-                sigma_var = "siglev"
-            else:
-                return np.zeros(max_i - min_i)
-
-            radius = 50000
-
-            lat_in = self.nc_data.get_dataset_variable("lat")[min_n:max_n]
-            lon_in = self.nc_data.get_dataset_variable("lon")[min_n:max_n]
-            lat_out = self.nc_data.get_dataset_variable("latc")[min_i:max_i]
-            lon_out = self.nc_data.get_dataset_variable("lonc")[min_i:max_i]
-
-            sigma = self.__resample(
-                lat_in,
-                lon_in,
-                lat_out,
-                lon_out,
-                self.nc_data.get_dataset_variable(sigma_var)[:, min_n:max_n],
-                radius,
-            ).transpose()
-            bath = self.__resample(
-                lat_in,
-                lon_in,
-                lat_out,
-                lon_out,
-                self.nc_data.get_dataset_variable("h")[min_n:max_n],
-                radius,
-            )
-            surf = self.__resample(
-                lat_in,
-                lon_in,
-                lat_out,
-                lon_out,
-                self.nc_data.get_dataset_variable("zeta")[time, min_n:max_n],
-                radius,
-            ).transpose()
-
-            if hasattr(time, "__len__"):
-                sigma = np.tile(sigma, (len(time), 1, 1))
-                sigma = np.rollaxis(sigma, 1, 0)
-
-            z = -1 * (sigma * (bath + surf) + surf)
-            return z
+        if "siglay" in var.dimensions:
+            sigma_var = "siglay"
+        elif "siglev" in var.dimensions:
+            sigma_var = "siglev"
         else:
-            if "siglay" in var.dimensions:
-                sigma = self.nc_data.get_dataset_variable("siglay")[:, min_i:max_i]
-            elif "siglev" in var.dimensions:
-                sigma = self.nc_data.get_dataset_variable("siglev")[:, min_i:max_i]
-            else:
-                return np.array([0] * (max_i - min_i))
-
-            bath = self.nc_data.get_dataset_variable("h")[min_i:max_i]
-            surf = self.nc_data.get_dataset_variable("zeta")[time, min_i:max_i]
-
-            if hasattr(time, "__len__"):
-                sigma = np.tile(sigma, (len(time), 1, 1))
-                sigma = np.rollaxis(sigma, 1, 0)
-
-            z = -1 * (sigma * (bath + surf) + surf)
-            return z
-
-    def get_profile(self, latitude, longitude, timestamp, variable):
-        latvar, lonvar = self.__latlon_vars(variable)
-        time = self.nc_data.timestamp_to_time_index(timestamp)
-
-        min_i, max_i, radius = self.__bounding_box(
-            latitude,
-            longitude,
-            "nele" in self.nc_data.get_dataset_variable(variable).dimensions,
-            10,
-        )
+            return np.zeros((1, len(indices)))
 
-        if not hasattr(latitude, "__len__"):
-            latitude = np.array([latitude])
-            longitude = np.array([longitude])
-
-        data = self.nc_data.get_dataset_variable(variable)[time, :, min_i:max_i]
-        res = self.__resample(
-            latvar[min_i:max_i],
-            lonvar[min_i:max_i],
-            [latitude],
-            [longitude],
-            data,
-            radius,
-        )
+        if "nele" in var.dimensions:
+            # Element depths are the mean of the depths at the element's nodes
+            nodes = self.mesh.nv[indices]
+            node_indices, positions = np.unique(nodes, return_inverse=True)
+            z = self.__sigma_to_z(sigma_var, time, node_indices)
+
+            return z[..., positions.reshape(nodes.shape)].mean(axis=-1)
+
+        return self.__sigma_to_z(sigma_var, time, indices)
 
-        d = self.__get_depths(variable, time, min_i, max_i)
+    def __sigma_to_z(self, sigma_var, time, nodes):
+        sigma = self.__read(sigma_var, slice(None), nodes)
+        bath = self.__read("h", nodes)
+        surf = self.__read("zeta", time, nodes)[..., np.newaxis, :]
 
-        res_d = self.__resample(
-            latvar[min_i:max_i], lonvar[min_i:max_i], [latitude], [longitude], d, radius
+        return -1 * (sigma * (bath + surf) + surf)
+
+    @timing.timed("read")
+    def get_profile(self, latitude, longitude, variable, starttime, endtime=None):
+        var = self.nc_data.get_dataset_variable(variable)
+        time = self.__time_index(starttime, endtime)
+
+        indices, positions, weights = self.__locate(
+            latitude, longitude, "nele" in var.dimensions
         )
 
-        dep = res_d
+        data = self.__read(variable, time, slice(None), indices)
+        res = self.__interpolate(data, positions, weights)
+
+        z = self.__get_depths(variable, time, indices)
+        dep = self.__interpolate(z, positions, weights)
 
-        return res, dep
+        return np.squeeze(res), np.squeeze(np.moveaxis(dep, -1, 0))
@@ -1,8 +1,15 @@
 import datetime
+import threading
 
-import geopy
 import numpy as np
-from geopy.distance import GeodesicDistance, geodesic
+from cachetools import LRUCache
+from pyproj import Geod
+
+_geod = Geod(ellps="WGS84")
+
+_lock = threading.Lock()
+# (points, n, times) -> path_to_points result
+_paths = LRUCache(maxsize=256)
 
 
 def bearing(lat0, lon0, lat1, lon1):
@@ -17,7 +24,65 @@ def bearing(lat0, lon0, lat1, lon1):
     return np.degrees(b)
 
 
+def distance(lat0, lon0, lat1, lon1):
+    """Returns the geodesic distances in km between arrays of points."""
+    _, _, d = _geod.inv(
+        *np.broadcast_arrays(
+            np.asarray(lon0, dtype=float),
+            np.asarray(lat0, dtype=float),
+            np.asarray(lon1, dtype=float),
+            np.asarray(lat1, dtype=float),
+        )
+    )
+    return np.asarray(d) / 1000
+
+
+def destination(lat0, lon0, bearings, distances):
+    """Returns the latitudes and longitudes reached by travelling distances in km
+    along the geodesics with the initial bearings from arrays of points.
+    """
+    lon, lat, _ = _geod.fwd(
+        *np.broadcast_arrays(
+            np.asarray(lon0, dtype=float),
+            np.asarray(lat0, dtype=float),
+            np.asarray(bearings, dtype=float),
+            np.asarray(distances, dtype=float) * 1000,
+        )
+    )
+    return np.asarray(lat), np.asarray(lon)
+
+
 def path_to_points(points, n=100, times=None):
+    """Samples a path of [lat, lon] points with about n points spread over its
+    segments by length, each segment keeping both of its end points.
+
+    Results are cached per path, n and times, so repeated calls for the same
+    path are free.
+
+    Returns:
+        tuple -- Arrays of the cumulative distances in km, times interpolated
+        along each segment, latitudes, longitudes and the bearing of the segment
+        of each point.
+    """
+    key = (
+        tuple(tuple(p) for p in points),
+        n,
+        None if times is None else tuple(times),
+    )
+
+    with _lock:
+        result = _paths.get(key)
+
+    if result is None:
+        result = _path_to_points(points, n, times)
+        with _lock:
+            _paths[key] = result
+
+    # Callers get their own arrays
+    return tuple(np.copy(r) for r in result)
+
+
+def _path_to_points(points, n, times):
     if times is None:
         times = [0] * len(points)
 
@@ -34,44 +99,35 @@ def path_to_points(points, n=100, times=None):
         else:
             times = np.linspace(times[0], times[-1], num=len(points))
 
-    tuples = list(zip(points, points[1:], times, times[1:]))
+    points = np.asarray(points, dtype=float)
+    times = np.asarray(times)
+    lat0, lon0 = points[:-1, 0], points[:-1, 1]
+    lat1, lon1 = points[1:, 0], points[1:, 1]
 
-    distance_between = []
-    for pair in tuples:
-        distance_between.append(geodesic(pair[0], pair[1]).km)
+    distance_between = distance(lat0, lon0, lat1, lon1)
+    n_pts = np.ceil(n * (distance_between / np.sum(distance_between))).astype(int)
+    n_pts = np.clip(n_pts, 2, n)
 
-    total_distance = np.sum(distance_between)
-    distance = []
-    latitude = []
-    longitude = []
-    bearings = []
-    output_time = []
+    # Segment of each output point and its position along the segment
+    segment = np.repeat(np.arange(len(n_pts)), n_pts)
+    fraction = (
+        np.arange(segment.size) - np.repeat(np.cumsum(n_pts) - n_pts, n_pts)
+    ) / (n_pts[segment] - 1)
 
-    for index, pair in enumerate(tuples):
-        n_pts = int(np.ceil(n * (distance_between[index] / total_distance)))
-        n_pts = np.clip(n_pts, 2, n)
-        p = list(map(geopy.Point, pair[0:2]))
+    bearings = bearing(lat0, lon0, lat1, lon1)[segment]
+    along = fraction * distance_between[segment]
+    latitude, longitude = destination(lat0[segment], lon0[segment], bearings, along)
 
-        p_dist, p_lat, p_lon, b = points_between(p[0], p[1], n_pts)
-        if len(distance) > 0:
-            distance.extend(np.add(p_dist, distance[-1]))
-        else:
-            distance.extend(p_dist)
+    start = np.concatenate(([0], np.cumsum(distance_between)[:-1]))
+    distances = start[segment] + along
 
-        latitude.extend(p_lat)
-        longitude.extend(p_lon)
-        bearings.extend([b] * len(p_dist))
-        output_time.extend(
-            [pair[2] + i * (pair[3] - pair[2]) / (n_pts - 1) for i in range(0, n_pts)]
-        )
-    return distance, output_time, latitude, longitude, bearings
+    t0 = times[:-1][segment]
+    output_time = t0 + (times[1:][segment] - t0) * fraction
 
+    return distances, output_time, latitude, longitude, bearings
 
-def points_between(start, end, numpoints, constantvalue=False):
-    distance = []
-    latitude = []
-    longitude = []
 
+def points_between(start, end, numpoints, constantvalue=False):
     lat0 = start.latitude
     lon0 = start.longitude
     lat1 = end.latitude
@@ -80,8 +136,7 @@ def points_between(start, end, numpoints, constantvalue=False):
     if constantvalue and np.isclose(lat0, lat1):
         latitude = np.ones(numpoints) * lat0
         longitude = np.linspace(lon0, lon1, num=numpoints)
-        for lon in longitude:
-            distance.append(geodesic(start, geopy.Point(lat0, lon)).km)
+        distances = distance(lat0, lon0, latitude, longitude)
         if lon1 > lon0:
             b = 90
         else:
@@ -89,20 +144,15 @@ def points_between(start, end, numpoints, constantvalue=False):
     elif constantvalue and np.isclose(lon0, lon1):
         latitude = np.linspace(lat0, lat1, num=numpoints)
         longitude = np.ones(numpoints) * lon0
-        for lat in latitude:
-            distance.append(geodesic(start, geopy.Point(lat, lon0)).km)
+        distances = distance(lat0, lon0, latitude, longitude)
         if lat1 > lat0:
             b = 0
         else:
             b = 180
     else:
-        total_distance = geodesic(start, end).km
-        distance = np.linspace(0, total_distance, num=numpoints)
+        total_distance = distance(lat0, lon0, lat1, lon1)
+        distances = np.linspace(0, total_distance, num=numpoints)
         b = bearing(lat0, lon0, lat1, lon1)
+        latitude, longitude = destination(lat0, lon0, b, distances)
 
-        for d in distance:
-            p = GeodesicDistance().destination(start, b, d)
-            latitude.append(p.latitude)
-            longitude.append(p.longitude)
-
-    return list(map(np.array, [distance, latitude, longitude, b]))
+    return list(map(np.array, [distances, latitude, longitude, b]))
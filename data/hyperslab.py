@@ -0,0 +1,356 @@
+"""
+Direct reads of small windows of NetCDF variables.
+
+SQLite-indexed datasets are opened with xarray.open_mfdataset, so reading a
+window of a variable builds and schedules a dask graph over every file, which
+often costs more than the read itself for the bounding box of a point, a tile or
+a profile. NetCDFData.read instead resolves the file holding a window and, when
+the on-disk chunks it touches add up to less than direct_read_max_mb, reads the
+hyperslab through a cached netCDF4 handle and decodes it like xarray would,
+assembling it from the chunks of data.chunk_cache when the variable is chunked.
+Larger windows, remote datasets and windows spanning several files fall back to
+the lazy xarray read. metrics() counts the reads served by each path.
+"""
+
+import os
+import threading
+from itertools import product
+from typing import List, Union
+
+import netCDF4
+import numpy as np
+import xarray
+from cachetools import LRUCache
+from xarray.backends import CachingFileManager
+from xarray.backends.netCDF4_ import NETCDF4_PYTHON_LOCK
+from xarray.conventions import decode_cf_variable
+
+import data.chunk_cache as chunk_cache
+import oceannavigator.timing as timing
+from oceannavigator.settings import get_settings
+
+TIME_DIMENSIONS = ["time", "time_counter", "Times"]
+PATHS = ["direct", "lazy"]
+
+_lock = threading.Lock()
+# (path, mtime) -> NetCDFFile
+_files = LRUCache(maxsize=1024)
+# read path -> {"reads": n, "bytes": n}
+_metrics = {}
+
+
+def clear() -> None:
+    """Forgets all files and counters."""
+    with _lock:
+        _files.clear()
+        _metrics.clear()
+
+
+def _after_fork() -> None:
+    # netCDF4 handles can't be shared with a forked process
+    global _lock
+
+    _lock = threading.Lock()
+    clear()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+class NetCDFFile:
+    """The layout of the variables of a NetCDF file and its time values, with a
+    handle that is reopened as needed by xarray's file cache.
+    """
+
+    def __init__(self, path: str, mtime: float) -> None:
+        self.path = path
+        self.mtime = mtime
+        self.manager = CachingFileManager(netCDF4.Dataset, path, mode="r")
+        self.variables = {}
+        # time dimension -> raw time values
+        self.times = {}
+
+        with NETCDF4_PYTHON_LOCK:
+            ds = self.manager.acquire()
+            for name, var in ds.variables.items():
+                chunks = var.chunking()
+                self.variables[name] = {
+                    "dims": var.dimensions,
+                    "shape": var.shape,
+                    # None for contiguous variables
+                    "chunks": None if chunks == "contiguous" else tuple(chunks),
+                    "attrs": {k: var.getncattr(k) for k in var.ncattrs()},
+                }
+
+                if name in TIME_DIMENSIONS and var.dimensions == (name,):
+                    var.set_auto_maskandscale(False)
+                    self.times[name] = np.asarray(var[:])
+
+    def time_index(self, dimension: str, times: np.ndarray) -> Union[int, None]:
+        """Returns the index of the first of consecutive time values in the file,
+        or None if they aren't all in it.
+        """
+        values = self.times.get(dimension)
+        if values is None:
+            return None
+
+        start = np.flatnonzero(values == times[0])
+        if not start.size:
+            return None
+
+        start = int(start[0])
+        if np.array_equal(values[start : start + times.size], times):
+            return start
+
+        return None
+
+    def read(self, variable: str, window: list) -> np.ndarray:
+        """Reads a window of a variable, assembled from cached decoded chunks
+        when the variable is chunked.
+
+        Arguments:
+            window -- The (start, stop, is_index) or sorted index array of each
+                dimension, see _normalize.
+        """
+        chunks = self.variables[variable]["chunks"]
+        shape = [w.size if isinstance(w, np.ndarray) else w[1] - w[0] for w in window]
+        if chunks is None or not chunk_cache.enabled() or 0 in shape:
+            key = tuple(
+                w if isinstance(w, np.ndarray) else w[0] if w[2] else slice(*w[:2])
+                for w in window
+            )
+            return self.__read(variable, key)
+
+        # (chunk number, output positions, positions in the chunk) of the chunks
+        # along each dimension
+        positions = []
+        for w, c in zip(window, chunks):
+            parts = []
+            if isinstance(w, np.ndarray):
+                number = w // c
+                for k in np.unique(number).tolist():
+                    found = number == k
+                    parts.append((k, np.flatnonzero(found), w[found] - k * c))
+            else:
+                start, stop, _ = w
+                for k in range(start // c, (stop - 1) // c + 1):
+                    lo, hi = max(start, k * c), min(stop, k * c + c)
+                    parts.append(
+                        (
+                            k,
+                            slice(lo - start, hi - start),
+                            slice(lo - k * c, hi - k * c),
+                        )
+                    )
+            positions.append(parts)
+
+        result = None
+        for parts in product(*positions):
+            index = tuple(k for k, _, _ in parts)
+            chunk = chunk_cache.get(
+                (self.path, self.mtime, variable, index),
+                lambda index=index: self.__read_chunk(variable, index),
+            )
+            if result is None:
+                result = np.empty(shape, dtype=chunk.dtype)
+            result[tuple(p for _, p, _ in parts)] = chunk[tuple(p for _, _, p in parts)]
+
+        # Drop the dimensions selected by ints
+        return result[
+            tuple(
+                0 if not isinstance(w, np.ndarray) and w[2] else slice(None)
+                for w in window
+            )
+        ]
+
+    def __read_chunk(self, variable: str, index: tuple) -> np.ndarray:
+        info = self.variables[variable]
+
+        return self.__read(
+            variable,
+            tuple(
+                slice(k * c, min(k * c + c, n))
+                for k, c, n in zip(index, info["chunks"], info["shape"])
+            ),
+        )
+
+    def __read(self, variable: str, key: tuple) -> np.ndarray:
+        """Reads and decodes a hyperslab of a variable."""
+        with NETCDF4_PYTHON_LOCK:
+            var = self.manager.acquire().variables[variable]
+            var.set_auto_maskandscale(False)
+            raw = np.asarray(var[key])
+
+        decoded = decode_cf_variable(
+            variable,
+            xarray.Variable(
+                [f"dim_{i}" for i in range(raw.ndim)],
+                raw,
+                self.variables[variable]["attrs"],
+            ),
+            decode_times=False,
+            decode_timedelta=False,
+        )
+
+        return np.asarray(decoded.values)
+
+
+def get_file(path: str) -> NetCDFFile:
+    key = (path, os.path.getmtime(path))
+    with _lock:
+        f = _files.get(key)
+
+    if f is None:
+        f = NetCDFFile(*key)
+        with _lock:
+            _files[key] = f
+
+    return f
+
+
+def _normalize(key: tuple, shape: tuple) -> Union[list, None]:
+    """Returns the (start, stop, is_index) of each dimension selected by ints and
+    contiguous slices, or the sorted indices selected by a 1-D integer array
+    (only one dimension can be selected by an array), or None for any other key.
+    """
+    if not isinstance(key, tuple):
+        key = (key,)
+    if len(key) > len(shape):
+        return None
+
+    result = []
+    for k, n in zip(key + (slice(None),) * (len(shape) - len(key)), shape):
+        if isinstance(k, (int, np.integer)) and not isinstance(k, bool):
+            k = int(k) + n if k < 0 else int(k)
+            if not 0 <= k < n:
+                return None
+            result.append((k, k + 1, True))
+        elif isinstance(k, slice) and k.step in (None, 1):
+            start, stop, _ = k.indices(n)
+            result.append((start, max(start, stop), False))
+        elif isinstance(k, np.ndarray) and k.ndim == 1 and k.dtype.kind in "iu":
+            k = np.where(k < 0, k + n, k)
+            if not k.size or k.min() < 0 or k.max() >= n or np.any(np.diff(k) <= 0):
+                return None
+            result.append(k)
+        else:
+            return None
+
+    if sum(isinstance(w, np.ndarray) for w in result) > 1:
+        return None
+
+    return result
+
+
+def _chunk_bytes(window: list, chunks: tuple, itemsize: int) -> int:
+    """Returns the size of the on-disk chunks that hold a window."""
+    size = itemsize
+    for w, c in zip(window, chunks or (1,) * len(window)):
+        if isinstance(w, np.ndarray):
+            size *= np.unique(w // c).size * c
+        elif w[1] > w[0]:
+            size *= ((w[1] - 1) // c - w[0] // c + 1) * c
+
+    return size
+
+
+def read(
+    paths: List[str],
+    name: str,
+    dims: tuple,
+    shape: tuple,
+    dtype: np.dtype,
+    key: tuple,
+    times: np.ndarray = None,
+) -> Union[np.ndarray, None]:
+    """Reads the key of a variable of an open dataset directly from the file
+    holding it.
+
+    Arguments:
+        paths -- The local files of the dataset.
+        name, dims, shape, dtype -- The variable in the open dataset.
+        key -- Ints, contiguous slices and at most one sorted index array.
+        times -- Time values of the dataset, needed when the first dimension
+            of the variable is time.
+
+    Returns:
+        ndarray -- The window, or None if it isn't held by one of the files or
+        its chunks are larger than direct_read_max_mb.
+    """
+    max_bytes = get_settings().direct_read_max_mb * 1024 * 1024
+    window = _normalize(key, shape)
+    if not max_bytes or window is None or np.dtype(dtype).kind not in "biuf":
+        return None
+
+    has_time = bool(dims) and dims[0] in TIME_DIMENSIONS
+    if has_time:
+        if times is None or isinstance(window[0], np.ndarray):
+            return None
+        start, stop, is_index = window[0]
+        if stop == start:
+            return None
+
+    for path in paths:
+        f = get_file(path)
+        info = f.variables.get(name)
+        if info is None or tuple(info["dims"]) != tuple(dims):
+            continue
+
+        local = list(window)
+        if has_time:
+            offset = f.time_index(dims[0], np.asarray(times[start:stop]))
+            if offset is None:
+                continue
+            local[0] = (offset, offset + stop - start, is_index)
+
+        if (
+            tuple(info["shape"][has_time:]) != tuple(shape[has_time:])
+            or has_time
+            and local[0][1] > info["shape"][0]
+        ):
+            continue
+
+        nbytes = _chunk_bytes(local, info["chunks"], np.dtype(dtype).itemsize)
+        if nbytes > max_bytes:
+            return None
+
+        result = f.read(name, local)
+        count("direct", result.nbytes)
+        return result
+
+    return None
+
+
+def count(path: str, nbytes: int) -> None:
+    """Counts a read served by a path ("direct" or "lazy")."""
+    with _lock:
+        m = _metrics.setdefault(path, {"reads": 0, "bytes": 0})
+        m["reads"] += 1
+        m["bytes"] += nbytes
+
+
+def metrics() -> dict:
+    """Returns the number of reads and bytes read by each path."""
+    with _lock:
+        return {
+            path: dict(_metrics.get(path, {"reads": 0, "bytes": 0})) for path in PATHS
+        }
+
+
+def prometheus_text() -> str:
+    """Returns the read counters in the Prometheus text format."""
+    current = metrics()
+    lines = timing.format_metric(
+        "navigator_variable_reads_total",
+        "counter",
+        "Variable windows read directly from files or through xarray.",
+        [("", {"path": path}, m["reads"]) for path, m in current.items()],
+    )
+    lines += timing.format_metric(
+        "navigator_variable_read_bytes_total",
+        "counter",
+        "Decoded bytes of variable windows read by each path.",
+        [("", {"path": path}, m["bytes"]) for path, m in current.items()],
+    )
+
+    return "\n".join(lines) + "\n"
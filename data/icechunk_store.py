@@ -0,0 +1,274 @@
+"""
+Long-lived Icechunk repositories and datasets.
+
+Opening an Icechunk repository, starting a session and opening its Zarr store
+with xarray costs several round trips to the object store, so each process keeps
+its repositories open and its datasets opened per snapshot. The snapshot of the
+main branch is looked up at most every icechunk_refresh_interval seconds and a
+new commit opens the dataset again. The snapshot id is also the version of a
+dataset in the tile and result caches, so nothing cached from an older commit is
+served after the branch moves.
+"""
+
+import asyncio
+import os
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from itertools import product
+from typing import Callable, Tuple
+
+import numpy as np
+import xarray
+import zarr
+from cachetools import LRUCache
+from icechunk import (
+    CachingConfig,
+    Repository,
+    RepositoryConfig,
+    local_filesystem_storage,
+    s3_storage,
+)
+from zarr.core.buffer import default_buffer_prototype
+from zarr.core.sync import sync
+
+from oceannavigator.settings import get_settings
+
+BRANCH = "main"
+
+_lock = threading.Lock()
+# dataset key -> Repository
+_repos = {}
+# dataset key -> (snapshot id, time.monotonic() of the lookup)
+_snapshots = {}
+# (dataset key, snapshot id) -> xarray.Dataset
+_datasets = LRUCache(maxsize=16)
+# (dataset key, snapshot id, *key) -> result, see cached
+_results = LRUCache(maxsize=1024)
+# Slices whose chunks have been prefetched, see prefetch
+_prefetched = LRUCache(maxsize=1024)
+_prefetcher = None
+
+
+def clear() -> None:
+    """Forgets all repositories, datasets and cached results."""
+    global _prefetcher
+
+    with _lock:
+        _repos.clear()
+        _snapshots.clear()
+        _datasets.clear()
+        _results.clear()
+        _prefetched.clear()
+        _prefetcher = None
+
+
+def _after_fork() -> None:
+    # Repositories can't be shared with a forked process
+    global _lock
+
+    _lock = threading.Lock()
+    clear()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def get_repo(dataset_key: str) -> Repository:
+    with _lock:
+        repo = _repos.get(dataset_key)
+        if repo is None:
+            repo = _repos[dataset_key] = _open_repo(dataset_key)
+
+    return repo
+
+
+def _open_repo(dataset_key: str) -> Repository:
+    settings = get_settings()
+    storage_type = settings.icechunk_storage_type
+    store_config = settings.icechunk_storage_config
+
+    if storage_type == "s3":
+        storage_config = s3_storage(
+            bucket=store_config["bucket"],
+            prefix=dataset_key,
+            region="us-east-1",
+            access_key_id=store_config["user"],
+            secret_access_key=store_config["password"],
+            endpoint_url=store_config["url"],
+            allow_http=True,
+            force_path_style=True,
+        )
+    elif storage_type == "local":
+        storage_config = local_filesystem_storage(
+            f"{store_config["path"]}/{dataset_key}"
+        )
+    else:
+        raise ValueError(f"Unknown Icechunk storage type: {storage_type}")
+
+    config = RepositoryConfig(
+        caching=CachingConfig(
+            num_bytes_chunks=settings.icechunk_chunk_cache_mb * 1024 * 1024
+        )
+    )
+
+    return Repository.open(
+        storage_config,
+        config=config,
+        authorize_virtual_chunk_access={"file:///data/": None},
+    )
+
+
+def snapshot_id(dataset_key: str) -> str:
+    """Returns the snapshot at the tip of the main branch of a dataset."""
+    interval = get_settings().icechunk_refresh_interval
+    now = time.monotonic()
+
+    snapshot, checked = _snapshots.get(dataset_key, (None, None))
+    if snapshot is None or now - checked >= interval:
+        snapshot = get_repo(dataset_key).lookup_branch(BRANCH)
+        _snapshots[dataset_key] = (snapshot, now)
+
+    return snapshot
+
+
+def open_dataset(dataset_key: str) -> Tuple[xarray.Dataset, str]:
+    """Returns the dataset at the tip of the main branch and its snapshot id.
+
+    The dataset is shared by all requests for the snapshot, so it must not be
+    modified or closed.
+    """
+    snapshot = snapshot_id(dataset_key)
+    key = (dataset_key, snapshot)
+
+    # Reads of an LRUCache reorder it, so they're locked like the writes
+    with _lock:
+        dataset = _datasets.get(key)
+    if dataset is None:
+        session = get_repo(dataset_key).readonly_session(snapshot_id=snapshot)
+
+        with warnings.catch_warnings():
+            warnings.filterwarnings(
+                "ignore",
+                message="Numcodecs codecs are not in the Zarr version 3 specification*",
+                category=UserWarning,
+            )
+
+            dataset = xarray.open_zarr(
+                session.store, consolidated=False, decode_times=False
+            )
+
+        with _lock:
+            dataset = _datasets.setdefault(key, dataset)
+
+    return dataset, snapshot
+
+
+def version(config) -> str:
+    """Returns the version of a dataset to key its cached results with, i.e. the
+    snapshot id of an Icechunk dataset, or an empty string for other datasets.
+    """
+    if getattr(config, "url", None) != "icechunk":
+        return ""
+
+    return snapshot_id(config.key)
+
+
+def cached(config, key: tuple, func: Callable):
+    """Returns func(), memoized per version of an Icechunk dataset. Results of
+    other datasets aren't cached.
+    """
+    ver = version(config)
+    if not ver:
+        return func()
+
+    key = (config.key, ver) + key
+    with _lock:
+        try:
+            return _results[key]
+        except KeyError:
+            pass
+
+    result = func()
+    with _lock:
+        _results[key] = result
+
+    return result
+
+
+def prefetch(
+    dataset_key: str,
+    snapshot: str,
+    dataset: xarray.Dataset,
+    variables: list,
+    indexes: dict,
+) -> None:
+    """Fetches the chunks of a slice of variables into the repository's chunk
+    cache in the background, e.g. the whole time and depth slice of which a tile
+    reads a window, so the reads of its neighbours don't go to the object store.
+
+    Arguments:
+        dataset -- The dataset as returned by open_dataset.
+        indexes -- Dimension -> index of the slice, other dimensions are fetched
+            entirely.
+    """
+    global _prefetcher
+
+    if get_settings().icechunk_chunk_cache_mb <= 0:
+        return
+
+    keys = []
+    for variable in variables:
+        if variable not in dataset.data_vars:
+            continue
+
+        key = (dataset_key, snapshot, variable, tuple(sorted(indexes.items())))
+        with _lock:
+            if key in _prefetched:
+                continue
+            _prefetched[key] = True
+
+        chunks = dataset[variable].encoding.get("chunks")
+        if chunks is None:
+            continue
+
+        # Chunk coordinates covering the slice along each dimension
+        coords = []
+        for dim, size, chunk in zip(
+            dataset[variable].dims, dataset[variable].shape, chunks
+        ):
+            if dim in indexes:
+                coords.append([indexes[dim] // chunk])
+            else:
+                coords.append(range(int(np.ceil(size / chunk))))
+
+        keys.append((variable, list(product(*coords))))
+
+    if not keys:
+        return
+
+    with _lock:
+        if _prefetcher is None:
+            _prefetcher = ThreadPoolExecutor(max_workers=1)
+
+    session = get_repo(dataset_key).readonly_session(snapshot_id=snapshot)
+    _prefetcher.submit(_fetch_chunks, session.store, keys)
+
+
+def _fetch_chunks(store, keys: list) -> None:
+    group = zarr.open_group(store, mode="r")
+    prototype = default_buffer_prototype()
+
+    requests = []
+    for variable, coords in keys:
+        metadata = group[variable].metadata
+        requests.extend(
+            store.get(f"{variable}/{metadata.encode_chunk_key(c)}", prototype)
+            for c in coords
+        )
+
+    async def fetch():
+        await asyncio.gather(*requests)
+
+    sync(fetch())
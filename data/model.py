@@ -1,10 +1,16 @@
 import abc
+from contextlib import contextmanager
 
 import numpy
 import pyresample
 from scipy.interpolate import interp1d
 
 import data.geo as geo
+import data.pyramid as pyramid
+
+# Cosine and sine of the angle from East to the model x-gridlines, merged into
+# the dataset from its grid angle file
+GRID_ANGLE = ("cos_alpha", "sin_alpha")
 
 
 class Model(metaclass=abc.ABCMeta):
@@ -107,6 +113,107 @@ class Model(metaclass=abc.ABCMeta):
 
         return data, masked_lat_in, masked_lon_in, output_def
 
+    def _read_levels(self, depths, read):
+        """Reads the levels of a variable at several depths with a single read
+        of the levels spanning them.
+
+        Arguments:
+            depths -- List of depth indices and/or "bottom".
+            read -- Function reading the given slice of levels, returning data
+                of shape (time, depth, lat, lon), or (time, lat, lon) for a
+                variable without depth.
+
+        Returns:
+            The values at each depth, of shape (time, depths, lat, lon), and the
+            depths of the bottom values, of shape (time, lat, lon).
+        """
+        levels = [int(d) for d in depths if d != "bottom"]
+        if "bottom" in depths or not levels:
+            window = slice(None)
+        else:
+            window = slice(min(levels), max(levels) + 1)
+        first = window.start or 0
+
+        data = numpy.ma.masked_invalid(read(window))
+        if data.ndim == 3:
+            # No depth dimension, every depth is the only level
+            data = data[:, numpy.newaxis]
+            first = 0
+            depths = [0] * len(depths)
+
+        valid = ~numpy.ma.getmaskarray(data)
+        deepest = data.shape[1] - 1 - numpy.argmax(valid[:, ::-1], axis=1)
+        index = numpy.stack(
+            [
+                deepest if d == "bottom" else numpy.full_like(deepest, int(d) - first)
+                for d in depths
+            ],
+            axis=1,
+        )
+        bottom_depths = numpy.ma.masked_where(
+            ~valid.any(axis=1), self.depths[first + deepest]
+        )
+
+        return numpy.take_along_axis(data, index, axis=1), bottom_depths
+
+    @staticmethod
+    def _resample_levels(values, resample, points):
+        """Resamples data of shape (time, levels, lat, lon) in a single pass.
+
+        Arguments:
+            resample -- Function resampling data of shape (levels, lat, lon) to
+                the points, returning shape (points, levels).
+            points -- The number of points.
+
+        Returns:
+            The values of shape (levels, points, time), with the dimensions of
+            length 1 other than levels dropped like the result of get_point.
+        """
+        res = resample(values.reshape((-1,) + values.shape[2:]))
+        res = numpy.moveaxis(
+            numpy.ma.reshape(res, (points, values.shape[0], values.shape[1])), -1, 0
+        )
+
+        return res.reshape(res.shape[:1] + tuple(n for n in res.shape[1:] if n != 1))
+
+    def _get_point_levels(self, depths, read, resample, points, return_depth=False):
+        """Returns the values of a variable at several depths from a single read
+        of the levels spanning them and a single resampling of those levels.
+
+        Arguments:
+            depths -- List of depth indices and/or "bottom".
+            read, resample, points -- See _read_levels and _resample_levels.
+
+        Returns:
+            The values at each depth, stacked along the first axis, and the
+            depths of those values if return_depth is True.
+        """
+        values, bottom_depths = self._read_levels(depths, read)
+
+        bottom = return_depth and "bottom" in depths
+        if bottom:
+            # The bottom depths are resampled as an extra level
+            values = numpy.ma.concatenate(
+                [values, bottom_depths[:, numpy.newaxis]], axis=1
+            )
+
+        res = self._resample_levels(values, resample, points)
+
+        if not return_depth:
+            return res
+
+        dep = numpy.ma.stack(
+            [
+                (
+                    res[-1]
+                    if d == "bottom"
+                    else numpy.full(res.shape[1:], self.depths[int(d)])
+                )
+                for d in depths
+            ]
+        )
+        return res[: len(depths)], dep
+
     def get_area(
         self,
         area,
@@ -117,7 +224,15 @@ class Model(metaclass=abc.ABCMeta):
         radius,
         neighbours,
         return_depth=False,
+        resolution=None,
     ):
+        """Returns a variable over an area of (latitude, longitude) points.
+
+        Arguments:
+            resolution -- The distance in metres between neighbouring points,
+                for models that read areas at a single time and depth index
+                from a coarser level of data.pyramid when their grid is finer.
+        """
         try:
             latitude = area[0, :].ravel()  # do we really need this slicing `:` BS?
             longitude = area[1, :].ravel()
@@ -135,10 +250,285 @@ class Model(metaclass=abc.ABCMeta):
             )
             return numpy.reshape(a, area.shape[1:]), numpy.reshape(d, area.shape[1:])
         a = self.get_point(
-            latitude, longitude, depth, variable, time, return_depth=return_depth
+            latitude, longitude, depth, variable, time, resolution=resolution
         )
         return numpy.reshape(a, area.shape[1:])
 
+    def get_vector_point(
+        self,
+        latitude,
+        longitude,
+        depth,
+        components,
+        starttime,
+        endtime=None,
+        polar=False,
+        resolution=None,
+    ):
+        """Returns a vector variable at the points from its components.
+
+        Models that read both components from a single window, resample them
+        together and rotate them by the grid angle override this. Here each
+        component is read on its own and the grid is assumed to be aligned
+        with East and North.
+
+        Arguments:
+            depth -- A depth index, "bottom" or a list of them.
+            components -- The x and y (east and north) component variables, or
+                the magnitude and bearing variables if polar is True.
+            resolution -- See get_area.
+
+        Returns:
+            dict -- The "east" and "north" components, the "magnitude" and the
+            "bearing" (degrees clockwise from North), each shaped like the
+            result of get_point.
+        """
+        first, second = (
+            self.get_point(
+                latitude,
+                longitude,
+                depth,
+                c,
+                starttime,
+                endtime,
+                resolution=None if polar else resolution,
+            )
+            for c in components
+        )
+
+        return self._vector(*self._east_north(first, second, polar))
+
+    def get_vector_area(
+        self,
+        area,
+        depth,
+        time,
+        components,
+        interp,
+        radius,
+        neighbours,
+        polar=False,
+        resolution=None,
+    ):
+        """Returns get_vector_point over an area, each value shaped like the
+        result of get_area.
+        """
+        try:
+            latitude = area[0, :].ravel()
+            longitude = area[1, :].ravel()
+        except IndexError:
+            latitude = area[0].ravel()
+            longitude = area[1].ravel()
+
+        self.nc_data.interp = interp
+        self.nc_data.radius = radius
+        self.nc_data.neighbours = neighbours
+
+        vector = self.get_vector_point(
+            latitude,
+            longitude,
+            depth,
+            components,
+            time,
+            polar=polar,
+            resolution=resolution,
+        )
+        return {k: numpy.reshape(v, area.shape[1:]) for k, v in vector.items()}
+
+    def get_vector_profile(
+        self, latitude, longitude, components, starttime, endtime=None, polar=False
+    ):
+        """Returns the profiles of a vector variable at the points like
+        get_vector_point, and their depths like get_profile.
+        """
+        (first, depth), (second, _) = (
+            self.get_profile(latitude, longitude, c, starttime, endtime)
+            for c in components
+        )
+
+        return self._vector(*self._east_north(first, second, polar)), depth
+
+    def _grid_angle(self, key):
+        """Returns the cosine and sine of the grid angle over a window of the
+        grid, or None if the dataset has no grid angle.
+        """
+        if not all(v in self.nc_data.dataset.variables for v in GRID_ANGLE):
+            return None
+
+        return tuple(self.nc_data.read(v, key) for v in GRID_ANGLE)
+
+    def _pyramid_window(
+        self,
+        latvar,
+        lonvar,
+        latitude,
+        longitude,
+        resolution,
+        depth,
+        endtime=None,
+        return_depth=False,
+    ):
+        """Returns the factor of the data.pyramid level to read points from and
+        the y and x slices of the level covering them, or (1, None) to read the
+        data itself. The window is found on the coarsest level, so reading a
+        level doesn't need the bounding box of the points on the grid. Levels
+        only hold a single time and depth index.
+        """
+        if (
+            resolution is None
+            or endtime is not None
+            or return_depth
+            or isinstance(depth, list)
+            or depth == "bottom"
+            or not pyramid.enabled()
+        ):
+            return 1, None
+
+        coarsest = pyramid.FACTORS[-1]
+        lat, lon = self._pyramid_coordinates(latvar, lonvar, coarsest)
+        window = pyramid.window(lat, lon, latitude, longitude)
+        if window is None:
+            return 1, None
+
+        if lat.ndim == 1:
+            spacing = pyramid.spacing(lat[window[0]], lon[window[1]])
+        else:
+            spacing = pyramid.spacing(lat[window], lon[window])
+        factor = pyramid.factor(spacing / coarsest, resolution)
+        if factor == 1:
+            return 1, None
+
+        scale = coarsest // factor
+        return factor, tuple(slice(w.start * scale, w.stop * scale) for w in window)
+
+    def _pyramid_level(self, variable, time, depth, factor):
+        """Returns a data.pyramid level of a variable at a timestamp and depth
+        index (ignored for variables without them), with NaN for masked cells.
+        Data interpolated with the nearest neighbour is decimated, not averaged.
+        """
+        categorical = self.nc_data.interp == "nearest"
+
+        def load():
+            if factor > 2:
+                finer = self._pyramid_level(variable, time, depth, factor // 2)
+            else:
+                ndim = len(self.nc_data.get_dataset_variable(variable).shape)
+                key = ()
+                if ndim > 2:
+                    key += (self.nc_data.timestamp_to_time_index(time),)
+                if ndim > 3:
+                    key += (int(depth),)
+                finer = numpy.ma.masked_invalid(self.nc_data.read(variable, key))
+                finer = finer.astype(numpy.float32).filled(numpy.nan)
+
+            return pyramid.coarsen(finer, categorical)
+
+        return pyramid.get(
+            (
+                str(self.nc_data.url),
+                self.nc_data.mtime,
+                self.nc_data.snapshot_id,
+                variable,
+                time,
+                depth,
+                factor,
+                categorical,
+            ),
+            load,
+        )
+
+    def _pyramid_coordinates(self, latvar, lonvar, factor):
+        """Returns the latitude and longitude of a data.pyramid level of the
+        grid of latitude and longitude variables.
+        """
+
+        def load():
+            if factor > 2:
+                finer = self._pyramid_coordinates(latvar, lonvar, factor // 2)
+            else:
+                finer = numpy.asarray(latvar), numpy.asarray(lonvar)
+
+            return pyramid.coarsen_coordinates(*finer)
+
+        return pyramid.get(
+            (
+                str(self.nc_data.url),
+                self.nc_data.mtime,
+                self.nc_data.snapshot_id,
+                latvar.name,
+                lonvar.name,
+                factor,
+            ),
+            load,
+        )
+
+    def _pyramid_data(self, variables, time, depth, factor, window):
+        """Returns the data.pyramid levels of a variable over a window of the
+        level, or of the east and north components of a vector variable from
+        its x and y components, stacked.
+        """
+        first, *second = (
+            self._pyramid_level(v, time, depth, factor)[window] for v in variables
+        )
+        if not second:
+            return numpy.ma.masked_invalid(first)
+
+        angle = None
+        if all(v in self.nc_data.dataset.variables for v in GRID_ANGLE):
+            angle = tuple(
+                self._pyramid_level(v, None, None, factor)[window] for v in GRID_ANGLE
+            )
+
+        return numpy.ma.masked_invalid(
+            numpy.stack(self._east_north(first, second[0], angle=angle))
+        )
+
+    @contextmanager
+    def _pyramid_radius(self, factor):
+        """Scales the radius of influence to the spacing of a data.pyramid
+        level while resampling it.
+        """
+        radius = self.nc_data.radius
+        self.nc_data.radius = radius * factor
+        try:
+            yield
+        finally:
+            self.nc_data.radius = radius
+
+    @staticmethod
+    def _east_north(first, second, polar=False, angle=None):
+        """Returns the east and north components of a vector from its x and y
+        components rotated by the grid angle (cosine, sine), or from its
+        magnitude and bearing if polar is True.
+        """
+        if polar:
+            bearing = numpy.radians(second)
+            return first * numpy.sin(bearing), first * numpy.cos(bearing)
+
+        if angle is None:
+            return first, second
+
+        cos, sin = angle
+        return first * cos - second * sin, first * sin + second * cos
+
+    @staticmethod
+    def _vector(east, north):
+        east = numpy.ma.masked_invalid(east)
+        north = numpy.ma.masked_invalid(north)
+
+        bearing = numpy.degrees(numpy.pi / 2.0 - numpy.ma.arctan2(north, east)) % 360
+        # The bearing is undefined where the velocity is 0 or very close
+        bearing = numpy.ma.masked_where(
+            (numpy.abs(east) < 10e-6) & (numpy.abs(north) < 10e-6), bearing
+        )
+
+        return {
+            "east": east,
+            "north": north,
+            "magnitude": numpy.ma.sqrt(east**2 + north**2),
+            "bearing": bearing,
+        }
+
     def get_path_profile(self, path, variable, starttime, endtime=None, numpoints=100):
         distances, times, lat, lon, bearings = geo.path_to_points(path, numpoints)
 
@@ -146,6 +536,25 @@ class Model(metaclass=abc.ABCMeta):
 
         return numpy.array([lat, lon]), distances, result.transpose(), depth
 
+    def get_vector_path_profile(
+        self, path, components, starttime, endtime=None, numpoints=100, polar=False
+    ):
+        """Returns get_path_profile for a vector variable, with its values from
+        get_vector_profile.
+        """
+        distances, times, lat, lon, bearings = geo.path_to_points(path, numpoints)
+
+        vector, depth = self.get_vector_profile(
+            lat, lon, components, starttime, endtime=endtime, polar=polar
+        )
+
+        return (
+            numpy.array([lat, lon]),
+            distances,
+            {k: v.transpose() for k, v in vector.items()},
+            depth,
+        )
+
     def get_profile_depths(self, latitude, longitude, time, variable, depths):
         profile, orig_dep = self.get_profile(latitude, longitude, variable, time)
 
@@ -14,7 +14,10 @@ from math import pi
 import numpy as np
 from pykdtree.kdtree import KDTree
 
+import oceannavigator.timing as timing
 
+
+@timing.timed("resample")
 def find_nearest_grid_point(lat, lon, latvar, lonvar, n=1):
     """Find the nearest grid point to a given lat/lon pair.
 
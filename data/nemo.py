@@ -3,6 +3,7 @@ from typing import Union
 import numpy as np
 import pyresample
 
+import oceannavigator.timing as timing
 from data.calculated import CalculatedData
 from data.model import Model
 from data.nearest_grid_point import find_nearest_grid_point
@@ -72,6 +73,7 @@ class Nemo(Model):
 
         return miny, maxy, minx, maxx, np.clip(np.amax(d), 5000, 50000)
 
+    @timing.timed("resample")
     def __resample(self, lat_in, lon_in, lat_out, lon_out, var):
         """Resamples data given lat/lon inputs and outputs"""
         var = np.squeeze(var)
@@ -82,24 +84,27 @@ class Nemo(Model):
             lat_in, lon_in, lat_out, lon_out, var
         )
 
-        if len(data.shape) == 3:
-            output = []
-            # multiple depths
-            for d in range(0, data.shape[2]):
+        mask = np.ma.getmaskarray(data)
+        if len(data.shape) == 3 and (mask == mask[..., :1]).all():
+            # multiple levels with the same mask, resampled together as
+            # channels of the masked grid
+            masked_lon_in.mask = masked_lat_in.mask = mask[..., 0]
 
-                masked_lon_in.mask = masked_lat_in.mask = (
-                    data[:, :, d].view(np.ma.MaskedArray).mask
-                )
+            input_def = pyresample.geometry.SwathDefinition(
+                lons=masked_lon_in, lats=masked_lat_in
+            )
 
-                input_def = pyresample.geometry.SwathDefinition(
-                    lons=masked_lon_in, lats=masked_lat_in, nprocs=8
-                )
+            output = self.nc_data.interpolate(input_def, output_def, data)
 
-                output.append(
-                    self.nc_data.interpolate(input_def, output_def, data[:, :, d])
-                )
+        elif len(data.shape) == 3:
+            # multiple depths, resampled together using the unmasked grid
+            input_def = pyresample.geometry.SwathDefinition(
+                lons=masked_lon_in, lats=masked_lat_in, nprocs=8
+            )
 
-            output = np.ma.array(output).transpose()
+            output = self.nc_data.interpolate_levels(
+                input_def, output_def, data
+            ).transpose()
 
         else:
             masked_lon_in.mask = masked_lat_in.mask = (
@@ -162,6 +167,7 @@ class Nemo(Model):
 
         raise LookupError("Cannot find latitude & longitude variables")
 
+    @timing.timed("read")
     def get_raw_point(self, latitude, longitude, depth, timestamp, variable):
         latvar, lonvar = self.__latlon_vars(variable)
         miny, maxy, minx, maxx, radius = self.__bounding_box(
@@ -208,6 +214,7 @@ class Nemo(Model):
 
         return (latvar[miny:maxy, minx:maxx], lonvar[miny:maxy, minx:maxx], data)
 
+    @timing.timed("read")
     def get_point(
         self,
         latitude,
@@ -217,10 +224,26 @@ class Nemo(Model):
         starttime,
         endtime=None,
         return_depth=False,
+        resolution=None,
     ):
 
         latvar, lonvar = self.__latlon_vars(variable)
 
+        factor, window = self._pyramid_window(
+            latvar,
+            lonvar,
+            latitude,
+            longitude,
+            resolution,
+            depth,
+            endtime,
+            return_depth,
+        )
+        if factor > 1:
+            return self.__resample_pyramid(
+                [variable], starttime, depth, factor, window, latitude, longitude
+            )
+
         miny, maxy, minx, maxx, radius = self.__bounding_box(
             latitude, longitude, latvar, lonvar, 10
         )
@@ -240,10 +263,25 @@ class Nemo(Model):
 
             time_duration = endtime_idx - starttime_idx  # how many time values we have
 
+        if isinstance(depth, list):
+            return self._get_point_levels(
+                depth,
+                self.__levels_reader(variable, time_slice, miny, maxy, minx, maxx),
+                lambda data: self.__resample(
+                    latvar[miny:maxy, minx:maxx],
+                    lonvar[miny:maxy, minx:maxx],
+                    latitude,
+                    longitude,
+                    data,
+                ),
+                len(latitude),
+                return_depth,
+            )
+
         depth_value = None
         res = None
         if depth == "bottom":
-            d = var[time_slice, :, miny:maxy, minx:maxx].values
+            d = self.nc_data.read(variable, np.s_[time_slice, :, miny:maxy, minx:maxx])
 
             d = np.rollaxis(d, 0, 4)  # roll time to back
             # compress lat, lon, time along depth axis
@@ -288,16 +326,17 @@ class Nemo(Model):
 
         else:
             if len(var.shape) == 4:
-                data = var[time_slice, int(depth), miny:maxy, minx:maxx]
+                key = np.s_[time_slice, int(depth), miny:maxy, minx:maxx]
             else:
-                data = var[time_slice, miny:maxy, minx:maxx]
+                key = np.s_[time_slice, miny:maxy, minx:maxx]
+            data = self.nc_data.read(variable, key)
 
             res = self.__resample(
                 latvar[miny:maxy, minx:maxx],
                 lonvar[miny:maxy, minx:maxx],
                 latitude,
                 longitude,
-                data.values,
+                data,
             )
 
             if return_depth:
@@ -310,6 +349,120 @@ class Nemo(Model):
             return res, depth_value
         return res
 
+    def __levels_reader(self, variable, time_slice, miny, maxy, minx, maxx):
+        """Returns a function reading a slice of levels of a variable over a
+        window, see Model._read_levels.
+        """
+        var = self.nc_data.get_dataset_variable(variable)
+
+        def read(levels):
+            if len(var.shape) == 4:
+                key = np.s_[time_slice, levels, miny:maxy, minx:maxx]
+            else:
+                key = np.s_[time_slice, miny:maxy, minx:maxx]
+            return self.nc_data.read(variable, key)
+
+        return read
+
+    def __same_grid(self, components):
+        """Checks that the components of a vector are on the same grid."""
+        latvar, _ = self.__latlon_vars(components[0])
+
+        return all(self.__latlon_vars(c)[0].name == latvar.name for c in components)
+
+    def __resample_pyramid(
+        self, variables, time, depth, factor, window, latitude, longitude
+    ):
+        """Resamples a variable, or the east and north components of a vector
+        variable, over a window of a data.pyramid level.
+        """
+        latvar, lonvar = self.__latlon_vars(variables[0])
+        lat, lon = self._pyramid_coordinates(latvar, lonvar, factor)
+        lat, lon = lat[window], lon[window]
+
+        with self._pyramid_radius(factor):
+            return self.__resample(
+                lat,
+                lon,
+                latitude,
+                longitude,
+                self._pyramid_data(variables, time, depth, factor, window),
+            )
+
+    @timing.timed("read")
+    def get_vector_point(
+        self,
+        latitude,
+        longitude,
+        depth,
+        components,
+        starttime,
+        endtime=None,
+        polar=False,
+        resolution=None,
+    ):
+        if not self.__same_grid(components):
+            return super().get_vector_point(
+                latitude, longitude, depth, components, starttime, endtime, polar
+            )
+
+        latvar, lonvar = self.__latlon_vars(components[0])
+
+        factor, window = 1, None
+        if not polar:
+            factor, window = self._pyramid_window(
+                latvar, lonvar, latitude, longitude, resolution, depth, endtime
+            )
+        if factor > 1:
+            res = self.__resample_pyramid(
+                components, starttime, depth, factor, window, latitude, longitude
+            )
+            return self._vector(res[..., 0], res[..., 1])
+
+        miny, maxy, minx, maxx, radius = self.__bounding_box(
+            latitude, longitude, latvar, lonvar, 10
+        )
+
+        if not hasattr(latitude, "__len__"):
+            latitude = np.array([latitude])
+            longitude = np.array([longitude])
+
+        time_slice = self.nc_data.make_time_slice(starttime, endtime)
+        depths = depth if isinstance(depth, list) else [depth]
+
+        first, second = (
+            self._read_levels(
+                depths,
+                self.__levels_reader(c, time_slice, miny, maxy, minx, maxx),
+            )[0]
+            for c in components
+        )
+        east, north = self._east_north(
+            first,
+            second,
+            polar,
+            None if polar else self._grid_angle(np.s_[miny:maxy, minx:maxx]),
+        )
+
+        # Both components resampled together
+        res = self._resample_levels(
+            np.ma.concatenate([east, north], axis=1),
+            lambda data: self.__resample(
+                latvar[miny:maxy, minx:maxx],
+                lonvar[miny:maxy, minx:maxx],
+                latitude,
+                longitude,
+                data,
+            ),
+            len(latitude),
+        )
+        east, north = res[: len(depths)], res[len(depths) :]
+        if not isinstance(depth, list):
+            east, north = east[0], north[0]
+
+        return self._vector(east, north)
+
+    @timing.timed("read")
     def get_profile(self, latitude, longitude, variable, starttime, endtime=None):
         var = self.nc_data.get_dataset_variable(variable)
         # We expect the following shape (time, depth, lat, lon)
@@ -335,7 +488,62 @@ class Nemo(Model):
             lonvar[miny:maxy, minx:maxx],
             [latitude],
             [longitude],
-            var[time_slice, :, miny:maxy, minx:maxx].values,
+            self.nc_data.read(variable, np.s_[time_slice, :, miny:maxy, minx:maxx]),
         )
 
         return res, np.squeeze([self.depths] * len(latitude))
+
+    @timing.timed("read")
+    def get_vector_profile(
+        self, latitude, longitude, components, starttime, endtime=None, polar=False
+    ):
+        if not self.__same_grid(components):
+            return super().get_vector_profile(
+                latitude, longitude, components, starttime, endtime, polar
+            )
+
+        for c in components:
+            if len(self.nc_data.get_dataset_variable(c).shape) != 4:
+                raise APIError(
+                    f"This plot requires a depth dimension. This variable ({c}) "
+                    "doesn't have a depth dimension."
+                )
+
+        time_slice = self.nc_data.make_time_slice(starttime, endtime)
+
+        latvar, lonvar = self.__latlon_vars(components[0])
+
+        miny, maxy, minx, maxx, radius = self.__bounding_box(
+            latitude, longitude, latvar, lonvar, 10
+        )
+
+        if not hasattr(latitude, "__len__"):
+            latitude = np.array([latitude])
+            longitude = np.array([longitude])
+
+        first, second = (
+            self.nc_data.read(c, np.s_[time_slice, :, miny:maxy, minx:maxx])
+            for c in components
+        )
+        east, north = self._east_north(
+            first,
+            second,
+            polar,
+            None if polar else self._grid_angle(np.s_[miny:maxy, minx:maxx]),
+        )
+
+        # Both components resampled together, stacked along the depth axis
+        res = self.__resample(
+            latvar[miny:maxy, minx:maxx],
+            lonvar[miny:maxy, minx:maxx],
+            [latitude],
+            [longitude],
+            np.concatenate([east, north], axis=1),
+        )
+        # Depth is the last axis of a single time, after time otherwise
+        east, north = np.split(res, 2, axis=-1 if first.shape[0] == 1 else 1)
+
+        return (
+            self._vector(east, north),
+            np.squeeze([self.depths] * len(latitude)),
+        )
@@ -14,14 +14,17 @@ import pyresample
 import xarray
 import xarray.core.variable
 from babel.dates import format_date
-from cachetools import TTLCache
-from icechunk import local_filesystem_storage, Repository, s3_storage
 
 import data.calculated
+import data.hyperslab as hyperslab
+import data.icechunk_store as icechunk_store
+import data.timeseries_store as timeseries_store
 import data.utils
+import oceannavigator.timing as timing
 from data.data import Data
 from data.nearest_grid_point import find_nearest_grid_point
 from data.sqlite_database import SQLiteDatabase
+from data.time_axis import TimeAxis
 from data.variable import Variable
 from data.variable_list import VariableList
 from oceannavigator.dataset_config import DatasetConfig
@@ -38,10 +41,10 @@ class NetCDFData(Data):
         super().__init__(url)
         self.dataset: Union[xarray.Dataset, netCDF4.Dataset] = None
         self._variable_list: VariableList = None
-        self.__timestamp_cache: TTLCache = TTLCache(1, 3600)
         self._grid_angle_file_url: str = kwargs.get("grid_angle_file_url", "")
         self._bathymetry_file_url: str = kwargs.get("bathymetry_file_url", "")
         self._time_variable: xarray.IndexVariable = None
+        self._time_axis: TimeAxis = None
         self._dataset_open: bool = False
         self._dataset_key: str = kwargs.get("dataset_key", "")
         self._dataset_config: DatasetConfig = (
@@ -50,6 +53,16 @@ class NetCDFData(Data):
         self.interp: str = kwargs.get("interp", "gaussian")
         self.radius: int = kwargs.get("radius", 25000)
         self.neighbours: int = kwargs.get("neighbours", 10)
+        # Snapshot of an Icechunk dataset and its unsubsetted dataset
+        self.snapshot_id: str = ""
+        self._ic_dataset: xarray.Dataset = None
+        # Point and path requests over a time range can be read from the
+        # dataset's time-series store, see data.timeseries_store
+        self._timeseries: bool = kwargs.get("timeseries", False)
+        self._requested_timestamps: List[int] = []
+        self._variables_to_load: List[str] = []
+        # "timeseries" when the data was opened from the time-series store
+        self.layout: str = "native"
 
         if url == "icechunk":
             self.get_ic_dataset(**kwargs)
@@ -58,6 +71,7 @@ class NetCDFData(Data):
                 self._dataset_config, **kwargs
             )
 
+    @timing.timed("open")
     def __enter__(self):
         # Don't decode times since we do it anyways.
         decode_times = False
@@ -65,7 +79,11 @@ class NetCDFData(Data):
         if self.url == "icechunk":
             pass
         elif self.url.endswith(".sqlite3") if not isinstance(self.url, list) else False:
-            if self._nc_files:
+            timeseries = self.__open_timeseries_store()
+            if timeseries is not None:
+                self.dataset = timeseries
+                self.layout = "timeseries"
+            elif self._nc_files:
                 try:
                     if len(self._nc_files) > 1:
                         self.dataset = xarray.open_mfdataset(
@@ -129,29 +147,16 @@ class NetCDFData(Data):
             self.dataset.close()
             self._dataset_open = False
 
-    def __get_ic_repo(self, dataset_key: str) -> Repository:
-        settings = get_settings()
-        storage_type = settings.icechunk_storage_type
-        store_config = settings.icechunk_storage_config
-
-        if storage_type == "s3":
-            storage_config = s3_storage(
-                bucket=store_config["bucket"],
-                prefix=dataset_key,
-                region="us-east-1",
-                access_key_id=store_config["user"],
-                secret_access_key=store_config["password"],
-                endpoint_url=store_config["url"],
-                allow_http=True,
-                force_path_style=True,
-            )
-        elif storage_type == "local":
-            storage_config = local_filesystem_storage(
-                f"{store_config["path"]}/{dataset_key}"
-            )
+    def __open_timeseries_store(self) -> Union[xarray.Dataset, None]:
+        if (
+            not self._timeseries
+            or len(self._requested_timestamps)
+            < get_settings().timeseries_store_min_timestamps
+        ):
+            return None
 
-        return Repository.open(
-            storage_config, authorize_virtual_chunk_access={"file:///data/": None}
+        return timeseries_store.open_store(
+            self._dataset_key, self._variables_to_load, self._requested_timestamps
         )
 
     def __find_variable(self, candidates: list):
@@ -211,11 +216,7 @@ class NetCDFData(Data):
             [int or ndarray] -- Time index(es).
         """
 
-        time_var = np.sort(self.time_variable.astype(int))
-
-        result = np.nonzero(np.isin(time_var, timestamp))[0].tolist()
-
-        return result if len(result) > 1 else result[0]
+        return self.time_axis.index(timestamp)
 
     def timestamp_to_iso_8601(self, timestamp: Union[int, List]):
         """Converts a given timestamp (e.g. 2031436800) or list of timestamps
@@ -244,15 +245,15 @@ class NetCDFData(Data):
         time_var = self.time_variable
         time_range[0] = time_range[0].replace(tzinfo=None)
         time_range = [netCDF4.date2num(x, time_var.attrs["units"]) for x in time_range]
-        time_range = [np.where(time_var.values == x)[0] for x in time_range]
+        time_range = [self.time_axis.index(x) for x in time_range]
 
         if len(time_range) == 1:  # Single Date
-            return int(str(time_range[0][0]))
+            return time_range[0]
         else:  # Multiple Dates
             date_formatted = {}
             i = 0
             for x in date.split(","):  # x is a single date
-                new_date = {x: int(str(time_range[i][0]))}
+                new_date = {x: time_range[i]}
                 date_formatted.update(new_date)  # Add Next pair
                 i += 1
             return date_formatted
@@ -291,32 +292,15 @@ class NetCDFData(Data):
             # Time is in ISO 8601 format and we need the dataset quantum
 
             quantum = self._dataset_config.quantum
-            if quantum == "day" or quantum == "hour":
-
-                def find_time_index(isoDate: datetime.datetime):
-                    for idx, date in enumerate(self.timestamps):
-                        # Only compare year, month, day.
-                        # Some daily/hourly average datasets have an
-                        # hour and minute offset that messes up
-                        # the index search.
-                        if date.date() == isoDate.date():
-                            return idx
-
-            else:
-
-                def find_time_index(isoDate: datetime.datetime):
-                    for idx, date in enumerate(self.timestamps):
-                        # Only compare year and month
-                        if (
-                            date.date().year == isoDate.date().year
-                            and date.date().month == isoDate.date().month
-                        ):
-                            return idx
+            # Only compare year, month, day. Some daily/hourly average datasets
+            # have an hour and minute offset that messes up the index search.
+            # Other datasets only compare year and month.
+            resolution = "D" if quantum == "day" or quantum == "hour" else "M"
 
             time_range = [
                 dateutil.parser.parse(x) for x in query.get("time").split(",")
             ]
-            time_range = [find_time_index(x) for x in time_range]
+            time_range = [self.time_axis.date_index(x, resolution) for x in time_range]
 
         apply_time_range = False
         if time_range[0] != time_range[1]:
@@ -751,7 +735,14 @@ class NetCDFData(Data):
     def interpolate(self, input_def, output_def, data):
         """Interpolates data given input and output definitions
         and the selected interpolation algorithm.
+
+        Data with a last axis beyond the input geometry holds channels that
+        are interpolated together with the same neighbours.
         """
+        channels = data.shape[-1] if data.ndim > len(input_def.shape) else None
+
+        def per_channel(arg):
+            return arg if channels is None else [arg] * channels
 
         # Ignore pyresample warnings
         with warnings.catch_warnings():
@@ -765,7 +756,7 @@ class NetCDFData(Data):
                     data,
                     output_def,
                     radius_of_influence=float(self.radius),
-                    sigmas=self.radius / 2,
+                    sigmas=per_channel(self.radius / 2),
                     fill_value=None,
                 )
 
@@ -787,7 +778,7 @@ class NetCDFData(Data):
                     radius_of_influence=float(self.radius),
                     neighbours=self.neighbours,
                     fill_value=None,
-                    weight_funcs=weight,
+                    weight_funcs=per_channel(weight),
                 )
 
             # Inverse-square weighting
@@ -808,7 +799,7 @@ class NetCDFData(Data):
                     radius_of_influence=float(self.radius),
                     neighbours=self.neighbours,
                     fill_value=None,
-                    weight_funcs=weight,
+                    weight_funcs=per_channel(weight),
                 )
 
             # Nearest-neighbour interpolation (junk)
@@ -824,6 +815,186 @@ class NetCDFData(Data):
 
         raise ValueError(f"Unknown interpolation method {self.interp}.")
 
+    def interpolate_levels(
+        self,
+        input_def,
+        output_def,
+        data,
+        radius: float = None,
+        neighbours: int = None,
+        weight_func=None,
+    ):
+        """Interpolates every level of data in a single pass.
+
+        Neighbours are found once on the unmasked input grid, searching twice
+        as many candidates as needed. For each level the nearest `neighbours`
+        unmasked candidates are kept and their weights are renormalized. Where
+        too few of the candidates are unmasked on a level (e.g. deep levels
+        near the coast), the masked grid of that level is searched instead, so
+        the result matches masking the input grid level by level.
+
+        Arguments:
+            input_def -- unmasked pyresample input geometry.
+            output_def -- pyresample output geometry.
+            data -- array of shape input_def.shape + (levels,).
+
+        Optional Arguments:
+            radius -- radius of influence, defaults to self.radius.
+            neighbours -- number of neighbours per level, defaults to the number
+                used by the selected interpolation algorithm.
+            weight_func -- weighting function of distance, defaults to the one
+                used by the selected interpolation algorithm. If both
+                neighbours and weight_func are given, self.interp is ignored.
+
+        Returns:
+            numpy.ma.MaskedArray of shape (levels,) + output_def.shape. Like
+            resample_nearest, nearest-neighbour interpolation fills points
+            without neighbours with 0 instead of masking them.
+        """
+        fill_value = None
+        if neighbours is None or weight_func is None:
+            default_neighbours, default_weight = self.__interpolation_weights()
+            neighbours = default_neighbours if neighbours is None else neighbours
+            weight_func = default_weight if weight_func is None else weight_func
+            if self.interp == "nearest":
+                fill_value = 0
+        radius = float(self.radius if radius is None else radius)
+
+        levels = data.shape[-1]
+        data = np.ma.masked_invalid(np.reshape(data, (input_def.size, levels)))
+
+        (
+            valid_input,
+            valid_output,
+            index_array,
+            distance_array,
+        ) = self.__neighbour_info(input_def, output_def, radius, 2 * neighbours)
+
+        values = data[valid_input]
+        output, count = self.__weighted_levels(
+            values, index_array, distance_array, neighbours, weight_func, radius
+        )
+
+        # Unmasked neighbours may lie beyond the candidates when all of those
+        # were found within the radius
+        short = (count < neighbours) & (index_array < values.shape[0]).all(
+            axis=1, keepdims=True
+        )
+        if short.any():
+            lons, lats = (a.ravel()[valid_input] for a in input_def.get_lonlats())
+            out_lons, out_lats = (
+                a.ravel()[valid_output] for a in output_def.get_lonlats()
+            )
+
+            for level in np.flatnonzero(short.any(axis=0)):
+                wet = ~np.ma.getmaskarray(values[:, level])
+                points = np.flatnonzero(short[:, level])
+                if not wet.any():
+                    continue
+
+                (
+                    level_input,
+                    level_output,
+                    level_index,
+                    level_distance,
+                ) = self.__neighbour_info(
+                    pyresample.geometry.SwathDefinition(lons=lons[wet], lats=lats[wet]),
+                    pyresample.geometry.SwathDefinition(
+                        lons=out_lons[points], lats=out_lats[points]
+                    ),
+                    radius,
+                    neighbours,
+                )
+                level_values, _ = self.__weighted_levels(
+                    values[wet, level : level + 1][level_input],
+                    level_index,
+                    level_distance,
+                    neighbours,
+                    weight_func,
+                    radius,
+                )
+                output[points[level_output], level] = level_values[:, 0]
+
+        result = np.ma.masked_all((valid_output.size, levels), dtype=data.dtype)
+        result[valid_output] = output
+        if fill_value is not None:
+            result = np.ma.asarray(result.filled(fill_value))
+
+        return np.moveaxis(result, -1, 0).reshape((levels,) + output_def.shape)
+
+    @staticmethod
+    def __neighbour_info(input_def, output_def, radius, neighbours):
+        """Runs pyresample's neighbour search, returning index and distance
+        arrays of shape (valid outputs, neighbours).
+        """
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            warnings.simplefilter("ignore", UserWarning)
+
+            (
+                valid_input,
+                valid_output,
+                index_array,
+                distance_array,
+            ) = pyresample.kd_tree.get_neighbour_info(
+                input_def, output_def, radius, neighbours=neighbours
+            )
+
+        if index_array.ndim == 1:
+            index_array = index_array[:, np.newaxis]
+            distance_array = distance_array[:, np.newaxis]
+
+        return valid_input, valid_output, index_array, distance_array
+
+    @staticmethod
+    def __weighted_levels(
+        values, index_array, distance_array, neighbours, weight_func, radius
+    ):
+        """Returns the weighted mean of the nearest `neighbours` unmasked
+        candidates of each output point on every level of values (a masked
+        (inputs, levels) array), and the number of candidates used.
+        """
+        found = index_array < values.shape[0]
+        index_array = np.where(found, index_array, 0)
+
+        # (output points, candidates, levels)
+        neighbour_values = np.ma.getdata(values)[index_array]
+        usable = ~np.ma.getmaskarray(values)[index_array] & found[..., np.newaxis]
+        usable &= np.cumsum(usable, axis=1) <= neighbours
+
+        weights = weight_func(np.where(found, distance_array, radius))
+        weights = np.where(usable, weights[..., np.newaxis], 0)
+        weight_sum = weights.sum(axis=1)
+
+        output = np.ma.array(
+            (weights * np.where(usable, neighbour_values, 0)).sum(axis=1)
+            / np.where(weight_sum > 0, weight_sum, 1),
+            mask=weight_sum == 0,
+        )
+
+        return output, usable.sum(axis=1)
+
+    def __interpolation_weights(self):
+        """Returns the number of neighbours and the distance weighting function
+        used by the selected interpolation algorithm.
+        """
+
+        def clip(r):
+            return np.clip(r, np.finfo(r.dtype).eps, np.finfo(r.dtype).max)
+
+        if self.interp == "gaussian":
+            # Same defaults as pyresample.kd_tree.resample_gauss
+            sigma = self.radius / 2
+            return 8, lambda r: np.exp(-(r**2) / sigma**2)
+        elif self.interp == "bilinear":
+            return self.neighbours, lambda r: 1.0 / clip(r)
+        elif self.interp == "inverse":
+            return self.neighbours, lambda r: 1.0 / clip(r) ** 2
+        elif self.interp == "nearest":
+            return 1, np.ones_like
+
+        raise ValueError(f"Unknown interpolation method {self.interp}.")
+
     @property
     def time_variable(self):
         """Finds and returns the xArray.IndexVariable containing
@@ -836,6 +1007,23 @@ class NetCDFData(Data):
         self._time_variable = self.__find_variable(["time", "time_counter", "Times"])
         return self._time_variable
 
+    @property
+    def time_axis(self) -> TimeAxis:
+        """The sorted timestamps of the time dimension, decoded and searched
+        once per open dataset.
+        """
+        if self._time_axis is None:
+            var = self.time_variable
+            if hasattr(var, "attrs"):
+                self._time_axis = TimeAxis(var.values, var.attrs.get("units"))
+            else:
+                # FVCOM datasets are netCDF4.Dataset instances
+                self._time_axis = TimeAxis(
+                    np.ma.getdata(var[:]), getattr(var, "units", None)
+                )
+
+        return self._time_axis
+
     @property
     def latlon_variables(self) -> tuple:
         """Finds the lat and lon variable arrays in the dataset.
@@ -915,6 +1103,62 @@ class NetCDFData(Data):
         """
         return self.dataset[key]
 
+    def read(self, variable: str, key: tuple) -> np.ndarray:
+        """Reads a window of a variable, e.g. np.s_[time, depth, y0:y1, x0:x1].
+        Small windows of local files are read directly from the file holding them
+        (see data.hyperslab), anything else through xarray or netCDF4.
+
+        Returns:
+            ndarray -- The decoded window, masked arrays for netCDF4 reads.
+        """
+        var = self.get_dataset_variable(variable)
+
+        if self.layout == "native" and not isinstance(
+            var, data.calculated.CalculatedArray
+        ):
+            paths = self.__local_paths()
+
+            # FVCOM datasets are netCDF4.Dataset instances
+            dims = getattr(var, "dims", None) or var.dimensions
+            if paths:
+                times = None
+                if dims and dims[0] in hyperslab.TIME_DIMENSIONS:
+                    times = self.dataset.variables[dims[0]][:]
+                    times = np.ma.getdata(getattr(times, "values", times))
+
+                result = hyperslab.read(
+                    paths, variable, dims, var.shape, var.dtype, key, times
+                )
+                if result is not None:
+                    return result
+
+        result = var[key]
+        result = getattr(result, "values", result)
+        hyperslab.count("lazy", result.nbytes)
+
+        return result
+
+    def __local_paths(self) -> list:
+        paths = getattr(self, "_nc_files", None)
+        if not paths and isinstance(self.url, str) and Path(self.url).is_file():
+            paths = [self.url]
+
+        return paths or []
+
+    @property
+    def mtime(self) -> float:
+        """Returns the latest modification time of the local files the dataset
+        was opened from, or 0 if it wasn't opened from local files.
+        """
+        return max(
+            (
+                Path(p).stat().st_mtime
+                for p in self.__local_paths()
+                if Path(p).is_file()
+            ),
+            default=0,
+        )
+
     @property
     def variables(self) -> VariableList:
         """Returns a list of all data variables and their
@@ -1032,19 +1276,7 @@ class NetCDFData(Data):
         Note: to get all timestamp values from a dataset,
         you must query the SQLiteDatabase.
         """
-        # If the timestamp cache is empty
-        if self.__timestamp_cache.get("timestamps") is None:
-            var = self.time_variable
-
-            # Convert timestamps to UTC
-            time_list = data.utils.time_index_to_datetime(
-                np.sort(var), var.attrs["units"]
-            )
-            timestamps = np.array(time_list)
-            timestamps.setflags(write=False)  # Make immutable
-            self.__timestamp_cache["timestamps"] = timestamps
-
-        return self.__timestamp_cache.get("timestamps")
+        return self.time_axis.datetimes
 
     def get_ic_dataset(
         self,
@@ -1070,19 +1302,8 @@ class NetCDFData(Data):
             None
         """
 
-        repo = self.__get_ic_repo(dataset_key)
-        session = repo.readonly_session(branch="main")
-
-        with warnings.catch_warnings():
-            warnings.filterwarnings(
-                "ignore",
-                message="Numcodecs codecs are not in the Zarr version 3 specification*",
-                category=UserWarning,
-            )
-
-            dataset = xarray.open_zarr(
-                session.store, consolidated=False, decode_times=False
-            )
+        dataset, self.snapshot_id = icechunk_store.open_dataset(dataset_key)
+        self._ic_dataset = dataset
 
         if variable and isinstance(variable, str):
             variable = [variable]
@@ -1114,6 +1335,33 @@ class NetCDFData(Data):
 
         self.dataset = dataset.loc[indexer]
 
+    def prefetch(self, variable: Union[str, list], depth: int) -> None:
+        """Starts fetching the chunks of variables at the selected timestamp and a
+        depth index in the background, for requests that read a window of the
+        slice such as tiles. Only Icechunk datasets are prefetched.
+        """
+        if self._ic_dataset is None or not isinstance(depth, (int, np.integer)):
+            return
+
+        time = self.dataset["time"].values
+        if time.size != 1:
+            return
+
+        if isinstance(variable, str):
+            variable = [variable]
+
+        icechunk_store.prefetch(
+            self._dataset_key,
+            self.snapshot_id,
+            self._ic_dataset,
+            variable,
+            {
+                "time": int(np.searchsorted(self._ic_dataset["time"].values, time[0])),
+                "depth": int(depth),
+            },
+        )
+
+    @timing.timed("index")
     def get_nc_file_list(
         self, datasetconfig: DatasetConfig, **kwargs: dict
     ) -> Union[List, None]:
@@ -1152,6 +1400,9 @@ class NetCDFData(Data):
             if not timestamp:
                 raise RuntimeError("Error finding timestamp(s) in database.")
 
+            self._requested_timestamps = timestamp
+            self._variables_to_load = variables_to_load
+
             file_list = db.get_netcdf_files(timestamp, variables_to_load)
             if len(file_list) > 50:
                 file_list = np.array(file_list)
@@ -0,0 +1,346 @@
+"""
+Bulk loading of observations.
+
+Importers parse each file into an ObservationBatch of column arrays and hand
+the batches to a BulkLoader, which writes them with Core-level executemany
+inserts in one transaction per file (or per group of files). Files can be
+parsed in a process pool while the loader writes to the database. Files that
+can't be parsed or written are logged and skipped.
+"""
+
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Union
+
+import numpy as np
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+from oceannavigator.log import log
+
+from .orm.datatype import DataType
+from .orm.platform import Platform, PlatformMetadata
+from .orm.sample import Sample
+from .orm.station import Station
+
+
+class ObservationBatch:
+    """Columnar stations and samples of a single platform."""
+
+    def __init__(self, platform_type: Platform.Type, unique_id: str, attrs=None):
+        self.platform_type = platform_type
+        self.unique_id = str(unique_id)
+        self.attrs = dict(attrs or {})
+        # key -> (name, unit)
+        self.datatypes = {}
+
+        self._stations = []
+        self._samples = []
+        self._n_stations = 0
+
+    def add_datatype(self, key: str, name: str, unit: str) -> None:
+        self.datatypes.setdefault(key, (name, unit))
+
+    def add_stations(self, time, latitude, longitude) -> np.ndarray:
+        """Adds stations and returns their indices in the batch, to be used as
+        the station of their samples.
+        """
+        time = np.atleast_1d(np.asarray(time, dtype="datetime64[us]"))
+        latitude = np.atleast_1d(np.asarray(latitude, dtype=np.float64))
+        longitude = np.atleast_1d(np.asarray(longitude, dtype=np.float64))
+
+        if np.any(np.abs(latitude) > 90):
+            raise ValueError(f"Latitude out of range (-90,90) for {self.unique_id}")
+        if np.any(np.abs(longitude) > 540):
+            raise ValueError(f"Longitude out of range (-540,540) for {self.unique_id}")
+
+        self._stations.append((time, latitude, longitude))
+        index = np.arange(self._n_stations, self._n_stations + time.size)
+        self._n_stations += time.size
+
+        return index
+
+    def add_samples(self, station, datatype_key: str, depth, value) -> None:
+        """Adds samples of a datatype. Samples with a missing depth or value
+        are dropped.
+
+        Arguments:
+            station -- Batch indices of the samples' stations (see add_stations).
+        """
+        if datatype_key not in self.datatypes:
+            raise KeyError(f"Unknown datatype {datatype_key}, add it first.")
+
+        station, depth, value = np.broadcast_arrays(
+            np.asarray(station, dtype=np.int64),
+            np.asarray(depth, dtype=np.float64),
+            np.asarray(value, dtype=np.float64),
+        )
+        valid = ~(np.isnan(depth) | np.isnan(value))
+
+        self._samples.append((datatype_key, station[valid], depth[valid], value[valid]))
+
+    @property
+    def n_stations(self) -> int:
+        return self._n_stations
+
+    @property
+    def n_samples(self) -> int:
+        return sum(s[1].size for s in self._samples)
+
+    def stations(self) -> tuple:
+        """Returns the (time, latitude, longitude) arrays of all stations."""
+        if not self._stations:
+            return (
+                np.array([], dtype="datetime64[us]"),
+                np.array([]),
+                np.array([]),
+            )
+
+        return tuple(np.concatenate(c) for c in zip(*self._stations))
+
+    def samples(self) -> list:
+        """Returns the (datatype key, station indices, depths, values) of each
+        group of added samples.
+        """
+        return self._samples
+
+
+class BulkLoader:
+    """Writes ObservationBatches to the observation database.
+
+    Datatype and platform ids are cached for the life of the loader, so a loader
+    should be reused for all the files of an import.
+    """
+
+    def __init__(self, engine: Engine, chunk_size: int = 10000, retries: int = 3):
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.retries = retries
+
+        self._datatypes = None
+        self._platforms = {}
+
+        self.files = 0
+        self.skipped = 0
+        self.stations = 0
+        self.samples = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return (self.stations + self.samples) / self.seconds if self.seconds else 0.0
+
+    def load(self, batches: List[ObservationBatch]) -> None:
+        """Writes the batches in a single transaction.
+
+        Station ids are assigned by the loader, so if another process inserted
+        stations in the meantime the transaction is retried.
+        """
+        batches = [b for b in batches if b is not None]
+        if not batches:
+            return
+
+        start = time.perf_counter()
+        for attempt in range(self.retries):
+            new_platforms = {}
+            try:
+                with self.engine.begin() as conn:
+                    for batch in batches:
+                        self._load_batch(conn, batch, new_platforms)
+                break
+            except Exception as e:
+                # Discard anything cached from the rolled back transaction
+                self._datatypes = None
+                if not isinstance(e, IntegrityError) or attempt == self.retries - 1:
+                    raise
+
+        self._platforms.update(new_platforms)
+
+        self.files += len(batches)
+        self.stations += sum(b.n_stations for b in batches)
+        self.samples += sum(b.n_samples for b in batches)
+        self.seconds += time.perf_counter() - start
+
+    def _load_batch(
+        self, conn: Connection, batch: ObservationBatch, new_platforms: dict
+    ) -> None:
+        self._add_datatypes(conn, batch.datatypes)
+        platform_id = self._get_platform_id(conn, batch, new_platforms)
+
+        times, latitudes, longitudes = batch.stations()
+        if times.size == 0:
+            return
+
+        # Reserve a block of station ids so samples can reference them without
+        # reading the ids back
+        first_id = (conn.execute(select(func.max(Station.id))).scalar() or 0) + 1
+        station_ids = np.arange(first_id, first_id + times.size)
+
+        self._insert(
+            conn,
+            Station,
+            ["id", "platform_id", "time", "latitude", "longitude"],
+            [
+                station_ids.tolist(),
+                [platform_id] * times.size,
+                times.tolist(),
+                latitudes.tolist(),
+                longitudes.tolist(),
+            ],
+        )
+
+        for key, station, depth, value in batch.samples():
+            self._insert(
+                conn,
+                Sample,
+                ["station_id", "datatype_key", "depth", "value"],
+                [
+                    station_ids[station].tolist(),
+                    [key] * station.size,
+                    depth.tolist(),
+                    value.tolist(),
+                ],
+            )
+
+    def _insert(self, conn: Connection, table, names: list, columns: list) -> None:
+        rows = [dict(zip(names, row)) for row in zip(*columns)]
+        for i in range(0, len(rows), self.chunk_size):
+            conn.execute(insert(table), rows[i : i + self.chunk_size])
+
+    def _add_datatypes(self, conn: Connection, datatypes: dict) -> None:
+        if self._datatypes is None:
+            self._datatypes = set(conn.execute(select(DataType.key)).scalars())
+
+        missing = [k for k in datatypes if k not in self._datatypes]
+        if missing:
+            conn.execute(
+                insert(DataType),
+                [
+                    {"key": k, "name": datatypes[k][0], "unit": datatypes[k][1]}
+                    for k in missing
+                ],
+            )
+            self._datatypes.update(missing)
+
+    def _get_platform_id(
+        self, conn: Connection, batch: ObservationBatch, new_platforms: dict
+    ) -> int:
+        key = batch.unique_id
+        platform_id = self._platforms.get(key) or new_platforms.get(key)
+        if platform_id is not None:
+            return platform_id
+
+        platform_id = conn.execute(
+            select(Platform.id).where(Platform.unique_id == batch.unique_id)
+        ).scalar()
+
+        if platform_id is None:
+            platform_id = conn.execute(
+                insert(Platform).values(
+                    type=batch.platform_type, unique_id=batch.unique_id
+                )
+            ).inserted_primary_key[0]
+
+            if batch.attrs:
+                conn.execute(
+                    insert(PlatformMetadata),
+                    [
+                        {"platform_id": platform_id, "key": k, "value": v}
+                        for k, v in batch.attrs.items()
+                    ],
+                )
+
+        new_platforms[key] = platform_id
+        return platform_id
+
+    def run(
+        self,
+        parse: Callable,
+        filenames: list,
+        processes: int = None,
+        files_per_transaction: int = 1,
+    ) -> None:
+        """Parses the files and loads the resulting batches.
+
+        Arguments:
+            parse -- A picklable (module-level) function taking a filename and
+                returning an ObservationBatch, or None to skip the file.
+            filenames -- Files to parse.
+            processes -- Number of parsing processes, 1 parses in this process.
+            files_per_transaction -- Number of files written per transaction.
+        """
+        start = time.perf_counter()
+
+        if processes == 1:
+            results = map(_parse, [parse] * len(filenames), filenames)
+            self._load_results(results, filenames, files_per_transaction)
+        else:
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                results = executor.map(_parse, [parse] * len(filenames), filenames)
+                self._load_results(results, filenames, files_per_transaction)
+
+        elapsed = time.perf_counter() - start
+        log().info(
+            f"Loaded {self.stations} stations and {self.samples} samples from "
+            f"{self.files} files in {elapsed:.1f}s "
+            f"({(self.stations + self.samples) / elapsed:.0f} rows/s, "
+            f"{self.rows_per_second:.0f} rows/s writing), skipped {self.skipped} "
+            "files."
+        )
+
+    def _load_results(self, results, filenames: list, files_per_transaction: int):
+        pending = []
+        for fname, batch in zip(filenames, results):
+            if batch is None:
+                self.skipped += 1
+                continue
+
+            log().info(
+                f"{fname}: {batch.n_stations} stations, {batch.n_samples} samples"
+            )
+            pending.append((fname, batch))
+            if len(pending) >= files_per_transaction:
+                self._load_files(pending)
+                pending = []
+
+        self._load_files(pending)
+
+    def _load_files(self, files: list) -> None:
+        """Loads (filename, batch) pairs in one transaction. If it fails, the
+        files are loaded one at a time and the failing ones are skipped.
+        """
+        if not files:
+            return
+
+        try:
+            self.load([batch for _, batch in files])
+        except Exception:
+            if len(files) > 1:
+                for f in files:
+                    self._load_files([f])
+                return
+
+            log().exception(f"{files[0][0]}: unable to load file, skipping.")
+            self.skipped += 1
+
+
+def _parse(parse: Callable, filename: str) -> Union[ObservationBatch, None]:
+    try:
+        return parse(filename)
+    except Exception as e:
+        log().warning(f"{filename}: unable to parse file ({e}), skipping.")
+        return None
+
+
+def expand_filenames(filename: Union[str, list]) -> list:
+    """Returns the NetCDF files of a filename, directory or list of files."""
+    if isinstance(filename, list):
+        return filename
+
+    if os.path.isdir(filename):
+        return sorted(glob.glob(os.path.join(filename, "*.nc")))
+
+    return [filename]
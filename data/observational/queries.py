@@ -3,8 +3,8 @@ import math
 from enum import Enum
 from typing import Callable, Dict, List, Optional, Tuple
 
-from sqlalchemy import and_, func, select
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import Integer, and_, case, cast, false, func, select
+from sqlalchemy.orm import Session
 
 from . import DataType, Platform, PlatformMetadata, Sample, Station, engine
 
@@ -28,6 +28,8 @@ def __db_funcs() -> Dict[str, Callable]:
             "avgtime": lambda v: func.datetime(
                 func.avg(func.strftime("%s", v)), "unixepoch"
             ),
+            # Coordinates are offset to be positive so truncation acts as floor
+            "cell": lambda v, size: cast((v + 540) / size, Integer),
         }
     elif dialect == "mysql" or dialect == "mariadb":
         funcs = {
@@ -38,6 +40,7 @@ def __db_funcs() -> Dict[str, Callable]:
             "hour": lambda v: func.date_format(v, "%Y%j%H"),
             "minute": lambda v: func.date_format(v, "%Y%j%H%M"),
             "avgtime": lambda v: func.from_unixtime(func.avg(func.unix_timestamp(v))),
+            "cell": lambda v, size: func.floor((v + 540) / size),
         }
     else:
         raise RuntimeError(f"Dialect {engine.dialect} is unknown")
@@ -368,6 +371,74 @@ def __build_station_query(
     return query.distinct()
 
 
+def __add_polygon_filter(query, polygon):
+    """
+    Limits a station query to the stations inside a polygon of (lat, lon)
+    vertices, counting the polygon edges crossed by a ray running east from each
+    station (an odd count is inside).
+    """
+    crossings = []
+    for (lat1, lon1), (lat2, lon2) in zip(polygon, polygon[1:] + polygon[:1]):
+        if lat1 == lat2:
+            continue
+
+        slope = (lon2 - lon1) / (lat2 - lat1)
+        crossings.append(
+            case(
+                (
+                    and_(
+                        Station.latitude >= min(lat1, lat2),
+                        Station.latitude < max(lat1, lat2),
+                        Station.longitude < (Station.latitude - lat1) * slope + lon1,
+                    ),
+                    1,
+                ),
+                else_=0,
+            )
+        )
+
+    if not crossings:
+        return query.filter(false())
+
+    return query.filter(sum(crossings[1:], crossings[0]) % 2 == 1)
+
+
+def __add_density_cap(query, cell_size, max_per_cell=1, limit=None):
+    """
+    Limits the stations returned by a station query to at most max_per_cell
+    stations in each cell_size by cell_size degree grid cell, and to at most
+    limit stations in all, dropping the later stations of each cell first.
+    """
+    cell = __db_funcs()["cell"]
+    stations = query.subquery()
+
+    ranked = select(
+        stations,
+        func.row_number()
+        .over(
+            partition_by=(
+                cell(stations.c.latitude, cell_size),
+                cell(stations.c.longitude, cell_size),
+            ),
+            order_by=stations.c.id,
+        )
+        .label("cell_rank"),
+    ).subquery()
+
+    query = select(
+        ranked.c.type,
+        ranked.c.id,
+        ranked.c.name,
+        ranked.c.latitude,
+        ranked.c.longitude,
+    ).where(ranked.c.cell_rank <= max_per_cell)
+
+    if limit:
+        query = query.order_by(ranked.c.cell_rank, ranked.c.id).limit(limit)
+
+    return query
+
+
 def get_stations(
     session: Session,
     variable: Optional[str] = None,
@@ -382,9 +453,16 @@ def get_stations(
     platform_types: Optional[List[Platform.Type]] = None,
     meta_key: Optional[str] = None,
     meta_value: Optional[str] = None,
+    polygon: Optional[List[Tuple[float, float]]] = None,
+    cell_size: Optional[float] = None,
+    max_per_cell: int = 1,
+    limit: Optional[int] = None,
 ) -> List[Station]:
     """
-    Queries for stations, given the optional query filters.
+    Queries for stations, given the optional query filters. If a polygon of
+    (lat, lon) vertices is given, only the stations inside it are returned. If
+    cell_size (in degrees) is given, at most max_per_cell of those stations are
+    returned per grid cell. At most limit stations are returned.
     """
     query = __build_station_query(
         session=session,
@@ -402,6 +480,14 @@ def get_stations(
         meta_value=meta_value,
     )
 
+    if polygon:
+        query = __add_polygon_filter(query, polygon)
+
+    if cell_size:
+        query = __add_density_cap(query, cell_size, max_per_cell, limit)
+    elif limit:
+        query = query.limit(limit)
+
     return session.execute(query).all()
 
 
@@ -465,9 +551,14 @@ def get_stations_radius(
     platform_types: Optional[List[Platform.Type]] = None,
     meta_key: Optional[str] = None,
     meta_value: Optional[str] = None,
+    cell_size: Optional[float] = None,
+    max_per_cell: int = 1,
+    limit: Optional[int] = None,
 ) -> List[Station]:
     """
-    Queries for stations within a radius of the latitude, longitude
+    Queries for stations within a radius of the latitude, longitude. If cell_size
+    (in degrees) is given, at most max_per_cell stations are returned per grid cell.
+    At most limit stations are returned.
     """
     minLat, maxLat, minLon, maxLon = __get_bounding_latlon(latitude, longitude, radius)
 
@@ -514,7 +605,12 @@ def get_stations_radius(
         <= radDist
     )
 
-    return query.options(joinedload("platform")).all()
+    if cell_size:
+        query = __add_density_cap(query, cell_size, max_per_cell, limit)
+    elif limit:
+        query = query.limit(limit)
+
+    return session.execute(query).all()
 
 
 def get_meta_keys(session: Session, platform_types: List[str]) -> List[str]:
@@ -0,0 +1,272 @@
+"""
+Coarsened copies of model fields for low zoom tiles.
+
+At low zooms a tile pixel covers many grid cells, yet reading a tile's area
+reads every cell of its bounding box and resamples all of them. Models instead
+read such areas from a pyramid of 2x, 4x and 8x coarser copies of a field at a
+time and depth, choosing the coarsest level whose spacing is still finer than
+the tile's pixels (see factor). Levels are built lazily, the first from the
+whole field and each of the others from the level below it, and kept in a
+per-process LRU bounded by pyramid_cache_mb.
+
+A coarse cell is the mean of the unmasked cells of a block of 2x2 cells, and is
+masked only when the whole block is, or the lower-right cell of the block for
+data that mustn't be blended (e.g. categories). Its coordinates are the centre
+of the block on the sphere. Levels are keyed by the modification time of the
+dataset's files, so a rewritten file isn't served from older levels.
+"""
+
+import os
+import threading
+from typing import Callable, Tuple, Union
+
+import numpy as np
+from cachetools import LRUCache
+
+import oceannavigator.timing as timing
+from data.geo import distance
+from oceannavigator.settings import get_settings
+
+FACTORS = [2, 4, 8]
+# Cells sampled along each axis to estimate the spacing of a grid
+SPACING_SAMPLES = 16
+
+_lock = threading.Lock()
+# (dataset, mtime, snapshot, variable, timestamp, depth, factor, categorical)
+#     -> level
+# (dataset, mtime, snapshot, latitude, longitude, factor) -> coordinates
+_levels = None
+_metrics = {"hits": 0, "misses": 0}
+
+
+def clear() -> None:
+    """Forgets all levels and counters, and picks up the configured budget."""
+    global _levels
+
+    with _lock:
+        _levels = None
+        for key in _metrics:
+            _metrics[key] = 0
+
+
+def _after_fork() -> None:
+    global _lock
+
+    _lock = threading.Lock()
+    clear()
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def enabled() -> bool:
+    return get_settings().pyramid_cache_mb > 0
+
+
+def _size(value: Union[np.ndarray, tuple]) -> int:
+    if isinstance(value, tuple):
+        return sum(a.nbytes for a in value)
+
+    return value.nbytes
+
+
+def _cache() -> LRUCache:
+    global _levels
+
+    if _levels is None:
+        _levels = LRUCache(
+            maxsize=get_settings().pyramid_cache_mb * 1024 * 1024, getsizeof=_size
+        )
+
+    return _levels
+
+
+def get(
+    key: tuple, load: Callable[[], Union[np.ndarray, tuple]]
+) -> Union[np.ndarray, tuple]:
+    """Returns a cached level or its coordinates, calling load() to build them
+    on a miss.
+
+    Returns:
+        ndarray or tuple -- The read-only array(s).
+    """
+    with _lock:
+        value = _cache().get(key)
+        if value is not None:
+            _metrics["hits"] += 1
+            return value
+
+    value = load()
+    for a in value if isinstance(value, tuple) else (value,):
+        a.setflags(write=False)
+
+    with _lock:
+        _metrics["misses"] += 1
+        cache = _cache()
+        if _size(value) <= cache.maxsize:
+            cache[key] = value
+
+    return value
+
+
+def _blocks(a: np.ndarray, axes: int) -> np.ndarray:
+    """Returns the 2-cell blocks along the last axes of an array, padded with
+    NaN, as new axes after each of them.
+    """
+    pad = [(0, 0)] * (a.ndim - axes) + [(0, n % 2) for n in a.shape[-axes:]]
+    a = np.pad(a, pad, constant_values=np.nan)
+
+    shape = list(a.shape[:-axes])
+    for n in a.shape[-axes:]:
+        shape += [n // 2, 2]
+
+    return a.reshape(shape)
+
+
+def _mean(a: np.ndarray, axes: int) -> np.ndarray:
+    """Returns the mean of the values of the 2-cell blocks along the last axes
+    that aren't NaN, or NaN for blocks without any.
+    """
+    blocks = _blocks(a, axes)
+    block_axes = tuple(range(blocks.ndim - 2 * axes + 1, blocks.ndim, 2))
+
+    valid = ~np.isnan(blocks)
+    count = valid.sum(axis=block_axes)
+    total = np.where(valid, blocks, 0).sum(axis=block_axes)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / count, np.nan).astype(a.dtype)
+
+
+@timing.timed("resample")
+def coarsen(data: np.ndarray, categorical: bool = False) -> np.ndarray:
+    """Returns the next level of a (..., y, x) float array with NaN for masked
+    cells. Categorical data takes the lower-right cell of each 2x2 block, or
+    the last row or column of a block cut short by an odd edge.
+    """
+    if categorical:
+        index = [np.minimum(np.arange(0, n, 2) + 1, n - 1) for n in data.shape[-2:]]
+        return data[..., index[0], :][..., index[1]]
+
+    return _mean(data, 2)
+
+
+def coarsen_coordinates(
+    latitude: np.ndarray, longitude: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the coordinates of the next level of a grid, either 2-D arrays of
+    the latitude and longitude of its cells or the 1-D latitudes and longitudes
+    of its rows and columns.
+    """
+    lat, lon = np.radians(latitude), np.radians(longitude)
+
+    if lat.ndim == 1:
+        lon = np.arctan2(_mean(np.sin(lon), 1), _mean(np.cos(lon), 1))
+
+        return _mean(latitude, 1), np.degrees(lon).astype(longitude.dtype)
+
+    x = _mean(np.cos(lat) * np.cos(lon), 2)
+    y = _mean(np.cos(lat) * np.sin(lon), 2)
+    z = _mean(np.sin(lat), 2)
+
+    return (
+        np.degrees(np.arctan2(z, np.hypot(x, y))).astype(latitude.dtype),
+        np.degrees(np.arctan2(y, x)).astype(longitude.dtype),
+    )
+
+
+def spacing(latitude: np.ndarray, longitude: np.ndarray) -> float:
+    """Returns the median distance in metres between neighbouring cells of a
+    grid (the larger of the two directions), given 2-D arrays of the latitude
+    and longitude of its cells or the 1-D latitudes and longitudes of its rows
+    and columns.
+    """
+    latitude, longitude = np.asarray(latitude), np.asarray(longitude)
+    if latitude.ndim == 1:
+        ny, nx = latitude.size, longitude.size
+    else:
+        ny, nx = latitude.shape
+    if ny < 2 or nx < 2:
+        return np.inf
+
+    iy = np.unique(np.linspace(0, ny - 2, SPACING_SAMPLES).astype(int))
+    ix = np.unique(np.linspace(0, nx - 2, SPACING_SAMPLES).astype(int))
+    rows, cols = iy[:, np.newaxis], ix[np.newaxis, :]
+
+    def point(y, x):
+        if latitude.ndim == 1:
+            return np.broadcast_arrays(latitude[y], longitude[x])
+        return latitude[y, x], longitude[y, x]
+
+    dx = distance(*point(rows, cols), *point(rows, cols + 1))
+    dy = distance(*point(rows, cols), *point(rows + 1, cols))
+
+    return float(np.median(np.maximum(dx, dy))) * 1000
+
+
+def window(
+    latitude: np.ndarray,
+    longitude: np.ndarray,
+    point_lat: np.ndarray,
+    point_lon: np.ndarray,
+) -> Union[Tuple[slice, slice], None]:
+    """Returns the y and x slices of the cells of a grid (given like for spacing)
+    within the latitude and longitude range of points, padded by a cell, or None
+    if there aren't any.
+    """
+    west = np.min(point_lon)
+    span = np.max(point_lon) - west
+
+    in_lat = (latitude >= np.min(point_lat)) & (latitude <= np.max(point_lat))
+    in_lon = np.mod(longitude - west, 360) <= span
+    if latitude.ndim == 1:
+        rows, cols = np.flatnonzero(in_lat), np.flatnonzero(in_lon)
+    else:
+        inside = in_lat & in_lon
+        rows = np.flatnonzero(inside.any(axis=1))
+        cols = np.flatnonzero(inside.any(axis=0))
+    if not rows.size or not cols.size:
+        return None
+
+    return (
+        slice(max(rows[0] - 1, 0), rows[-1] + 2),
+        slice(max(cols[0] - 1, 0), cols[-1] + 2),
+    )
+
+
+def factor(grid_spacing: float, resolution: float) -> int:
+    """Returns the factor of the coarsest level that is finer than a resolution
+    in metres, or 1 if the grid itself isn't.
+    """
+    return max([f for f in FACTORS if grid_spacing * f <= resolution], default=1)
+
+
+def metrics() -> dict:
+    """Returns the hits and misses of the cache and the bytes currently cached."""
+    with _lock:
+        result = dict(_metrics)
+        result["bytes"] = _levels.currsize if _levels is not None else 0
+
+    return result
+
+
+def prometheus_text() -> str:
+    """Returns the cache metrics in the Prometheus text format."""
+    current = metrics()
+    lines = timing.format_metric(
+        "navigator_pyramid_requests_total",
+        "counter",
+        "Coarsened level lookups by result.",
+        [
+            ("", {"result": "hit"}, current["hits"]),
+            ("", {"result": "miss"}, current["misses"]),
+        ],
+    )
+    lines += timing.format_metric(
+        "navigator_pyramid_bytes",
+        "gauge",
+        "Bytes of the cached coarsened levels.",
+        [("", {}, current["bytes"])],
+    )
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,84 @@
+from typing import List, Union
+
+import numpy as np
+
+import data.utils
+
+
+class TimeAxis:
+    """The sorted raw values of the time dimension of an open dataset and their
+    decoded UTC datetimes. Lookups are binary searches of the sorted values.
+
+    Arguments:
+        values {ndarray} -- Raw timestamps (e.g. 2031436800), in any order.
+        units {str} -- Time units (e.g. 'seconds since 1950-01-01 00:00:00').
+    """
+
+    def __init__(self, values: np.ndarray, units: str) -> None:
+        self.units = units
+        self.values = np.sort(np.asarray(values))
+        self.values.setflags(write=False)
+        self._datetimes = None
+        self._dates = {}
+
+    def __len__(self) -> int:
+        return self.values.size
+
+    @property
+    def datetimes(self) -> np.ndarray:
+        """The decoded timestamps as a read-only array of UTC datetimes."""
+        if self._datetimes is None:
+            datetimes = np.array(
+                data.utils.time_index_to_datetime(self.values, self.units)
+            )
+            datetimes.setflags(write=False)
+            self._datetimes = datetimes
+
+        return self._datetimes
+
+    def index(self, timestamp: Union[int, List]) -> Union[int, List[int]]:
+        """Returns the index of a timestamp, or the indexes of the timestamps of
+        a list found in the axis.
+
+        Raises:
+            IndexError -- If none of the timestamps are in the axis.
+        """
+        timestamps = np.unique(timestamp)
+        idx = np.searchsorted(self.values, timestamps)
+        found = idx < self.values.size
+        found[found] = self.values[idx[found]] == timestamps[found]
+
+        result = idx[found].tolist()
+        return result if len(result) > 1 else result[0]
+
+    def nearest(self, timestamp: Union[int, np.ndarray]) -> Union[int, np.ndarray]:
+        """Returns the index of the closest timestamp in the axis."""
+        timestamp = np.asarray(timestamp)
+        right = np.minimum(np.searchsorted(self.values, timestamp), len(self) - 1)
+        left = np.maximum(right - 1, 0)
+
+        closer_left = np.abs(timestamp - self.values[left]) <= np.abs(
+            self.values[right] - timestamp
+        )
+        result = np.where(closer_left, left, right)
+
+        return int(result) if result.ndim == 0 else result
+
+    def date_index(self, date, resolution: str = "D") -> Union[int, None]:
+        """Returns the index of the first timestamp on the same day (resolution
+        "D") or in the same month ("M") as a date, or None if there is none.
+        """
+        dates = self._dates.get(resolution)
+        if dates is None:
+            dates = np.array(
+                [d.replace(tzinfo=None) for d in self.datetimes],
+                dtype=f"datetime64[{resolution}]",
+            )
+            self._dates[resolution] = dates
+
+        date = np.datetime64(date.replace(tzinfo=None), resolution)
+        idx = int(np.searchsorted(dates, date))
+        if idx < dates.size and dates[idx] == date:
+            return idx
+
+        return None
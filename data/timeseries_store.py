@@ -0,0 +1,207 @@
+"""
+Time-series layout of SQLite-indexed datasets.
+
+Model output is written one time step per file with spatial chunks, which suits
+maps and tiles but not time series: a one-year virtual mooring opens 365 files
+and reads a bounding box from each. The time-series store of a dataset holds the
+same variables in a Zarr store chunked with long time chunks, one depth level
+and small spatial chunks. It's built and appended to as timestamps are added to
+the index by scripts/build_timeseries_store.py, and NetCDFData reads long time
+ranges of point and path requests from it (see the timeseries argument of
+data.open_dataset).
+"""
+
+import os
+import threading
+import time
+from typing import List, Union
+
+import numpy as np
+import xarray
+from cachetools import LRUCache
+
+from data.sqlite_database import SQLiteDatabase
+from oceannavigator.dataset_config import DatasetConfig
+from oceannavigator.log import log
+from oceannavigator.settings import get_settings
+
+TIME_DIMENSIONS = ["time", "time_counter", "Times"]
+DEPTH_DIMENSIONS = ["depth", "deptht", "z"]
+LATLON_VARIABLES = ["nav_lat", "nav_lon", "latitude", "longitude", "lat", "lon"]
+
+_lock = threading.Lock()
+# (store path, mtime of its metadata) -> xarray.Dataset
+_stores = LRUCache(maxsize=16)
+
+
+def store_path(dataset_key: str) -> str:
+    """Returns the location of a dataset's store, or an empty string if time-series
+    stores aren't configured.
+    """
+    store_dir = get_settings().timeseries_store_dir
+    if not store_dir:
+        return ""
+
+    return os.path.join(store_dir, f"{dataset_key}.zarr")
+
+
+def open_store(
+    dataset_key: str, variables: List[str], timestamps: List[int]
+) -> Union[xarray.Dataset, None]:
+    """Returns the store of a dataset subset to the timestamps, or None if it
+    doesn't hold all the timestamps of the variables.
+    """
+    path = store_path(dataset_key)
+    if not path or not os.path.isdir(path):
+        return None
+
+    dataset = _open(path)
+    if any(v not in dataset.data_vars for v in variables):
+        return None
+
+    time_dim = dataset.attrs["time_dimension"]
+    times = dataset[time_dim].values
+    timestamps = np.asarray(sorted(timestamps))
+
+    idx = np.searchsorted(times, timestamps)
+    if np.any(idx >= times.size) or np.any(
+        times[np.minimum(idx, times.size - 1)] != timestamps
+    ):
+        return None
+
+    if np.all(np.diff(idx) == 1):
+        idx = slice(idx[0], idx[-1] + 1)
+
+    subset = dataset.isel({time_dim: idx})
+    # Closing the subset would close the shared store
+    subset.set_close(None)
+
+    return subset
+
+
+def _open(path: str) -> xarray.Dataset:
+    """Returns the store at path, opened once per version of its metadata.
+    Appending rewrites the consolidated metadata, so the store is opened again
+    after an update.
+    """
+    metadata = os.path.join(path, ".zmetadata")
+    key = (path, os.path.getmtime(metadata if os.path.exists(metadata) else path))
+
+    with _lock:
+        dataset = _stores.get(key)
+    if dataset is None:
+        dataset = xarray.open_zarr(path, decode_times=False)
+        with _lock:
+            dataset = _stores.setdefault(key, dataset)
+
+    return dataset
+
+
+def update(
+    dataset_key: str,
+    variables: List[str],
+    time_chunk: int = 128,
+    spatial_chunk: int = 32,
+) -> int:
+    """Appends the timestamps of the index later than the last one in the store
+    to the store, creating it if needed. The chunk sizes only apply when the
+    store is created.
+
+    Returns:
+        int -- The number of timestamps appended.
+    """
+    config = DatasetConfig(dataset_key)
+    path = store_path(dataset_key)
+    if not path:
+        raise ValueError("ONAV_TIMESERIES_STORE_DIR isn't set.")
+
+    with SQLiteDatabase(config.url) as db:
+        timestamps = db.get_variable_timestamps(variables[0])
+
+    size = 0
+    if os.path.isdir(path):
+        with xarray.open_zarr(path, decode_times=False) as store:
+            missing = [v for v in variables if v not in store.data_vars]
+            if missing:
+                raise ValueError(
+                    f"The store of {dataset_key} doesn't hold {missing}, remove it "
+                    "to build it again with all variables."
+                )
+
+            time_dim = store.attrs["time_dimension"]
+            size = store.sizes[time_dim]
+            time_chunk = store[variables[0]].encoding["chunks"][0]
+            timestamps = [t for t in timestamps if t > store[time_dim].values[-1]]
+
+    start = time.perf_counter()
+    appended = 0
+    while appended < len(timestamps):
+        # Each batch fills up to the end of a time chunk so appending never
+        # writes a chunk more than once per batch
+        n = time_chunk - (size + appended) % time_chunk
+        batch = timestamps[appended : appended + n]
+
+        _write_batch(config, path, variables, batch, time_chunk, spatial_chunk)
+
+        appended += len(batch)
+        log().info(f"{dataset_key}: appended {appended}/{len(timestamps)} timestamps.")
+
+    if appended:
+        elapsed = time.perf_counter() - start
+        log().info(f"{dataset_key}: {appended} timestamps in {elapsed:.1f}s.")
+
+    return appended
+
+
+def _write_batch(
+    config: DatasetConfig,
+    path: str,
+    variables: List[str],
+    timestamps: List[int],
+    time_chunk: int,
+    spatial_chunk: int,
+) -> None:
+    with SQLiteDatabase(config.url) as db:
+        files = db.get_netcdf_files(timestamps, variables)
+
+    with xarray.open_mfdataset(
+        files,
+        decode_times=False,
+        data_vars="minimal",
+        coords="minimal",
+        compat="override",
+        combine="by_coords",
+    ) as source:
+        time_dim = next(d for d in TIME_DIMENSIONS if d in source.dims)
+        extra = [v for v in LATLON_VARIABLES if v in source.variables]
+
+        dataset = source[variables + extra].sel({time_dim: timestamps})
+        for v in dataset.variables.values():
+            v.encoding = {}
+
+        chunks = {}
+        for dim in dataset.dims:
+            if dim == time_dim:
+                chunks[dim] = -1
+            elif dim in DEPTH_DIMENSIONS:
+                chunks[dim] = 1
+            else:
+                chunks[dim] = spatial_chunk
+        dataset = dataset.chunk(chunks)
+        dataset.attrs = {"time_dimension": time_dim}
+
+        if not os.path.isdir(path):
+            encoding = {
+                v: {
+                    "chunks": tuple(
+                        time_chunk if d == time_dim else dataset[v].chunks[i][0]
+                        for i, d in enumerate(dataset[v].dims)
+                    )
+                }
+                for v in variables
+            }
+            dataset.to_zarr(path, mode="w-", encoding=encoding, zarr_format=2)
+        else:
+            # Only append the variables along time
+            static = [v for v in dataset.variables if time_dim not in dataset[v].dims]
+            dataset.drop_vars(static).to_zarr(path, append_dim=time_dim)
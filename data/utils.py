@@ -1,7 +1,6 @@
 #!/usr/bin/env python
 
 import datetime
-import itertools
 import re
 from bisect import bisect_left, bisect_right
 from typing import List, Union
@@ -86,23 +85,12 @@ def datetime_to_timestamp(datetime: datetime.datetime, time_units: str):
 
 def time_index_to_datetime(timestamps, time_units: str):
 
-    if isinstance(timestamps, np.ndarray):
-        timestamps = timestamps.tolist()
+    # Decode all timestamps in one call, nested lists are flattened
+    result = cftime.num2date(
+        np.ravel(np.asarray(timestamps)), time_units, only_use_cftime_datetimes=False
+    )
 
-    if not isinstance(timestamps, list):
-        timestamps = [timestamps]
-
-    result = [
-        cftime.num2date(timestamp, time_units, only_use_cftime_datetimes=False).replace(
-            tzinfo=pytz.UTC
-        )
-        for timestamp in timestamps
-    ]
-
-    if isinstance(result[0], list):
-        return list(itertools.chain(*result))
-
-    return result
+    return [d.replace(tzinfo=pytz.UTC) for d in result]
 
 
 def roll_time(requested_index: int, len_timestamp_dim: int):
@@ -1,5 +1,6 @@
 import logging
 import pathlib
+import random
 import time
 
 import dask
@@ -15,6 +16,7 @@ from sentry_sdk.integrations.asgi import SentryAsgiMiddleware
 
 from oceannavigator.dataset_config import DatasetConfig
 
+from . import timing, workers
 from .settings import get_settings
 
 
@@ -66,11 +68,13 @@ def configure_exception_handlers(app: FastAPI) -> None:
         return JSONResponse(status_code=404, content={"message": str(exception)})
 
 
-def configure_pyinstrument(app: FastAPI, output_dir: str) -> None:
+def configure_pyinstrument(
+    app: FastAPI, output_dir: str, sample_rate: float = 1.0
+) -> None:
     @app.middleware("http")
     async def profile_request(request: Request, call_next):
         api_path = request.scope["path"]
-        if "/api/v2.0/" in api_path:
+        if "/api/v2.0/" in api_path and random.random() < sample_rate:
             profiler = Profiler(interval=0.01, async_mode="enabled")
             profiler.start()
             response = await call_next(request)
@@ -114,11 +118,16 @@ def create_app() -> FastAPI:
     configure_sentry(app)
     configure_dask()
     configure_exception_handlers(app)
+    timing.configure_timing(app)
     if settings.profiling:
-        configure_pyinstrument(app, settings.profiling_dir)
+        configure_pyinstrument(
+            app, settings.profiling_dir, settings.profiling_sample_rate
+        )
 
     add_routes(app)
 
+    app.add_event_handler("shutdown", workers.shutdown)
+
     # We must mount the root page AFTER adding ALL other routes.
     # see: https://github.com/encode/starlette/issues/437#issuecomment-473598659
     # Yes, this function is discouraged but YOLO.
@@ -834,7 +834,9 @@ const Map = forwardRef((props, ref) => {
         prevFeatures = prevFeatures.filter((feature) => feature.get("class") === "observation")
         featureVectorSource.removeFeatures(prevFeatures)
 
-        url = `/api/v2.0/observation/point/` + `${featureId}.json`;
+        url =
+          `/api/v2.0/observation/point/` +
+          `${featureId}&resolution=${Math.round(resolution)}.json`;
         break;
       case "observation_tracks":
         prevFeatures = featureVectorSource.getFeatures();
@@ -26,6 +26,7 @@ class Settings(BaseSettings):
 
     bathymetry_file: str = ""
     cache_dir: str = ""
+    chunk_cache_mb: int = 256  # Per process, 0 reads windows without caching
     class4_fname_pattern: str = ""
     class4_op_path: str = ""
     class4_rao_path: str = ""
@@ -36,17 +37,23 @@ class Settings(BaseSettings):
     dataset_config_file: str = ""
     dataset_config_stub_path: str = ""
     debug: bool = False
+    direct_read_max_mb: float = 16  # 0 reads every window through xarray
     drifter_agg_url: str = ""
     drifter_catalog_url: str = ""
     drifter_url: str = ""
     etopo_file: str = ""
     icechunk_storage_type: str = "s3"
     icechunk_storage_config: dict = {}
+    icechunk_chunk_cache_mb: int = 256  # Per process, 0 disables prefetching
+    icechunk_refresh_interval: float = 5  # Seconds between branch lookups
     log_level: str = "DEBUG"
+    mbtiles_cache_mb: int = 64  # Per process
     observation_agg_url: str = ""
     overlay_kml_dir: str = ""
     profiling: bool = False
     profiling_dir: str = ""
+    profiling_sample_rate: float = 1.0  # Fraction of API requests to profile
+    pyramid_cache_mb: int = 128  # Per process, 0 reads low zoom tiles at full size
     sentry_env: str = ""
     sentry_py_dsn: str = ""
     sentry_traces_rate: float = 0
@@ -56,6 +63,18 @@ class Settings(BaseSettings):
     sqlalchemy_pool_recycle: int = 50
     sqlalchemy_track_modifications: bool = False
     tile_cache_dir: str = ""
+    tile_png_compress_level: int = 6  # zlib level of data tiles, 1 is fastest
+    tile_webp: bool = False  # Lossless WebP data tiles for clients accepting them
+    timeseries_store_dir: str = ""  # Empty disables time-series stores
+    timeseries_store_min_timestamps: int = 30
+    worker_processes: int = 0  # Per pool, 0 runs jobs in threads instead
+    worker_mp_context: str = "spawn"
+    worker_tile_threads: int = 8  # Threads of the tile pool without processes
+    worker_max_queue: int = 16
+    # A map view requests a few dozen tiles of each layer at once
+    worker_max_queues: dict = {"tile": 128, "quiver": 128, "bathymetry": 128}
+    worker_limits: dict = {"plot": 4, "tile": 8, "quiver": 8, "bathymetry": 8}
+    worker_retry_after: int = 5
 
     backend_cors_origins_str: str = ""  # Should be a comma-separated list of origins
 
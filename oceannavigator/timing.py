@@ -0,0 +1,206 @@
+"""
+Lightweight per-request stage timers.
+
+Code wraps the major phases of a request (index lookup, dataset open, variable
+read, resampling, rendering...) in stage() blocks. Time spent in a stage is
+exclusive of any stages nested inside it. The middleware added by
+configure_timing() reports the stage totals of each request in a Server-Timing
+header and aggregates them into histograms that are exposed in the Prometheus
+text format by prometheus_text().
+"""
+
+import bisect
+import contextlib
+import functools
+import threading
+import time
+from contextvars import ContextVar
+
+from fastapi import FastAPI, Request
+
+# Upper bounds (seconds) of the histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current: ContextVar = ContextVar("timings", default=None)
+_lock = threading.Lock()
+_histograms: dict = {}
+
+
+class _Timings:
+    def __init__(self) -> None:
+        self.stages: dict = {}
+        # Time spent in nested stages of each open stage
+        self.nested: list = []
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        if self.nested:
+            self.nested[-1] += seconds
+
+
+class _Histogram:
+    def __init__(self) -> None:
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+
+
+@contextlib.contextmanager
+def collect():
+    """Collects the stage timings of everything run inside the block.
+
+    Yields:
+        dict -- Seconds spent in each stage, filled in as stages complete.
+    """
+    timings = _Timings()
+    token = _current.set(timings)
+    try:
+        yield timings.stages
+    finally:
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def stage(name: str):
+    """Times the block as the named stage of the current request. Does nothing
+    outside of collect().
+    """
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+
+    timings.nested.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = timings.nested.pop()
+        timings.stages[name] = timings.stages.get(name, 0.0) + elapsed - nested
+        if timings.nested:
+            timings.nested[-1] += elapsed
+
+
+def timed(name: str):
+    """Decorator that times each call of the function as the named stage."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def merge(stages: dict) -> None:
+    """Adds stage timings collected elsewhere (e.g. in a worker process) to the
+    current request.
+    """
+    timings = _current.get()
+    if timings is not None:
+        for name, seconds in stages.items():
+            timings.add(name, seconds)
+
+
+def timed_call(func, *args) -> tuple:
+    """Calls func(*args) collecting its stage timings.
+
+    Returns:
+        tuple -- (result, stage timings)
+    """
+    with collect() as stages:
+        result = func(*args)
+
+    return result, stages
+
+
+def observe(metric: str, label: str, seconds: float) -> None:
+    with _lock:
+        histogram = _histograms.get((metric, label))
+        if histogram is None:
+            histogram = _histograms[(metric, label)] = _Histogram()
+        histogram.observe(seconds)
+
+
+def server_timing_header(stages: dict, total: float) -> str:
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in stages.items()]
+    entries.append(f"total;dur={total * 1000:.1f}")
+
+    return ", ".join(entries)
+
+
+def format_metric(name: str, kind: str, description: str, samples: list) -> list:
+    """Formats a metric in the Prometheus text format.
+
+    Arguments:
+        samples -- List of (name suffix, labels dict, value) tuples.
+    """
+    lines = [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+    for suffix, labels, value in samples:
+        label_str = ",".join(f'{k}="{v}"' for k, v in labels.items())
+        lines.append(f"{name}{suffix}{{{label_str}}} {value}")
+
+    return lines
+
+
+_METRICS = {
+    "request": (
+        "navigator_request_duration_seconds",
+        "route",
+        "Time taken to handle requests.",
+    ),
+    "stage": (
+        "navigator_stage_duration_seconds",
+        "stage",
+        "Time spent in each request stage.",
+    ),
+}
+
+
+def prometheus_text() -> str:
+    with _lock:
+        histograms = {
+            key: (list(h.counts), h.sum) for key, h in sorted(_histograms.items())
+        }
+
+    lines = []
+    for metric, (name, label, description) in _METRICS.items():
+        samples = []
+        for (m, value), (counts, total) in histograms.items():
+            if m != metric:
+                continue
+
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), counts):
+                cumulative += count
+                samples.append(("_bucket", {label: value, "le": bound}, cumulative))
+            samples.append(("_sum", {label: value}, total))
+            samples.append(("_count", {label: value}, cumulative))
+
+        lines.extend(format_metric(name, "histogram", description, samples))
+
+    return "\n".join(lines) + "\n"
+
+
+def configure_timing(app: FastAPI) -> None:
+    @app.middleware("http")
+    async def time_request(request: Request, call_next):
+        start = time.perf_counter()
+        with collect() as stages:
+            response = await call_next(request)
+        total = time.perf_counter() - start
+
+        route = request.scope.get("route")
+        observe("request", getattr(route, "path", "other"), total)
+        for name, seconds in stages.items():
+            observe("stage", name, seconds)
+
+        response.headers["Server-Timing"] = server_timing_header(stages, total)
+        return response
@@ -0,0 +1,305 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+
+from fastapi import HTTPException, Request
+
+from . import timing
+from .log import log
+from .settings import get_settings
+
+DISCONNECT_POLL_INTERVAL = 0.5
+# Endpoints whose jobs run in the tile pool, everything else runs in the plot
+# pool so a slow plot never holds up the tiles of a map
+TILE_ENDPOINTS = ["tile", "quiver", "bathymetry"]
+
+# pool name -> Executor
+_executors: dict = {}
+_limiters: dict = {}
+_metrics: dict = {}
+
+
+def _init_worker() -> None:
+    """Imports the plotting stack and loads the dataset config once when a
+    worker process starts so the first job doesn't pay for it.
+    """
+    import matplotlib
+
+    matplotlib.use("AGG")
+
+    # A failed warm-up would break the whole pool, leave errors to the jobs
+    try:
+        import plotting.jobs  # noqa: F401
+        from oceannavigator import configure_dask
+        from oceannavigator.dataset_config import DatasetConfig
+
+        configure_dask()
+        DatasetConfig._get_dataset_config()
+    except Exception:
+        log().exception("Unable to warm up worker process.")
+
+
+def _get_executor(endpoint: str) -> Executor:
+    pool = "tile" if endpoint in TILE_ENDPOINTS else "plot"
+
+    if pool not in _executors:
+        settings = get_settings()
+        if settings.worker_processes > 0:
+            _executors[pool] = ProcessPoolExecutor(
+                max_workers=settings.worker_processes,
+                mp_context=multiprocessing.get_context(settings.worker_mp_context),
+                initializer=_init_worker,
+            )
+        elif pool == "tile":
+            # Tiles are rendered without pyplot, so they can share threads
+            _executors[pool] = ThreadPoolExecutor(
+                max_workers=settings.worker_tile_threads
+            )
+        else:
+            # pyplot isn't thread-safe, so without worker processes plots still
+            # run one at a time, just off the event loop
+            _executors[pool] = ThreadPoolExecutor(max_workers=1)
+
+    return _executors[pool]
+
+
+def shutdown() -> None:
+    for executor in _executors.values():
+        executor.shutdown(wait=False, cancel_futures=True)
+    _executors.clear()
+
+
+class _Limiter:
+    """Limits the number of concurrent jobs of an endpoint and the number of
+    jobs allowed to wait for a slot.
+    """
+
+    def __init__(self, limit: int, max_queue: int) -> None:
+        self.semaphore = asyncio.Semaphore(limit)
+        self.capacity = limit + max_queue
+        self.pending = 0
+
+
+def _get_limiter(endpoint: str) -> _Limiter:
+    if endpoint not in _limiters:
+        settings = get_settings()
+        limit = settings.worker_limits.get(endpoint, max(settings.worker_processes, 1))
+        max_queue = settings.worker_max_queues.get(endpoint, settings.worker_max_queue)
+        _limiters[endpoint] = _Limiter(limit, max_queue)
+
+    return _limiters[endpoint]
+
+
+def _get_metrics(endpoint: str) -> dict:
+    return _metrics.setdefault(
+        endpoint,
+        {
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "cancelled": 0,
+            "queue_wait_seconds": 0.0,
+            "queue_wait_seconds_max": 0.0,
+            "execution_seconds": 0.0,
+            "execution_seconds_max": 0.0,
+        },
+    )
+
+
+def metrics() -> dict:
+    """Returns the job counts and timings of each endpoint along with the
+    current number of running and queued jobs.
+    """
+    result = {}
+    for endpoint, m in _metrics.items():
+        limiter = _limiters.get(endpoint)
+        result[endpoint] = dict(m, pending=limiter.pending if limiter else 0)
+
+    return result
+
+
+def prometheus_text() -> str:
+    """Returns the worker metrics in the Prometheus text format."""
+    current = metrics()
+    statuses = ["completed", "failed", "rejected", "cancelled"]
+
+    lines = timing.format_metric(
+        "navigator_worker_jobs_total",
+        "counter",
+        "Worker jobs by endpoint and outcome.",
+        [
+            ("", {"endpoint": endpoint, "status": status}, m[status])
+            for endpoint, m in current.items()
+            for status in statuses
+        ],
+    )
+    lines += timing.format_metric(
+        "navigator_worker_pending_jobs",
+        "gauge",
+        "Running and queued worker jobs.",
+        [("", {"endpoint": endpoint}, m["pending"]) for endpoint, m in current.items()],
+    )
+    for key, description in [
+        ("queue_wait_seconds", "Time worker jobs spent waiting for a slot."),
+        ("execution_seconds", "Time worker jobs spent running."),
+    ]:
+        lines += timing.format_metric(
+            f"navigator_worker_{key}_total",
+            "counter",
+            description,
+            [("", {"endpoint": endpoint}, m[key]) for endpoint, m in current.items()],
+        )
+
+    return "\n".join(lines) + "\n"
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+
+
+class _Job:
+    """A job submitted to a pool. The endpoint's slot is held until the job has
+    finished, even when the request stopped waiting for it, and the result of a
+    job nobody waits for anymore is passed to discard.
+    """
+
+    def __init__(self, future: Future, limiter: _Limiter, discard) -> None:
+        self.future = future
+        self.limiter = limiter
+        self.discard = discard
+        self.finished = False
+        self.abandoned = False
+
+        loop = asyncio.get_running_loop()
+
+        def done(_):
+            try:
+                loop.call_soon_threadsafe(self._finish)
+            except RuntimeError:
+                # The event loop is gone, and its limiter with it
+                pass
+
+        future.add_done_callback(done)
+
+    def _finish(self) -> None:
+        self.finished = True
+        self.limiter.semaphore.release()
+        self.limiter.pending -= 1
+
+        if self.abandoned:
+            self._discard()
+
+    def abandon(self) -> None:
+        self.abandoned = True
+        if self.finished:
+            self._discard()
+
+    def _discard(self) -> None:
+        if (
+            self.discard is None
+            or self.future.cancelled()
+            or self.future.exception() is not None
+        ):
+            return
+
+        result, _ = self.future.result()
+        try:
+            self.discard(result)
+        except Exception:
+            log().exception("Unable to discard the result of an abandoned job.")
+
+
+async def run(endpoint: str, request: Request, func, *args, discard=None):
+    """Runs a CPU-bound job in the worker pool without blocking the event loop.
+
+    Tile, quiver and bathymetry jobs run in a pool of their own, other jobs in
+    the plot pool. Jobs are limited per endpoint; when the endpoint's running
+    and queued jobs are at capacity the request is rejected with a 503 and a
+    Retry-After header. If the client disconnects while the job is in the pool,
+    the job is cancelled if it has not started and the request is cancelled. A
+    job that has started keeps its slot until it finishes, and its result is
+    passed to discard.
+
+    Arguments:
+        endpoint -- Name of the endpoint, used for limits and metrics.
+        request -- The incoming request, watched for disconnects. May be None.
+        func -- A picklable (module-level) function.
+        args -- Picklable arguments for func.
+        discard -- Called with the result of a job whose request has gone away,
+            e.g. to remove the files it wrote.
+
+    Returns:
+        The result of func(*args).
+    """
+    settings = get_settings()
+    limiter = _get_limiter(endpoint)
+    stats = _get_metrics(endpoint)
+
+    if limiter.pending >= limiter.capacity:
+        stats["rejected"] += 1
+        raise HTTPException(
+            status_code=503,
+            detail=f"Too many {endpoint} requests, try again later.",
+            headers={"Retry-After": str(settings.worker_retry_after)},
+        )
+
+    limiter.pending += 1
+    queued = time.perf_counter()
+    try:
+        await limiter.semaphore.acquire()
+    except BaseException:
+        limiter.pending -= 1
+        raise
+
+    try:
+        future = _get_executor(endpoint).submit(timing.timed_call, func, *args)
+    except BaseException:
+        limiter.semaphore.release()
+        limiter.pending -= 1
+        raise
+    job = _Job(future, limiter, discard)
+
+    started = time.perf_counter()
+    wait = started - queued
+    stats["queue_wait_seconds"] += wait
+    stats["queue_wait_seconds_max"] = max(stats["queue_wait_seconds_max"], wait)
+
+    result = asyncio.wrap_future(job.future)
+    try:
+        if request is not None:
+            watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+            await asyncio.wait({result, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            watcher.cancel()
+
+            if not result.done():
+                stats["cancelled"] += 1
+                log().info(f"Cancelled {endpoint} job, client disconnected.")
+                raise asyncio.CancelledError()
+
+        try:
+            value, stages = await result
+        except Exception:
+            stats["failed"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            stats["execution_seconds"] += elapsed
+            stats["execution_seconds_max"] = max(
+                stats["execution_seconds_max"], elapsed
+            )
+    except asyncio.CancelledError:
+        # Cancels the job if it hasn't started
+        result.cancel()
+        job.abandon()
+        raise
+
+    stats["completed"] += 1
+    timing.merge(stages)
+    return value
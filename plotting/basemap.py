@@ -0,0 +1,124 @@
+import hashlib
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import cartopy.crs as ccrs
+import cartopy.feature as cfeature
+import numpy as np
+import shapely
+from cachetools import LRUCache
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from oceannavigator.settings import get_settings
+
+LAND_FACECOLOR = "grey"
+LAND_EDGECOLOR = "black"
+
+_layer_cache = LRUCache(maxsize=64 * 1024 * 1024, getsizeof=lambda a: a.nbytes)
+settings = get_settings()
+
+_scaler = cfeature.AdaptiveScaler("110m", (("50m", 50), ("10m", 15)))
+_pc_projection = ccrs.PlateCarree()
+
+
+@lru_cache(maxsize=None)
+def _land_index(scale: str) -> tuple:
+    """Loads the Natural Earth land polygons of the given scale with the lakes
+    cut out and builds a spatial index over them. Done once per scale and process.
+    """
+    land = cfeature.NaturalEarthFeature("physical", "land", scale=scale)
+    lakes = cfeature.NaturalEarthFeature("physical", "lakes", scale=scale)
+
+    land_polys = shapely.get_parts(np.array(list(land.geometries()), dtype=object))
+    lake_polys = np.array(list(lakes.geometries()), dtype=object)
+
+    if len(lake_polys):
+        lake_tree = shapely.STRtree(lake_polys)
+        land_idx, lake_idx = lake_tree.query(land_polys, predicate="intersects")
+        for i in np.unique(land_idx):
+            land_polys[i] = land_polys[i].difference(
+                shapely.union_all(lake_polys[lake_idx[land_idx == i]])
+            )
+
+    land_polys = land_polys[~shapely.is_empty(land_polys)]
+    return shapely.STRtree(land_polys), land_polys
+
+
+def get_land_geoms(extent: tuple) -> list:
+    """Returns the land (minus lakes) geometries in a PlateCarree extent
+    (x0, x1, y0, y1), clipped to a slightly padded extent.
+    """
+    scale = _scaler.scale_from_extent(extent)
+    tree, land_polys = _land_index(scale)
+
+    x0, x1, y0, y1 = extent
+    bounds = (x0 - 1, y0 - 1, x1 + 1, y1 + 1)
+
+    geoms = land_polys[tree.query(shapely.box(*bounds))]
+    geoms = shapely.clip_by_rect(geoms, *bounds)
+
+    return list(geoms[~shapely.is_empty(geoms)])
+
+
+def land_layer(projection, extent: list, size: tuple, dpi: int) -> np.ndarray:
+    """Returns an RGBA image of the land in the given projection and extent,
+    transparent over the ocean, to be composited over the data with imshow.
+
+    Arguments:
+        projection -- Cartopy projection of the map.
+        extent -- Map extent in projection coordinates (x0, x1, y0, y1).
+        size -- Image (width, height) in pixels.
+        dpi -- Resolution the map is rendered at.
+    """
+    key = hashlib.sha1(
+        ";".join(
+            str(x)
+            for x in [projection.proj4_init]
+            + [f"{e:.6g}" for e in extent]
+            + list(size)
+            + [dpi]
+        ).encode()
+    ).hexdigest()
+
+    layer = _layer_cache.get(key)
+    if layer is not None:
+        return layer
+
+    filename = Path(settings.cache_dir).joinpath("basemap", f"{key}.npy")
+    try:
+        layer = np.load(filename)
+    except (OSError, ValueError):
+        width, height = size
+        fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+        fig.patch.set_alpha(0)
+        canvas = FigureCanvasAgg(fig)
+        ax = fig.add_axes([0, 0, 1, 1], projection=projection)
+        ax.set_axis_off()
+        ax.patch.set_alpha(0)
+        ax.set_extent(extent, crs=projection)
+        # Fill the whole image; the size already has the map's aspect ratio
+        ax.set_aspect("auto")
+        ax.add_geometries(
+            get_land_geoms(ax.get_extent(crs=_pc_projection)),
+            crs=_pc_projection,
+            facecolor=LAND_FACECOLOR,
+            edgecolor=LAND_EDGECOLOR,
+        )
+        canvas.draw()
+        layer = np.asarray(canvas.buffer_rgba()).copy()
+
+        def do_save(filename: Path, data: np.ndarray) -> None:
+            filename.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = filename.with_name(f"{filename.stem}.{os.getpid()}.npy")
+            np.save(tmp_file, data)
+            os.replace(tmp_file, filename)
+
+        t = threading.Thread(target=do_save, args=(filename, layer))
+        t.daemon = True
+        t.start()
+
+    _layer_cache[key] = layer
+    return layer
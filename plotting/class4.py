@@ -7,6 +7,7 @@ import numpy as np
 # from flask_babel import gettext
 from netCDF4 import Dataset, chartostring
 
+import plotting.figure_pool as figure_pool
 import plotting.utils as utils
 from oceannavigator.settings import get_settings
 from plotting.plotter import Plotter
@@ -142,7 +143,7 @@ class Class4Plotter(Plotter):
 
     def plot(self):
         figuresize = list(map(float, self.size.split("x")))
-        fig = plt.figure(figsize=figuresize, dpi=self.dpi)
+        fig = figure_pool.figure(figuresize, self.dpi)
 
         width = len(self.variables)
 
@@ -0,0 +1,132 @@
+"""
+Memory-mapped ETOPO grids.
+
+The topography and bathymetry tiles and the land mask of the data tiles read a
+256x256 window of the ETOPO grid of their projection and zoom
+(settings.etopo_file % (projection, zoom)). Each grid is copied once, in the
+dtype it's stored in (int16 for ETOPO), into a raw .npy array in the cache
+directory, which every worker maps read-only, so a window is a slice of pages
+shared through the OS page cache instead of a NetCDF read per tile. Grids are
+otherwise copied by the first tile of each zoom, so deployments should run
+scripts/convert_etopo.py beforehand.
+"""
+
+import os
+import threading
+from typing import NamedTuple
+
+import numpy as np
+from netCDF4 import Dataset
+
+from oceannavigator.settings import get_settings
+
+TILE_SIZE = 256
+# Rows copied at a time when converting a grid
+CONVERT_ROWS = 1024
+
+
+class Grid(NamedTuple):
+    # Memory-mapped values as stored in the source
+    data: np.ndarray
+    fill_value: float
+    scale_factor: float
+    add_offset: float
+
+
+_lock = threading.Lock()
+# (projection, zoom) -> lock held while loading the grid
+_locks = {}
+# (projection, zoom) -> Grid
+_grids = {}
+
+
+def source_path(projection: str, z: int) -> str:
+    return get_settings().etopo_file % (projection, z)
+
+
+def grid_path(projection: str, z: int) -> str:
+    name = os.path.basename(source_path(projection, z))
+    return os.path.join(get_settings().cache_dir, "etopo", f"{name}.npy")
+
+
+def convert(projection: str, z: int) -> str:
+    """Converts the grid of a projection and zoom, if it hasn't been converted
+    since the source was last modified. Returns the path of the converted grid.
+    """
+    source = source_path(projection, z)
+    path = grid_path(projection, z)
+
+    if os.path.isfile(path) and os.path.getmtime(path) >= os.path.getmtime(source):
+        return path
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Unique per process so concurrent conversions don't write the same file
+    tmp = f"{path}.{os.getpid()}.tmp"
+
+    with Dataset(source, "r") as dataset:
+        variable = dataset["z"]
+        variable.set_auto_maskandscale(False)
+        grid = np.lib.format.open_memmap(
+            tmp, mode="w+", dtype=variable.dtype, shape=variable.shape
+        )
+        for row in range(0, variable.shape[0], CONVERT_ROWS):
+            grid[row : row + CONVERT_ROWS] = variable[row : row + CONVERT_ROWS]
+        grid.flush()
+        del grid
+
+    os.replace(tmp, path)
+    return path
+
+
+def grid(projection: str, z: int) -> Grid:
+    """Returns the read-only memory-mapped grid of a projection and zoom. Only
+    requests for the same grid wait for it to be converted.
+    """
+    key = (projection, z)
+    grid = _grids.get(key)
+    if grid is None:
+        with _lock:
+            lock = _locks.setdefault(key, threading.Lock())
+
+        with lock:
+            grid = _grids.get(key)
+            if grid is None:
+                grid = _grids[key] = _load(projection, z)
+
+    return grid
+
+
+def _load(projection: str, z: int) -> Grid:
+    path = convert(projection, z)
+
+    with Dataset(source_path(projection, z), "r") as dataset:
+        variable = dataset["z"]
+        fill_value = getattr(
+            variable, "_FillValue", getattr(variable, "missing_value", np.nan)
+        )
+
+        return Grid(
+            np.load(path, mmap_mode="r"),
+            fill_value,
+            getattr(variable, "scale_factor", 1),
+            getattr(variable, "add_offset", 0),
+        )
+
+
+def window(projection: str, x: int, y: int, z: int) -> np.ndarray:
+    """Returns the elevations of a tile in metres as float32, with NaN for
+    missing values.
+    """
+    tile_grid = grid(projection, z)
+    values = tile_grid.data[
+        y * TILE_SIZE : (y + 1) * TILE_SIZE, x * TILE_SIZE : (x + 1) * TILE_SIZE
+    ]
+
+    data = values.astype(np.float32)
+    if tile_grid.scale_factor != 1 or tile_grid.add_offset != 0:
+        data = data * np.float32(tile_grid.scale_factor) + np.float32(
+            tile_grid.add_offset
+        )
+    data[values == tile_grid.fill_value] = np.nan
+
+    return data
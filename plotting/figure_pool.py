@@ -0,0 +1,54 @@
+import threading
+
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+
+MAX_POOLED_FIGURES = 8
+
+_local = threading.local()
+
+_SUBPLOT_PARAMS = ("left", "right", "bottom", "top", "wspace", "hspace")
+
+
+def _pool() -> dict:
+    if not hasattr(_local, "figures"):
+        _local.figures = {}
+
+    return _local.figures
+
+
+def _key(figsize, dpi) -> tuple:
+    return (tuple(float(s) for s in figsize), float(dpi))
+
+
+def figure(figsize, dpi) -> Figure:
+    """Returns a blank pyplot figure of the given size, reusing one released by
+    an earlier plot on this thread (with its Agg canvas) when available. The
+    figure is made current so the pyplot interface draws onto it.
+    """
+    figures = _pool().get(_key(figsize, dpi), [])
+    while figures:
+        fig = figures.pop()
+        if plt.fignum_exists(fig.number):
+            return plt.figure(fig.number)
+
+    return plt.figure(figsize=figsize, dpi=dpi)
+
+
+def release(fig: Figure) -> None:
+    """Clears a figure returned by figure() and keeps it for reuse, or closes
+    it if the pool is full.
+    """
+    pool = _pool()
+    key = _key(fig.get_size_inches(), fig.dpi)
+
+    if sum(len(f) for f in pool.values()) >= MAX_POOLED_FIGURES:
+        plt.close(fig)
+        return
+
+    fig.clf()
+    fig.subplotpars.update(
+        **{p: mpl.rcParams[f"figure.subplot.{p}"] for p in _SUBPLOT_PARAMS}
+    )
+    pool.setdefault(key, []).append(fig)
@@ -12,6 +12,7 @@ from mpl_toolkits.axes_grid1 import make_axes_locatable
 from pandas.plotting import register_matplotlib_converters
 
 import plotting.colormap as colormap
+import plotting.figure_pool as figure_pool
 import plotting.utils as utils
 from data import open_dataset
 from oceannavigator import DatasetConfig
@@ -54,46 +55,14 @@ class HovmollerPlotter(LinePlotter):
 
             return (depth, depth_value, depth_unit)
 
-        # Load left/Main Map
-        with open_dataset(
-            self.dataset_config,
-            timestamp=self.starttime,
-            endtime=self.endtime,
-            variable=self.variables,
-        ) as dataset:
-
-            self.depth, self.depth_value, self.depth_unit = find_depth(
-                self.depth, len(dataset.depths) - 1, dataset
-            )
-
-            self.path_points, self.distance, times, data = dataset.get_path(
-                self.points,
-                self.depth,
-                self.variables[0],
-                self.starttime,
-                self.endtime,
-                tile_time=False,
-            )
-            self.variable_name = self.get_variable_names(dataset, self.variables)[0]
-
-            variable_units = self.get_variable_units(dataset, self.variables)
-
-            self.variable_unit = variable_units[0]
-            self.data = data.T
-            self.iso_timestamps = times
-
-            # Get colourmap
-            if self.cmap is None:
-                self.cmap = colormap.find_colormap(self.variable_name)
-
-        # Load data sent from Right Map (if in compare mode)
-        if self.compare:
+        def load_compare():
             compare_config = DatasetConfig(self.compare["dataset"])
             with open_dataset(
                 compare_config,
                 timestamp=self.compare["starttime"],
                 endtime=self.compare["endtime"],
                 variable=self.compare["variables"],
+                timeseries=True,
             ) as dataset:
                 (
                     self.compare["depth"],
@@ -131,6 +100,46 @@ class HovmollerPlotter(LinePlotter):
                 self.compare["data"] = data.T
                 self.compare["times"] = times
 
+        # Load data sent from Right Map (if in compare mode) while the main map
+        # is loaded
+        compare = self.start_compare(load_compare) if self.compare else None
+
+        # Load left/Main Map
+        with open_dataset(
+            self.dataset_config,
+            timestamp=self.starttime,
+            endtime=self.endtime,
+            variable=self.variables,
+            timeseries=True,
+        ) as dataset:
+
+            self.depth, self.depth_value, self.depth_unit = find_depth(
+                self.depth, len(dataset.depths) - 1, dataset
+            )
+
+            self.path_points, self.distance, times, data = dataset.get_path(
+                self.points,
+                self.depth,
+                self.variables[0],
+                self.starttime,
+                self.endtime,
+                tile_time=False,
+            )
+            self.variable_name = self.get_variable_names(dataset, self.variables)[0]
+
+            variable_units = self.get_variable_units(dataset, self.variables)
+
+            self.variable_unit = variable_units[0]
+            self.data = data.T
+            self.iso_timestamps = times
+
+            # Get colourmap
+            if self.cmap is None:
+                self.cmap = colormap.find_colormap(self.variable_name)
+
+        if compare:
+            compare()
+
     # Render Hovmoller graph(s)
     def plot(self):
         def get_depth_label(depthValue, depthUnit):
@@ -143,7 +152,7 @@ class HovmollerPlotter(LinePlotter):
         # Vertical scaling of figure
         figuresize[1] *= 1.5 if self.compare else 1
 
-        fig = plt.figure(figsize=figuresize, dpi=self.dpi)
+        fig = figure_pool.figure(figuresize, self.dpi)
 
         if self.showmap:
             width = 2  # 2 columns
@@ -0,0 +1,70 @@
+"""
+Plot and tile jobs run by the worker pool (oceannavigator.workers). Each job is
+a module-level function with picklable arguments and results so it can run in
+a separate process.
+"""
+
+import asyncio
+from io import BytesIO
+
+import oceannavigator.timing as timing
+import plotting.tile
+from data.observational import SessionLocal
+from plotting.class4 import Class4Plotter
+from plotting.hovmoller import HovmollerPlotter
+from plotting.map import MapPlotter
+from plotting.observation import ObservationPlotter
+from plotting.profile import ProfilePlotter
+from plotting.sound import SoundSpeedPlotter
+from plotting.stick import StickPlotter
+from plotting.timeseries import TimeseriesPlotter
+from plotting.track import TrackPlotter
+from plotting.transect import TransectPlotter
+from plotting.ts import TemperatureSalinityPlotter
+
+PLOTTERS = {
+    "map": MapPlotter,
+    "transect": TransectPlotter,
+    "timeseries": TimeseriesPlotter,
+    "ts": TemperatureSalinityPlotter,
+    "sound": SoundSpeedPlotter,
+    "profile": ProfilePlotter,
+    "hovmoller": HovmollerPlotter,
+    "observation": ObservationPlotter,
+    "track": TrackPlotter,
+    "class4": Class4Plotter,
+    "stick": StickPlotter,
+}
+
+# Plotters that query the observation database
+DB_PLOTTERS = ["observation", "track"]
+
+
+def plot(plot_type: str, dataset: str, query: dict, options: dict) -> tuple:
+    """Generates a plot, returning (data, mime type, filename)."""
+    if plot_type in DB_PLOTTERS:
+        db = SessionLocal()
+        try:
+            return PLOTTERS[plot_type](dataset, query, db, **options).run()
+        finally:
+            db.close()
+
+    return PLOTTERS[plot_type](dataset, query, **options).run()
+
+
+def data_tile(
+    projection: str, x: int, y: int, z: int, args: dict, format: str = "PNG"
+) -> BytesIO:
+    img = asyncio.run(plotting.tile.plot(projection, x, y, z, args))
+
+    with timing.stage("encode"):
+        return plotting.tile.encode(img, format)
+
+
+def quiver_tile(*args) -> dict:
+    return asyncio.run(plotting.tile.quiver(*args))
+
+
+def bathymetry_tile(projection: str, x: int, y: int, z: int) -> BytesIO:
+    with timing.stage("render"):
+        return asyncio.run(plotting.tile.bathymetry(projection, x, y, z))
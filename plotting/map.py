@@ -1,14 +1,9 @@
 import copy
-import hashlib
 import os
-import pathlib
-import pickle
-import threading
 import tempfile
 from textwrap import wrap
 
 import cartopy.crs as ccrs
-import cartopy.feature as cfeature
 import cartopy.img_transform as cimg_transform
 import matplotlib.pyplot as plt
 import numpy as np
@@ -19,18 +14,16 @@ from osgeo import gdal, osr
 from shapely.geometry import LinearRing, MultiPolygon, Point, Polygon as Poly
 from shapely.ops import unary_union
 
+import plotting.basemap as basemap
 import plotting.colormap as colormap
+import plotting.figure_pool as figure_pool
 import plotting.overlays as overlays
 import plotting.utils as utils
 from data import open_dataset
 from oceannavigator import DatasetConfig
 from plotting.plotter import Plotter
 from utils.errors import ClientError
-from utils.misc import list_areas
-
-from oceannavigator.settings import get_settings
-
-settings = get_settings()
+from utils.kml_index import get_area
 
 
 class MapPlotter(Plotter):
@@ -55,16 +48,9 @@ class MapPlotter(Plotter):
         names = []
         centroids = []
         all_rings = []
-        data = None
         for idx, a in enumerate(self.area):
             if isinstance(a, str):
-
-                sp = a.split("/", 1)
-                if data is None:
-                    data = list_areas(sp[0], simplify=False)
-
-                b = [x for x in data if x.get("key") == a]
-                a = b[0]
+                a = get_area(a)
                 self.area[idx] = a
             else:
                 self.points = copy.deepcopy(np.array(a["polygons"]))
@@ -138,24 +124,7 @@ class MapPlotter(Plotter):
 
     def get_land_geoms(self, extent: tuple) -> list:
         # Returns a list of land shape geometries that intersect the plot extent
-        scaler = cfeature.AdaptiveScaler("110m", (("50m", 50), ("10m", 15)))
-        scale = scaler.scale_from_extent(extent)
-
-        land_feats = cfeature.NaturalEarthFeature("physical", "land", scale=scale)
-
-        land_geoms = land_feats.intersecting_geometries(extent)
-        land_geoms = unary_union(list(land_geoms))
-
-        geometries = []
-        if not land_geoms.is_empty:
-            lake_feats = cfeature.NaturalEarthFeature("physical", "lakes", scale=scale)
-
-            lake_geoms = lake_feats.intersecting_geometries(extent)
-            lake_geoms = unary_union(list(lake_geoms))
-
-            geometries.append(land_geoms.difference(lake_geoms))
-
-        return geometries
+        return basemap.get_land_geoms(extent)
 
     def load_map(
         self,
@@ -163,54 +132,48 @@ class MapPlotter(Plotter):
         figuresize: list,
         dpi: int,
     ) -> tuple:
-
-        CACHE_DIR = settings.cache_dir
-        filename = self._get_filename(self.plot_projection.proj4_params["proj"], extent)
-        filename = pathlib.Path(CACHE_DIR).joinpath(filename)
-
-        if not filename.exists():
-            fig = plt.figure(figsize=figuresize, dpi=dpi)
-            ax = plt.axes(projection=self.plot_projection, facecolor="dimgrey")
+        fig = figure_pool.figure(figuresize, dpi)
+        ax = plt.axes(projection=self.plot_projection, facecolor="dimgrey")
+        ax.set_extent(extent, crs=self.plot_projection)
+
+        if self.filetype in ["png", "jpeg"]:
+            # Composite a cached raster of the land at the axes' size in pixels
+            ax.apply_aspect()
+            bbox = ax.get_position()
+            size = (
+                max(1, round(bbox.width * figuresize[0] * dpi)),
+                max(1, round(bbox.height * figuresize[1] * dpi)),
+            )
+            ax.imshow(
+                basemap.land_layer(self.plot_projection, extent, size, dpi),
+                extent=extent,
+                transform=self.plot_projection,
+                origin="upper",
+                interpolation="nearest",
+                zorder=1,
+            )
             ax.set_extent(extent, crs=self.plot_projection)
+        else:
             pc_extent = ax.get_extent(crs=self.pc_projection)
-
-            land_geoms = self.get_land_geoms(pc_extent)
             ax.add_geometries(
-                land_geoms,
+                self.get_land_geoms(pc_extent),
                 crs=self.pc_projection,
-                facecolor="grey",
-                edgecolor="black",
+                facecolor=basemap.LAND_FACECOLOR,
+                edgecolor=basemap.LAND_EDGECOLOR,
             )
 
-            ax.gridlines(
-                draw_labels={"bottom": "x", "left": "y"},
-                dms=True,
-                x_inline=False,
-                y_inline=False,
-                xlabel_style={"size": 10, "rotation": 0},
-                ylabel_style={"size": 10},
-                zorder=2,
-            )
-
-            def do_pickle(fig, ax, filename: str) -> None:
-                pickle.dump((fig, ax), open(filename, "wb"), -1)
-
-            pathlib.Path(CACHE_DIR).mkdir(parents=True, exist_ok=True)
-
-            t = threading.Thread(target=do_pickle, args=(fig, ax, filename))
-            t.daemon = True
-            t.start()
-        else:
-            fig, ax = pickle.load(open(filename, "rb"))
+        ax.gridlines(
+            draw_labels={"bottom": "x", "left": "y"},
+            dms=True,
+            x_inline=False,
+            y_inline=False,
+            xlabel_style={"size": 10, "rotation": 0},
+            ylabel_style={"size": 10},
+            zorder=2,
+        )
 
         return fig, ax
 
-    def _get_filename(self, projection: str, extent: list) -> str:
-        hash = hashlib.sha1(
-            ";".join(str(x) for x in [projection] + extent).encode()
-        ).hexdigest()
-        return hash + ".pickle"
-
     def load_data(self):
 
         width_scale = 1.25
@@ -330,6 +293,34 @@ class MapPlotter(Plotter):
         if self.__load_quiver():
             variables_to_load.append(self.quiver["variable"])
 
+        if self.dataset_config.variable[self.variables[0]].data_categories:
+            self.interp = "nearest"
+
+        def load_compare():
+            compare_config = DatasetConfig(self.compare["dataset"])
+            with open_dataset(
+                compare_config,
+                variable=self.compare["variables"],
+                timestamp=self.compare["time"],
+            ) as dataset:
+                data = []
+                for v in self.compare["variables"]:
+                    d = dataset.get_area(
+                        np.array([self.latitude, self.longitude]),
+                        self.compare["depth"],
+                        self.compare["time"],
+                        v,
+                        self.interp,
+                        self.radius,
+                        self.neighbours,
+                    )
+                    data.append(d)
+
+                return data[0]
+
+        # Load the compare dataset while the primary one is loaded
+        compare = self.start_compare(load_compare) if self.compare else None
+
         with open_dataset(
             self.dataset_config, variable=variables_to_load, timestamp=self.time
         ) as dataset:
@@ -349,8 +340,6 @@ class MapPlotter(Plotter):
 
             data = []
             var = dataset.variables[self.variables[0]]
-            if self.dataset_config.variable[self.variables[0]].data_categories:
-                self.interp = "nearest"
             if self.filetype in ["csv", "odv", "txt"]:
                 d, depth_value_map = dataset.get_area(
                     np.array([self.latitude, self.longitude]),
@@ -500,31 +489,9 @@ class MapPlotter(Plotter):
 
             self.timestamp = dataset.nc_data.timestamp_to_iso_8601(self.time)
 
-        if self.compare:
+        if compare:
             self.variable_name += " Difference"
-            compare_config = DatasetConfig(self.compare["dataset"])
-            with open_dataset(
-                compare_config,
-                variable=self.compare["variables"],
-                timestamp=self.compare["time"],
-            ) as dataset:
-                data = []
-                for v in self.compare["variables"]:
-                    var = dataset.variables[v]
-                    d = dataset.get_area(
-                        np.array([self.latitude, self.longitude]),
-                        self.compare["depth"],
-                        self.compare["time"],
-                        v,
-                        self.interp,
-                        self.radius,
-                        self.neighbours,
-                    )
-                    data.append(d)
-
-                data = data[0]
-
-                self.data -= data
+            self.data -= compare()
         # Load bathymetry data
         self.bathymetry = overlays.bathymetry(self.latitude, self.longitude, blur=2)
 
@@ -573,8 +540,7 @@ class MapPlotter(Plotter):
         self.depth_value_map = depth_value_map
 
     def odv_ascii(self):
-        float_to_str = np.vectorize(lambda x: "%0.3f" % x)
-        data = float_to_str(self.data.ravel()[::5])
+        data = self.data.ravel()[::5]
         station = ["%06d" % x for x in range(1, len(data) + 1)]
 
         latitude = self.latitude.ravel()[::5]
@@ -637,28 +603,16 @@ class MapPlotter(Plotter):
         longitude = self.longitude.ravel()[::5]
         depth = self.depth_value_map.ravel()[::5]
 
-        data = []
-        for idx in range(0, len(latitude)):
-            if np.ma.is_masked(data_in[idx]):
-                continue
+        data = [latitude, longitude, depth, data_in]
+        formats = ["%0.4f", "%0.4f", "%0.1f", "%0.3f"]
+        if have_quiver:
+            data.extend([*quiver_data_in, bearing])
+            formats.extend(["%0.3f"] * 3)
 
-            entry = [
-                "%0.4f" % latitude[idx],
-                "%0.4f" % longitude[idx],
-                "%0.1f" % depth[idx],
-                "%0.3f" % data_in[idx],
-            ]
-            if have_quiver:
-                entry.extend(
-                    [
-                        "%0.3f" % quiver_data_in[0][idx],
-                        "%0.3f" % quiver_data_in[1][idx],
-                        "%0.3f" % bearing[idx],
-                    ]
-                )
-            data.append(entry)
+        keep = ~np.ma.getmaskarray(data_in)
+        data = [d[keep] for d in data]
 
-        return super(MapPlotter, self).csv(header, columns, data)
+        return super(MapPlotter, self).csv(header, columns, data, formats)
 
     def stats_csv(self):
         # If the user has selected the display of quiver data in the browser,
@@ -0,0 +1,124 @@
+"""
+Pooled readers of the MBTiles files of the shape file directory.
+
+Each thread keeps a read-only connection to each {tiletype}.mbtiles file it
+reads, so a tile is a single parameterized query on an open connection (sqlite3
+keeps the prepared statement in the connection's statement cache). Tiles are
+kept gzipped in a per-process LRU of mbtiles_cache_mb, and are only decompressed
+for clients that don't accept gzip.
+"""
+
+import gzip
+import os
+import sqlite3
+import threading
+from typing import Union
+
+from cachetools import LRUCache
+
+from oceannavigator.settings import get_settings
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+QUERY = (
+    "SELECT tile_data FROM tiles "
+    "WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?"
+)
+
+_lock = threading.Lock()
+# Per-thread tiletype -> sqlite3.Connection
+_local = threading.local()
+# (tiletype, zoom, x, y) -> tile bytes as stored, or None if there's no tile
+_tiles = None
+
+
+def _cache() -> LRUCache:
+    global _tiles
+
+    if _tiles is None:
+        with _lock:
+            if _tiles is None:
+                _tiles = LRUCache(
+                    maxsize=max(get_settings().mbtiles_cache_mb, 1) * 1024 * 1024,
+                    getsizeof=lambda tile: len(tile or b"") + 1,
+                )
+
+    return _tiles
+
+
+def clear() -> None:
+    """Forgets the cached tiles and the connections of the calling thread."""
+    global _tiles
+
+    with _lock:
+        _tiles = None
+
+    for connection in getattr(_local, "connections", {}).values():
+        connection.close()
+    _local.connections = {}
+
+
+def _after_fork() -> None:
+    # Connections can't be shared with a forked process
+    global _lock, _local, _tiles
+
+    _lock = threading.Lock()
+    _local = threading.local()
+    _tiles = None
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def _connection(tiletype: str) -> sqlite3.Connection:
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    connection = connections.get(tiletype)
+    if connection is None:
+        path = os.path.join(get_settings().shape_file_dir, f"{tiletype}.mbtiles")
+        if not os.path.isfile(path):
+            raise FileNotFoundError(path)
+
+        connection = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+        connections[tiletype] = connection
+
+    return connection
+
+
+def get_tile(tiletype: str, zoom: int, x: int, y: int) -> Union[bytes, None]:
+    """Returns a tile as stored in the MBTiles file, usually gzipped, or None if
+    the file has no such tile.
+
+    Arguments:
+        * y -- The XYZ row of the tile, flipped to the TMS row of the file
+    """
+    key = (tiletype, zoom, x, y)
+    cache = _cache()
+
+    with _lock:
+        if key in cache:
+            return cache[key]
+
+    row = _connection(tiletype).execute(QUERY, (zoom, x, (2**zoom - 1) - y)).fetchone()
+    tile = row[0] if row else None
+
+    with _lock:
+        try:
+            cache[key] = tile
+        except ValueError:
+            # Larger than the whole cache
+            pass
+
+    return tile
+
+
+def is_gzipped(tile: bytes) -> bool:
+    return tile[:2] == GZIP_MAGIC
+
+
+def decompress(tile: bytes) -> bytes:
+    return gzip.decompress(tile) if is_gzipped(tile) else tile
@@ -1,7 +1,10 @@
 import contextlib
 import datetime
+import os
+import tempfile
 from abc import ABCMeta, abstractmethod
-from io import BytesIO, StringIO
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
 from pathlib import Path
 from typing import List
 
@@ -10,10 +13,53 @@ import numpy as np
 import xarray as xr
 from babel.dates import format_date, format_datetime
 
+import oceannavigator.timing as timing
 import plotting.colormap as colormap
+import plotting.figure_pool as figure_pool
 import plotting.utils as utils
 from oceannavigator import DatasetConfig
 
+# Rows formatted at a time by the CSV and ODV exporters
+EXPORT_CHUNK_ROWS = 50000
+
+
+def _column_values(values, fmt: str, missing: str) -> tuple:
+    """Returns the format and list of values of a chunk of an export column."""
+    if np.ma.isMaskedArray(values) or np.asarray(values).dtype.kind in "biufc":
+        values = np.ma.filled(np.ma.asarray(values, dtype=np.float64), np.nan)
+        if missing is not None:
+            invalid = np.isnan(values)
+            if invalid.any():
+                return "%s", [
+                    missing if bad else fmt % v
+                    for v, bad in zip(values.tolist(), invalid.tolist())
+                ]
+
+    return fmt, np.asarray(values).tolist()
+
+
+def write_columns(f, columns: list, formats: list, sep: str, missing=None) -> int:
+    """Writes the rows of column arrays to a file, formatting each chunk of rows
+    with a single row format. Returns the number of rows written.
+
+    Arguments:
+        columns -- 1-D arrays of equal length.
+        formats -- The %-format of each column.
+        sep -- The column separator.
+        missing -- Written in place of NaN and masked values, or None to format
+            them as nan.
+    """
+    n = len(columns[0]) if columns else 0
+    for start in range(0, n, EXPORT_CHUNK_ROWS):
+        chunk = [
+            _column_values(c[start : start + EXPORT_CHUNK_ROWS], fmt, missing)
+            for c, fmt in zip(columns, formats)
+        ]
+        row = sep.join(c[0] for c in chunk) + "\n"
+        f.write("".join(map(row.__mod__, zip(*(c[1] for c in chunk)))))
+
+    return n
+
 
 # Base class for all plotting objects
 class Plotter(metaclass=ABCMeta):
@@ -55,15 +101,20 @@ class Plotter(metaclass=ABCMeta):
         _ = self.prepare_plot()
 
         if self.filetype == "csv":
-            return self.csv()
+            with timing.stage("encode"):
+                return self.csv()
         elif self.filetype == "txt":
-            return self.odv_ascii()
+            with timing.stage("encode"):
+                return self.odv_ascii()
         elif self.filetype == "stats":
-            return self.stats_csv()
+            with timing.stage("encode"):
+                return self.stats_csv()
         elif self.filetype == "nc":
-            return self.netcdf()
+            with timing.stage("encode"):
+                return self.netcdf()
         else:
-            return self.plot()
+            with timing.stage("render"):
+                return self.plot()
 
     # Receives query sent from javascript and parses it.
     @abstractmethod
@@ -217,6 +268,35 @@ class Plotter(metaclass=ABCMeta):
     def load_data(self):
         pass
 
+    def start_compare(self, loader):
+        """Starts loading the compare dataset by calling loader() in a thread, so
+        that it is read while the caller loads the primary dataset.
+
+        FVCOM datasets are read through netCDF4 handles, which are not thread
+        safe, so if either dataset is FVCOM loader() is instead called when its
+        result is requested.
+
+        Returns:
+            callable -- Waits for and returns the result of loader().
+        """
+        compare_config = DatasetConfig(self.compare["dataset"])
+        if any(
+            (config.model_class or "").lower() == "fvcom"
+            for config in (self.dataset_config, compare_config)
+        ):
+            return loader
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(timing.timed_call, loader)
+        executor.shutdown(wait=False)
+
+        def result():
+            value, stages = future.result()
+            timing.merge(stages)
+            return value
+
+        return result
+
     def load_misc(self, dataset, variables):
         self.variable_names = self.get_variable_names(dataset, variables)
         self.variable_units = self.get_variable_units(dataset, variables)
@@ -245,30 +325,63 @@ class Plotter(metaclass=ABCMeta):
             )
 
         with contextlib.closing(BytesIO()) as buf:
-            plt.savefig(
+            fig.savefig(
                 buf,
                 format=self.filetype,
                 dpi="figure",
                 bbox_inches="tight",
                 pad_inches=0.5,
             )
-            plt.close(fig)
+            figure_pool.release(fig)
 
             buf.seek(0)
             return (buf.getvalue(), self.mime, self.filename)
 
-    def csv(self, header=[], columns=[], data=[]):
-        with contextlib.closing(StringIO()) as buf:
-            buf.write("\n".join(["// %s: %s" % (h[0], h[1]) for h in header]))
-            buf.write("\n")
-            buf.write(", ".join(columns))
-            buf.write("\n")
+    @contextlib.contextmanager
+    def _export_file(self):
+        """Opens a temporary file for an export, which is removed if writing it
+        fails.
+        """
+        f = tempfile.NamedTemporaryFile(
+            "w", prefix="export_", suffix=f".{self.filetype}", delete=False
+        )
+        try:
+            with f:
+                yield f
+        except BaseException:
+            os.remove(f.name)
+            raise
+
+    def csv(self, header=[], columns=[], data=[], formats=None, missing=None):
+        """
+        Writes a CSV export to a temporary file, which the plot route streams
+        and removes.
 
-            for line in data:
-                buf.write(", ".join(map(str, line)))
-                buf.write("\n")
+        Arguments:
+            header -- (key, value) pairs written as comments.
+            columns -- The column names.
+            data -- Rows of values, or with formats, a list of column arrays.
+            formats -- The %-format of each column of data.
+            missing -- Written in place of NaN and masked values of the
+                columns, which are otherwise written as nan.
 
-            return (buf.getvalue(), self.mime, self.filename)
+        Returns:
+            tuple -- The path of the file, the mimetype and the filename.
+        """
+        with self._export_file() as f:
+            f.write("\n".join(["// %s: %s" % (h[0], h[1]) for h in header]))
+            f.write("\n")
+            f.write(", ".join(columns))
+            f.write("\n")
+
+            if formats is None:
+                for line in data:
+                    f.write(", ".join(map(str, line)))
+                    f.write("\n")
+            else:
+                write_columns(f, data, formats, ", ", missing)
+
+        return (f.name, self.mime, self.filename)
 
     def odv_ascii(
         self,
@@ -281,14 +394,68 @@ class Plotter(metaclass=ABCMeta):
         depth=[],
         time=[],
         data=[],
+        data_format="%0.3f",
     ):
-        with contextlib.closing(StringIO()) as buf:
-            buf.write(
+        """
+        Writes an ODV spreadsheet export to a temporary file, see csv.
+
+        Arguments:
+            station, latitude, longitude, time -- Per station.
+            depth -- Depths of each station, (station, depth).
+            data -- The values, (station), (station, depth) or
+                (station, variable, depth). Rows where all the values are
+                masked are skipped.
+        """
+        if len(depth.shape) == 1:
+            depth = np.reshape(depth, (depth.shape[0], 1))
+
+        n_stations = len(station)
+        n_depths = depth.shape[1]
+        idx = np.repeat(np.arange(n_stations), n_depths)
+        idx2 = np.tile(np.arange(n_depths), n_stations)
+
+        if len(data.shape) == 1:
+            values = [data[idx]]
+        elif len(data.shape) == 2:
+            values = [data[idx, idx2]]
+        else:
+            values = [data[idx, v, idx2] for v in range(data.shape[1])]
+
+        keep = np.ones(idx.size, dtype=bool)
+        if isinstance(data, np.ma.MaskedArray) and len(data.shape) > 1:
+            mask = np.ma.getmaskarray(data)
+            if len(data.shape) == 3:
+                mask = mask.all(axis=1)
+            keep = ~mask[idx, idx2]
+
+        # Station metadata is only written on the first row of a station
+        station = np.asarray(station, dtype=object)
+        repeated = np.zeros(n_stations, dtype=bool)
+        repeated[1:] = station[1:] == station[:-1]
+        blank = repeated[idx] | (idx2 > 0)
+
+        def metadata(values):
+            return np.where(blank, "", np.asarray(values, dtype=object)[idx])
+
+        columns = [
+            np.where((idx == 0) & (idx2 == 0), cruise, ""),
+            metadata(station),
+            metadata(["C"] * n_stations),
+            metadata([time[i].isoformat() for i in range(n_stations)]),
+            metadata(["%0.4f" % x for x in np.asarray(longitude[:n_stations])]),
+            metadata(["%0.4f" % x for x in np.asarray(latitude[:n_stations])]),
+            depth[idx, idx2],
+            *values,
+        ]
+        formats = ["%s"] * 6 + ["%0.1f"] + [data_format] * len(values)
+
+        with self._export_file() as f:
+            f.write(
                 "//<CreateTime>%s</CreateTime>\n"
                 % (datetime.datetime.now().isoformat())
             )
-            buf.write("//<Software>Ocean Navigator</Software>\n")
-            buf.write(
+            f.write("//<Software>Ocean Navigator</Software>\n")
+            f.write(
                 "\t".join(
                     [
                         "Cruise",
@@ -302,49 +469,11 @@ class Plotter(metaclass=ABCMeta):
                     + ["%s [%s]" % x for x in zip(variables, variable_units)]
                 )
             )
-            buf.write("\n")
-
-            if len(depth.shape) == 1:
-                depth = np.reshape(depth, (depth.shape[0], 1))
-
-            for idx in range(0, len(station)):
-                for idx2 in range(0, depth.shape[1]):
-                    if idx > 0 or idx2 > 0:
-                        cruise = ""
-
-                    if isinstance(data[idx], np.ma.MaskedArray):
-                        if len(data.shape) == 3 and data[idx, :, idx2].mask.all():
-                            continue
-                        if len(data.shape) == 2 and np.ma.is_masked(data[idx, idx2]):
-                            continue
-
-                    line = [
-                        cruise,
-                        station[idx],
-                        "C",
-                        time[idx].isoformat(),
-                        "%0.4f" % longitude[idx],
-                        "%0.4f" % latitude[idx],
-                        "%0.1f" % depth[idx, idx2],
-                    ]
-                    if len(data.shape) == 1:
-                        line.append(str(data[idx]))
-                    elif len(data.shape) == 2:
-                        line.append(str(data[idx, idx2]))
-                    else:
-                        line.extend(list(map(str, data[idx, :, idx2])))
-
-                    if idx > 0 and station[idx] == station[idx - 1] or idx2 > 0:
-                        line[1] = ""
-                        line[2] = ""
-                        line[3] = ""
-                        line[4] = ""
-                        line[5] = ""
-
-                    buf.write("\t".join(line))
-                    buf.write("\n")
+            f.write("\n")
 
-            return (buf.getvalue(), self.mime, self.filename)
+            write_columns(f, [c[keep] for c in columns], formats, "\t", missing="")
+
+        return (f.name, self.mime, self.filename)
 
     def netcdf(self, dataset):
         if self.query.get("time"):
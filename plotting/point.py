@@ -1,10 +1,10 @@
 #!/usr/bin/env python
 
-import matplotlib.pyplot as plt
 import numpy as np
 from netCDF4 import Dataset
 
 from oceannavigator import DatasetConfig
+import plotting.figure_pool as figure_pool
 from plotting.plotter import Plotter
 
 
@@ -16,9 +16,8 @@ class PointPlotter(Plotter):
         self.parse_names_points(query.get("names"), query.get("station"))
 
     def setup_subplots(self, numplots):
-        fig, ax = plt.subplots(
-            1, numplots, sharey=True, figsize=self.figuresize, dpi=self.dpi
-        )
+        fig = figure_pool.figure(self.figuresize, self.dpi)
+        ax = fig.subplots(1, numplots, sharey=True)
 
         if not isinstance(ax, np.ndarray):
             ax = [ax]
@@ -0,0 +1,526 @@
+"""
+Pre-generation of data tiles.
+
+Renders the data tiles of a dataset variable at a given time and depth over a
+range of zooms, straight into the tile cache served by the tiles route. The
+finest zoom is read from the source in blocks of tiles, one read per block, and
+the coarser zooms are derived by downsampling the finer tiles instead of being
+read and resampled again, so they are close to but not exactly the tiles the
+route renders. Blocks are rendered in a process pool, in Z-order, and each
+parent tile is derived as soon as its children have been rendered, so only a
+few tiles per zoom are held in memory.
+"""
+
+import json
+import multiprocessing
+import os
+import time
+import warnings
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import ExitStack
+from itertools import product
+from typing import Iterable, Iterator, List, Tuple, Union
+
+import numpy as np
+
+import data.icechunk_store as icechunk_store
+import plotting.tile as tile
+from data import open_dataset
+from data.sqlite_database import SQLiteDatabase
+from data.utils import get_data_vars_from_equation
+from oceannavigator import DatasetConfig
+from oceannavigator.log import log
+from oceannavigator.settings import get_settings
+
+# Zoom levels read per block, i.e. each read covers 4x4 tiles of the finest zoom
+BLOCK_LEVELS = 2
+TILE_SIZE = 256
+MAX_LATITUDE = 85.0511
+
+# The dataset opened by this (worker) process, see _get_dataset
+_open = {}
+
+
+class TileSet:
+    """The data tiles of a dataset variable at a time and depth, as requested
+    from the tiles route. The radius is in km.
+    """
+
+    def __init__(
+        self,
+        dataset: str,
+        variable: str,
+        timestamp: int,
+        depth: Union[int, str] = 0,
+        scale: str = None,
+        projection: str = "EPSG:3857",
+        interp: str = "gaussian",
+        radius: int = 25,
+        neighbours: int = 10,
+    ):
+        config = DatasetConfig(dataset)
+        variables = variable.split(",")
+
+        if scale is None:
+            scale = ",".join(map(str, config.variable[variable].scale))
+        if depth != "bottom":
+            depth = int(depth)
+
+        self.dataset = dataset
+        self.variable = variable
+        self.timestamp = int(timestamp)
+        self.depth = depth
+        self.scale = scale
+        self.projection = projection
+        self.interp = interp
+        self.radius = radius
+        self.neighbours = neighbours
+        # Tiles of an Icechunk dataset are cached per snapshot
+        self.version = icechunk_store.version(config)
+        self.categorical = any(
+            config.variable[v].data_categories is not None for v in variables
+        )
+
+    def __str__(self):
+        return f"{self.dataset}/{self.variable} at {self.timestamp} depth {self.depth}"
+
+    @property
+    def args(self) -> dict:
+        """The arguments of plotting.tile.get_tile_data."""
+        return {
+            "dataset": self.dataset,
+            "variable": self.variable,
+            "time": self.timestamp,
+            "depth": self.depth,
+            "interp": self.interp,
+            "radius": self.radius * 1000,
+            "neighbours": self.neighbours,
+        }
+
+    def path(self, z: int, x: int, y: int) -> str:
+        return tile.tile_path(
+            self.projection,
+            self.dataset,
+            self.variable,
+            self.timestamp,
+            self.depth,
+            self.scale,
+            z,
+            x,
+            y,
+            self.interp,
+            self.radius,
+            self.neighbours,
+            self.version,
+        )
+
+    @property
+    def marker_path(self) -> str:
+        """A file next to the zoom directories recording a completed run."""
+        zoom_dir = os.path.dirname(os.path.dirname(self.path(0, 0, 0)))
+        return os.path.join(os.path.dirname(zoom_dir), "pregen.json")
+
+    def is_complete(self, zooms: Tuple[int, int]) -> bool:
+        try:
+            with open(self.marker_path) as f:
+                done = json.load(f)["zooms"]
+        except (OSError, ValueError, KeyError):
+            return False
+
+        return done[0] <= zooms[0] and done[1] >= zooms[1]
+
+    def tiles(self, z: int, bounds: tuple = None) -> List[Tuple[int, int]]:
+        """Returns the (x, y) of the tiles at zoom z that cover the bounds
+        (lat_min, lat_max, lon_min, lon_max), or all tiles if there are none.
+        """
+        n = 2**z
+        if bounds is None or self.projection != "EPSG:3857":
+            return list(product(range(n), range(n)))
+
+        lat_min, lat_max, lon_min, lon_max = bounds
+        x_min, y_min = tile.deg2num(min(lat_max, MAX_LATITUDE), lon_min, z)
+        x_max, y_max = tile.deg2num(max(lat_min, -MAX_LATITUDE), lon_max, z)
+
+        return list(
+            product(
+                range(max(x_min, 0), min(x_max, n - 1) + 1),
+                range(max(y_min, 0), min(y_max, n - 1) + 1),
+            )
+        )
+
+    def write(
+        self,
+        data: np.ndarray,
+        z: int,
+        x: int,
+        y: int,
+        cmap,
+        depthm: float,
+        overwrite: bool = False,
+    ) -> bool:
+        """Renders a tile's data into the tile cache. Returns False if the tile
+        was already cached.
+        """
+        path = self.path(z, x, y)
+        if not overwrite and os.path.isfile(path):
+            return False
+
+        scale = [float(component) for component in self.scale.split(",")]
+        img = tile.render(data, self.projection, x, y, z, depthm, scale, cmap)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(tile.encode(img).getbuffer())
+        os.replace(tmp, path)
+
+        return True
+
+
+def downsample(data: np.ndarray, categorical: bool = False) -> np.ndarray:
+    """Halves the resolution of tile data by averaging each 2x2 group of valid
+    pixels, or by taking one of them for categorical data.
+    """
+    if categorical:
+        return data[::2, ::2]
+
+    h, w = data.shape
+    with warnings.catch_warnings():
+        # All-NaN groups (land, outside the domain) stay NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmean(data.reshape(h // 2, 2, w // 2, 2), axis=(1, 3))
+
+
+def _get_dataset(tiles: TileSet) -> tuple:
+    """Returns the dataset and config of a tile set, keeping the dataset open
+    for the next blocks rendered by this process.
+    """
+    key = (tiles.dataset, tiles.variable, tiles.timestamp)
+    if key not in _open:
+        for stack, *_ in _open.values():
+            stack.close()
+        _open.clear()
+
+        config = DatasetConfig(tiles.dataset)
+        stack = ExitStack()
+        dataset = stack.enter_context(
+            open_dataset(
+                config, variable=tiles.variable.split(","), timestamp=tiles.timestamp
+            )
+        )
+        _open[key] = (stack, dataset, config)
+
+    return _open[key][1:]
+
+
+def _render_block(
+    tiles: TileSet,
+    x: int,
+    y: int,
+    z: int,
+    levels: int,
+    derive: bool = True,
+    overwrite: bool = False,
+) -> tuple:
+    """Renders the tiles under tile (x, y, z) at zoom z + levels from a single
+    read of the source. With derive, the tiles of the zooms in between are
+    downsampled from them.
+
+    Returns:
+        tuple -- The data of tile (x, y, z) if derived, the colormap, the depth
+        in metres and the number of tiles written.
+    """
+    dataset, config = _get_dataset(tiles)
+
+    n = 2**levels
+    area = np.empty((2, TILE_SIZE * n, TILE_SIZE * n))
+    for i, j in product(range(n), range(n)):
+        # Areas are transposed relative to the image, columns first
+        area[
+            :, i * TILE_SIZE : (i + 1) * TILE_SIZE, j * TILE_SIZE : (j + 1) * TILE_SIZE
+        ] = tile.get_tile_area(tiles.projection, x * n + i, y * n + j, z + levels)
+
+    data, cmap, depthm = tile.get_tile_data(dataset, config, area, tiles.args)
+    data = np.ma.filled(np.ma.masked_invalid(data).astype(np.float32), np.nan)
+
+    written = 0
+    for level in range(levels, -1, -1):
+        m = 2**level
+        for i, j in product(range(m), range(m)):
+            written += tiles.write(
+                data[
+                    j * TILE_SIZE : (j + 1) * TILE_SIZE,
+                    i * TILE_SIZE : (i + 1) * TILE_SIZE,
+                ],
+                z + level,
+                x * m + i,
+                y * m + j,
+                cmap,
+                depthm,
+                overwrite,
+            )
+
+        if not derive:
+            return None, cmap, depthm, written
+        if level:
+            data = downsample(data, tiles.categorical)
+
+    return data, cmap, depthm, written
+
+
+def _derive(
+    tiles: TileSet,
+    roots: Iterable[tuple],
+    keys: List[Tuple[int, int]],
+    z: int,
+    zmin: int,
+    overwrite: bool = False,
+) -> int:
+    """Writes the tiles from zoom z - 1 to zmin by downsampling the data of the
+    tiles at zoom z. Each tile is written as soon as all of its children have
+    arrived, so with the roots in Z-order only a few unfinished tiles per zoom
+    are held in memory.
+
+    Arguments:
+        roots -- The (x, y, data, cmap, depth in metres) of the tiles at zoom z.
+        keys -- The (x, y) of all of those tiles.
+
+    Returns:
+        int -- The number of tiles written.
+    """
+    # (z, x, y) -> number of children
+    expected = {}
+    level = set(keys)
+    for zoom in range(z - 1, zmin - 1, -1):
+        parents = {}
+        for x, y in level:
+            parents[(x // 2, y // 2)] = parents.get((x // 2, y // 2), 0) + 1
+        expected.update({(zoom, x, y): n for (x, y), n in parents.items()})
+        level = set(parents)
+
+    # (z, x, y) -> [data, children received]
+    pending = {}
+    written = 0
+    for x, y, data, cmap, depthm in roots:
+        zoom = z
+        while zoom > zmin:
+            key = (zoom - 1, x // 2, y // 2)
+            block = pending.setdefault(
+                key, [np.full((2 * TILE_SIZE, 2 * TILE_SIZE), np.nan, np.float32), 0]
+            )
+            i, j = x % 2, y % 2
+            block[0][
+                j * TILE_SIZE : (j + 1) * TILE_SIZE, i * TILE_SIZE : (i + 1) * TILE_SIZE
+            ] = data
+            block[1] += 1
+            if block[1] < expected[key]:
+                break
+
+            del pending[key]
+            zoom, x, y = key
+            data = downsample(block[0], tiles.categorical)
+            written += tiles.write(data, zoom, x, y, cmap, depthm, overwrite)
+
+    return written
+
+
+def z_order(x: int, y: int) -> int:
+    """Returns the position of a tile along the Z-order curve of its zoom, which
+    visits the 4 children of every tile one after the other.
+    """
+    key = 0
+    for bit in range(32):
+        key |= ((x >> bit) & 1) << (2 * bit + 1) | ((y >> bit) & 1) << (2 * bit)
+
+    return key
+
+
+def _map(executor: Union[Executor, None], func, args: list, window: int) -> Iterator:
+    """Like executor.map, but submits at most window calls ahead of the results
+    consumed so finished results don't pile up in memory. Without an executor
+    the calls are made in this process.
+    """
+    if executor is None:
+        yield from map(func, *args)
+        return
+
+    submitted = deque()
+    for call in zip(*args):
+        if len(submitted) >= window:
+            yield submitted.popleft().result()
+        submitted.append(executor.submit(func, *call))
+
+    while submitted:
+        yield submitted.popleft().result()
+
+
+def dataset_bounds(tiles: TileSet) -> Union[tuple, None]:
+    """Returns the (lat_min, lat_max, lon_min, lon_max) of a dataset's grid, or
+    None if it has no latitude and longitude variables.
+    """
+    config = DatasetConfig(tiles.dataset)
+    with open_dataset(
+        config, variable=tiles.variable.split(","), timestamp=tiles.timestamp
+    ) as ds:
+        try:
+            lat, lon = ds.nc_data.latlon_variables
+        except KeyError:
+            return None
+
+        lat = np.asarray(lat)
+        lon = (np.asarray(lon) + 180) % 360 - 180
+
+    return (
+        float(np.nanmin(lat)),
+        float(np.nanmax(lat)),
+        float(np.nanmin(lon)),
+        float(np.nanmax(lon)),
+    )
+
+
+def pregenerate(
+    tiles: TileSet,
+    zooms: Tuple[int, int],
+    processes: int = None,
+    derive: bool = True,
+    overwrite: bool = False,
+    bounds: tuple = None,
+) -> dict:
+    """Renders the tiles of a tile set from zooms[0] to zooms[1] into the tile
+    cache.
+
+    Arguments:
+        tiles -- The tile set.
+        zooms -- The first and last zoom, inclusive.
+        processes -- Number of rendering processes, 1 renders in this process.
+        derive -- Derive coarser zooms from finer ones rather than reading and
+            resampling the source at every zoom.
+        overwrite -- Replace tiles that are already cached.
+        bounds -- The (lat_min, lat_max, lon_min, lon_max) to render, defaults
+            to the extent of the dataset.
+
+    Returns:
+        dict -- The number of tiles written, the seconds taken and tiles/s.
+    """
+    zmin, zmax = zooms
+    start = time.perf_counter()
+
+    if bounds is None:
+        bounds = dataset_bounds(tiles)
+
+    if derive:
+        root = max(zmin, zmax - BLOCK_LEVELS)
+        keys = sorted(tiles.tiles(root, bounds), key=lambda k: z_order(*k))
+        blocks = [(x, y, root, zmax - root) for x, y in keys]
+    else:
+        blocks = []
+        for z in range(zmin, zmax + 1):
+            root = max(0, z - BLOCK_LEVELS)
+            blocks += [(x, y, root, z - root) for x, y in tiles.tiles(root, bounds)]
+
+    args = [
+        [tiles] * len(blocks),
+        *zip(*blocks),
+        [derive] * len(blocks),
+        [overwrite] * len(blocks),
+    ]
+
+    written = 0
+
+    def roots():
+        nonlocal written
+
+        for (x, y, _, _), (data, cmap, depthm, n) in zip(blocks, results):
+            written += n
+            yield x, y, data, cmap, depthm
+
+    with ExitStack() as stack:
+        executor = None
+        if blocks and processes != 1:
+            executor = stack.enter_context(
+                ProcessPoolExecutor(
+                    max_workers=processes,
+                    mp_context=multiprocessing.get_context(
+                        get_settings().worker_mp_context
+                    ),
+                )
+            )
+        window = 2 * (processes or os.cpu_count() or 1)
+        results = _map(executor, _render_block, args, window) if blocks else []
+
+        if derive:
+            derived = _derive(tiles, roots(), keys, root, zmin, overwrite)
+            written += derived
+        else:
+            for _ in roots():
+                pass
+
+    elapsed = time.perf_counter() - start
+    stats = {
+        "zooms": [zmin, zmax],
+        "tiles": written,
+        "seconds": round(elapsed, 3),
+        "tiles_per_second": round(written / elapsed, 1) if elapsed else 0.0,
+    }
+
+    os.makedirs(os.path.dirname(tiles.marker_path), exist_ok=True)
+    with open(tiles.marker_path, "w") as f:
+        json.dump(stats, f)
+
+    log().info(
+        f"{tiles} zooms {zmin}-{zmax}: {written} tiles in {elapsed:.1f}s "
+        f"({stats['tiles_per_second']:.0f} tiles/s)"
+    )
+
+    return stats
+
+
+def index_timestamps(dataset: str, variable: str) -> List[int]:
+    """Returns the timestamps of a variable in the dataset's index."""
+    config = DatasetConfig(dataset)
+    variable = variable.split(",")[0]
+
+    url = config.url if not isinstance(config.url, list) else config.url[0]
+    if url.endswith(".sqlite3"):
+        with SQLiteDatabase(url) as db:
+            if variable in config.calculated_variables:
+                variable = get_data_vars_from_equation(
+                    config.calculated_variables[variable]["equation"],
+                    [v.key for v in db.get_data_variables()],
+                )[0]
+            return db.get_variable_timestamps(variable)
+
+    with open_dataset(config, variable=variable) as ds:
+        return list(map(int, ds.nc_data.time_variable.values))
+
+
+def pregenerate_new(
+    dataset: str,
+    variable: str,
+    zooms: Tuple[int, int],
+    latest: int = None,
+    processes: int = None,
+    derive: bool = True,
+    bounds: tuple = None,
+    **kwargs,
+) -> List[dict]:
+    """Pre-generates the timestamps of the dataset's index that haven't been
+    pre-generated for the zooms yet.
+
+    Arguments:
+        latest -- Only consider this many of the most recent timestamps.
+        bounds -- See pregenerate.
+        kwargs -- Depth, scale, projection, etc. of the TileSets.
+    """
+    timestamps = index_timestamps(dataset, variable)
+    if latest:
+        timestamps = timestamps[-latest:]
+
+    stats = []
+    for timestamp in timestamps:
+        tiles = TileSet(dataset, variable, timestamp, **kwargs)
+        if not tiles.is_complete(zooms):
+            stats.append(pregenerate(tiles, zooms, processes, derive, bounds=bounds))
+
+    return stats
@@ -3,6 +3,7 @@ import matplotlib.pyplot as plt
 import numpy as np
 import xarray as xr
 
+import plotting.figure_pool as figure_pool
 import plotting.utils as utils
 from data import open_dataset
 from plotting.point import PointPlotter
@@ -40,26 +41,21 @@ class ProfilePlotter(PointPlotter):
         self.depths = point_depths
 
     def odv_ascii(self):
-        float_to_str = np.vectorize(lambda x: "%0.1f" % x)
-        data = float_to_str(self.data)
-
-        station = np.repeat(self.names, len(self.depths))
         points = np.array(self.points)
-        latitude = np.repeat(points[:, 0], len(self.depths))
-        longitude = np.repeat(points[:, 1], len(self.depths))
-        time = np.repeat(self.iso_timestamp, data.shape[0])
+        time = np.repeat(self.iso_timestamp, len(self.points))
         depth = self.depths[:, 0, :]
 
         return super(ProfilePlotter, self).odv_ascii(
             self.dataset_name,
             self.variable_names,
             self.variable_units,
-            station,
-            latitude,
-            longitude,
+            self.names,
+            points[:, 0],
+            points[:, 1],
             depth,
             time,
-            data,
+            self.data,
+            data_format="%0.1f",
         )
 
     def csv(self):
@@ -90,30 +86,23 @@ class ProfilePlotter(PointPlotter):
                 variable_order.append(name)
 
 
-        data = []
+        # One row per point and depth, skipping depths without any value
+        p = np.repeat(np.arange(self.data.shape[0]), self.data.shape[2])
+        d = np.tile(np.arange(self.data.shape[2]), self.data.shape[0])
+        keep = ~np.ma.getmaskarray(self.data).all(axis=1)[p, d]
+        p, d = p[keep], d[keep]
 
-        # For each point
-        for p in range(0, self.data.shape[0]):
-            # For each depth
-            for d in range(0, self.data.shape[2]):
-                if self.data[p, :, d].mask.all():
-                    continue
+        points = np.array([point[:2] for point in self.points], dtype=np.float64)
+        data = [points[p, 0], points[p, 1], self.depths[p, 0, d]]
 
-                # if variable_order:
-                entry = [
-                    "%0.4f" % self.points[p][0],
-                    "%0.4f" % self.points[p][1],
-                    "%0.1f" % self.depths[p, 0, d],
-                ]
+        # Append values for each variable in order, formatted to one decimal place
+        for var_name in variable_order:
+            i = self.variable_names.index(var_name)
+            data.append(self.data[p, i, d])
 
-                ## Append values for each variable in order, formatted to one decimal place
-                for var_name in variable_order:
-                    i = self.variable_names.index(var_name)
-                    value = self.data[p, i, d]
-                    entry.append("%0.1f" % value)
-                data.append(entry)
-               
-        return super(ProfilePlotter, self).csv(header, columns, data)
+        formats = ["%0.4f", "%0.4f"] + ["%0.1f"] * (len(data) - 2)
+
+        return super(ProfilePlotter, self).csv(header, columns, data, formats)
 
     def stats_csv(self):
         header = [
@@ -170,7 +159,7 @@ class ProfilePlotter(PointPlotter):
 
     def plot(self):
         # Create base figure
-        fig = plt.figure(figsize=self.figuresize, dpi=self.dpi)
+        fig = figure_pool.figure(self.figuresize, self.dpi)
 
         # Setup figure layout
         width = len(self.variables)
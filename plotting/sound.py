@@ -5,6 +5,7 @@ import numpy as np
 import pint
 import gsw
 
+import plotting.figure_pool as figure_pool
 import plotting.utils as utils
 from plotting.ts import TemperatureSalinityPlotter
 
@@ -43,7 +44,7 @@ class SoundSpeedPlotter(TemperatureSalinityPlotter):
 
     def plot(self):
         # Create base figure
-        fig = plt.figure(figsize=self.figuresize, dpi=self.dpi)
+        fig = figure_pool.figure(self.figuresize, self.dpi)
 
         # Setup figure layout
         width = 2 if self.showmap else 1
@@ -13,7 +13,7 @@ from shapely.ops import unary_union
 from data import open_dataset
 from oceannavigator import DatasetConfig
 from utils.errors import ClientError, ServerError
-from utils.misc import list_areas
+from utils.kml_index import get_area
 
 
 class Area:
@@ -408,17 +408,9 @@ def computer_stats(area, query, dataset_name):
 def stats(dataset_name, query):
     try:
         area = query.get("area")
-        data = None
-
         for idx, a in enumerate(area):
             if isinstance(a, str):
-                sp = a.split("/", 1)
-                if data is None:
-                    data = list_areas(sp[0], simplify=False)
-
-                b = [x for x in data if x.get("key") == a]
-                a = b[0]
-                area[idx] = a
+                area[idx] = get_area(a)
 
         points_lat = []
         for p in area[0]["polygons"][0]:
@@ -6,6 +6,7 @@ import numpy as np
 # from flask_babel import gettext
 from matplotlib.dates import date2num
 
+import plotting.figure_pool as figure_pool
 import plotting.utils as utils
 from data import open_dataset
 from plotting.point import PointPlotter
@@ -17,49 +18,54 @@ class StickPlotter(PointPlotter):
 
         super(StickPlotter, self).__init__(dataset_name, query, **kwargs)
 
+    def parse_query(self, query):
+        super(StickPlotter, self).parse_query(query)
+
+        depth = query.get("depth", 0)
+        if not isinstance(depth, list):
+            depth = [depth]
+
+        self.depth = [d if d == "bottom" else int(d) for d in depth]
+
     def load_data(self):
         if not isinstance(self.depth, list):
             self.depth = [self.depth]
 
-        self.depth = sorted(self.depth)
+        # Bottom after the other depths
+        self.depth = sorted(self.depth, key=lambda d: np.inf if d == "bottom" else d)
 
         with open_dataset(
             self.dataset_config,
             timestamp=self.starttime,
             endtime=self.endtime,
             variable=self.variables,
+            timeseries=True,
         ) as dataset:
 
             self.load_misc(dataset, self.variables)
             self.variable_name = self.get_vector_variable_name(dataset, self.variables)
 
             point_data = []
-            point_depth = []
             for p in self.points:
-                data = []
-                depth = []
-                for v in self.variables:
-                    dd = []
-                    jj = []
-                    for d in self.depth:
-                        da, dp = dataset.get_timeseries_point(
-                            float(p[0]),
-                            float(p[1]),
-                            d,
-                            self.starttime,
-                            self.endtime,
-                            v,
-                            return_depth=True,
-                        )
-                        dd.append(da)
-                        jj.append(dp)
-                    data.append(np.ma.array(dd))
-                    depth.append(np.ma.array(jj))
-                point_data.append(np.ma.array(data))
-                point_depth.append(np.ma.array(depth))
+                # Both components at every depth from a single read
+                vector = dataset.get_vector_point(
+                    float(p[0]),
+                    float(p[1]),
+                    self.depth,
+                    self.variables,
+                    self.starttime,
+                    self.endtime,
+                )
+                point_data.append(np.ma.stack([vector["east"], vector["north"]]))
+
+            point_data = np.ma.stack(point_data)
+            point_depth = [
+                None if d == "bottom" else dataset.depths[d] for d in self.depth
+            ]
 
-            point_data = np.ma.array(point_data)
-            point_depth = np.ma.array(point_depth)
+            starttime_idx = dataset.nc_data.timestamp_to_time_index(self.starttime)
+            endtime_idx = dataset.nc_data.timestamp_to_time_index(self.endtime)
+            timestamp = dataset.nc_data.timestamps[starttime_idx : endtime_idx + 1]
 
         self.data = self.subtract_other(point_data)
         self.data_depth = point_depth
@@ -108,7 +114,7 @@ class StickPlotter(PointPlotter):
                 if self.depth[d] == "bottom":
                     depth = "Bottom"
                 else:
-                    depth = "%d" % np.round(self.data_depth[p, 0, d, 0])
+                    depth = "%d" % np.round(self.data_depth[d])
 
                 # For each time
                 for t in range(0, self.data.shape[3]):
@@ -138,13 +144,8 @@ class StickPlotter(PointPlotter):
     def plot(self):
         figuresize = list(map(float, self.size.split("x")))
         figuresize[1] *= len(self.points) * len(self.depth)
-        fig, ax = plt.subplots(
-            len(self.points) * len(self.depth),
-            1,
-            sharex=True,
-            figsize=figuresize,
-            dpi=self.dpi,
-        )
+        fig = figure_pool.figure(figuresize, self.dpi)
+        ax = fig.subplots(len(self.points) * len(self.depth), 1, sharex=True)
         if len(self.points) * len(self.depth) == 1:
             ax = [ax]
 
@@ -189,7 +190,7 @@ class StickPlotter(PointPlotter):
                     if self.depth[idx2] == "bottom":
                         depth = "Bottom"
                     else:
-                        depth = "%d m" % np.round(self.data_depth[idx, 0, idx2, 0])
+                        depth = "%d m" % np.round(self.data_depth[idx2])
                     if self.plotTitle is None or self.plotTitle == "":
                         a.set_title(
                             "%s at (%s)\n%s"  # gettext("%s at (%s)\n%s")
@@ -1,4 +1,7 @@
 import math
+import os
+import threading
+from functools import lru_cache
 from io import BytesIO
 
 import matplotlib.cm
@@ -6,17 +9,19 @@ import matplotlib.colors
 import matplotlib.pyplot as plt
 import numpy as np
 import xarray as xr
+from cachetools import LRUCache
 from matplotlib.colorbar import ColorbarBase
 from matplotlib.patches import Patch
 from matplotlib.ticker import ScalarFormatter
-from netCDF4 import Dataset
 from PIL import Image
 from pyproj import Proj
 from pyproj.transformer import Transformer
 from scipy.ndimage import gaussian_filter
-from skimage import measure
 
+import data.pyramid as pyramid
+import oceannavigator.timing as timing
 import plotting.colormap as colormap
+import plotting.etopo as etopo
 import plotting.utils as utils
 from data import open_dataset
 from data.transformers.geojson import data_array_to_geojson
@@ -233,85 +238,237 @@ def scale(args):
     return buf
 
 
-async def plot(projection: str, x: int, y: int, z: int, args: dict) -> BytesIO:
-    settings = get_settings()
+def tile_path(
+    projection: str,
+    dataset: str,
+    variable: str,
+    time: int,
+    depth,
+    scale: str,
+    z: int,
+    x: int,
+    y: int,
+    interp: str = "gaussian",
+    radius: int = 25,
+    neighbours: int = 10,
+    version: str = "",
+) -> str:
+    """
+    Returns the location of a data tile in the tile cache. The radius is in km and
+    the version is that of the dataset, see data.icechunk_store.version.
+    """
+    return os.path.join(
+        get_settings().cache_dir,
+        "api",
+        "v2.0",
+        "tiles",
+        str(InterpolationType(interp)),
+        str(radius),
+        str(neighbours),
+        projection,
+        f"{dataset}@{version}" if version else dataset,
+        variable,
+        str(time),
+        str(depth),
+        scale,
+        str(z),
+        str(x),
+        f"{y}.png",
+    )
+
 
+def get_tile_area(projection: str, x: int, y: int, z: int) -> np.ndarray:
+    """
+    Returns the latitudes and longitudes of a tile's pixels as an area for
+    Model.get_area. The area is transposed relative to the image.
+    """
     lat, lon = get_latlon_coords(projection, x, y, z)
     if len(lat.shape) == 1:
         lat, lon = np.meshgrid(lat, lon)
 
-    dataset_name = args.get("dataset")
-    config = DatasetConfig(dataset_name)
-    variable = args.get("variable")
-
-    variable = variable.split(",")
+    return np.array([lat, lon])
 
-    depth = args.get("depth")
 
-    scale = args.get("scale")
-    scale = [float(component) for component in scale.split(",")]
+def get_tile_data(
+    dataset, config: DatasetConfig, area: np.ndarray, args: dict
+) -> tuple:
+    """
+    Reads the tile variable(s) over an area from an open dataset.
 
+    Returns:
+        tuple -- The data in image orientation (the magnitude for vector
+        variables), the colormap and the depth in metres used to mask out land.
+    """
+    variable = args.get("variable").split(",")
+    depth = args.get("depth")
     time = args.get("time")
 
-    data = []
-    with open_dataset(config, variable=variable, timestamp=time) as dataset:
-        for v in variable:
-            if config.variable[v].data_categories is not None:
-                args["interp"] = InterpolationType.nearest
-                args["radius"] = 25000
-                args["neighbours"] = 10
-
-            data.append(
-                dataset.get_area(
-                    np.array([lat, lon]),
-                    depth,
-                    time,
-                    v,
-                    args.get("interp"),
-                    args.get("radius"),
-                    args.get("neighbours"),
-                )
-            )
+    dataset.nc_data.prefetch(variable, depth)
 
-        vc = config.variable[dataset.variables[variable[0]]]
-        variable_name = vc.name
-        cmap = colormap.find_colormap(variable_name)
+    for v in variable:
+        if config.variable[v].data_categories is not None:
+            args["interp"] = InterpolationType.nearest
+            args["radius"] = 25000
+            args["neighbours"] = 10
 
-        if depth != "bottom":
-            depthm = dataset.depths[depth]
-        else:
-            depthm = 0
+    vc = config.variable[dataset.variables[variable[0]]]
+    cmap = colormap.find_colormap(vc.name)
 
-    if len(data) == 1:
-        data = data[0]
+    # Grids finer than the tile's pixels are read from a coarser copy
+    resolution = pyramid.spacing(area[0], area[1])
 
-    if len(data) == 2:
-        data = np.sqrt(data[0] ** 2 + data[1] ** 2)
+    if len(variable) == 2:
+        # Vector components, read and resampled together
+        data = dataset.get_vector_area(
+            area,
+            depth,
+            time,
+            variable,
+            args.get("interp"),
+            args.get("radius"),
+            args.get("neighbours"),
+            resolution=resolution,
+        )["magnitude"]
         cmap = colormap.colormaps.get("speed")
+    else:
+        data = dataset.get_area(
+            area,
+            depth,
+            time,
+            variable[0],
+            args.get("interp"),
+            args.get("radius"),
+            args.get("neighbours"),
+            resolution=resolution,
+        )
+
+    if depth != "bottom":
+        depthm = dataset.depths[depth]
+    else:
+        depthm = 0
 
-    data = data.transpose()
-    xpx = x * 256
-    ypx = y * 256
+    return data.transpose(), cmap, depthm
+
+
+# Palette indices of the colours below and above the scale and of missing data,
+# the data colours take the indices before them
+UNDER, OVER, BAD = 253, 254, 255
+
+_palette_lock = threading.Lock()
+# id(cmap) -> (cmap, number of data colours, RGBA palette)
+_palettes = LRUCache(maxsize=128)
+
+
+def palette(cmap) -> tuple:
+    """
+    Returns the number of data colours of a colormap and its 256 RGBA palette
+    entries, with the under, over and bad colours at UNDER, OVER and BAD.
+    Colormaps of more than UNDER colours are sampled at the centres of UNDER
+    equal bins.
+    """
+    with _palette_lock:
+        cached = _palettes.get(id(cmap))
+    if cached is not None and cached[0] is cmap:
+        return cached[1:]
+
+    levels = min(cmap.N, UNDER)
+    lut = np.zeros((256, 4), dtype=np.uint8)
+    if levels == cmap.N:
+        lut[:levels] = cmap(np.arange(levels), bytes=True)
+    else:
+        lut[:levels] = cmap((np.arange(levels) + 0.5) / levels, bytes=True)
+    lut[[UNDER, OVER, BAD]] = cmap(np.array([-1.0, 2.0, np.nan]), bytes=True)
+
+    with _palette_lock:
+        _palettes[id(cmap)] = (cmap, levels, lut)
+
+    return levels, lut
+
+
+def colour_indices(data: np.ndarray, scale: list, levels: int) -> np.ndarray:
+    """
+    Returns the palette index of each value of a masked array, binned like
+    matplotlib's Normalize and Colormap into levels colours over the scale.
+    """
+    bad = np.ma.getmaskarray(data) | ~np.isfinite(np.ma.getdata(data))
+
+    span = scale[1] - scale[0]
+    x = np.ma.getdata(data).astype(np.float32)
+    x[bad] = scale[0]
+    x -= scale[0]
+    x *= levels / span if span > 0 else 0
+
+    index = np.clip(x, 0, levels - 1).astype(np.uint8)
+    index[x < 0] = UNDER
+    index[x > levels] = OVER
+    index[bad] = BAD
+
+    return index
+
+
+def render(
+    data: np.ndarray,
+    projection: str,
+    x: int,
+    y: int,
+    z: int,
+    depthm: float,
+    scale: list,
+    cmap,
+) -> Image.Image:
+    """
+    Colours a tile's data into a palette image, masking out land below the
+    vector-tile threshold.
+    """
+    data = np.ma.masked_invalid(data)
 
     # Mask out any topography if we're below the vector-tile threshold
     if z < 8:
-        with Dataset(settings.etopo_file % (projection, z), "r") as dataset:
-            bathymetry = dataset["z"][ypx : (ypx + 256), xpx : (xpx + 256)]
-
-        bathymetry = gaussian_filter(bathymetry, 0.5)
+        bathymetry = gaussian_filter(etopo.window(projection, x, y, z), 0.5)
 
         data[np.where(bathymetry > -depthm)] = np.ma.masked
 
-    sm = matplotlib.cm.ScalarMappable(
-        matplotlib.colors.Normalize(vmin=scale[0], vmax=scale[1]), cmap=cmap
-    )
-
-    img = sm.to_rgba(np.ma.masked_invalid(np.squeeze(data)))
-    im = Image.fromarray((img * 255.0).astype(np.uint8))
+    with timing.stage("render"):
+        levels, lut = palette(cmap)
+        im = Image.fromarray(colour_indices(np.squeeze(data), scale, levels))
+        im.putpalette(lut.tobytes(), rawmode="RGBA")
 
     return im
 
 
+def encode(img: Image.Image, format: str = "PNG") -> BytesIO:
+    """
+    Encodes a tile image as a PNG at the configured zlib level, or as a lossless
+    WebP.
+    """
+    buf = BytesIO()
+    if format == "WEBP":
+        img.save(buf, format="WEBP", lossless=True)
+    else:
+        img.save(
+            buf, format="PNG", compress_level=get_settings().tile_png_compress_level
+        )
+    buf.seek(0)
+
+    return buf
+
+
+async def plot(projection: str, x: int, y: int, z: int, args: dict) -> BytesIO:
+    area = get_tile_area(projection, x, y, z)
+
+    config = DatasetConfig(args.get("dataset"))
+
+    scale = args.get("scale")
+    scale = [float(component) for component in scale.split(",")]
+
+    with open_dataset(
+        config, variable=args.get("variable").split(","), timestamp=args.get("time")
+    ) as dataset:
+        data, cmap, depthm = get_tile_data(dataset, config, area, args)
+
+    return render(data, projection, x, y, z, depthm, scale, cmap)
+
+
 def get_quiver_slice(
     dim_var: xr.IndexVariable, tile_bounds: np.array, n_quivers: int
 ) -> np.array:
@@ -346,7 +503,13 @@ async def quiver(
 ):
     config = DatasetConfig(dataset_name)
 
-    with open_dataset(config, variable=variable, timestamp=time) as ds:
+    # The bearings are read from the same open dataset
+    bearings_var = config.variable[variable].bearing_component
+    if variable not in config.vector_variables:
+        bearings_var = None
+    variables = [variable, bearings_var] if bearings_var else variable
+
+    with open_dataset(config, variable=variables, timestamp=time) as ds:
         lat_var, lon_var = ds.nc_data.latlon_variables
 
         time_index = ds.nc_data.timestamp_to_time_index(time)
@@ -373,127 +536,125 @@ async def quiver(
             data = data[data_slice]
 
             bearings = None
-            bearings_var = config.variable[variable].bearing_component
-            if variable in config.vector_variables and bearings_var:
-                with open_dataset(
-                    config, variable=bearings_var, timestamp=time
-                ) as ds_bearing:
-                    bearings = ds_bearing.nc_data.get_dataset_variable(bearings_var)[
-                        data_slice
-                    ].squeeze(drop=True)
-
-            d = await data_array_to_geojson(
-                data.squeeze(drop=True),
-                bearings,
-                lat_var[lat_slice],
-                lon_var[lon_slice],
-                config.variable[variable].scale,
-            )
+            if bearings_var:
+                bearings = ds.nc_data.get_dataset_variable(bearings_var)[
+                    data_slice
+                ].squeeze(drop=True)
+
+            with timing.stage("encode"):
+                d = await data_array_to_geojson(
+                    data.squeeze(drop=True),
+                    bearings,
+                    lat_var[lat_slice],
+                    lon_var[lon_slice],
+                    config.variable[variable].scale,
+                )
 
             return d
     return {"type": "FeatureCollection", "features": []}
 
 
-def topo(projection: str, x: int, y: int, z: int, shaded_relief: bool) -> BytesIO:
-    settings = get_settings()
+TOPO_SCALE = (-4000, 1000)
+BATHYMETRY_LEVELS = [100, 200, 500, 1000, 2000, 3000, 4000, 5000, 6000]
 
-    lat, lon = get_latlon_coords(projection, x, y, z)
-    if len(lat.shape) == 1:
-        lat, lon = np.meshgrid(lat, lon)
-
-    xpx = x * 256
-    ypx = y * 256
-
-    scale = [-4000, 1000]
-    cmap = "BrBG_r"
 
+@lru_cache()
+def topo_lut() -> np.ndarray:
+    """
+    Returns the RGBA colours of the topography tiles for each whole metre of
+    elevation in TOPO_SCALE, followed by a transparent colour for missing values.
+    """
     land_colors = plt.cm.BrBG_r(np.linspace(0.6, 1, 128))
     water_colors = colormap.colormaps["bathymetry"](np.linspace(0.25, 1, 196))
     colors = np.vstack((water_colors, land_colors))
     cmap = matplotlib.colors.LinearSegmentedColormap.from_list("topo", colors)
 
-    data = None
-    with Dataset(settings.etopo_file % (projection, z), "r") as dataset:
-        data = dataset["z"][ypx : (ypx + 256), xpx : (xpx + 256)]
-
-    shade = 0
-    if shaded_relief:
-        x, y = np.gradient(data)
-        slope = np.pi / 2.0 - np.arctan(np.sqrt(x * x + y * y))
-        aspect = np.arctan2(-x, y)
-        altitude = np.pi / 4.0
-        azimuth = np.pi / 2.0
-
-        shaded = np.sin(altitude) * np.sin(slope) + np.cos(altitude) * np.cos(
-            slope
-        ) * np.cos((azimuth - np.pi / 2.0) - aspect)
-        shade = (shaded + 1) / 8
-        shade = np.repeat(np.expand_dims(shade, 2), 4, axis=2)
-        shade[:, :, 3] = 0
-
     sm = matplotlib.cm.ScalarMappable(
-        matplotlib.colors.SymLogNorm(linthresh=0.1, vmin=scale[0], vmax=scale[1]),
+        matplotlib.colors.SymLogNorm(
+            linthresh=0.1, vmin=TOPO_SCALE[0], vmax=TOPO_SCALE[1]
+        ),
         cmap=cmap,
     )
-    img = sm.to_rgba(np.squeeze(data))
+    lut = sm.to_rgba(np.arange(TOPO_SCALE[0], TOPO_SCALE[1] + 1), bytes=True)
 
-    img += shade
-    img = np.clip(img, 0, 1)
+    return np.vstack((lut, np.zeros((1, 4), dtype=np.uint8)))
 
-    im = Image.fromarray((img * 255.0).astype(np.uint8))
 
-    buf = BytesIO()
-    im.save(buf, format="PNG", optimize=True)
-    buf.seek(0)
+def hillshade(data: np.ndarray) -> np.ndarray:
+    """
+    Returns the brightness added to each pixel of a shaded relief in 0-63.
+    """
+    x, y = np.gradient(data)
+    slope = np.pi / 2.0 - np.arctan(np.sqrt(x * x + y * y))
+    aspect = np.arctan2(-x, y)
+    altitude = np.pi / 4.0
+    azimuth = np.pi / 2.0
 
-    return buf
+    shaded = np.sin(altitude) * np.sin(slope) + np.cos(altitude) * np.cos(
+        slope
+    ) * np.cos((azimuth - np.pi / 2.0) - aspect)
 
+    return np.nan_to_num((shaded + 1) * (255 / 8)).astype(np.uint8)
 
-async def bathymetry(projection: str, x: int, y: int, z: int) -> BytesIO:
-    settings = get_settings()
 
-    lat, lon = get_latlon_coords(projection, x, y, z)
-    if len(lat.shape) == 1:
-        lat, lon = np.meshgrid(lat, lon)
+def topo(projection: str, x: int, y: int, z: int, shaded_relief: bool) -> BytesIO:
+    data = etopo.window(projection, x, y, z)
 
-    xpx = x * 256
-    ypx = y * 256
+    missing = np.isnan(data)
+    index = np.clip(np.nan_to_num(data), *TOPO_SCALE) - TOPO_SCALE[0]
+    index = np.rint(index).astype(np.intp)
+    index[missing] = len(topo_lut()) - 1
+
+    img = topo_lut()[index]
+
+    if shaded_relief:
+        rgb = img[..., :3].astype(np.uint16) + hillshade(data)[..., np.newaxis]
+        img[..., :3] = np.minimum(rgb, 255)
 
-    with Dataset(settings.etopo_file % (projection, z), "r") as dataset:
-        data = dataset["z"][ypx : (ypx + 256), xpx : (xpx + 256)] * -1
-        data = data[::-1, :]
+    return encode(Image.fromarray(img))
 
-    LEVELS = [100, 200, 500, 1000, 2000, 3000, 4000, 5000, 6000]
 
-    normalized = matplotlib.colors.LogNorm(vmin=1, vmax=6000)(LEVELS)
+@lru_cache()
+def bathymetry_colors() -> np.ndarray:
+    """
+    Returns the RGBA colours of the contours of the bathymetry tiles.
+    """
+    normalized = matplotlib.colors.LogNorm(vmin=1, vmax=6000)(BATHYMETRY_LEVELS)
     cmap = matplotlib.colors.LinearSegmentedColormap.from_list(
         "transparent_gray", [(0, 0, 0, 1), (0, 0, 0, 0.5)]
     )
-    colors = cmap(normalized)
 
-    fig = plt.figure()
-    fig.set_size_inches(4, 4)
-    ax = plt.Axes(fig, [0, 0, 1, 1])
-    ax.set_axis_off()
-    fig.add_axes(ax)
+    return cmap(normalized, bytes=True)
 
-    for i, l in enumerate(LEVELS):
-        contours = measure.find_contours(data, l)
 
-        for _, contour in enumerate(contours):
-            ax.plot(contour[:, 1], contour[:, 0], color=colors[i], linewidth=1)
+async def bathymetry(projection: str, x: int, y: int, z: int) -> BytesIO:
+    """
+    Draws the bathymetry contours of a tile. A pixel is on a contour where the
+    depth crosses a level between it and its right or lower neighbour, and gets
+    the colour of the deepest level crossed.
+    """
+    data = etopo.window(projection, x, y, z) * -1
+
+    # Number of levels above each pixel, -1 for missing values
+    band = np.searchsorted(BATHYMETRY_LEVELS, data, side="right")
+    band[np.isnan(data)] = -1
+
+    level = np.full(data.shape, -1)
+    for a, b in [
+        (np.s_[:, :-1], np.s_[:, 1:]),
+        (np.s_[:-1, :], np.s_[1:, :]),
+    ]:
+        crossed = (band[a] != band[b]) & (band[a] >= 0) & (band[b] >= 0)
+        # Draw on the deeper side of the crossing
+        deepest = np.maximum(band[a], band[b]) - 1
+        for side, other in [(a, b), (b, a)]:
+            on_side = crossed & (band[side] > band[other])
+            level[side] = np.where(
+                on_side, np.maximum(level[side], deepest), level[side]
+            )
 
-    plt.xlim([0, 255])
-    plt.ylim([0, 255])
+    img = np.zeros(data.shape + (4,), dtype=np.uint8)
+    contour = level >= 0
+    img[contour] = bathymetry_colors()[level[contour]]
 
-    buf = BytesIO()
-    plt.savefig(
-        buf,
-        format="png",
-        dpi=64,
-        transparent=True,
-    )
-    plt.close(fig)
-    buf.seek(0)
-
-    return buf
+    return encode(Image.fromarray(img))
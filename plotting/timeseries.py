@@ -10,6 +10,7 @@ from matplotlib.ticker import ScalarFormatter
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 
 import plotting.colormap as colormap
+import plotting.figure_pool as figure_pool
 import plotting.utils as utils
 from data import open_dataset
 from data.utils import datetime_to_timestamp
@@ -49,6 +50,7 @@ class TimeseriesPlotter(PointPlotter):
             variable=self.variables,
             timestamp=self.starttime,
             endtime=self.endtime,
+            timeseries=True,
             interp=self.interp,
             radius=self.radius,
             neighbours=self.neighbours,
@@ -138,26 +140,21 @@ class TimeseriesPlotter(PointPlotter):
                     dataset, vector_variables
                 )
 
-                d = []
-                vector_point_data = []
-                for vv in vector_variables:
-                    for p in self.points:
-                        vector_data = []
-
-                        d, _ = dataset.get_timeseries_point(
-                            float(p[0]),
-                            float(p[1]),
-                            self.depth,
-                            self.starttime,
-                            self.endtime,
-                            vv,
-                            return_depth=True,
-                        )
-
-                    vector_data.append(d)
-                    vector_point_data.append(np.ma.array(vector_data))
+                east = []
+                north = []
+                for p in self.points:
+                    vector = dataset.get_vector_point(
+                        float(p[0]),
+                        float(p[1]),
+                        self.depth,
+                        vector_variables,
+                        self.starttime,
+                        self.endtime,
+                    )
+                    east.append(vector["east"])
+                    north.append(vector["north"])
 
-                self.quiver_data = vector_point_data
+                self.quiver_data = [np.ma.stack(east), np.ma.stack(north)]
 
             self.times = times
             self.data = point_data
@@ -205,7 +202,7 @@ class TimeseriesPlotter(PointPlotter):
                     ]
                 )
         else:
-            max_dep_idx = np.where(~self.data[:, 0, 0, :].mask)[1].max()
+            max_dep_idx = np.where(~np.ma.getmaskarray(self.data[:, 0, 0, :]))[1].max()
             if not has_quiver:
                 header.append(
                     ["Variable", "%s (%s)" % (self.variable_name, self.variable_unit)]
@@ -248,54 +245,36 @@ class TimeseriesPlotter(PointPlotter):
             )
             bearing[inds] = np.nan
 
-        data = []
+        # One row per point and time
+        p = np.repeat(np.arange(self.data.shape[0]), self.data.shape[2])
+        t = np.tile(np.arange(self.data.shape[2]), self.data.shape[0])
 
-        # For each point
-        for p in range(0, self.data.shape[0]):
-            # For each time
-            for t in range(0, self.data.shape[2]):
-                entry = [
-                    "%0.4f" % self.points[p][0],
-                    "%0.4f" % self.points[p][1],
-                    self.times[t].isoformat(),
-                ]
-                if self.depth == "all":
-                    entry.extend(
-                        ["%0.3f" % f for f in self.data[p, 0, t, : max_dep_idx + 1]]
-                    )
-                    if has_quiver:
-                        entry.extend(
-                            [
-                                "%0.3f" % f
-                                for f in self.quiver_data[0][p, t, : max_dep_idx + 1]
-                            ]
-                        )
-                        entry.extend(
-                            [
-                                "%0.3f" % f
-                                for f in self.quiver_data[1][p, t, : max_dep_idx + 1]
-                            ]
-                        )
-                        entry.extend(
-                            ["%0.3f" % f for f in bearing[p, t, : max_dep_idx + 1]]
-                        )
-                else:
-                    entry.append("%0.3f" % self.data[p, 0, t])
-                    if has_quiver:
-                        entry.extend(
-                            [
-                                "%0.3f" % self.quiver_data[0][p, t],
-                                "%0.3f" % self.quiver_data[1][p, t],
-                                "%0.3f" % bearing[p, t],
-                            ]
-                        )
-                data.append(entry)
+        points = np.array([point[:2] for point in self.points], dtype=np.float64)
+        times = np.array([time.isoformat() for time in self.times], dtype=object)
 
-        d = np.array(data)
-        d[np.where(d == "nan")] = ""
-        data = d.tolist()
+        data = [points[p, 0], points[p, 1], times[t]]
+        if self.depth == "all":
+            depths = range(max_dep_idx + 1)
+            data.extend([self.data[p, 0, t, d] for d in depths])
+            if has_quiver:
+                for component in [*self.quiver_data[:2], bearing]:
+                    data.extend([component[p, t, d] for d in depths])
+        else:
+            data.append(self.data[p, 0, t])
+            if has_quiver:
+                data.extend(
+                    [
+                        self.quiver_data[0][p, t],
+                        self.quiver_data[1][p, t],
+                        bearing[p, t],
+                    ]
+                )
 
-        return super(TimeseriesPlotter, self).csv(header, columns, data)
+        formats = ["%0.4f", "%0.4f", "%s"] + ["%0.3f"] * (len(data) - 3)
+
+        return super(TimeseriesPlotter, self).csv(
+            header, columns, data, formats, missing=""
+        )
 
     def stats_csv(self):
         header = [
@@ -413,9 +392,8 @@ class TimeseriesPlotter(PointPlotter):
             size = list(map(float, self.size.split("x")))
             numpoints = len(self.points)
             figuresize = (size[0], size[1] * numpoints)
-            fig, ax = plt.subplots(
-                numpoints, 1, sharex=True, figsize=figuresize, dpi=self.dpi
-            )
+            fig = figure_pool.figure(figuresize, self.dpi)
+            ax = fig.subplots(numpoints, 1, sharex=True)
 
             if not isinstance(ax, np.ndarray):
                 ax = [ax]
@@ -473,7 +451,7 @@ class TimeseriesPlotter(PointPlotter):
             # Create base figure
             figure_size = self.figuresize
             figure_size[0] *= 1.5 if self.showmap else 1.0
-            fig = plt.figure(figsize=figure_size, dpi=self.dpi)
+            fig = figure_pool.figure(figure_size, self.dpi)
 
             # Setup figure layout
             width = 1
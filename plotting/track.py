@@ -14,6 +14,7 @@ from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 import plotting.colormap as colormap
+import plotting.figure_pool as figure_pool
 import plotting.utils as utils
 from data import open_dataset
 from data.observational import (
@@ -131,6 +132,7 @@ class TrackPlotter(Plotter):
                 endtime=end,
                 variable=self.variables,
                 nearest_timestamp=True,
+                timeseries=True,
             ) as dataset:
                 # Make distance -> time function
                 dist_to_time = interp1d(
@@ -264,7 +266,7 @@ class TrackPlotter(Plotter):
 
         figuresize = list(map(float, self.size.split("x")))
         figuresize[1] *= numplots
-        fig = plt.figure(figsize=figuresize, dpi=self.dpi)
+        fig = figure_pool.figure(figuresize, self.dpi)
         gs = gridspec.GridSpec(numplots, width, width_ratios=width_ratios)
 
         if self.showmap:
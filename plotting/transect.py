@@ -5,9 +5,9 @@ from geopy.distance import GeodesicDistance
 from matplotlib.ticker import ScalarFormatter, StrMethodFormatter
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 from netCDF4 import Dataset
-from scipy.interpolate import interp1d
 
 import plotting.colormap as colormap
+import plotting.figure_pool as figure_pool
 import plotting.utils as utils
 from data import geo, open_dataset
 from oceannavigator import DatasetConfig
@@ -55,6 +55,91 @@ class TransectPlotter(LinePlotter):
                 break
 
     def load_data(self):
+        def load_compare():
+            self.compare_config = DatasetConfig(self.compare["dataset"])
+            self.compare["time"] = int(self.compare["time"])
+            with open_dataset(
+                self.compare_config,
+                timestamp=self.compare["time"],
+                variable=self.compare["variables"],
+            ) as dataset:
+                self.compare["iso_timestamp"] = dataset.nc_data.timestamp_to_iso_8601(
+                    self.compare["time"]
+                )
+
+                # 1 variable
+                if len(self.compare["variables"]) == 1:
+
+                    # Get and store the "nicely formatted" string for the variable name
+                    self.compare["name"] = self.get_variable_names(
+                        dataset, self.compare["variables"]
+                    )[0]
+
+                    # Find correct colourmap
+                    if self.compare["colormap"] == "default":
+                        self.compare["colormap"] = colormap.find_colormap(
+                            self.compare["name"]
+                        )
+                    else:
+                        self.compare["colormap"] = colormap.find_colormap(
+                            self.compare["colormap"]
+                        )
+
+                    (
+                        climate_points,
+                        climate_distance,
+                        climate_data,
+                        cdep,
+                    ) = dataset.get_path_profile(
+                        self.points, self.compare["variables"][0], self.compare["time"]
+                    )
+
+                    self.compare["units"] = dataset.variables[
+                        self.compare["variables"][0]
+                    ].unit
+                    self.__fill_invalid_shift(climate_data)
+
+                    return climate_data, cdep
+
+                # Velocity variables
+                else:
+                    # Get and store the "nicely formatted" string for the variable name
+                    self.compare["name"] = self.get_vector_variable_name(
+                        dataset, self.compare["variables"]
+                    )
+
+                    (
+                        climate_pts,
+                        climate_distance,
+                        climate_vector,
+                        cdep,
+                    ) = dataset.get_vector_path_profile(
+                        self.points,
+                        self.compare["variables"],
+                        self.compare["time"],
+                        numpoints=100,
+                    )
+                    climate_x = climate_vector["east"]
+                    climate_y = climate_vector["north"]
+
+                    (
+                        climate_distances,
+                        ctimes,
+                        clat,
+                        clon,
+                        bearings,
+                    ) = geo.path_to_points(self.points, 100)
+
+                    r = np.radians(np.subtract(90, bearings))
+                    theta = np.arctan2(climate_y, climate_x) - r
+                    mag = climate_vector["magnitude"]
+
+                    return (theta, mag), cdep
+
+        # Load data sent from Right Map (if in compare mode) while the primary
+        # transect is loaded
+        compare = self.start_compare(load_compare) if self.compare else None
+
         vars_to_load = self.variables.copy()
         if self.surface:
             vars_to_load.append(self.surface)
@@ -90,16 +175,14 @@ class TransectPlotter(LinePlotter):
                     self.points, 100
                 )
                 # Calculate vector components
-                transect_pts, distance, x, dep = dataset.get_path_profile(
-                    self.points, self.variables[0], self.time, numpoints=100
-                )
-                transect_pts, distance, y, dep = dataset.get_path_profile(
-                    self.points, self.variables[1], self.time, numpoints=100
+                transect_pts, distance, vector, dep = dataset.get_vector_path_profile(
+                    self.points, self.variables, self.time, numpoints=100
                 )
+                x, y = vector["east"], vector["north"]
 
                 r = np.radians(np.subtract(90, bearings))
                 theta = np.arctan2(y, x) - r
-                magnitude = np.sqrt(x**2 + y**2)
+                magnitude = vector["magnitude"]
 
                 parallel = magnitude * np.cos(theta)
                 perpendicular = magnitude * np.sin(theta)
@@ -184,136 +267,46 @@ class TransectPlotter(LinePlotter):
                 )
                 self.destination = destination
 
-        # Load data sent from Right Map (if in compare mode)
-        if self.compare:
-
-            def interpolate_depths(data, depth_in, depth_out):
-                output = []
-                for i in range(0, depth_in.shape[0]):
-                    f = interp1d(
-                        depth_in[i],
-                        data[:, i],
-                        bounds_error=False,
-                        assume_sorted=True,
+        # Map the data sent from Right Map (if in compare mode) onto the depths of
+        # the primary transect
+        if compare:
+            compare_data, cdep = compare()
+
+            # 1 variable
+            if len(self.compare["variables"]) == 1:
+                climate_data = compare_data
+                if (self.depth.shape != cdep.shape) or (self.depth != cdep).any():
+                    # Need to interpolate the depths
+                    climate_data = utils.interpolate_depths(
+                        climate_data, cdep, self.depth
                     )
-                    output.append(f(depth_out[i].view(np.ma.MaskedArray).filled()))
 
-                return np.ma.masked_invalid(output).transpose()
-
-            self.compare_config = DatasetConfig(self.compare["dataset"])
-            self.compare["time"] = int(self.compare["time"])
-            with open_dataset(
-                self.compare_config,
-                timestamp=self.compare["time"],
-                variable=self.compare["variables"],
-            ) as dataset:
-                self.compare["iso_timestamp"] = dataset.nc_data.timestamp_to_iso_8601(
-                    self.compare["time"]
-                )
-
-                # 1 variable
-                if len(self.compare["variables"]) == 1:
-
-                    # Get and store the "nicely formatted" string for the variable name
-                    self.compare["name"] = self.get_variable_names(
-                        dataset, self.compare["variables"]
-                    )[0]
-
-                    # Find correct colourmap
-                    if self.compare["colormap"] == "default":
-                        self.compare["colormap"] = colormap.find_colormap(
-                            self.compare["name"]
-                        )
-                    else:
-                        self.compare["colormap"] = colormap.find_colormap(
-                            self.compare["colormap"]
-                        )
-
-                    (
-                        climate_points,
-                        climate_distance,
-                        climate_data,
-                        cdep,
-                    ) = dataset.get_path_profile(
-                        self.points, self.compare["variables"][0], self.compare["time"]
-                    )
-
-                    self.compare["units"] = dataset.variables[
-                        self.compare["variables"][0]
-                    ].unit
-                    self.__fill_invalid_shift(climate_data)
-
-                    if (self.depth.shape != cdep.shape) or (self.depth != cdep).any():
-                        # Need to interpolate the depths
-                        climate_data = interpolate_depths(
-                            climate_data, cdep, self.depth
-                        )
-
-                    if self.transect_data["data"] is None:
-                        self.transect_data["magnitude"] -= climate_data
-                        self.transect_data["parallel"] -= climate_data
-                        self.transect_data["perpendicular"] -= climate_data
-                    else:
-                        self.transect_data["compare_data"] = climate_data
-
-                # Velocity variables
+                if self.transect_data["data"] is None:
+                    self.transect_data["magnitude"] -= climate_data
+                    self.transect_data["parallel"] -= climate_data
+                    self.transect_data["perpendicular"] -= climate_data
                 else:
-                    # Get and store the "nicely formatted" string for the variable name
-                    self.compare["name"] = self.get_vector_variable_name(
-                        dataset, self.compare["variables"]
-                    )
+                    self.transect_data["compare_data"] = climate_data
 
-                    (
-                        climate_pts,
-                        climate_distance,
-                        climate_x,
-                        cdep,
-                    ) = dataset.get_path_profile(
-                        self.points,
-                        self.compare["variables"][0],
-                        self.compare["time"],
-                        numpoints=100,
-                    )
-                    (
-                        climate_pts,
-                        climate_distance,
-                        climate_y,
-                        cdep,
-                    ) = dataset.get_path_profile(
-                        self.points,
-                        self.compare["variables"][0],
-                        self.compare["time"],
-                        numpoints=100,
-                    )
-
-                    (
-                        climate_distances,
-                        ctimes,
-                        clat,
-                        clon,
-                        bearings,
-                    ) = geo.path_to_points(self.points, 100)
-
-                    r = np.radians(np.subtract(90, bearings))
-                    theta = np.arctan2(climate_y, climate_x) - r
-                    mag = np.sqrt(climate_x**2 + climate_y**2)
-
-                    if np.all(self.depth != cdep):
-                        theta = interpolate_depths(theta, cdep, self.depth)
-                        self.__fill_invalid_shift(theta)
-                        mag = interpolate_depths(mag, cdep, self.depth)
-                        self.__fill_invalid_shift(mag)
-
-                    self.compare["parallel"] = mag * np.cos(theta)
-                    self.compare["perpendicular"] = mag * np.sin(theta)
-
-                    """
-                    if self.transect_data['parallel'] is None:
-                        self.transect_data['data'] -= mag
-                    else:
-                        self.transect_data['parallel'] -= climate_parallel
-                        self.transect_data['perpendicular'] -= climate_perpendicular
-                    """
+            # Velocity variables
+            else:
+                theta, mag = compare_data
+                if np.all(self.depth != cdep):
+                    theta = utils.interpolate_depths(theta, cdep, self.depth)
+                    self.__fill_invalid_shift(theta)
+                    mag = utils.interpolate_depths(mag, cdep, self.depth)
+                    self.__fill_invalid_shift(mag)
+
+                self.compare["parallel"] = mag * np.cos(theta)
+                self.compare["perpendicular"] = mag * np.sin(theta)
+
+                """
+                if self.transect_data['parallel'] is None:
+                    self.transect_data['data'] -= mag
+                else:
+                    self.transect_data['parallel'] -= climate_parallel
+                    self.transect_data['perpendicular'] -= climate_perpendicular
+                """
 
         # Bathymetry
         with Dataset(settings.bathymetry_file, "r") as dataset:
@@ -357,33 +350,32 @@ class TransectPlotter(LinePlotter):
             )
             values = ["data"]
 
-        data = []
-        for idx, dist in enumerate(self.transect_data["distance"]):
-            if dist == self.transect_data["distance"][idx - 1]:
-                continue
-
-            for j in range(0, len(self.transect_data[values[0]][:, idx])):
-                entry = [
-                    "%0.4f" % self.transect_data["points"][0, idx],
-                    "%0.4f" % self.transect_data["points"][1, idx],
-                    "%0.1f" % dist,
-                    "%0.1f" % self.depth[idx, j],
-                ]
-                if self.surface is not None:
-                    if j == 0:
-                        entry.append("%0.4f" % self.surface_data["data"][idx])
-                    else:
-                        entry.append("-")
+        distance = np.asarray(self.transect_data["distance"])
+        points = self.transect_data["points"]
+        n_depths = self.transect_data[values[0]].shape[0]
+        idx = np.repeat(np.arange(distance.size), n_depths)
+        j = np.tile(np.arange(n_depths), distance.size)
 
-                for t in values:
-                    entry.append("%0.4f" % self.transect_data[t][j, idx])
+        data = [points[0, idx], points[1, idx], distance[idx], self.depth[idx, j]]
+        formats = ["%0.4f", "%0.4f", "%0.1f", "%0.1f"]
 
-                if entry[-1] == "nan":
-                    continue
+        if self.surface is not None:
+            surface = np.array(
+                ["%0.4f" % x for x in self.surface_data["data"]], dtype=object
+            )
+            data.append(np.where(j == 0, surface[idx], "-"))
+            formats.append("%s")
 
-                data.append(entry)
+        for t in values:
+            data.append(self.transect_data[t][j, idx])
+            formats.append("%0.4f")
 
-        return super(TransectPlotter, self).csv(header, columns, data)
+        # Skip repeated points and rows without a value
+        last = np.ma.filled(np.ma.asarray(data[-1], dtype=np.float64), np.nan)
+        keep = (distance != np.roll(distance, 1))[idx] & ~np.isnan(last)
+        data = [d[keep] for d in data]
+
+        return super(TransectPlotter, self).csv(header, columns, data, formats)
 
     def stats_csv(self):
         header = [["Dataset", self.dataset_name], ["Timestamp", self.iso_timestamp]]
@@ -408,13 +400,12 @@ class TransectPlotter(LinePlotter):
         return super(TransectPlotter, self).csv(header, columns, data)
 
     def odv_ascii(self):
-        float_to_str = np.vectorize(lambda x: "%0.3f" % x)
         numstations = len(self.transect_data["distance"])
         station = list(range(1, 1 + numstations))
         station = ["%03d" % s for s in station]
 
-        latitude = np.repeat(self.transect_data["points"][0, :], len(self.depth))
-        longitude = np.repeat(self.transect_data["points"][1, :], len(self.depth))
+        latitude = self.transect_data["points"][0, :]
+        longitude = self.transect_data["points"][1, :]
         time = np.repeat(self.iso_timestamp, len(station))
         depth = self.depth
 
@@ -433,8 +424,6 @@ class TransectPlotter(LinePlotter):
             variable_units = [self.transect_data["units"]]
             data = self.transect_data["data"].transpose()
 
-        data = float_to_str(data)
-
         return super(TransectPlotter, self).odv_ascii(
             self.dataset_name,
             variable_names,
@@ -572,7 +561,7 @@ class TransectPlotter(LinePlotter):
             else:
                 gs = gridspec.GridSpec(Row, Col, width_ratios=width_ratios, hspace=0.2)
 
-        fig = plt.figure(figsize=figuresize, dpi=self.dpi)
+        fig = figure_pool.figure(figuresize, self.dpi)
 
         return gs, fig, velocity
 
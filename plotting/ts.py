@@ -5,6 +5,7 @@ import matplotlib.pyplot as plt
 import numpy as np
 import gsw
 
+import plotting.figure_pool as figure_pool
 import plotting.utils as utils
 from data import open_dataset
 from plotting.point import PointPlotter
@@ -78,7 +79,7 @@ class TemperatureSalinityPlotter(PointPlotter):
 
     def plot(self):
         # Create base figure
-        fig = plt.figure(figsize=self.figuresize, dpi=self.dpi)
+        fig = figure_pool.figure(self.figuresize, self.dpi)
 
         # Setup figure layout
         width = 2 if self.showmap else 1
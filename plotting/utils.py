@@ -71,6 +71,43 @@ def normalize_scale(data, variable_config):
     return vmin, vmax
 
 
+def interpolate_depths(data, depth_in, depth_out):
+    """Linearly interpolates every profile of a transect onto new depths at once,
+    e.g. to map a compare dataset onto the depths of the primary one.
+
+    Arguments:
+        data -- (depth, point) values at depth_in.
+        depth_in -- (point, depth) increasing depths of each profile.
+        depth_out -- (point, depth) depths to interpolate each profile to.
+
+    Returns:
+        masked array -- (depth, point) values at depth_out, masked outside the
+        depths of each profile and next to masked input values.
+    """
+    values = np.ma.filled(np.ma.asarray(data, dtype=np.float64), np.nan).T
+    depth_in = np.broadcast_to(
+        np.ma.filled(np.ma.asarray(depth_in, dtype=np.float64), np.nan), values.shape
+    )
+    depth_out = np.ma.filled(np.ma.asarray(depth_out, dtype=np.float64), np.nan)
+    depth_out = np.broadcast_to(depth_out, (values.shape[0], depth_out.shape[-1]))
+
+    # Index of the first input depth below each output depth
+    idx = np.sum(depth_in[:, np.newaxis, :] <= depth_out[:, :, np.newaxis], axis=2)
+    idx = np.clip(idx, 1, values.shape[1] - 1)
+
+    d0 = np.take_along_axis(depth_in, idx - 1, axis=1)
+    d1 = np.take_along_axis(depth_in, idx, axis=1)
+    v0 = np.take_along_axis(values, idx - 1, axis=1)
+    v1 = np.take_along_axis(values, idx, axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result = v0 + (depth_out - d0) / (d1 - d0) * (v1 - v0)
+        outside = (depth_out < depth_in[:, :1]) | (depth_out > depth_in[:, -1:])
+    result[outside] = np.nan
+
+    return np.ma.masked_invalid(result.T)
+
+
 def mathtext(text):
     if re.search(r"[Cc]elsius", text):
         text = re.sub(r"(degree[_ ])?[Cc]elsius", "\u00b0C", text)
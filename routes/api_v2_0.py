@@ -1,12 +1,9 @@
 import base64
 import datetime
-import gzip
 import json
 import os
 import pathlib
 import pickle
-import shutil
-import sqlite3
 from io import BytesIO
 
 import geojson
@@ -17,15 +14,24 @@ from dateutil.parser import parse as dateparse
 from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
-from PIL import Image
-from shapely.geometry import LinearRing, Point, Polygon
+from shapely.geometry import Point
 from sqlalchemy import exc, func
 from sqlalchemy.orm import Session
 
+import data.chunk_cache as chunk_cache
 import data.class4 as class4
+import data.hyperslab as hyperslab
+import data.icechunk_store as icechunk_store
 import data.observational.queries as ob_queries
+import data.pyramid as pyramid
+import oceannavigator.timing as timing
+import oceannavigator.workers as workers
 import plotting.colormap
+import plotting.jobs
+import plotting.mbtiles as mbtiles
+import plotting.utils
 import routes.enums as e
+import utils.kml_index as kml_index
 import utils.misc
 from data import open_dataset
 from data.observational import (
@@ -42,27 +48,29 @@ from data.utils import get_data_vars_from_equation, time_index_to_datetime
 from oceannavigator.dataset_config import DatasetConfig
 from oceannavigator.log import log
 from oceannavigator.settings import get_settings
-from plotting.class4 import Class4Plotter
 from plotting.colormap import plot_colormaps
-from plotting.hovmoller import HovmollerPlotter
-from plotting.map import MapPlotter
-from plotting.observation import ObservationPlotter
-from plotting.profile import ProfilePlotter
 from plotting.scale import get_scale
 from plotting.scriptGenerator import generatePython, generateR
-from plotting.sound import SoundSpeedPlotter
-from plotting.stick import StickPlotter
-from plotting.tile import bathymetry as plot_bathymetry
 from plotting.tile import scale as plot_scale
+from plotting.tile import tile_path
 from plotting.tile import topo as plot_topography
-from plotting.timeseries import TimeseriesPlotter
-from plotting.track import TrackPlotter
-from plotting.transect import TransectPlotter
-from plotting.ts import TemperatureSalinityPlotter
 from utils.errors import ClientError
 
 FAILURE = ClientError("Bad API usage")
 MAX_CACHE = 315360000
+# Filetypes of the exports plotters write to temporary files, and the bytes
+# streamed from them at a time
+EXPORT_FILETYPES = ["csv", "txt", "stats"]
+EXPORT_CHUNK_SIZE = 1024 * 1024
+# Observation point density limits
+MAX_STATIONS = 500
+STATION_CELL_PIXELS = 16
+METRES_PER_DEGREE = 111320
+# About 10 m, so the cap still applies to fully zoomed in maps
+MIN_STATION_CELL_SIZE = 1e-4
+MAX_STATIONS_PER_CELL = 10
+# Backstop on the stations returned however small the cells are
+STATION_LIMIT = 10000
 
 try:
     Base.metadata.create_all(bind=engine)
@@ -99,6 +107,32 @@ def git_info():
     return git_info
 
 
+@router.get("/workers")
+def worker_metrics():
+    """
+    Returns the queue wait and execution times of the plot and tile jobs.
+    """
+
+    return workers.metrics()
+
+
+@router.get("/metrics")
+def metrics():
+    """
+    Returns request, stage, worker, read, chunk cache and pyramid metrics in the
+    Prometheus text format.
+    """
+
+    return Response(
+        timing.prometheus_text()
+        + workers.prometheus_text()
+        + hyperslab.prometheus_text()
+        + chunk_cache.prometheus_text()
+        + pyramid.prometheus_text(),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
 @router.get("/generate_script")
 def generate_script(
     query: str = Query(description="string-ified JSON"),
@@ -213,6 +247,14 @@ def variables(
 
     config = DatasetConfig(dataset)
 
+    return icechunk_store.cached(
+        config,
+        ("variables", has_depth_only, vectors_only),
+        lambda: _variables(config, has_depth_only, vectors_only),
+    )
+
+
+def _variables(config: DatasetConfig, has_depth_only: bool, vectors_only: bool):
     data = []
     with open_dataset(config) as ds:
         for v in ds.variables:
@@ -259,6 +301,12 @@ def timestamps(
 
     config = DatasetConfig(dataset)
 
+    return icechunk_store.cached(
+        config, ("timestamps", variable), lambda: _timestamps(config, variable)
+    )
+
+
+def _timestamps(config: DatasetConfig, variable: str):
     # Handle possible list of URLs for staggered grid velocity field datasets
     url = config.url if not isinstance(config.url, list) else config.url[0]
     if url.endswith(".sqlite3"):
@@ -309,11 +357,20 @@ def depths(
 
     config = DatasetConfig(dataset)
 
+    return icechunk_store.cached(
+        config,
+        ("depths", variable, include_all_key),
+        lambda: _depths(config, variable, include_all_key),
+    )
+
+
+def _depths(config: DatasetConfig, variable: str, include_all_key: bool):
     data = []
     with open_dataset(config, variable=variable, timestamp=-1) as ds:
         if variable not in ds.variables:
             raise HTTPException(
-                status_code=404, detail=f"{variable} not found in dataset {dataset}"
+                status_code=404,
+                detail=f"{variable} not found in dataset {config.key}",
             )
 
         v = ds.variables[variable]
@@ -393,16 +450,30 @@ def range(
     """
     extent = list(map(float, extent.split(",")))
 
-    min_value, max_value = get_scale(
-        dataset,
-        variable,
-        depth,
-        time,
-        projection,
-        extent,
-        interp,
-        radius * 1000,
-        neighbours,
+    min_value, max_value = icechunk_store.cached(
+        DatasetConfig(dataset),
+        (
+            "range",
+            variable,
+            depth,
+            time,
+            interp,
+            radius,
+            neighbours,
+            projection,
+            tuple(extent),
+        ),
+        lambda: get_scale(
+            dataset,
+            variable,
+            depth,
+            time,
+            projection,
+            extent,
+            interp,
+            radius * 1000,
+            neighbours,
+        ),
     )
 
     return {
@@ -609,14 +680,7 @@ def subset_query(
 
     if "area" in args.keys():
         # Predefined area selected
-        area = args.get("area")
-        sp = area.split("/", 1)
-
-        data = utils.misc.list_areas(sp[0], simplify=False)
-
-        b = [x for x in data if x.get("key") == area]
-        args = args.to_dict()
-        args["polygons"] = b[0]["polygons"]
+        args["polygons"] = kml_index.get_area(args.get("area"))["polygons"]
 
     config = DatasetConfig(dataset)
     time_range = time.split(",")
@@ -671,8 +735,34 @@ def colormaps_png():
     )
 
 
+def _export_response(path: str, mime: str) -> StreamingResponse:
+    """Streams an export written to a temporary file by a plotter. The file is
+    removed as soon as it's opened, so it's gone however the response ends.
+    """
+    f = open(path, "rb")
+    os.remove(path)
+    size = os.fstat(f.fileno()).st_size
+
+    def chunks():
+        with f:
+            while chunk := f.read(EXPORT_CHUNK_SIZE):
+                yield chunk
+
+    return StreamingResponse(
+        chunks(),
+        media_type=mime,
+        headers={"Cache-Control": "max-age=300", "Content-Length": str(size)},
+    )
+
+
+def _remove_export(result: tuple) -> None:
+    """Removes the export file of a plot job whose request has gone away."""
+    os.remove(result[0])
+
+
 @router.get("/plot/{plot_type}")
 async def plot(
+    request: Request,
     plot_type: str = Path(title="The key of the dataset.", examples=["profile"]),
     query: str = Query(
         description="Collection of plot arguments.",
@@ -697,13 +787,15 @@ async def plot(
     dpi: int = Query(
         72, description="The resoltuion of the plot (dpi).", examples=[72]
     ),
-    db: Session = Depends(get_db),
 ):
     """
     Interface for all plotting operations. Update example query with valid timestamp to
     test.
     """
 
+    # The type of file the plotter writes, e.g. "odv" exports are "txt" files
+    filetype, _ = plotting.utils.get_mimetype(format)
+
     if format == "json":
 
         def make_response(data, mime):
@@ -715,7 +807,7 @@ async def plot(
                 headers={"Cache-Control": "max-age=300"},
             )
 
-    elif format == "nc":
+    elif filetype == "nc":
 
         def make_response(data, mime):
             return FileResponse(
@@ -727,6 +819,11 @@ async def plot(
                 },
             )
 
+    elif filetype in EXPORT_FILETYPES:
+
+        def make_response(data, mime):
+            return _export_response(data, mime)
+
     else:
 
         def make_response(data, mime):
@@ -743,34 +840,21 @@ async def plot(
     }
 
     # Determine which plotter we need.
-    if plot_type == "map":
-        plotter = MapPlotter(dataset, query, **options)
-    elif plot_type == "transect":
-        plotter = TransectPlotter(dataset, query, **options)
-    elif plot_type == "timeseries":
-        plotter = TimeseriesPlotter(dataset, query, **options)
-    elif plot_type == "ts":
-        plotter = TemperatureSalinityPlotter(dataset, query, **options)
-    elif plot_type == "sound":
-        plotter = SoundSpeedPlotter(dataset, query, **options)
-    elif plot_type == "profile":
-        plotter = ProfilePlotter(dataset, query, **options)
-    elif plot_type == "hovmoller":
-        plotter = HovmollerPlotter(dataset, query, **options)
-    elif plot_type == "observation":
-        plotter = ObservationPlotter(dataset, query, db, **options)
-    elif plot_type == "track":
-        plotter = TrackPlotter(dataset, query, db, **options)
-    elif plot_type == "class4":
-        plotter = Class4Plotter(dataset, query, **options)
-    elif plot_type == "stick":
-        plotter = StickPlotter(dataset, query, **options)
-    else:
+    if plot_type not in plotting.jobs.PLOTTERS:
         raise HTTPException(
             status_code=404, detail=f"Incorrect plot type ({plot_type}) provided."
         )
 
-    img, mime, filename = plotter.run()
+    img, mime, filename = await workers.run(
+        "plot",
+        request,
+        plotting.jobs.plot,
+        plot_type,
+        dataset,
+        query,
+        options,
+        discard=_remove_export if filetype in EXPORT_FILETYPES else None,
+    )
 
     if img:
         response = make_response(img, mime)
@@ -892,6 +976,7 @@ def kml_area(
 
 @router.get("/tiles/{dataset}/{variable}/{time}/{depth}/{zoom}/{x}/{y}")
 async def data_tile(
+    request: Request,
     dataset: str = Path(description="The key of the dataset.", examples=["giops_day"]),
     variable: str = Path(description="The key of the variable.", examples=["votemper"]),
     time: int = Path(description="NetCDF timestamp"),
@@ -912,36 +997,46 @@ async def data_tile(
     """
 
     settings = get_settings()
+    webp = settings.tile_webp and "image/webp" in request.headers.get("accept", "")
+    # Caches must keep the PNG and WebP tiles apart
+    vary = {"Vary": "Accept"} if settings.tile_webp else {}
 
-    f = os.path.join(
-        settings.cache_dir,
-        "api",
-        "v2.0",
-        "tiles",
-        str(interp),
-        str(radius),
-        str(neighbours),
+    f = tile_path(
         projection,
         dataset,
         variable,
-        str(time),
+        time,
         depth,
         scale,
-        str(zoom),
-        str(x),
-        f"{y}.png",
+        zoom,
+        x,
+        y,
+        interp,
+        radius,
+        neighbours,
+        icechunk_store.version(DatasetConfig(dataset)),
     )
-    if os.path.isfile(f):
+    # WebP tiles are cached next to the PNGs, which are sent while no WebP is
+    # cached (e.g. pregenerated tiles)
+    files = [(f, "image/png")]
+    if webp:
+        files.insert(0, (os.path.splitext(f)[0] + ".webp", "image/webp"))
+    with timing.stage("cache"):
+        cached = next((c for c in files if os.path.isfile(c[0])), None)
+    if cached:
         return FileResponse(
-            f,
-            media_type="image/png",
-            headers={"Cache-Control": f"max-age={MAX_CACHE}"},
+            cached[0],
+            media_type=cached[1],
+            headers={"Cache-Control": f"max-age={MAX_CACHE}", **vary},
         )
 
     if depth != "bottom" and depth != "all":
         depth = int(depth)
 
-    img = await plotting.tile.plot(
+    buf = await workers.run(
+        "tile",
+        request,
+        plotting.jobs.data_tile,
         projection,
         x,
         y,
@@ -956,19 +1051,17 @@ async def data_tile(
             "depth": depth,
             "scale": scale,
         },
+        "WEBP" if webp else "PNG",
     )
 
-    buf = BytesIO()
-    img.save(buf, format="PNG", optimize=True)
-    buf.seek(0)
-
-    return _cache_and_send_img(buf, f)
+    return _cache_and_send_img(buf, *files[0], vary)
 
 
 @router.get(
     "/tiles/quiver/{dataset}/{variable}/{time}/{depth}/{density_adj}/{zoom}/{x}/{y}"
 )
 async def quiver_tile(
+    request: Request,
     dataset: str = Path(description="The key of the dataset.", examples=["giops_day"]),
     variable: str = Path(description="The key of the variable.", examples=["votemper"]),
     time: int = Path(description="NetCDF timestamp"),
@@ -986,6 +1079,7 @@ async def quiver_tile(
     """
 
     settings = get_settings()
+    version = icechunk_store.version(DatasetConfig(dataset))
 
     cached_file_name = os.path.join(
         settings.cache_dir,
@@ -994,7 +1088,7 @@ async def quiver_tile(
         "tiles",
         "quiver",
         projection,
-        dataset,
+        f"{dataset}@{version}" if version else dataset,
         variable,
         str(time),
         depth,
@@ -1004,11 +1098,16 @@ async def quiver_tile(
         f"{y}.geojson",
     )
 
-    if os.path.isfile(cached_file_name):
+    with timing.stage("cache"):
+        cached = os.path.isfile(cached_file_name)
+    if cached:
         log().info(f"Using cached {cached_file_name}.")
         return FileResponse(cached_file_name, media_type="application/json")
 
-    data = await plotting.tile.quiver(
+    data = await workers.run(
+        "quiver",
+        request,
+        plotting.jobs.quiver_tile,
         dataset,
         variable,
         time,
@@ -1020,10 +1119,11 @@ async def quiver_tile(
         projection,
     )
 
-    path = pathlib.Path(cached_file_name).parent
-    path.mkdir(parents=True, exist_ok=True)
-    with open(cached_file_name, "w", encoding="utf-8") as f:
-        geojson.dump(data, f)
+    with timing.stage("cache"):
+        path = pathlib.Path(cached_file_name).parent
+        path.mkdir(parents=True, exist_ok=True)
+        with open(cached_file_name, "w", encoding="utf-8") as f:
+            geojson.dump(data, f)
 
     return data
 
@@ -1076,6 +1176,7 @@ def topography_tiles(
 
 @router.get("/tiles/bath/{zoom}/{x}/{y}")
 async def bathymetry_tiles(
+    request: Request,
     zoom: int = Path(examples=[4]),
     x: int = Path(examples=[0]),
     y: int = Path(examples=[1]),
@@ -1115,12 +1216,15 @@ async def bathymetry_tiles(
             headers={"Cache-Control": f"max-age={MAX_CACHE}"},
         )
 
-    img = await plot_bathymetry(projection, x, y, zoom)
+    img = await workers.run(
+        "bathymetry", request, plotting.jobs.bathymetry_tile, projection, x, y, zoom
+    )
     return _cache_and_send_img(img, f)
 
 
 @router.get("/mbt/{tiletype}/{zoom}/{x}/{y}")
 def mbt(
+    request: Request,
     tiletype: str = Path(examples=["bath"]),
     zoom: int = Path(examples=[8]),
     x: int = Path(examples=[88]),
@@ -1135,23 +1239,9 @@ def mbt(
 
     settings = get_settings()
 
-    shape_file_dir = settings.shape_file_dir
-    requestf = pathlib.Path(
-        settings.cache_dir,
-        "api",
-        "v2.0",
-        "mbt",
-        projection,
-        tiletype,
-        str(zoom),
-        str(x),
-        str(y),
-    )
-    basedir = requestf.parents[0]
-
     # Send blank tile if conditions aren't met
     blank_response = FileResponse(
-        shape_file_dir + "/blank.mbt",
+        settings.shape_file_dir + "/blank.mbt",
         media_type="image/png",
         headers={"Cache-Control": f"max-age={MAX_CACHE}"},
     )
@@ -1162,35 +1252,19 @@ def mbt(
     if (zoom > 11) and (tiletype == "bath"):
         return blank_response
 
-    # Send file if cached or select data in SQLite file
-    if requestf.is_file():
-        return FileResponse(
-            requestf.as_posix(),
-            media_type="image/png",
-            headers={"Cache-Control": f"max-age={MAX_CACHE}"},
-        )
-
-    y = (2**zoom - 1) - y
-    connection = sqlite3.connect(shape_file_dir + "/{}.mbtiles".format(tiletype))
-    selector = connection.cursor()
-    sqlite = f"SELECT tile_data FROM tiles WHERE zoom_level = {zoom} AND tile_column = {x} AND tile_row = {y}"  # noqa: E501
-    selector.execute(sqlite)
-    tile = selector.fetchone()
+    tile = mbtiles.get_tile(tiletype, zoom, x, y)
     if tile is None:
         return blank_response
 
-    # Write tile to cache and send file
-    basedir.mkdir(parents=True, exist_ok=True)
-    with open(requestf.as_posix() + ".pbf", "wb") as f:
-        f.write(tile[0])
-    with gzip.open(requestf.as_posix() + ".pbf", "rb") as gzipped:
-        with open(requestf, "wb") as tileout:
-            shutil.copyfileobj(gzipped, tileout)
-    return FileResponse(
-        requestf,
-        media_type="image/png",
-        headers={"Cache-Control": f"max-age={MAX_CACHE}"},
-    )
+    headers = {"Cache-Control": f"max-age={MAX_CACHE}", "Vary": "Accept-Encoding"}
+    if mbtiles.is_gzipped(tile) and "gzip" in request.headers.get(
+        "accept-encoding", ""
+    ):
+        headers["Content-Encoding"] = "gzip"
+    else:
+        tile = mbtiles.decompress(tile)
+
+    return Response(tile, media_type="image/png", headers=headers)
 
 
 @router.get("/observation/time_range")
@@ -1442,7 +1516,6 @@ def observation_point(
     Observational query for points. Used in ObservationSelector.
     """
     query_dict = {key: value for key, value in [q.split("=") for q in query.split("&")]}
-    data = []
     params = {}
     MAPPING = {
         "start_date": "starttime",
@@ -1472,8 +1545,8 @@ def observation_point(
         else:
             params[MAPPING[k]] = float(v)
 
-    checkpoly = False
     with_radius = False
+    extent = [-90, 90, -180, 180]
     if "area" in query_dict:
         area = json.loads(query_dict.get("area"))
         if len(area) > 1:
@@ -1483,54 +1556,63 @@ def observation_point(
             params["minlon"] = min(lons)
             params["maxlat"] = max(lats)
             params["maxlon"] = max(lons)
-            poly = Polygon(LinearRing(area))
-            checkpoly = True
+            extent = [min(lats), max(lats), min(lons), max(lons)]
+            params["polygon"] = [(c[0], c[1]) for c in area]
         else:
             params["latitude"] = area[0][0]
             params["longitude"] = area[0][1]
             params["radius"] = float(query_dict.get("radius", 10))
             with_radius = True
 
+    if "resolution" in query_dict:
+        # Map resolution is in metres per pixel
+        params["cell_size"] = (
+            STATION_CELL_PIXELS * float(query_dict["resolution"]) / METRES_PER_DEGREE
+        )
+    elif with_radius:
+        params["cell_size"] = (
+            2 * params["radius"] * 1000 / METRES_PER_DEGREE / np.sqrt(MAX_STATIONS)
+        )
+    else:
+        params["cell_size"] = np.sqrt(
+            max(extent[1] - extent[0], 1e-3)
+            * max(extent[3] - extent[2], 1e-3)
+            / MAX_STATIONS
+        )
+    params["cell_size"] = max(params["cell_size"], MIN_STATION_CELL_SIZE)
+    params["limit"] = STATION_LIMIT
+
+    try:
+        params["max_per_cell"] = int(query_dict.get("max_per_cell", 1))
+    except ValueError:
+        params["max_per_cell"] = 0
+    if not 1 <= params["max_per_cell"] <= MAX_STATIONS_PER_CELL:
+        raise HTTPException(
+            status_code=400,
+            detail=f"max_per_cell must be from 1 to {MAX_STATIONS_PER_CELL}.",
+        )
+
     if with_radius:
         stations = ob_queries.get_stations_radius(session=db, **params)
     else:
         stations = ob_queries.get_stations(session=db, **params)
 
-    if len(stations) > 500:
-        stations = stations[:: round(len(stations) / 500)]
-
-    df = pd.DataFrame(
-        np.array(stations),
-        columns=["type", "id", "name", "lat", "lon"],
-    )
-    df["id"] = df.id.astype(int)
-
-    if len(df) > 0:
-        df["coordinates"] = df[["lon", "lat"]].values.tolist()
-        df["type"] = df["type"].apply(lambda t: t.name)
-
-        if checkpoly:
-            df["in_poly"] = df["coordinates"].apply(
-                lambda c: poly.contains(Point(c[1], c[0]))
-            )
-            df = df.loc[df["in_poly"]]
-
-        data = [
-            {
-                "type": "Feature",
-                "geometry": {
-                    "type": "Point",
-                    "coordinates": row["coordinates"],
-                },
-                "properties": {
-                    "id": int(row.id),
-                    "type": row["type"],
-                    "class": "observation",
-                    **({"name": row["name"]} if row["name"] is not None else {}),
-                },
-            }
-            for idx, row in df.iterrows()
-        ]
+    data = [
+        {
+            "type": "Feature",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [float(lon), float(lat)],
+            },
+            "properties": {
+                "id": int(station_id),
+                "type": platform_type.name,
+                "class": "observation",
+                **({"name": name} if name is not None else {}),
+            },
+        }
+        for platform_type, station_id, name, lat, lon in stations
+    ]
 
     result = {
         "type": "FeatureCollection",
@@ -1636,9 +1718,12 @@ def observation_variables(
     )
 
 
-def _cache_and_send_img(bytesIOBuff: BytesIO, f: str):
+@timing.timed("cache")
+def _cache_and_send_img(
+    bytesIOBuff: BytesIO, f: str, media_type: str = "image/png", headers: dict = None
+):
     """
-    Caches a rendered image buffer on disk and sends it to the browser
+    Caches an encoded image buffer on disk as is and sends it to the browser
 
     bytesIOBuff: BytesIO object containing image data
     f: filename of image to be cached
@@ -1646,13 +1731,15 @@ def _cache_and_send_img(bytesIOBuff: BytesIO, f: str):
     p = pathlib.Path(f).parent
     p.mkdir(parents=True, exist_ok=True)
 
-    bytesIOBuff.seek(0)
-    im = Image.open(bytesIOBuff)
-    im.save(f, format="PNG", optimize=True)
+    with open(f, "wb") as cached:
+        cached.write(bytesIOBuff.getbuffer())
     bytesIOBuff.seek(0)
 
     return StreamingResponse(
         bytesIOBuff,
-        media_type="image/png",
-        headers={"Content-Disposition": f"attachment; filename=#{os.path.basename(f)}"},
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f"attachment; filename=#{os.path.basename(f)}",
+            **(headers or {}),
+        },
     )
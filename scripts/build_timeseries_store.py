@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+parent_dir = str(Path(__file__).resolve().parent.parent)
+sys.path.append(parent_dir)
+
+from data.timeseries_store import update
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Builds or appends to the time-series store of a SQLite-indexed "
+            "dataset in ONAV_TIMESERIES_STORE_DIR. Run after the dataset index is "
+            "updated, or with --watch."
+        )
+    )
+    parser.add_argument("dataset", help="Dataset key, e.g. giops_day")
+    parser.add_argument(
+        "variables",
+        nargs="+",
+        help="Variable keys sharing the same timestamps, e.g. votemper vosaline",
+    )
+    parser.add_argument(
+        "--time-chunk",
+        type=int,
+        default=128,
+        help="Timestamps per chunk when the store is created",
+    )
+    parser.add_argument(
+        "--spatial-chunk",
+        type=int,
+        default=32,
+        help="Grid points per chunk along x and y when the store is created",
+    )
+    parser.add_argument(
+        "--watch",
+        type=int,
+        metavar="SECONDS",
+        help="Check the index again every SECONDS",
+    )
+    args = parser.parse_args()
+
+    while True:
+        update(args.dataset, args.variables, args.time_chunk, args.spatial_chunk)
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+
+import argparse
+import sys
+from pathlib import Path
+
+parent_dir = str(Path(__file__).resolve().parent.parent)
+sys.path.append(parent_dir)
+
+from plotting.etopo import convert
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Converts the ETOPO grids of ONAV_ETOPO_FILE into the memory-mapped "
+            "grids of the cache directory. Grids are otherwise converted by the "
+            "first tile request of each zoom."
+        )
+    )
+    parser.add_argument(
+        "--projection", nargs="+", default=["EPSG:3857", "EPSG:32661", "EPSG:3031"]
+    )
+    parser.add_argument(
+        "--zoom", type=int, nargs=2, default=[0, 7], metavar=("MIN", "MAX")
+    )
+    args = parser.parse_args()
+
+    for projection in args.projection:
+        for z in range(args.zoom[0], args.zoom[1] + 1):
+            try:
+                print(convert(projection, z))
+            except FileNotFoundError as e:
+                print(f"{projection} zoom {z}: {e}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,20 @@
 #!/usr/bin/env python
-import glob
+import logging
 import os
 import sys
 
 import defopt
-import pandas as pd
 import gsw
 import numpy as np
 import xarray as xr
-from sqlalchemy import create_engine, select
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine
 
 current = os.path.dirname(os.path.realpath(__file__))
 parent = os.path.dirname(os.path.dirname(current))
 sys.path.append(parent)
 
-from data.observational import DataType, Platform, Sample, Station
+from data.observational import Platform
+from data.observational.bulk import BulkLoader, ObservationBatch, expand_filenames
 
 VARIABLES = ["TEMP", "PSAL"]
 
@@ -29,8 +27,6 @@ META_FIELDS = {
     "WMO_INST_TYPE": "wmo_instrument_type",
 }
 
-datatype_map = {}
-
 
 def extract_metadata(ds, metadata):
     platform_number = ds.attrs.get(metadata["PLATFORM_NUMBER"])
@@ -77,11 +73,58 @@ def reformat_coordinates(ds: xr.Dataset) -> xr.Dataset:
     return ds
 
 
-def main(uri: str, filename: str):
+def parse(fname: str) -> ObservationBatch:
+    """Reads the profiles of an Argo file into an ObservationBatch."""
+    with xr.open_dataset(fname) as ds:
+        if ds.LATITUDE.size == 1:
+            print(f"{fname}: moored instrument, skipping file.")
+            return None
+
+        ds = reformat_coordinates(ds)
+
+        meta_data = extract_metadata(ds, META_FIELDS)
+        batch = ObservationBatch(
+            Platform.Type.argo,
+            f"argo_{meta_data['PLATFORM_NUMBER']}",
+            {META_FIELDS[f]: (meta_data[f] or "").strip() for f in META_FIELDS},
+        )
+
+        n_times = ds.TIME.size
+        if "DEPH" in ds.variables:
+            depth = ds.DEPH.transpose("TIME", ...).values.reshape(n_times, -1)
+        elif "PRES" in ds.variables:
+            pres = ds.PRES.transpose("TIME", ...).values.reshape(n_times, -1)
+            depth = gsw.conversions.z_from_p(-pres, ds.LATITUDE.values[:, None])
+        else:
+            print(f"{fname}: no depth or pressure, skipping file.")
+            return None
+
+        stations = batch.add_stations(
+            ds.TIME.values, ds.LATITUDE.values, ds.LONGITUDE.values
+        )
+
+        for variable in [v for v in VARIABLES if v in ds.variables]:
+            var = ds[variable]
+            batch.add_datatype(var.standard_name, var.long_name, var.units)
+            batch.add_samples(
+                stations[:, None],
+                var.standard_name,
+                depth,
+                var.transpose("TIME", ...).values.reshape(n_times, -1),
+            )
+
+    return batch
+
+
+def main(
+    uri: str, filename: str, processes: int = None, files_per_transaction: int = 10
+):
     """Import Argo Profiles
 
     :param str uri: Database URI
     :param str filename: Argo NetCDF Filename, or directory of files
+    :param int processes: Number of processes used to parse the files
+    :param int files_per_transaction: Number of files written per transaction
     """
 
     engine = create_engine(
@@ -90,129 +133,11 @@ def main(uri: str, filename: str):
         pool_recycle=3600,
     )
 
-    with Session(engine) as session:
-
-        if not isinstance(filename, list):
-            if os.path.isdir(filename):
-                filenames = sorted(glob.glob(os.path.join(filename, "*.nc")))
-            else:
-                filenames = [filename]
-        else:
-            filenames = filename
-
-        for fname in filenames:
-            with xr.open_dataset(fname) as ds:
-                print(fname)
-                if ds.LATITUDE.size == 1:
-                    print("Moored instrument: skipping file.")
-                    continue
-
-                ds = reformat_coordinates(ds)
-
-                times = pd.to_datetime(ds.TIME.values)
-
-                meta_data = extract_metadata(ds, META_FIELDS)
-
-                variables = [v for v in VARIABLES if v in ds.variables]
-
-                platform_number = meta_data["PLATFORM_NUMBER"]
-                unique_id = f"argo_{platform_number}"
-
-                platform = (
-                    session.query(Platform)
-                    .filter(
-                        Platform.unique_id == unique_id,
-                        Platform.type == Platform.Type.argo,
-                    )
-                    .first()
-                )
-                if platform is None:
-                    platform = Platform(type=Platform.Type.argo, unique_id=unique_id)
-                    attrs = {}
-                    for f in META_FIELDS:
-                        attrs[META_FIELDS[f]] = (meta_data[f] or "").strip()
-
-                    platform.attrs = attrs
-                    session.add(platform)
-                    session.commit()
-
-                for idx, time in enumerate(times):
-                    station = Station(
-                        time=time,
-                        latitude=ds["LATITUDE"].values[idx],
-                        longitude=ds["LONGITUDE"].values[idx],
-                        platform_id=platform.id,
-                    )
-
-                    try:
-                        session.add(station)
-                        session.commit()
-                    except IntegrityError:
-                        print("Error committing station.")
-                        session.rollback()
-
-                    samples = []
-                    for variable in variables:
-                        if variable not in datatype_map:
-                            statement = select(DataType).where(
-                                DataType.key == ds[variable].standard_name
-                            )
-                            dt = session.execute(statement).all()
-                            if not dt:
-                                dt = DataType(
-                                    key=ds[variable].standard_name,
-                                    name=ds[variable].long_name,
-                                    unit=ds[variable].units,
-                                )
-
-                                session.add(dt)
-                                session.commit()
-                                datatype_map[variable] = dt
-                            else:
-                                dt = dt[0][0]
-                        else:
-                            dt = datatype_map[variable]
-
-                        values = ds[variable].isel(TIME=idx).values
-
-                        if "DEPH" in ds.variables:
-                            depth = ds.DEPH.isel(TIME=idx).values
-                        elif "PRES" in ds.variables:
-                            pres = ds["PRES"].isel(TIME=idx).values
-                            lat = ds["LATITUDE"][idx].values
-
-                            depth = gsw.conversions.z_from_p(
-                                -pres,
-                                lat,
-                            )
-
-                        data = np.stack(
-                            [
-                                depth.flatten(),
-                                values.flatten(),
-                            ],
-                            axis=1,
-                        )
-                        data = data[~np.isnan(data).any(axis=1)]
-
-                        samples = [
-                            Sample(
-                                depth=pair[0],
-                                datatype_key=dt.key,
-                                value=pair[1],
-                                station_id=station.id,
-                            )
-                            for pair in data
-                        ]
-
-                        try:
-                            session.bulk_save_objects(samples)
-                        except IntegrityError:
-                            print("Error committing samples.")
-                            session.rollback()
-
-                session.commit()
+    BulkLoader(engine).run(
+        parse, expand_filenames(filename), processes, files_per_transaction
+    )
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     defopt.run(main)
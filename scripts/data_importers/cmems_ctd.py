@@ -1,24 +1,23 @@
 #!/usr/bin/env python
 
-import glob
+import logging
 import os
 import sys
 
 import defopt
 import gsw
 import numpy as np
-import pandas as pd
 import xarray as xr
 
-from sqlalchemy import create_engine, select
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine
 
 current = os.path.dirname(os.path.realpath(__file__))
 parent = os.path.dirname(os.path.dirname(current))
 sys.path.append(parent)
 
-from data.observational import DataType, Platform, Sample, Station
+from data.observational import Platform
+from data.observational.bulk import BulkLoader, ObservationBatch, expand_filenames
+
 
 def reformat_coordinates(ds: xr.Dataset) -> xr.Dataset:
     """
@@ -46,12 +45,63 @@ def reformat_coordinates(ds: xr.Dataset) -> xr.Dataset:
 
     return ds
 
-def main(uri: str, filename: str):
 
-    """Import NAFC CTD
+def parse(fname: str) -> ObservationBatch:
+    """Reads the casts of a CTD file into an ObservationBatch."""
+    with xr.open_dataset(fname) as ds:
+        if ds.LATITUDE.size == 1:
+            print(f"{fname}: moored instrument, skipping file.")
+            return None
+
+        ds = reformat_coordinates(ds)
+
+        batch = ObservationBatch(
+            Platform.Type.mission,
+            ds.attrs["platform_code"],
+            {"Institution": ds.attrs["institution"]},
+        )
+
+        n_times = ds.TIME.size
+        if "DEPH" in ds.variables:
+            depth = ds.DEPH.transpose("TIME", ...).values.reshape(n_times, -1)
+        elif "PRES" in ds.variables:
+            pres = ds.PRES.transpose("TIME", ...).values.reshape(n_times, -1)
+            depth = gsw.conversions.z_from_p(-pres, ds.LATITUDE.values[:, None])
+        else:
+            print(f"{fname}: no depth or pressure, skipping file.")
+            return None
+
+        stations = batch.add_stations(
+            ds.TIME.values, ds.LATITUDE.values, ds.LONGITUDE.values
+        )
+
+        # Only consider variables that have depth
+        for name in ds.variables:
+            var = ds[name]
+            standard_name = var.attrs.get("standard_name")
+            if "DEPTH" not in var.dims or standard_name is None:
+                continue
+
+            batch.add_datatype(standard_name, var.long_name, var.units)
+            batch.add_samples(
+                stations[:, None],
+                standard_name,
+                depth,
+                var.transpose("TIME", ...).values.reshape(n_times, -1),
+            )
+
+    return batch
+
+
+def main(
+    uri: str, filename: str, processes: int = None, files_per_transaction: int = 10
+):
+    """Import CMEMS CTD
 
     :param str uri: Database URI
     :param str filename: NetCDF file, or directory of files
+    :param int processes: Number of processes used to parse the files
+    :param int files_per_transaction: Number of files written per transaction
     """
     engine = create_engine(
         uri,
@@ -59,130 +109,11 @@ def main(uri: str, filename: str):
         pool_recycle=3600,
     )
 
-    with Session(engine) as session:
-        datatype_map = {}
-
-        if not isinstance(filename, list):
-            if os.path.isdir(filename):
-                filenames = sorted(glob.glob(os.path.join(filename, "*.nc")))
-            else:
-                filenames = [filename]
-        else:
-            filenames = filename
-
-        for fname in filenames:
-            print(fname)
-            with xr.open_dataset(fname) as ds:
-                
-                if ds.LATITUDE.size == 1:
-                    print("Moored instrument: skipping file.")
-                    continue
-                
-                ds = reformat_coordinates(ds)
-                
-                times = pd.to_datetime(ds.TIME.values)
-
-                if len(datatype_map) == 0:
-                    # Generate the DataTypes; only consider variables that have depth
-                    for var in filter(
-                        lambda x, dataset=ds: "DEPTH" in dataset[x].dims,
-                        [d for d in ds.variables],
-                    ):
-                        variable = ds[var]
-                        standard_name = variable.attrs.get('standard_name')
-                        if standard_name is not None:
-                            statement = select(DataType).where(
-                                    DataType.key == ds[var].standard_name
-                                )
-                            dt = session.execute(statement).all()                                                   
-                            if not dt :
-                                dt = DataType(
-                                    key=ds[var].standard_name,
-                                    name=ds[var].long_name,
-                                    unit=ds[var].units,
-                                )
-                                session.add(dt)
-                            else:
-                                dt = dt[0][0]
-
-                            datatype_map[var] = dt
-                    session.commit()
-
-                p = Platform(
-                    type=Platform.Type.mission, unique_id=f"{ds.attrs["platform_code"]}"
-                )
-                attrs = {
-                    "Institution": ds.attrs["institution"],
-                }
-                p.attrs = attrs
-
-                try:
-                    session.add(p)
-                    session.commit()
-                except IntegrityError:
-                    print("Error committing platform.")
-                    session.rollback()
-                    stmt = select(Platform.id).where(Platform.unique_id == ds.attrs["platform_code"])
-                    p.id = session.execute(stmt).first()[0]
-
-                for idx, time in enumerate(times):
-                    # Generate the station
-                    s = Station(
-                        latitude=ds.LATITUDE.values[idx],
-                        longitude=ds.LONGITUDE.values[idx],
-                        time=time,
-                        platform_id=p.id
-                    )
-                    try:
-                        session.add(s)
-                        session.commit()
-                    except IntegrityError:
-                        print("Error committing station.")
-                        session.rollback()
-
-                    # Generate the samples
-                    for var, dt in datatype_map.items():
-                        if "DEPH" in ds.variables:
-                            depth = ds.DEPH.isel(TIME=idx).values
-                        elif "PRES" in ds.variables:
-                            pres = ds["PRES"].isel(TIME=idx).values
-                            lat = ds["LATITUDE"][idx].values
-
-                            depth = gsw.conversions.z_from_p(
-                                -pres,
-                                lat,
-                            )
-
-                        if var in ds.variables:
-                            values = ds[var].isel(TIME=idx).values
-
-                            data = np.stack(
-                                [
-                                    depth.flatten(),
-                                    values.flatten(),
-                                ],
-                                axis=1,
-                            )
-                            data = data[~np.isnan(data).any(axis=1)]
-
-                            samples = [
-                                Sample(
-                                    depth=pair[0],
-                                    datatype_key=dt.key,
-                                    value=pair[1],
-                                    station_id=s.id,
-                                )
-                                for pair in data
-                            ]
-
-                        try:
-                            session.bulk_save_objects(samples)
-                        except IntegrityError:
-                            print("Error committing samples.")
-                            session.rollback()
-
-                session.commit()
+    BulkLoader(engine).run(
+        parse, expand_filenames(filename), processes, files_per_transaction
+    )
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     defopt.run(main)
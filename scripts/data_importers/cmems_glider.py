@@ -1,21 +1,20 @@
 #!/usr/bin/env python
 
-import glob
+import logging
 import os
 import sys
 
 import defopt
 import numpy as np
 import xarray as xr
-from sqlalchemy import create_engine, select
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy import create_engine
 
 current = os.path.dirname(os.path.realpath(__file__))
 parent = os.path.dirname(os.path.dirname(current))
 sys.path.append(parent)
 
-from data.observational import DataType, Platform, Sample, Station
+from data.observational import Platform
+from data.observational.bulk import BulkLoader, ObservationBatch, expand_filenames
 
 VARIABLES = ["PRES", "PSAL", "TEMP", "CNDC"]
 
@@ -46,12 +45,59 @@ def reformat_coordinates(ds: xr.Dataset) -> xr.Dataset:
 
     return ds
 
-def main(uri: str, filename: str):
 
+def parse(fname: str) -> ObservationBatch:
+    """Reads a glider file into an ObservationBatch with a station for each
+    position along the track.
+    """
+    with xr.open_dataset(fname).drop_duplicates("TIME") as ds:
+        ds = reformat_coordinates(ds)
+        variables = [v for v in VARIABLES if v in ds.variables]
+        df = (
+            ds[["TIME", "LATITUDE", "LONGITUDE", *variables]]
+            .to_dataframe()
+            .reset_index()
+            .dropna(axis=1, how="all")
+            .dropna()
+        )
+
+        batch = ObservationBatch(
+            Platform.Type.glider,
+            ds.attrs["platform_code"],
+            {
+                "Glider Platform": ds.attrs["platform_code"],
+                "WMO": ds.attrs["wmo_platform_code"],
+                "Institution": ds.attrs["institution"],
+            },
+        )
+
+        position = ["TIME", "LATITUDE", "LONGITUDE"]
+        stations = df.drop_duplicates(position)
+        station_index = batch.add_stations(
+            stations.TIME.values, stations.LATITUDE.values, stations.LONGITUDE.values
+        )
+        row_station = station_index[df.groupby(position, sort=False).ngroup().values]
+
+        # remove missing variables from variables list
+        for variable in [v for v in VARIABLES if v in df.columns]:
+            var = ds[variable]
+            batch.add_datatype(var.standard_name, var.long_name, var.units)
+            batch.add_samples(
+                row_station, var.standard_name, df.DEPTH.values, df[variable].values
+            )
+
+    return batch
+
+
+def main(
+    uri: str, filename: str, processes: int = None, files_per_transaction: int = 10
+):
     """Import Glider NetCDF
 
     :param str uri: Database URI
     :param str filename: Glider Filename, or directory of NetCDF files
+    :param int processes: Number of processes used to parse the files
+    :param int files_per_transaction: Number of files written per transaction
     """
     engine = create_engine(
         uri,
@@ -59,129 +105,11 @@ def main(uri: str, filename: str):
         pool_recycle=3600,
     )
 
-    with Session(engine) as session:
-
-        if not isinstance(filename, list):
-            if os.path.isdir(filename):
-                filenames = sorted(glob.glob(os.path.join(filename, "*.nc")))
-            else:
-                filenames = [filename]
-        else:
-            filenames = filename
-
-        datatype_map = {}
-        for fname in filenames:
-            print(fname)
-            with xr.open_dataset(fname).drop_duplicates("TIME") as ds:
-                ds = reformat_coordinates(ds)
-                variables = [v for v in VARIABLES if v in ds.variables]
-                df = (
-                    ds[["TIME", "LATITUDE", "LONGITUDE", *variables]]
-                    .to_dataframe()
-                    .reset_index()
-                    .dropna(axis=1, how='all')
-                    .dropna()
-                )
-
-                # remove missing variables from variables list
-                variables = [v for v in VARIABLES if v in df.columns]
-
-                for variable in variables:
-                    if variable not in datatype_map:
-                        statement = select(DataType).where(
-                            DataType.key == ds[variable].standard_name
-                        )
-                        dt = session.execute(statement).all()
-                        if not dt:
-                            dt = DataType(
-                                key=ds[variable].standard_name,
-                                name=ds[variable].long_name,
-                                unit=ds[variable].units,
-                            )
-                            session.add(dt)
-                        else:
-                            dt = dt[0][0]
-
-                        datatype_map[variable] = dt
-
-                session.commit()
-
-                p = Platform(
-                    type=Platform.Type.glider, unique_id=f"{ds.attrs["platform_code"]}"
-                )
-                attrs = {
-                    "Glider Platform": ds.attrs["platform_code"],
-                    "WMO": ds.attrs["wmo_platform_code"],
-                    "Institution": ds.attrs["institution"],
-                }
-                p.attrs = attrs
-
-                try:
-                    session.add(p)
-                    session.commit()
-                except IntegrityError:
-                    print("Error committing platform.")
-                    session.rollback()
-                    stmt = select(Platform.id).where(Platform.unique_id == ds.attrs["platform_code"])
-                    p.id = session.execute(stmt).first()[0]
-
-                n_chunks = np.ceil(len(df)/1e4)
-
-                if n_chunks < 1:
-                    continue
-
-                for chunk in np.array_split(df, n_chunks):
-                    chunk["STATION_ID"] = 0
-
-                    stations = [
-                        Station(
-                            platform_id=p.id,
-                            time=row.TIME,
-                            latitude=row.LATITUDE,
-                            longitude=row.LONGITUDE,
-                        )
-                        for idx, row in chunk[["TIME","LATITUDE", "LONGITUDE"]].drop_duplicates().iterrows()
-                    ]
-
-                    # Using return_defaults=True here so that the stations will get
-                    # updated with id's. It's slower, but it means that we can just
-                    # put all the station ids into a pandas series to use when
-                    # constructing the samples.
-                    try:
-                        session.bulk_save_objects(stations, return_defaults=True)
-                        session.commit()
-                    except IntegrityError:
-                        print("Error committing station.")
-                        session.rollback()
-
-                    stmt = select(Station).where(Station.platform_id==p.id)
-                    station_data = session.execute(stmt).all()
-
-                    for station in station_data:
-                        chunk.loc[chunk["TIME"]==station[0].time,"STATION_ID"] = station[0].id
-
-                    samples = [
-                        [
-                            Sample(
-                                station_id=row.STATION_ID,
-                                depth=row.DEPTH,
-                                value=row[variable],
-                                datatype_key=datatype_map[variable].key,
-                            )
-                            for variable in variables
-                        ]
-                        for idx, row in chunk.iterrows()
-                    ]
-                    try:
-                        session.bulk_save_objects(
-                            [item for sublist in samples for item in sublist]
-                        )
-                    except IntegrityError:
-                        print("Error committing samples.")
-                        session.rollback()
-
-                    session.commit()
+    BulkLoader(engine).run(
+        parse, expand_filenames(filename), processes, files_per_transaction
+    )
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     defopt.run(main)
@@ -1,140 +1,110 @@
 #!/usr/bin/env python3
 
 import argparse
-import multiprocessing
-from itertools import product
+import logging
+import sys
+import time
+from pathlib import Path
 
-import requests
+parent_dir = str(Path(__file__).resolve().parent.parent)
+sys.path.append(parent_dir)
 
-parser = argparse.ArgumentParser(description="Warm up the tile cache.")
-parser.add_argument(
-    "--url",
-    type=str,
-    required=True,
-    help=(
-        "Root URL to Navigator instance. Ex: "
-        + "https://oceannavigator.ca or http://10.5.166.251:5000"
-    ),
-)
-args = parser.parse_args()
+from plotting.pregen import TileSet, pregenerate, pregenerate_new
 
-base_url = f"{args.url}/api/v2.0"
 
-
-def get_tile(
-    dataset: str,
-    variable: str,
-    time: int,
-    depth: int,
-    scale: str,
-    x: int,
-    y: int,
-    z: int,
-) -> None:
-    res = requests.get(
-        f"{base_url}/tiles/gaussian/25/10/EPSG:3857/{dataset}/{variable}/{time}/{depth}/{scale}/{z}/{x}/{y}.png",
-        timeout=25,
-        verify=False,
-    )
-
-    if res.status_code != 200:
-        print(f"Error getting tile {res.status_code} -- {res.url}")
-    else:
-        print(f"Fetched {res.url}")
-
-
-if __name__ == "__main__":
-    print(f"Starting with {multiprocessing.cpu_count()} processes...")
-
-    datasets = list(
-        filter(
-            lambda d: "riops" in d or "giops" in d,
-            map(
-                lambda d: d["id"],
-                requests.get(f"{base_url}/datasets").json(),
-                verify=False,
-            ),
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Pre-generate data tiles into the tile cache. Run with --new after "
+            "the dataset index is updated to render any new timestamps."
         )
     )
-
-    timestamps = list(
-        map(
-            lambda t: int(t["id"]),
-            requests.get(
-                f"{base_url}/timestamps/?dataset=giops_day&variable=votemper",
-                verify=False,
-            ).json(),
-        )
+    parser.add_argument("dataset", help="Dataset key, e.g. giops_day")
+    parser.add_argument("variable", help="Variable key, e.g. votemper")
+    parser.add_argument("--depth", default="0", help="Depth index or 'bottom'")
+    parser.add_argument(
+        "--scale", help="Colour scale, e.g. -5,30. Defaults to the variable's scale"
     )
-
-    zoom_levels = [z for z in range(1, 8)]
-    x_range = [x for x in range(0, 8)]
-    y_range = [y for y in range(0, 8)]
-
-    nc_timestamp = [timestamps[0]]
-
-    print(f"Fetching tiles for {nc_timestamp}")
-
-    time = nc_timestamp
-    depth = [0]
-
-    with multiprocessing.Pool(processes=multiprocessing.cpu_count()) as pool:
-        res1 = pool.starmap_async(
-            get_tile,
-            product(
-                datasets,
-                ["vozocrtx", "vomecrty"],
-                time,
-                depth,
-                ["-3,3"],
-                x_range,
-                y_range,
-                zoom_levels,
-            ),
-        )
-        res2 = pool.starmap_async(
-            get_tile,
-            product(
-                datasets,
-                ["magwatervel"],
-                time,
-                depth,
-                ["0,3"],
-                x_range,
-                y_range,
-                zoom_levels,
-            ),
-        )
-        res3 = pool.starmap_async(
-            get_tile,
-            product(
-                datasets,
-                ["votemper"],
-                time,
-                depth,
-                ["-5,30"],
-                x_range,
-                y_range,
-                zoom_levels,
-            ),
-        )
-        res4 = pool.starmap_async(
-            get_tile,
-            product(
-                datasets,
-                ["vosaline"],
-                time,
-                depth,
-                ["30,40"],
-                x_range,
-                y_range,
-                zoom_levels,
-            ),
+    parser.add_argument(
+        "--zoom", type=int, nargs=2, default=[0, 7], metavar=("MIN", "MAX")
+    )
+    parser.add_argument("--projection", default="EPSG:3857")
+    parser.add_argument("--interp", default="gaussian")
+    parser.add_argument("--radius", type=int, default=25, help="Radius in km")
+    parser.add_argument("--neighbours", type=int, default=10)
+    parser.add_argument("--processes", type=int, help="Defaults to the CPU count")
+    parser.add_argument(
+        "--no-derive",
+        dest="derive",
+        action="store_false",
+        help="Read the source at every zoom instead of downsampling finer zooms",
+    )
+    parser.add_argument(
+        "--bounds",
+        type=float,
+        nargs=4,
+        metavar=("LAT_MIN", "LAT_MAX", "LON_MIN", "LON_MAX"),
+        help="Region to render, defaults to the extent of the dataset",
+    )
+    parser.add_argument("--overwrite", action="store_true")
+
+    times = parser.add_mutually_exclusive_group(required=True)
+    times.add_argument("--time", type=int, nargs="+", help="NetCDF timestamps")
+    times.add_argument(
+        "--new",
+        action="store_true",
+        help="Timestamps of the index that haven't been pre-generated yet",
+    )
+    parser.add_argument(
+        "--latest", type=int, help="With --new, only the latest N timestamps"
+    )
+    parser.add_argument(
+        "--watch",
+        type=int,
+        metavar="SECONDS",
+        help="With --new, check the index again every SECONDS",
+    )
+    args = parser.parse_args()
+
+    zooms = tuple(args.zoom)
+    options = {
+        "depth": args.depth,
+        "scale": args.scale,
+        "projection": args.projection,
+        "interp": args.interp,
+        "radius": args.radius,
+        "neighbours": args.neighbours,
+    }
+
+    if args.time:
+        for timestamp in args.time:
+            tiles = TileSet(args.dataset, args.variable, timestamp, **options)
+            pregenerate(
+                tiles,
+                zooms,
+                args.processes,
+                args.derive,
+                args.overwrite,
+                args.bounds,
+            )
+        return
+
+    while True:
+        pregenerate_new(
+            args.dataset,
+            args.variable,
+            zooms,
+            args.latest,
+            args.processes,
+            args.derive,
+            args.bounds,
+            **options,
         )
+        if not args.watch:
+            break
+        time.sleep(args.watch)
 
-        res1.get()
-        res2.get()
-        res3.get()
-        res4.get()
 
-    print("Done!")
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Measures plot throughput for each plot type without the web server.
+
+The plot queries are read from an endpoints file (by default the one used by the
+API tests) and each plot is generated repeatedly in-process at the API's default
+size and resolution. Data loading (prepare_plot) and rendering (plot) are timed
+separately so changes to the rendering layer can be compared on their own.
+
+Usage:
+    ONAV_ENV_FILE=... python scripts/profiling_scripts/plot_throughput.py \
+        [--endpoints tests/testdata/endpoints.json] [--iterations 10] \
+        [--size 15x9] [--dpi 72] [--format png]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../.."))
+
+from plotting.hovmoller import HovmollerPlotter  # noqa: E402
+from plotting.map import MapPlotter  # noqa: E402
+from plotting.profile import ProfilePlotter  # noqa: E402
+from plotting.sound import SoundSpeedPlotter  # noqa: E402
+from plotting.stick import StickPlotter  # noqa: E402
+from plotting.timeseries import TimeseriesPlotter  # noqa: E402
+from plotting.transect import TransectPlotter  # noqa: E402
+from plotting.ts import TemperatureSalinityPlotter  # noqa: E402
+
+PLOTTERS = {
+    "map": MapPlotter,
+    "transect": TransectPlotter,
+    "timeseries": TimeseriesPlotter,
+    "ts": TemperatureSalinityPlotter,
+    "sound": SoundSpeedPlotter,
+    "profile": ProfilePlotter,
+    "hovmoller": HovmollerPlotter,
+    "stick": StickPlotter,
+}
+
+
+def load_queries(endpoints_file: str) -> dict:
+    """Returns the first plot query of each supported plot type in the
+    endpoints file.
+    """
+    with open(endpoints_file) as f:
+        endpoints = json.load(f)
+
+    queries = {}
+    for url in endpoints.values():
+        parsed = urlparse(url)
+        if "/plot/" not in parsed.path:
+            continue
+
+        plot_type = parsed.path.rsplit("/", 1)[-1]
+        args = parse_qs(parsed.query)
+        if plot_type in PLOTTERS and plot_type not in queries and "query" in args:
+            fmt = args.get("format", ["png"])[0]
+            if fmt in ["png", "json"]:
+                queries[plot_type] = json.loads(args["query"][0])
+
+    return queries
+
+
+def benchmark(plot_type: str, query: dict, iterations: int, options: dict) -> dict:
+    prepare_times, plot_times = [], []
+
+    for _ in range(iterations):
+        plotter = PLOTTERS[plot_type](query["dataset"], dict(query), **options)
+
+        start = time.perf_counter()
+        plotter.prepare_plot()
+        prepared = time.perf_counter()
+        plotter.plot()
+        done = time.perf_counter()
+
+        prepare_times.append(prepared - start)
+        plot_times.append(done - prepared)
+
+    return {
+        "prepare": np.mean(prepare_times),
+        "plot": np.mean(plot_times),
+        "plots_per_second": 1.0 / np.mean(plot_times),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--endpoints", default="tests/testdata/endpoints.json")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--size", default="15x9")
+    parser.add_argument("--dpi", type=int, default=72)
+    parser.add_argument("--format", default="png")
+    parser.add_argument("--types", nargs="*", default=list(PLOTTERS.keys()))
+    args = parser.parse_args()
+
+    options = {"format": args.format, "size": args.size, "dpi": args.dpi}
+    queries = load_queries(args.endpoints)
+
+    print(f"{'plot type':<12}{'prepare (s)':>14}{'plot (s)':>12}{'plots/s':>10}")
+    for plot_type in args.types:
+        if plot_type not in queries:
+            print(f"{plot_type:<12}{'no query':>14}")
+            continue
+
+        try:
+            result = benchmark(plot_type, queries[plot_type], args.iterations, options)
+        except Exception as e:
+            print(f"{plot_type:<12}{'failed':>14}  {e}")
+            continue
+
+        print(
+            f"{plot_type:<12}{result['prepare']:>14.3f}{result['plot']:>12.3f}"
+            f"{result['plots_per_second']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
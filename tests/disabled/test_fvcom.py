@@ -41,7 +41,7 @@ class TestFvcom(unittest.TestCase):
 
     def test_get_point(self):
         with Fvcom("tests/testdata/fvcom_test.nc") as n:
-            data, depth = n.get_point(45.3, -64.0, 0, 0, "temp", return_depth=True)
+            data, depth = n.get_point(45.3, -64.0, 0, "temp", 0, return_depth=True)
 
             self.assertAlmostEqual(data, 6.78, places=2)
             self.assertAlmostEqual(depth, 6.51, places=2)
@@ -64,7 +64,7 @@ class TestFvcom(unittest.TestCase):
     def test_bottom_point(self):
         with Fvcom("tests/testdata/fvcom_test.nc") as n:
             self.assertAlmostEqual(
-                n.get_point(45.3, -64.0, "bottom", 0, "temp"), 6.78, places=2
+                n.get_point(45.3, -64.0, "bottom", "temp", 0), 6.78, places=2
             )
 
     def test_timestamps(self):
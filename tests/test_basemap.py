@@ -0,0 +1,76 @@
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import cartopy.crs as ccrs
+import numpy as np
+import shapely
+
+import plotting.basemap as basemap
+from oceannavigator.settings import get_settings
+
+# A square island with a lake in the middle, and a second island far away
+LAND = [shapely.box(-10, -10, 10, 10), shapely.box(50, 50, 60, 60)]
+LAKES = [shapely.box(-2, -2, 2, 2)]
+
+
+def _natural_earth(category, name, scale):
+    return MagicMock(geometries=lambda: iter(LAND if name == "land" else LAKES))
+
+
+class TestBasemap(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+        for patcher in [
+            patch.object(get_settings(), "cache_dir", self.path),
+            patch("cartopy.feature.NaturalEarthFeature", side_effect=_natural_earth),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        for clear in [basemap._land_index.cache_clear, basemap._layer_cache.clear]:
+            clear()
+            self.addCleanup(clear)
+
+    def test_get_land_geoms(self):
+        geoms = basemap.get_land_geoms((-5, 5, -5, 5))
+        land = shapely.union_all(geoms)
+
+        # Only the island under the extent, clipped to the padded extent and
+        # without its lake
+        self.assertEqual(land.bounds, (-6, -6, 6, 6))
+        self.assertEqual(land.area, 12 * 12 - 4 * 4)
+        self.assertFalse(land.contains(shapely.Point(0, 0)))
+        self.assertTrue(land.contains(shapely.Point(4, 4)))
+
+        self.assertEqual(basemap.get_land_geoms((20, 30, 20, 30)), [])
+
+    def test_land_layer(self):
+        projection = ccrs.PlateCarree()
+        layer = basemap.land_layer(projection, [-20, 20, -20, 20], (80, 60), 72)
+
+        self.assertEqual(layer.shape, (60, 80, 4))
+        # Ocean and lakes are transparent, land is opaque
+        self.assertEqual(layer[2, 2, 3], 0)
+        self.assertEqual(layer[30, 40, 3], 0)
+        self.assertEqual(layer[20, 28, 3], 255)
+
+        # Served from memory, then from the cache directory
+        self.assertIs(
+            basemap.land_layer(projection, [-20, 20, -20, 20], (80, 60), 72), layer
+        )
+
+        for _ in range(50):
+            if list(Path(self.path).glob("basemap/*.npy")):
+                break
+            time.sleep(0.1)
+        basemap._layer_cache.clear()
+
+        with patch.object(basemap, "get_land_geoms", side_effect=AssertionError):
+            cached = basemap.land_layer(projection, [-20, 20, -20, 20], (80, 60), 72)
+        np.testing.assert_array_equal(cached, layer)
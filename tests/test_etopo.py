@@ -0,0 +1,113 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from netCDF4 import Dataset
+from PIL import Image
+
+import plotting.etopo as etopo
+import plotting.tile as tile
+from oceannavigator.settings import get_settings
+
+
+class TestEtopo(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+        for name, value in [
+            ("etopo_file", os.path.join(self.path, "etopo_%s_%d.nc")),
+            ("cache_dir", os.path.join(self.path, "cache")),
+        ]:
+            patcher = patch.object(get_settings(), name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        etopo._grids.clear()
+        self.addCleanup(etopo._grids.clear)
+
+        # Depth increasing to the east, land in the first columns and a missing
+        # value in the corner
+        self.elevation = np.tile(np.linspace(500, -5500, 512), (512, 1))
+        self.write_source(1)
+
+    def write_source(self, z: int) -> None:
+        size = 256 * 2**z
+        with Dataset(etopo.source_path("EPSG:3857", z), "w") as dataset:
+            dataset.createDimension("y", size)
+            dataset.createDimension("x", size)
+            var = dataset.createVariable("z", "i2", ("y", "x"), fill_value=-32767)
+            var[:] = np.ma.masked_array(
+                np.resize(self.elevation, (size, size)).astype(np.int16),
+                mask=np.pad([[True]], ((0, size - 1), (0, size - 1))),
+            )
+
+    def test_window(self):
+        window = etopo.window("EPSG:3857", 1, 1, 1)
+
+        self.assertEqual(window.shape, (256, 256))
+        self.assertEqual(window.dtype, np.float32)
+        np.testing.assert_array_equal(
+            window, self.elevation[256:, 256:].astype(np.int16)
+        )
+        self.assertTrue(np.isnan(etopo.window("EPSG:3857", 0, 0, 1)[0, 0]))
+
+        # Grids are converted in the dtype of the source
+        path = etopo.grid_path("EPSG:3857", 1)
+        self.assertEqual(np.load(path, mmap_mode="r").dtype, np.int16)
+
+        # Converted grids are reused until the source changes
+        mtime = os.path.getmtime(path)
+        self.assertEqual(etopo.convert("EPSG:3857", 1), path)
+        self.assertEqual(os.path.getmtime(path), mtime)
+
+    def test_grid_lock(self):
+        self.write_source(2)
+        converting = threading.Event()
+        release = threading.Event()
+        convert = etopo.convert
+
+        def slow_convert(projection, z):
+            if z == 1:
+                converting.set()
+                release.wait(10)
+            return convert(projection, z)
+
+        with patch("plotting.etopo.convert", side_effect=slow_convert):
+            thread = threading.Thread(target=etopo.grid, args=("EPSG:3857", 1))
+            thread.start()
+            self.assertTrue(converting.wait(10))
+
+            # Other zooms don't wait for the conversion of zoom 1
+            self.assertEqual(etopo.grid("EPSG:3857", 2).data.shape, (1024, 1024))
+            self.assertTrue(thread.is_alive())
+
+            release.set()
+            thread.join()
+
+        self.assertEqual(etopo.grid("EPSG:3857", 1).data.shape, (512, 512))
+
+    def test_topo(self):
+        img = np.asarray(Image.open(tile.topo("EPSG:3857", 0, 0, 1, False)))
+
+        self.assertEqual(img.shape, (256, 256, 4))
+        self.assertEqual(img[0, 0, 3], 0)
+        self.assertTrue(np.all(img[1:, :, 3] == 255))
+
+        shaded = np.asarray(Image.open(tile.topo("EPSG:3857", 0, 0, 1, True)))
+        self.assertTrue(np.all(shaded[1:, :, :3] >= img[1:, :, :3]))
+
+    def test_bathymetry(self):
+        img = np.asarray(Image.open(asyncio.run(tile.bathymetry("EPSG:3857", 0, 0, 1))))
+
+        self.assertEqual(img.shape, (256, 256, 4))
+        # The 100, 200, 500, 1000 and 2000 m levels cross the tile as lines
+        columns = np.flatnonzero(img[128, :, 3])
+        self.assertEqual(len(columns), 5)
+        self.assertTrue(np.all(img[:, columns, 3] > 0))
+        self.assertGreater(img[128, columns[0], 3], img[128, columns[-1], 3])
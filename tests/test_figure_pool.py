@@ -0,0 +1,56 @@
+import unittest
+from unittest.mock import patch
+
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+
+import plotting.figure_pool as figure_pool
+
+
+class TestFigurePool(unittest.TestCase):
+    def setUp(self):
+        figure_pool._pool().clear()
+        self.addCleanup(figure_pool._pool().clear)
+        self.addCleanup(plt.close, "all")
+
+    def test_release(self):
+        fig = figure_pool.figure((4, 3), 72)
+        fig.subplots_adjust(left=0.3, top=0.5)
+        fig.add_subplot(121).plot([0, 1])
+        fig.text(0.5, 0.5, "text")
+        figure_pool.release(fig)
+
+        reused = figure_pool.figure((4, 3), 72)
+
+        self.assertIs(reused, fig)
+        self.assertIs(plt.gcf(), fig)
+        self.assertEqual(reused.axes, [])
+        self.assertEqual(reused.texts, [])
+        for p in figure_pool._SUBPLOT_PARAMS:
+            self.assertEqual(
+                getattr(reused.subplotpars, p), mpl.rcParams[f"figure.subplot.{p}"]
+            )
+
+    def test_size_and_dpi(self):
+        fig = figure_pool.figure((4, 3), 72)
+        figure_pool.release(fig)
+
+        self.assertIsNot(figure_pool.figure((5, 3), 72), fig)
+        self.assertIsNot(figure_pool.figure((4, 3), 100), fig)
+        self.assertIs(figure_pool.figure((4.0, 3.0), 72.0), fig)
+
+    @patch.object(figure_pool, "MAX_POOLED_FIGURES", 2)
+    def test_max_pooled_figures(self):
+        figs = [figure_pool.figure((4, 3), 72) for _ in range(3)]
+        for fig in figs:
+            figure_pool.release(fig)
+
+        # The figure released to a full pool is closed
+        self.assertEqual(sum(len(f) for f in figure_pool._pool().values()), 2)
+        self.assertTrue(plt.fignum_exists(figs[0].number))
+        self.assertFalse(plt.fignum_exists(figs[2].number))
+
+        # Closed figures are never handed out again
+        plt.close(figs[1])
+        self.assertIs(figure_pool.figure((4, 3), 72), figs[0])
+        self.assertNotIn(figure_pool.figure((4, 3), 72), figs)
@@ -0,0 +1,103 @@
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+
+import data.fvcom as fvcom
+from data.fvcom import FvcomMesh
+from oceannavigator.settings import get_settings
+
+# A unit square of 4 nodes split into 2 elements along its diagonal
+NODE_LAT = np.array([0.0, 0.0, 1.0, 1.0])
+NODE_LON = np.array([0.0, 1.0, 0.0, 1.0])
+NV = np.array([[0, 1, 3], [0, 3, 2]])
+
+
+class TestFvcomMesh(unittest.TestCase):
+    def setUp(self):
+        fvcom._mesh_cache.clear()
+        self.addCleanup(fvcom._mesh_cache.clear)
+
+        self.mesh = FvcomMesh(
+            NODE_LAT,
+            NODE_LON,
+            NODE_LAT[NV].mean(axis=1),
+            NODE_LON[NV].mean(axis=1),
+            NV,
+        )
+
+    def test_locate(self):
+        lat = np.array([0.2, 0.7, 0.5, 2.0])
+        lon = np.array([0.7, 0.2, 0.5, 2.0])
+        element, weights = self.mesh.locate(lat, lon, candidates=2)
+
+        np.testing.assert_array_equal(element[:2], [0, 1])
+        # Points on the shared edge are in either element
+        self.assertIn(element[2], [0, 1])
+        self.assertEqual(element[3], -1)
+        self.assertTrue(np.isnan(weights[3]).all())
+
+        # The weights sum to 1 and interpolate the point itself
+        np.testing.assert_allclose(weights[:3].sum(axis=1), 1)
+        nodes = NV[element[:3]]
+        np.testing.assert_allclose((weights[:3] * NODE_LAT[nodes]).sum(axis=1), lat[:3])
+        np.testing.assert_allclose((weights[:3] * NODE_LON[nodes]).sum(axis=1), lon[:3])
+
+    def test_locate_antimeridian(self):
+        mesh = FvcomMesh(
+            NODE_LAT,
+            NODE_LON + 179.5,
+            self.mesh.element_lat,
+            self.mesh.element_lon + 179.5,
+            NV,
+        )
+        element, weights = mesh.locate(0.2, -179.8, candidates=2)
+
+        self.assertEqual(element[0], 0)
+        np.testing.assert_allclose(weights.sum(), 1)
+
+    def test_from_dataset(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+
+        variables = {
+            "lat": NODE_LAT,
+            "lon": NODE_LON,
+            "latc": self.mesh.element_lat,
+            "lonc": self.mesh.element_lon,
+            # One-based and transposed, as stored by FVCOM
+            "nv": NV.transpose() + 1,
+        }
+        nc_data = MagicMock(url="fvcom.nc")
+        nc_data.get_dataset_variable.side_effect = variables.get
+
+        with patch.object(get_settings(), "cache_dir", path):
+            mesh = FvcomMesh.from_dataset(nc_data)
+            np.testing.assert_array_equal(mesh.nv, NV)
+            self.assertIs(FvcomMesh.from_dataset(nc_data), mesh)
+
+            # The mesh is saved in the background
+            cache_file = next(iter(Path(path).glob("fvcom_mesh/*.npz")), None)
+            for _ in range(50):
+                if cache_file is not None:
+                    break
+                time.sleep(0.1)
+                cache_file = next(iter(Path(path).glob("fvcom_mesh/*.npz")), None)
+            self.assertIsNotNone(cache_file)
+
+            # Other processes load it instead of reading the dataset
+            fvcom._mesh_cache.clear()
+            nc_data.get_dataset_variable.reset_mock()
+            loaded = FvcomMesh.from_dataset(nc_data)
+
+        self.assertIsNot(loaded, mesh)
+        np.testing.assert_array_equal(loaded.nv, NV)
+        np.testing.assert_array_equal(loaded.node_lon, NODE_LON)
+        self.assertEqual(
+            sorted(c.args[0] for c in nc_data.get_dataset_variable.call_args_list),
+            ["lat", "nv"],
+        )
@@ -1,6 +1,7 @@
 import unittest
 
 import geopy
+import numpy as np
 
 from data.geo import *
 
@@ -58,3 +59,20 @@ class TestGeo(unittest.TestCase):
         dist, t, lat, lon, b = path_to_points(points, n=10, times=[0, 1])
         self.assertAlmostEqual(lat[-1], 20.0, places=1)
         self.assertAlmostEqual(lon[-1], 20.0, places=1)
+
+    def test_path_to_points_cached(self):
+        points = [[45, -60], [47, -57], [50, -40]]
+        dist, t, lat, lon, b = path_to_points(points, n=100, times=[0, 10])
+
+        self.assertEqual(len(dist), len(lat))
+        self.assertTrue((np.diff(dist) >= 0).all())
+        self.assertAlmostEqual(dist[-1], 1618.2, places=1)
+        self.assertAlmostEqual(t[-1], 10)
+        self.assertAlmostEqual(lat[-1], 50.0, places=1)
+        self.assertAlmostEqual(lon[-1], -40.0, places=1)
+
+        # Repeated calls get equal copies
+        lat[:] = 0
+        cached = path_to_points(points, n=100, times=[0, 10])
+        self.assertAlmostEqual(cached[2][-1], 50.0, places=1)
+        np.testing.assert_array_equal(cached[0], dist)
@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import xarray
+
+import data.chunk_cache as chunk_cache
+import data.hyperslab as hyperslab
+from data.netcdf_data import NetCDFData
+from oceannavigator.settings import get_settings
+
+NEMO = "tests/testdata/nemo_test.nc"
+
+
+class TestHyperslab(unittest.TestCase):
+    def setUp(self):
+        hyperslab.clear()
+        chunk_cache.clear()
+        self.addCleanup(hyperslab.clear)
+        self.addCleanup(chunk_cache.clear)
+
+    def test_read(self):
+        with NetCDFData(NEMO) as nc_data:
+            for key in [
+                np.s_[0:1, 0, 10:30, 20:40],
+                np.s_[1, :, 5:9, 5:9],
+                np.s_[-1, 49, :, 100:101],
+            ]:
+                np.testing.assert_array_equal(
+                    nc_data.read("votemper", key),
+                    nc_data.dataset["votemper"][key].values,
+                )
+
+            # Keys other than ints and slices are read through xarray
+            nc_data.read("votemper", np.s_[0, 0, [1, 2], 0])
+
+        metrics = hyperslab.metrics()
+        self.assertEqual(metrics["direct"]["reads"], 3)
+        self.assertEqual(metrics["lazy"]["reads"], 1)
+
+    def test_max_size(self):
+        # A window of 1 level holds whole (1, 50, 76, 101) chunks
+        with patch.object(get_settings(), "direct_read_max_mb", 1):
+            with NetCDFData(NEMO) as nc_data:
+                nc_data.read("votemper", np.s_[0, 0, 0:10, 0:10])
+
+        self.assertEqual(hyperslab.metrics()["lazy"]["reads"], 1)
+
+    def test_read_files(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+
+        # One file per timestamp
+        paths = []
+        with xarray.open_dataset(NEMO, decode_times=False) as ds:
+            for i in range(2):
+                paths.append(os.path.join(path, f"nemo_{i}.nc"))
+                ds.isel(time_counter=slice(i, i + 1)).to_netcdf(paths[-1])
+
+        nc_data = NetCDFData(NEMO)
+        nc_data._nc_files = paths
+        nc_data.dataset = xarray.open_mfdataset(paths, decode_times=False)
+        self.addCleanup(nc_data.dataset.close)
+
+        key = np.s_[1:2, 0, 10:30, 20:40]
+        np.testing.assert_array_equal(
+            nc_data.read("votemper", key), nc_data.dataset["votemper"][key].values
+        )
+        self.assertEqual(hyperslab.metrics()["direct"]["reads"], 1)
+
+        # Windows spanning files are read through xarray
+        nc_data.read("votemper", np.s_[0:2, 0, 10:30, 20:40])
+        self.assertEqual(hyperslab.metrics()["lazy"]["reads"], 1)
+
+    def test_chunk_cache(self):
+        with NetCDFData(NEMO) as nc_data:
+            for key in [np.s_[0, 0, 10:30, 20:40], np.s_[0, 5, 30:40, 0:10]]:
+                np.testing.assert_array_equal(
+                    nc_data.read("votemper", key),
+                    nc_data.dataset["votemper"][key].values,
+                )
+
+        # Both windows are in the first (1, 50, 76, 101) chunk
+        metrics = chunk_cache.metrics()
+        self.assertEqual(metrics["misses"], 1)
+        self.assertEqual(metrics["hits"], 1)
+        self.assertEqual(metrics["chunks"], 1)
+
+        # Chunks are read-only
+        with self.assertRaises(ValueError):
+            next(iter(chunk_cache._chunks.values()))[0] = 0
+
+    def test_chunk_cache_disabled(self):
+        with patch.object(get_settings(), "chunk_cache_mb", 0):
+            chunk_cache.clear()
+            with NetCDFData(NEMO) as nc_data:
+                nc_data.read("votemper", np.s_[0, 0, 10:30, 20:40])
+
+        self.assertEqual(hyperslab.metrics()["direct"]["reads"], 1)
+        self.assertEqual(chunk_cache.metrics()["misses"], 0)
+
+    def test_read_indices(self):
+        key = np.s_[1, 0:10, 40, np.array([0, 3, 50, 100])]
+        with NetCDFData(NEMO) as nc_data:
+            np.testing.assert_array_equal(
+                nc_data.read("votemper", key),
+                nc_data.dataset["votemper"][key].values,
+            )
+
+        self.assertEqual(hyperslab.metrics()["direct"]["reads"], 1)
@@ -0,0 +1,138 @@
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import xarray
+from icechunk import Repository, local_filesystem_storage
+from icechunk.xarray import to_icechunk
+
+import data.icechunk_store as icechunk_store
+from oceannavigator.settings import get_settings
+from plotting.tile import tile_path
+
+
+class TestIcechunkStore(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+        settings = get_settings()
+        for name, value in {
+            "icechunk_storage_type": "local",
+            "icechunk_storage_config": {"path": self.path},
+            "icechunk_refresh_interval": 0,
+        }.items():
+            patcher = patch.object(settings, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        icechunk_store.clear()
+        self.addCleanup(icechunk_store.clear)
+
+        self.repo = Repository.create(local_filesystem_storage(f"{self.path}/test"))
+        self.config = SimpleNamespace(url="icechunk", key="test")
+        self.commit(0)
+
+    def commit(self, value: float) -> None:
+        shape = (3, 4, 40, 60)
+        dataset = xarray.Dataset(
+            {
+                "votemper": (
+                    ("time", "depth", "latitude", "longitude"),
+                    np.full(shape, value) + np.random.rand(*shape),
+                )
+            },
+            coords={
+                "time": [2212444800, 2212531200, 2212617600],
+                "depth": [0.5, 1.5, 2.5, 3.5],
+                "latitude": np.linspace(40, 50, shape[2]),
+                "longitude": np.linspace(-70, -55, shape[3]),
+            },
+        )
+        dataset["votemper"].encoding["chunks"] = (1, 1, 20, 30)
+
+        session = self.repo.writable_session("main")
+        to_icechunk(dataset, session, mode="w")
+        session.commit(f"Values around {value}")
+
+    def test_open_dataset(self):
+        dataset, snapshot = icechunk_store.open_dataset("test")
+        self.assertIs(icechunk_store.open_dataset("test")[0], dataset)
+        self.assertEqual(icechunk_store.version(self.config), snapshot)
+
+        # Subsets of the shared dataset can be closed
+        dataset.loc[{"time": slice(2212531200, 2212531200)}].close()
+        self.assertLess(float(dataset.votemper[0, 0, 0, 0]), 1)
+
+        self.commit(10)
+        new_dataset, new_snapshot = icechunk_store.open_dataset("test")
+
+        self.assertNotEqual(new_snapshot, snapshot)
+        self.assertIsNot(new_dataset, dataset)
+        self.assertGreater(float(new_dataset.votemper[0, 0, 0, 0]), 10)
+
+    def test_refresh_interval(self):
+        snapshot = icechunk_store.snapshot_id("test")
+
+        with patch.object(get_settings(), "icechunk_refresh_interval", 3600):
+            self.commit(10)
+            self.assertEqual(icechunk_store.snapshot_id("test"), snapshot)
+
+        self.assertNotEqual(icechunk_store.snapshot_id("test"), snapshot)
+
+    def test_cached(self):
+        func = MagicMock(return_value=[1, 2])
+
+        self.assertEqual(icechunk_store.cached(self.config, ("a",), func), [1, 2])
+        self.assertEqual(icechunk_store.cached(self.config, ("a",), func), [1, 2])
+        self.assertEqual(func.call_count, 1)
+
+        self.commit(10)
+        icechunk_store.cached(self.config, ("a",), func)
+        self.assertEqual(func.call_count, 2)
+
+        # Other datasets aren't cached
+        config = SimpleNamespace(url="test.sqlite3", key="test")
+        self.assertEqual(icechunk_store.version(config), "")
+        icechunk_store.cached(config, ("a",), func)
+        icechunk_store.cached(config, ("a",), func)
+        self.assertEqual(func.call_count, 4)
+
+    def test_prefetch(self):
+        dataset, snapshot = icechunk_store.open_dataset("test")
+        expected = self.repo.readonly_session(snapshot_id=snapshot)
+        expected = (
+            xarray.open_zarr(expected.store, consolidated=False, decode_times=False)
+            .votemper[1, 2]
+            .values
+        )
+
+        icechunk_store.prefetch(
+            "test", snapshot, dataset, ["votemper"], {"time": 1, "depth": 2}
+        )
+        icechunk_store._prefetcher.shutdown(wait=True)
+
+        # The slice is read from the chunk cache, other slices aren't cached
+        for chunk in glob.glob(os.path.join(self.path, "test", "chunks", "*")):
+            os.remove(chunk)
+
+        np.testing.assert_array_equal(dataset.votemper[1, 2].values, expected)
+        with self.assertRaises(Exception):
+            dataset.votemper[0, 0].values
+
+    def test_tile_path(self):
+        path = tile_path("EPSG:3857", "test", "votemper", 0, 0, "-5,30", 0, 0, 0)
+        versioned = tile_path(
+            "EPSG:3857", "test", "votemper", 0, 0, "-5,30", 0, 0, 0, version="abc"
+        )
+
+        self.assertIn(f"{os.sep}test{os.sep}", path)
+        self.assertEqual(
+            versioned,
+            path.replace(f"{os.sep}test{os.sep}", f"{os.sep}test@abc{os.sep}"),
+        )
@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import utils.kml_index as kml_index
+import utils.misc
+from oceannavigator.settings import get_settings
+
+AREAS = "AZMP_NL_Region_Analysis_Areas"
+VIEW = "-6000000,5000000,-5500000,7000000"
+
+
+class TestKMLIndex(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+        shutil.copytree("tests/testdata/kml", self.path, dirs_exist_ok=True)
+
+        patcher = patch.object(get_settings(), "overlay_kml_dir", self.path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        kml_index.clear()
+        self.addCleanup(kml_index.clear)
+
+    def test_get_kml(self):
+        kml = kml_index.get_kml("area", AREAS)
+
+        self.assertIs(kml_index.get_kml("area", AREAS), kml)
+        self.assertEqual(kml.name, "AZMP NL Region Analysis Areas")
+        self.assertEqual(len(kml.features), 65)
+
+        # Modified files are parsed again
+        path = os.path.join(self.path, "area", f"{AREAS}.kml")
+        os.utime(path, (kml.mtime + 10, kml.mtime + 10))
+        self.assertIsNot(kml_index.get_kml("area", AREAS), kml)
+
+        with self.assertRaises(FileNotFoundError):
+            kml_index.get_kml("area", "missing")
+
+    def test_query(self):
+        kml = kml_index.get_kml("point", "AZMP_Stations")
+
+        self.assertEqual(kml.query("EPSG:3857", None), list(range(157)))
+        self.assertEqual(len(kml.query("EPSG:3857", VIEW)), 39)
+        self.assertEqual(kml.query("EPSG:3857", "0,0,1,1"), [])
+
+    def test_areas(self):
+        kml = kml_index.get_kml("area", AREAS)
+
+        # Resolutions are rounded down to a power of two
+        simplified = kml.simplified("EPSG:3857", 9784)
+        self.assertIs(kml.simplified("EPSG:3857", 8192), simplified)
+        self.assertIsNot(kml.simplified("EPSG:3857", 8191), simplified)
+
+        result = utils.misc.areas(AREAS, "EPSG:3857", 9784, VIEW)
+        self.assertEqual(len(result["features"]), 29)
+        self.assertEqual(result["features"][0]["properties"]["resolution"], 9784)
+
+    def test_get_area(self):
+        area = kml_index.get_area(f"{AREAS}/LS1")
+
+        self.assertEqual(area["name"], "LS1")
+        self.assertEqual(area["polygons"][0][0], [60.45, -64.4])
+
+        # Callers get their own copy
+        area["polygons"].clear()
+        self.assertTrue(kml_index.get_area(f"{AREAS}/LS1")["polygons"])
+
+        with self.assertRaises(KeyError):
+            kml_index.get_area(f"{AREAS}/missing")
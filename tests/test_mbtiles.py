@@ -0,0 +1,84 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+import plotting.mbtiles as mbtiles
+from oceannavigator import create_app
+from oceannavigator.settings import get_settings
+
+
+class TestMBTiles(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+        patcher = patch.object(get_settings(), "shape_file_dir", self.path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        mbtiles.clear()
+        self.addCleanup(mbtiles.clear)
+
+        with open(os.path.join(self.path, "blank.mbt"), "wb") as f:
+            f.write(b"blank")
+
+        self.tile = b"tile data" * 100
+        self.database = os.path.join(self.path, "lands.mbtiles")
+        with sqlite3.connect(self.database) as connection:
+            connection.execute(
+                "CREATE TABLE tiles (zoom_level integer, tile_column integer, "
+                "tile_row integer, tile_data blob)"
+            )
+            # Stored in TMS rows
+            connection.execute(
+                "INSERT INTO tiles VALUES (7, 105, 50, ?)",
+                (gzip.compress(self.tile),),
+            )
+        connection.close()
+
+    def test_get_tile(self):
+        tile = mbtiles.get_tile("lands", 7, 105, 77)
+
+        self.assertTrue(mbtiles.is_gzipped(tile))
+        self.assertEqual(mbtiles.decompress(tile), self.tile)
+        self.assertIsNone(mbtiles.get_tile("lands", 7, 105, 78))
+
+        # Hot tiles are read from the cache, other threads use their own connection
+        with sqlite3.connect(self.database) as connection:
+            connection.execute("DELETE FROM tiles")
+        connection.close()
+
+        self.assertEqual(mbtiles.get_tile("lands", 7, 105, 77), tile)
+
+        result = []
+        thread = threading.Thread(
+            target=lambda: result.append(mbtiles._connection("lands"))
+        )
+        thread.start()
+        thread.join()
+        self.assertIsNot(result[0], mbtiles._connection("lands"))
+
+        with self.assertRaises(FileNotFoundError):
+            mbtiles.get_tile("missing", 7, 105, 77)
+
+    def test_mbt_endpoint(self):
+        client = TestClient(create_app())
+        url = "/api/v2.0/mbt/lands/7/105/77?projection=EPSG:3857"
+
+        response = client.get(url, headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertEqual(response.content, self.tile)
+
+        response = client.get(url, headers={"Accept-Encoding": "identity"})
+        self.assertNotIn("content-encoding", response.headers)
+        self.assertEqual(response.content, self.tile)
+
+        response = client.get("/api/v2.0/mbt/lands/7/105/78?projection=EPSG:3857")
+        self.assertEqual(response.content, b"blank")
@@ -5,6 +5,7 @@ import numpy as np
 from fastapi.exceptions import HTTPException
 from pytest import raises
 
+import data.pyramid as pyramid
 from data.nemo import Nemo
 from data.netcdf_data import NetCDFData
 from data.variable import Variable
@@ -182,6 +183,35 @@ class TestNemo(unittest.TestCase):
             r = ds.get_area(a, 0, 2031436800, "votemper", "inverse", 25000, 10)
             self.assertAlmostEqual(r[5, 5], 301.2795, places=4)
 
+    def test_get_area_pyramid(self):
+        pyramid.clear()
+        self.addCleanup(pyramid.clear)
+
+        nc_data = NetCDFData("tests/testdata/nemo_test.nc")
+        with Nemo(nc_data) as ds:
+            a = np.array(
+                np.meshgrid(np.linspace(5, 10, 10), np.linspace(-150, -160, 10))
+            )
+            full = ds.get_area(a, 0, 2031436800, "votemper", "gaussian", 25000, 10)
+
+            # Points finer than the grid are read from the data itself
+            r = ds.get_area(
+                a, 0, 2031436800, "votemper", "gaussian", 25000, 10, resolution=10000
+            )
+            np.testing.assert_array_equal(r, full)
+
+            r = ds.get_area(
+                a, 0, 2031436800, "votemper", "gaussian", 25000, 10, resolution=250000
+            )
+            np.testing.assert_allclose(r, full, atol=0.5)
+
+            # Levels are built once
+            misses = pyramid.metrics()["misses"]
+            ds.get_area(
+                a, 0, 2031436800, "votemper", "gaussian", 25000, 10, resolution=250000
+            )
+            self.assertEqual(pyramid.metrics()["misses"], misses)
+
     def test_get_path_profile(self):
         nc_data = NetCDFData("tests/testdata/nemo_test.nc")
         with Nemo(nc_data) as ds:
@@ -204,6 +234,59 @@ class TestNemo(unittest.TestCase):
             self.assertAlmostEqual(r[0], 299.17, places=2)
             self.assertAlmostEqual(r[1], 299.72, places=2)
 
+    def test_get_timeseries_point_depths(self):
+        nc_data = NetCDFData("tests/testdata/nemo_test.nc")
+        with Nemo(nc_data) as ds:
+            r, d = ds.get_timeseries_point(
+                13.0,
+                -149.0,
+                [0, 20, "bottom"],
+                2031436800,
+                2034072000,
+                "votemper",
+                return_depth=True,
+            )
+            self.assertEqual(r.shape[0], 3)
+            self.assertAlmostEqual(r[0, 0], 299.17, places=2)
+            self.assertAlmostEqual(r[0, 1], 299.72, places=2)
+            self.assertAlmostEqual(r[1, 0], 296.466766, places=4)
+            self.assertAlmostEqual(r[2, 0], 274.13, places=2)
+
+            self.assertAlmostEqual(d[0, 0], ds.depths[0])
+            self.assertAlmostEqual(d[1, 1], ds.depths[20])
+            self.assertGreater(d[2, 0], ds.depths[20])
+
+    def test_get_vector_point(self):
+        nc_data = NetCDFData("tests/testdata/nemo_test.nc")
+        with Nemo(nc_data) as ds:
+            value = float(ds.get_point(13.0, -149.0, 0, "votemper", 2031436800))
+            r = ds.get_vector_point(
+                13.0, -149.0, 0, ["votemper", "votemper"], 2031436800
+            )
+            self.assertAlmostEqual(r["east"], value, places=4)
+            self.assertAlmostEqual(r["north"], value, places=4)
+            self.assertAlmostEqual(r["magnitude"], np.sqrt(2) * value, places=3)
+            self.assertAlmostEqual(r["bearing"], 45, places=4)
+
+            # Grid x-gridlines pointing North
+            with patch.object(ds, "_grid_angle", return_value=(0, 1)):
+                r = ds.get_vector_point(
+                    13.0, -149.0, 0, ["votemper", "votemper"], 2031436800
+                )
+            self.assertAlmostEqual(r["east"], -value, places=4)
+            self.assertAlmostEqual(r["north"], value, places=4)
+            self.assertAlmostEqual(r["bearing"], 315, places=4)
+
+    def test_get_vector_profile(self):
+        nc_data = NetCDFData("tests/testdata/nemo_test.nc")
+        with Nemo(nc_data) as ds:
+            p, d = ds.get_profile(13.0, -149.0, "votemper", 2031436800)
+            r, vd = ds.get_vector_profile(
+                13.0, -149.0, ["votemper", "votemper"], 2031436800
+            )
+            np.testing.assert_array_almost_equal(r["east"], p, decimal=4)
+            np.testing.assert_array_equal(vd, d)
+
     def test_get_timeseries_profile(self):
         nc_data = NetCDFData("tests/testdata/nemo_test.nc")
         with Nemo(nc_data) as ds:
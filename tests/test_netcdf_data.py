@@ -12,6 +12,7 @@ import netCDF4
 import numpy
 import pytest
 import pytz
+import pyresample
 import xarray
 from icechunk import local_filesystem_storage, Repository
 from icechunk.xarray import to_icechunk
@@ -24,10 +25,10 @@ class TestNetCDFData(unittest.TestCase):
     with open("tests/testdata/datasetconfigpatch.json", "r") as f:
         patch_dataset_config_ret_val = json.load(f)
 
-    for name in patch_dataset_config_ret_val: 
+    for name in patch_dataset_config_ret_val:
         stub_file = f"tests/testdata/datasetconfigpatch-stubs/{name}.json"
 
-        with open(stub_file, "r") as f: 
+        with open(stub_file, "r") as f:
             patch_dataset_config_ret_val[name] = json.load(f)[name]
 
     @pytest.fixture(scope="class", autouse=True)
@@ -167,6 +168,14 @@ class TestNetCDFData(unittest.TestCase):
             self.assertTrue(nc_data._dataset_open)
         self.assertFalse(nc_data._dataset_open)
 
+    def test_mtime(self):
+        with NetCDFData("tests/testdata/nemo_test.nc") as nc_data:
+            self.assertEqual(
+                nc_data.mtime, os.path.getmtime("tests/testdata/nemo_test.nc")
+            )
+
+        self.assertEqual(NetCDFData("https://example.com/giops.nc").mtime, 0)
+
     def test_timestamp_to_time_index_int_timestamp(self):
         with NetCDFData("tests/testdata/nemo_test.nc") as nc_data:
             result = nc_data.timestamp_to_time_index(2031436800)
@@ -377,6 +386,16 @@ class TestNetCDFData(unittest.TestCase):
             with self.assertRaises(ValueError):
                 nc_data.timestamps[0] = 0
 
+    def test_timestamps_netcdf4_dataset(self):
+        # FVCOM datasets are opened as netCDF4.Dataset instances
+        nc_data = NetCDFData("tests/testdata/nemo_test.nc")
+        with netCDF4.Dataset("tests/testdata/nemo_test.nc") as nc_data.dataset:
+            self.assertEqual(
+                nc_data.timestamps[0],
+                datetime.datetime(2014, 5, 17, 0, 0, 0, 0, pytz.UTC),
+            )
+            self.assertEqual(nc_data.timestamp_to_time_index(2031436800), 0)
+
     @patch("data.netcdf_data.DatasetConfig._get_dataset_config")
     def test_get_nc_file_list_not_sqlite3(self, patch_get_dataset_config):
         patch_get_dataset_config.return_value = self.patch_dataset_config_ret_val
@@ -410,3 +429,72 @@ class TestNetCDFData(unittest.TestCase):
             nc_data.interp = "fake_method"
             with self.assertRaises(ValueError):
                 nc_data.interpolate(None, None, None)
+
+    def test_interpolate_levels_matches_interpolate(self):
+        with NetCDFData("tests/testdata/nemo_test.nc") as nc_data:
+            var = nc_data.get_dataset_variable("votemper")
+            data = numpy.ma.masked_invalid(
+                numpy.rollaxis(var[0, :, 10:20, 10:20].values, 0, 3)
+            )
+            lat = nc_data.get_dataset_variable("nav_lat")[10:20, 10:20].values
+            lon = nc_data.get_dataset_variable("nav_lon")[10:20, 10:20].values
+            output_def = pyresample.geometry.SwathDefinition(
+                lons=numpy.array([lon[5, 5], lon[2, 7]]),
+                lats=numpy.array([lat[5, 5], lat[2, 7]]),
+            )
+            input_def = pyresample.geometry.SwathDefinition(lons=lon, lats=lat)
+
+            for interp in ["gaussian", "bilinear", "inverse"]:
+                nc_data.interp = interp
+                result = nc_data.interpolate_levels(input_def, output_def, data)
+                self.assertEqual(result.shape, (data.shape[-1], 2))
+
+                for d in [0, 10, 20]:
+                    masked_lon = numpy.ma.array(lon, mask=data[:, :, d].mask)
+                    masked_lat = numpy.ma.array(lat, mask=data[:, :, d].mask)
+                    expected = nc_data.interpolate(
+                        pyresample.geometry.SwathDefinition(
+                            lons=masked_lon, lats=masked_lat
+                        ),
+                        output_def,
+                        data[:, :, d],
+                    )
+                    numpy.testing.assert_allclose(result[d], expected, rtol=1e-5)
+
+                self.assertTrue(numpy.ma.is_masked(result[-1]))
+
+    def test_interpolate_levels_sparse_level(self):
+        lon, lat = numpy.meshgrid(numpy.linspace(0, 1, 10), numpy.linspace(0, 1, 10))
+        input_def = pyresample.geometry.SwathDefinition(lons=lon, lats=lat)
+        output_def = pyresample.geometry.SwathDefinition(
+            lons=numpy.array([0.0]), lats=numpy.array([0.0])
+        )
+
+        # The second level is only unmasked in the far corner, beyond the
+        # candidates searched on the unmasked grid
+        data = numpy.ma.array(numpy.stack([lon + lat, lon * 10], axis=-1), mask=False)
+        data[:-1, :, 1] = numpy.ma.masked
+        data[-1, :-1, 1] = numpy.ma.masked
+
+        with NetCDFData("tests/testdata/nemo_test.nc") as nc_data:
+            nc_data.radius = 500000
+            for interp in ["gaussian", "inverse", "nearest"]:
+                nc_data.interp = interp
+                result = nc_data.interpolate_levels(input_def, output_def, data)
+
+                masked = numpy.ma.array(lon, mask=data[:, :, 1].mask)
+                expected = nc_data.interpolate(
+                    pyresample.geometry.SwathDefinition(
+                        lons=masked, lats=numpy.ma.array(lat, mask=masked.mask)
+                    ),
+                    output_def,
+                    data[:, :, 1],
+                )
+                numpy.testing.assert_allclose(result[1], expected, rtol=1e-5)
+                self.assertAlmostEqual(float(result[1, 0]), 10)
+
+            # Nearest-neighbour fills points without neighbours with 0
+            nc_data.radius = 1000
+            result = nc_data.interpolate_levels(input_def, output_def, data)
+            self.assertFalse(numpy.ma.is_masked(result))
+            numpy.testing.assert_array_equal(result[:, 0], [0, 0])
@@ -0,0 +1,105 @@
+import datetime
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import Session
+
+from data.observational import Base, DataType, Platform, Sample, Station
+from data.observational.bulk import BulkLoader, ObservationBatch
+
+
+def _make_batch(unique_id="argo_1", n_stations=3, n_depths=4):
+    batch = ObservationBatch(Platform.Type.argo, unique_id, {"WMO": unique_id})
+    batch.add_datatype("sea_water_temperature", "Temperature", "degrees_C")
+
+    times = np.datetime64("2024-01-01") + np.arange(n_stations) * np.timedelta64(1, "D")
+    stations = batch.add_stations(
+        times, np.full(n_stations, 45.0), np.arange(n_stations)
+    )
+
+    depth = np.tile(np.arange(n_depths, dtype=float), (n_stations, 1))
+    value = np.arange(n_stations * n_depths, dtype=float).reshape(depth.shape)
+    value[0, 0] = np.nan
+    batch.add_samples(stations[:, None], "sea_water_temperature", depth, value)
+
+    return batch
+
+
+class TestBulkLoader(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        Base.metadata.create_all(self.engine)
+
+    def test_batch(self):
+        batch = _make_batch()
+
+        self.assertEqual(batch.n_stations, 3)
+        self.assertEqual(batch.n_samples, 11)
+
+        with self.assertRaises(ValueError):
+            batch.add_stations([np.datetime64("2024-01-01")], [91], [0])
+        with self.assertRaises(KeyError):
+            batch.add_samples([0], "unknown", [0], [0])
+
+    def test_load(self):
+        loader = BulkLoader(self.engine, chunk_size=4)
+        loader.load([_make_batch(), _make_batch("argo_2", n_stations=2)])
+        loader.load([_make_batch()])
+
+        self.assertEqual(loader.files, 3)
+        self.assertEqual(loader.stations, 8)
+        self.assertEqual(loader.samples, 11 + 7 + 11)
+
+        with Session(self.engine) as session:
+            self.assertEqual(session.scalar(select(func.count(Platform.id))), 2)
+            self.assertEqual(session.scalar(select(func.count(DataType.key))), 1)
+            self.assertEqual(session.scalar(select(func.count(Station.id))), 8)
+            self.assertEqual(session.scalar(select(func.count(Sample.id))), 29)
+
+            platform = session.scalars(
+                select(Platform).where(Platform.unique_id == "argo_2")
+            ).one()
+            self.assertEqual(dict(platform.attrs), {"WMO": "argo_2"})
+
+            station = session.scalars(
+                select(Station).where(Station.platform_id == platform.id)
+            ).first()
+            self.assertEqual(station.time, datetime.datetime(2024, 1, 1))
+            self.assertEqual(sorted(s.value for s in station.samples), [1.0, 2.0, 3.0])
+
+    def test_run(self):
+        def parse(fname):
+            return _make_batch(fname) if fname != "skip" else None
+
+        loader = BulkLoader(self.engine)
+        loader.run(parse, ["a", "skip", "b", "c"], processes=1, files_per_transaction=2)
+
+        self.assertEqual(loader.files, 3)
+        with Session(self.engine) as session:
+            self.assertEqual(session.scalar(select(func.count(Platform.id))), 3)
+
+    def test_run_skips_failing_files(self):
+        loader = BulkLoader(self.engine)
+        load_batch = loader._load_batch
+
+        def fail_bad(conn, batch, new_platforms):
+            load_batch(conn, batch, new_platforms)
+            if batch.unique_id == "bad":
+                raise ValueError("Bad file")
+
+        with patch.object(loader, "_load_batch", side_effect=fail_bad):
+            with self.assertLogs("Ocean_Navigator") as logs:
+                loader.run(
+                    _make_batch, ["a", "bad", "b"], processes=1, files_per_transaction=2
+                )
+
+        # The other file of the failed transaction and the later files are kept
+        self.assertEqual(loader.files, 2)
+        self.assertEqual(loader.skipped, 1)
+        self.assertTrue(any("bad: unable to load" in m for m in logs.output))
+        with Session(self.engine) as session:
+            self.assertEqual(
+                sorted(session.scalars(select(Platform.unique_id))), ["a", "b"]
+            )
@@ -0,0 +1,57 @@
+import datetime
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from data.observational import Base, Platform, Station
+from data.observational import queries as q
+
+
+class TestStationQueries(unittest.TestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+
+        self.session = Session(engine)
+        self.addCleanup(self.session.close)
+
+        platform = Platform(type=Platform.Type.argo, unique_id="argo_1")
+        self.session.add(platform)
+        self.session.flush()
+
+        # Three stations in one cell of a 1 degree grid, one in the next
+        for lat, lon in [(45.2, -60.8), (45.5, -60.2), (45.7, -60.4), (45.5, -59.5)]:
+            self.session.add(
+                Station(
+                    platform_id=platform.id,
+                    time=datetime.datetime(2024, 1, 1),
+                    latitude=lat,
+                    longitude=lon,
+                )
+            )
+        self.session.commit()
+
+    def ids(self, **kwargs) -> list:
+        return sorted(s.id for s in q.get_stations(self.session, **kwargs))
+
+    def test_density_cap(self):
+        self.assertEqual(self.ids(), [1, 2, 3, 4])
+        self.assertEqual(self.ids(cell_size=1), [1, 4])
+        self.assertEqual(self.ids(cell_size=1, max_per_cell=2), [1, 2, 4])
+
+    def test_limit(self):
+        self.assertEqual(len(self.ids(limit=2)), 2)
+        # The later stations of a cell are dropped first
+        self.assertEqual(self.ids(cell_size=1, max_per_cell=2, limit=2), [1, 4])
+
+    def test_polygon(self):
+        square = [(45, -60.3), (46, -60.3), (46, -60), (45, -60)]
+        self.assertEqual(self.ids(polygon=square), [2])
+        triangle = [(45, -61), (46, -61), (46, -59.9)]
+        self.assertEqual(self.ids(polygon=triangle), [1, 3])
+
+        # The cap keeps the stations inside the polygon that share a cell with
+        # ones outside it
+        self.assertEqual(self.ids(polygon=square, cell_size=1), [2])
+        self.assertEqual(self.ids(polygon=triangle, cell_size=1), [1])
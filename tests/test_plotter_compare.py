@@ -0,0 +1,72 @@
+import threading
+import time
+import unittest
+from unittest.mock import PropertyMock, patch
+
+import numpy as np
+
+import oceannavigator.timing as timing
+from oceannavigator import DatasetConfig
+from plotting.plotter import Plotter
+from plotting.utils import interpolate_depths
+
+
+class ComparePlotter(Plotter):
+    def __init__(self):
+        self.plottype = "compare"
+        super().__init__("nemo_sqlite3", {}, format="png", dpi=72, size="10x7")
+        self.compare = {"dataset": "nemo_sqlite3"}
+
+    def parse_query(self, query):
+        pass
+
+    def load_data(self):
+        pass
+
+    def plot(self):
+        pass
+
+
+class TestPlotterCompare(unittest.TestCase):
+    def load(self):
+        with timing.stage("compare"):
+            time.sleep(0.01)
+        return threading.get_ident()
+
+    def test_start_compare(self):
+        plotter = ComparePlotter()
+
+        with timing.collect() as stages:
+            compare = plotter.start_compare(self.load)
+            self.assertNotEqual(compare(), threading.get_ident())
+
+        # The timings of the compare thread are added to the request
+        self.assertGreaterEqual(stages["compare"], 0.01)
+
+    def test_start_compare_fvcom(self):
+        plotter = ComparePlotter()
+
+        with patch.object(
+            DatasetConfig, "model_class", new_callable=PropertyMock
+        ) as model_class:
+            model_class.return_value = "fvcom"
+            compare = plotter.start_compare(self.load)
+
+        self.assertEqual(compare(), threading.get_ident())
+
+    def test_interpolate_depths(self):
+        # 2 profiles with 3 levels
+        data = np.ma.array(
+            [[0.0, 10.0], [1.0, 20.0], [2.0, 30.0]],
+            mask=[[False, False], [False, False], [False, True]],
+        )
+        depth_in = np.array([[0.0, 10.0, 20.0], [0.0, 10.0, 20.0]])
+        depth_out = np.array([[5.0, 10.0, 25.0], [5.0, 15.0, 20.0]])
+
+        result = interpolate_depths(data, depth_in, depth_out)
+
+        self.assertEqual(result.shape, (3, 2))
+        np.testing.assert_array_equal(
+            result.mask, [[False, False], [False, True], [True, True]]
+        )
+        np.testing.assert_allclose(result.compressed(), [0.5, 15.0, 1.0])
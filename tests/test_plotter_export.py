@@ -0,0 +1,114 @@
+import datetime
+import glob
+import os
+import tempfile
+import unittest
+from io import StringIO
+from unittest.mock import patch
+
+import numpy as np
+
+from plotting.plotter import Plotter, write_columns
+
+
+class ExportPlotter(Plotter):
+    def __init__(self, format):
+        self.plottype = "export"
+        super().__init__("nemo_sqlite3", {}, format=format, dpi=72, size="10x7")
+
+    def parse_query(self, query):
+        pass
+
+    def load_data(self):
+        pass
+
+    def plot(self):
+        pass
+
+
+class TestPlotterExport(unittest.TestCase):
+    def read(self, result):
+        path, mime, filename = result
+        self.addCleanup(os.remove, path)
+        with open(path) as f:
+            return f.read()
+
+    def test_write_columns(self):
+        f = StringIO()
+        n = write_columns(
+            f,
+            [
+                np.array([1.0, 2.0, 3.0]),
+                np.ma.array([0.5, np.nan, 1.25], mask=[False, False, True]),
+                np.array(["a", "b", "c"]),
+            ],
+            ["%0.1f", "%0.2f", "%s"],
+            ", ",
+        )
+
+        self.assertEqual(n, 3)
+        self.assertEqual(f.getvalue(), "1.0, 0.50, a\n2.0, nan, b\n3.0, nan, c\n")
+
+        f = StringIO()
+        write_columns(f, [np.array([np.nan, 1.0])], ["%0.1f"], ", ", missing="")
+        self.assertEqual(f.getvalue(), "\n1.0\n")
+
+    def test_csv(self):
+        plotter = ExportPlotter("csv")
+
+        text = self.read(
+            plotter.csv(
+                [["Dataset", "test"]],
+                ["Latitude", "Value"],
+                [np.array([45.0, 46.0]), np.array([1.0, 2.0])],
+                ["%0.4f", "%0.3f"],
+            )
+        )
+
+        self.assertEqual(
+            text,
+            "// Dataset: test\nLatitude, Value\n45.0000, 1.000\n46.0000, 2.000\n",
+        )
+
+    def test_odv_ascii(self):
+        plotter = ExportPlotter("odv")
+        time = datetime.datetime(2024, 1, 1)
+        data = np.ma.array(
+            [[1.0, 2.0], [3.0, 4.0]], mask=[[False, False], [True, False]]
+        )
+
+        text = self.read(
+            plotter.odv_ascii(
+                "cruise",
+                ["Temperature"],
+                ["Celsius"],
+                ["001", "002"],
+                np.array([45.0, 46.0]),
+                np.array([-60.0, -61.0]),
+                np.array([[0.5, 10.0], [0.5, 10.0]]),
+                [time, time],
+                data,
+            )
+        )
+
+        lines = text.splitlines()
+        self.assertEqual(lines[2].split("\t")[-1], "Temperature [Celsius]")
+        self.assertEqual(
+            lines[3:],
+            [
+                "cruise\t001\tC\t2024-01-01T00:00:00\t-60.0000\t45.0000\t0.5\t1.000",
+                "\t\t\t\t\t\t10.0\t2.000",
+                "\t\t\t\t\t\t10.0\t4.000",
+            ],
+        )
+
+    def test_export_removed_on_error(self):
+        plotter = ExportPlotter("csv")
+        pattern = os.path.join(tempfile.gettempdir(), "export_*.csv")
+        before = set(glob.glob(pattern))
+
+        with patch("plotting.plotter.write_columns", side_effect=MemoryError):
+            with self.assertRaises(MemoryError):
+                plotter.csv([], ["Value"], [np.array([1.0])], ["%0.1f"])
+
+        self.assertEqual(set(glob.glob(pattern)), before)
@@ -0,0 +1,203 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import PropertyMock, patch
+
+import numpy as np
+
+from plotting import pregen
+from plotting.tile import tile_path
+from routes.enums import InterpolationType
+
+
+def _tile_data(dataset, config, area, args):
+    # Distinct values for every pixel of the block
+    return np.arange(area[0].size, dtype=np.float32).reshape(area[0].shape), "c", 5.0
+
+
+class TestPregen(unittest.TestCase):
+    def setUp(self):
+        self.tiles = pregen.TileSet("nemo_sqlite3", "votemper", 2212444800)
+
+        # (z, x, y) -> data of the tiles written
+        self.written = {}
+
+        def write(tiles, data, z, x, y, cmap, depthm, overwrite=False):
+            self.assertEqual((cmap, depthm), ("c", 5.0))
+            self.written[(z, x, y)] = np.array(data)
+            return True
+
+        patcher = patch.object(pregen.TileSet, "write", autospec=True)
+        patcher.start().side_effect = write
+        self.addCleanup(patcher.stop)
+
+    def test_tile_set(self):
+        self.assertEqual(self.tiles.scale, "-5,30")
+        self.assertEqual(self.tiles.args["radius"], 25000)
+        self.assertFalse(self.tiles.categorical)
+
+        # Same cache location as the tiles route
+        self.assertEqual(
+            self.tiles.path(3, 2, 1),
+            tile_path(
+                "EPSG:3857",
+                "nemo_sqlite3",
+                "votemper",
+                2212444800,
+                "0",
+                "-5,30",
+                3,
+                2,
+                1,
+                InterpolationType.gaussian,
+                25,
+                10,
+            ),
+        )
+
+    def test_tiles(self):
+        self.assertEqual(self.tiles.tiles(0), [(0, 0)])
+        self.assertEqual(len(self.tiles.tiles(2)), 16)
+        self.assertEqual(self.tiles.tiles(2, (40, 60, -70, -40)), [(1, 1)])
+        self.assertEqual(
+            self.tiles.tiles(3, (-90, 90, -180, 180)),
+            self.tiles.tiles(3),
+        )
+
+    def test_downsample(self):
+        data = np.arange(16, dtype=np.float32).reshape(4, 4)
+        data[0, 0] = np.nan
+        data[2:, 2:] = np.nan
+
+        result = pregen.downsample(data)
+
+        np.testing.assert_allclose(result, [[(1 + 4 + 5) / 3, 4.5], [10.5, np.nan]])
+        np.testing.assert_array_equal(
+            pregen.downsample(data, categorical=True), data[::2, ::2]
+        )
+
+    @patch("plotting.pregen.index_timestamps")
+    @patch("plotting.pregen.pregenerate")
+    def test_pregenerate_new(self, pregenerate, index_timestamps):
+        index_timestamps.return_value = [2212444800, 2212531200, 2212617600]
+
+        with tempfile.TemporaryDirectory() as tmp, patch.object(
+            pregen.TileSet, "marker_path", new_callable=PropertyMock
+        ) as marker_path:
+            marker_path.side_effect = lambda: os.path.join(tmp, "pregen.json")
+            pregen.pregenerate_new("nemo_sqlite3", "votemper", (0, 4))
+            self.assertEqual(pregenerate.call_count, 3)
+
+            with open(os.path.join(tmp, "pregen.json"), "w") as f:
+                json.dump({"zooms": [0, 6]}, f)
+
+            pregenerate.reset_mock()
+            pregen.pregenerate_new("nemo_sqlite3", "votemper", (0, 4))
+            self.assertEqual(pregenerate.call_count, 0)
+
+            pregen.pregenerate_new("nemo_sqlite3", "votemper", (0, 7), latest=2)
+            self.assertEqual(
+                [c.args[0].timestamp for c in pregenerate.call_args_list],
+                [2212531200, 2212617600],
+            )
+
+    @patch("plotting.pregen._get_dataset", return_value=(None, None))
+    @patch("plotting.tile.get_tile_data", side_effect=_tile_data)
+    def test_render_block(self, get_tile_data, _):
+        data, cmap, depthm, written = pregen._render_block(self.tiles, 1, 2, 3, 1)
+
+        # One read of the 2x2 tiles of zoom 4 under tile (1, 2) of zoom 3
+        self.assertEqual(get_tile_data.call_count, 1)
+        self.assertEqual(get_tile_data.call_args.args[2].shape, (2, 512, 512))
+
+        block = _tile_data(None, None, np.zeros((2, 512, 512)), None)[0]
+        self.assertEqual(written, 5)
+        self.assertEqual(
+            sorted(self.written),
+            [(3, 1, 2), (4, 2, 4), (4, 2, 5), (4, 3, 4), (4, 3, 5)],
+        )
+        # Tiles are columns of the block by x and rows by y
+        np.testing.assert_array_equal(self.written[(4, 3, 4)], block[:256, 256:])
+        np.testing.assert_array_equal(self.written[(4, 2, 5)], block[256:, :256])
+        np.testing.assert_array_equal(self.written[(3, 1, 2)], pregen.downsample(block))
+        np.testing.assert_array_equal(data, self.written[(3, 1, 2)])
+        self.assertEqual((cmap, depthm), ("c", 5.0))
+
+        self.written.clear()
+        result = pregen._render_block(self.tiles, 1, 2, 3, 1, derive=False)
+        self.assertIsNone(result[0])
+        self.assertEqual(
+            sorted(self.written), [(4, 2, 4), (4, 2, 5), (4, 3, 4), (4, 3, 5)]
+        )
+
+    def test_derive(self):
+        keys = sorted(self.tiles.tiles(2), key=lambda k: pregen.z_order(*k))
+        consumed = []
+
+        def roots():
+            for x, y in keys:
+                consumed.append((x, y))
+                yield x, y, np.full((256, 256), x * 4 + y, np.float32), "c", 5.0
+
+        # Each parent is written as soon as its children have arrived
+        written = pregen._derive(self.tiles, roots(), keys, 2, 0)
+        self.assertEqual(written, 5)
+        self.assertEqual(keys[:4], [(0, 0), (0, 1), (1, 0), (1, 1)])
+
+        tile = self.written[(1, 0, 0)]
+        self.assertEqual(
+            [tile[0, 0], tile[0, 255], tile[255, 0], tile[255, 255]], [0, 4, 1, 5]
+        )
+        tile = self.written[(0, 0, 0)]
+        np.testing.assert_array_equal(tile[::128, ::128], [[0, 8], [2, 10]])
+        self.assertEqual(tile.mean(), 7.5)
+
+    def test_derive_order(self):
+        keys = sorted(self.tiles.tiles(2), key=lambda k: pregen.z_order(*k))
+        events = []
+
+        def write(tiles, data, z, x, y, cmap, depthm, overwrite=False):
+            events.append((z, x, y))
+            return True
+
+        def roots():
+            for x, y in keys:
+                events.append((2, x, y))
+                yield x, y, np.zeros((256, 256), np.float32), "c", 5.0
+
+        pregen.TileSet.write.side_effect = write
+        pregen._derive(self.tiles, roots(), keys, 2, 0)
+
+        self.assertEqual(events.index((1, 0, 0)), 4)
+        self.assertEqual(events[-2:], [(1, 1, 1), (0, 0, 0)])
+
+        # Tiles missing from the bounds are left empty
+        self.written.clear()
+        pregen.TileSet.write.side_effect = None
+        pregen.TileSet.write.return_value = True
+        roots = [(0, 0, np.ones((256, 256), np.float32), "c", 5.0)]
+        self.assertEqual(pregen._derive(self.tiles, roots, [(0, 0)], 1, 0), 1)
+        tile = pregen.TileSet.write.call_args.args[1]
+        self.assertEqual(tile[0, 0], 1)
+        self.assertTrue(np.isnan(tile[255, 255]))
+
+    @patch("plotting.pregen._render_block")
+    def test_pregenerate(self, render_block):
+        render_block.return_value = (np.zeros((256, 256), np.float32), "c", 5.0, 21)
+
+        with tempfile.TemporaryDirectory() as tmp, patch.object(
+            pregen.TileSet, "marker_path", new_callable=PropertyMock
+        ) as marker_path:
+            marker_path.return_value = os.path.join(tmp, "pregen.json")
+            stats = pregen.pregenerate(
+                self.tiles, (0, 4), processes=1, bounds=(-90, 90, -180, 180)
+            )
+
+        # 16 blocks of zooms 2-4, zooms 0-1 derived from them
+        self.assertEqual(render_block.call_count, 16)
+        self.assertEqual(stats["tiles"], 16 * 21 + 5)
+        self.assertEqual(
+            sorted(self.written),
+            [(0, 0, 0)] + [(1, x, y) for x in range(2) for y in range(2)],
+        )
@@ -0,0 +1,85 @@
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+import data.pyramid as pyramid
+from oceannavigator.settings import get_settings
+
+
+class TestPyramid(unittest.TestCase):
+    def setUp(self):
+        pyramid.clear()
+        self.addCleanup(pyramid.clear)
+
+    def test_coarsen(self):
+        data = np.arange(15, dtype=np.float32).reshape(3, 5)
+        data[0, 0] = np.nan
+        data[2, 4] = np.nan
+
+        np.testing.assert_array_equal(
+            pyramid.coarsen(data),
+            [[(1 + 5 + 6) / 3, 5, 6.5], [10.5, 12.5, np.nan]],
+        )
+
+        # Lower-right cells of the blocks, clipped to the odd edges
+        np.testing.assert_array_equal(
+            pyramid.coarsen(data, categorical=True), [[6, 8, 9], [11, 13, np.nan]]
+        )
+
+        # Leading axes are kept
+        self.assertEqual(pyramid.coarsen(np.zeros((2, 4, 6, 8))).shape, (2, 4, 3, 4))
+
+    def test_coarsen_coordinates(self):
+        # 2-D grid across the antimeridian
+        lat, lon = np.meshgrid([10.0, 11.0], [179.0, -179.0], indexing="ij")
+        lat, lon = pyramid.coarsen_coordinates(lat, lon)
+        self.assertAlmostEqual(lat[0, 0], 10.5, places=2)
+        self.assertAlmostEqual(abs(lon[0, 0]), 180.0, places=5)
+
+        # 1-D rows and columns
+        lat, lon = pyramid.coarsen_coordinates(
+            np.array([0.0, 1.0, 2.0]), np.array([358.0, 0.0, 2.0, 4.0])
+        )
+        np.testing.assert_allclose(lat, [0.5, 2.0])
+        np.testing.assert_allclose(lon, [-1.0, 3.0], atol=1e-6)
+
+    def test_spacing(self):
+        lat, lon = np.linspace(-1, 1, 21), np.linspace(0, 2, 21)
+        self.assertAlmostEqual(pyramid.spacing(lat, lon) / 11000, 1, places=1)
+
+        lat, lon = np.meshgrid(lat, lon, indexing="ij")
+        self.assertAlmostEqual(pyramid.spacing(lat, lon) / 11000, 1, places=1)
+
+        self.assertEqual(pyramid.spacing(np.zeros((1, 5)), np.zeros((1, 5))), np.inf)
+
+    def test_factor(self):
+        self.assertEqual(pyramid.factor(1000, 500), 1)
+        self.assertEqual(pyramid.factor(1000, 3000), 2)
+        self.assertEqual(pyramid.factor(1000, 100000), 8)
+
+    def test_window(self):
+        lat, lon = np.meshgrid(np.arange(10.0), np.arange(10.0), indexing="ij")
+
+        y, x = pyramid.window(lat, lon, np.array([3.5, 5.5]), np.array([2.5, 4]))
+        self.assertEqual((y, x), (slice(3, 7), slice(2, 6)))
+        y, x = pyramid.window(lat[:, 0], lon[0], np.array([0, 1]), np.array([8, 20]))
+        self.assertEqual((y, x), (slice(0, 3), slice(7, 11)))
+
+        self.assertIsNone(
+            pyramid.window(lat, lon, np.array([20, 30]), np.array([0, 10]))
+        )
+
+    def test_get(self):
+        load = lambda: np.zeros(4)  # noqa: E731
+
+        level = pyramid.get("key", load)
+        self.assertIs(pyramid.get("key", load), level)
+        self.assertEqual(pyramid.metrics(), {"hits": 1, "misses": 1, "bytes": 32})
+
+        # Levels are read-only
+        with self.assertRaises(ValueError):
+            level[0] = 1
+
+        with patch.object(get_settings(), "pyramid_cache_mb", 0):
+            self.assertFalse(pyramid.enabled())
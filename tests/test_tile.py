@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import patch
+
+import matplotlib.cm
+import matplotlib.colors
+import numpy as np
+from PIL import Image
+
+import plotting.colormap as colormap
+import plotting.tile as tile
+from oceannavigator.settings import get_settings
+
+
+class TestTile(unittest.TestCase):
+    def setUp(self):
+        tile._palettes.clear()
+        self.addCleanup(tile._palettes.clear)
+
+        # Values below, inside and above the scale, with missing values
+        data = np.linspace(-10, 40, 256 * 256, dtype=np.float32).reshape(256, 256)
+        data[0, :10] = np.nan
+        self.data = np.ma.masked_invalid(data)
+        self.data[1, :10] = np.ma.masked
+
+    def colours(self, cmap) -> tuple:
+        """Returns the colours of a rendered tile and of matplotlib."""
+        img = tile.render(self.data, "EPSG:3857", 0, 0, 8, 0, [-5, 30], cmap)
+        self.assertEqual(img.mode, "P")
+
+        expected = matplotlib.cm.ScalarMappable(
+            matplotlib.colors.Normalize(vmin=-5, vmax=30), cmap=cmap
+        ).to_rgba(self.data, bytes=True)
+
+        return np.asarray(img.convert("RGBA")), expected
+
+    def test_render(self):
+        # Colormaps of at most 253 colours are coloured exactly
+        cmap = colormap.colormaps["seabed lithology"]
+        rendered, expected = self.colours(cmap)
+        np.testing.assert_array_equal(rendered, expected)
+        np.testing.assert_array_equal(rendered[:2, :10], 0)
+
+        # Larger colormaps are sampled
+        cmap = colormap.colormaps["temperature"]
+        rendered, expected = self.colours(cmap)
+        self.assertLessEqual(np.abs(rendered.astype(int) - expected).max(), 5)
+        self.assertEqual(tile.palette(cmap)[0], tile.UNDER)
+
+        self.assertEqual(len(tile._palettes), 2)
+
+    def test_colour_indices(self):
+        data = np.ma.masked_invalid([-1, 0, 0.5, 9.9, 10, 11, np.nan])
+        np.testing.assert_array_equal(
+            tile.colour_indices(data, [0, 10], 10),
+            [tile.UNDER, 0, 0, 9, 9, tile.OVER, tile.BAD],
+        )
+
+        # An empty scale takes the first colour
+        np.testing.assert_array_equal(tile.colour_indices(data, [1, 1], 10)[1:3], 0)
+
+    def test_encode(self):
+        img = tile.render(
+            self.data,
+            "EPSG:3857",
+            0,
+            0,
+            8,
+            0,
+            [-5, 30],
+            colormap.colormaps["temperature"],
+        )
+
+        for level in [1, 9]:
+            with patch.object(get_settings(), "tile_png_compress_level", level):
+                png = Image.open(tile.encode(img))
+                self.assertEqual(png.format, "PNG")
+                self.assertEqual(png.mode, "P")
+                np.testing.assert_array_equal(np.asarray(png), np.asarray(img))
+
+        webp = Image.open(tile.encode(img, "WEBP"))
+        self.assertEqual(webp.format, "WEBP")
+        np.testing.assert_array_equal(
+            np.asarray(webp.convert("RGBA")), np.asarray(img.convert("RGBA"))
+        )
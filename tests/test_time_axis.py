@@ -0,0 +1,52 @@
+import datetime
+import unittest
+
+import numpy as np
+import pytz
+
+from data.time_axis import TimeAxis
+
+UNITS = "seconds since 1950-01-01 00:00:00"
+# 2017-12-21 00:00 to 2018-01-09 in 12 hour steps, out of order
+VALUES = np.roll(np.arange(2144966400, 2144966400 + 40 * 43200, 43200), 5)
+
+
+class TestTimeAxis(unittest.TestCase):
+    def setUp(self):
+        self.axis = TimeAxis(VALUES, UNITS)
+
+    def test_datetimes(self):
+        self.assertEqual(len(self.axis), 40)
+        self.assertEqual(
+            self.axis.datetimes[0], datetime.datetime(2017, 12, 21, tzinfo=pytz.UTC)
+        )
+        self.assertEqual(
+            self.axis.datetimes[-1],
+            datetime.datetime(2018, 1, 9, 12, tzinfo=pytz.UTC),
+        )
+        with self.assertRaises(ValueError):
+            self.axis.datetimes[0] = None
+
+    def test_index(self):
+        self.assertEqual(self.axis.index(2144966400), 0)
+        self.assertEqual(self.axis.index([2145052800, 2144966400, 1]), [0, 2])
+        self.assertEqual(self.axis.index(np.float64(2145052800.0)), 2)
+
+        with self.assertRaises(IndexError):
+            self.axis.index(2144966401)
+
+    def test_nearest(self):
+        self.assertEqual(self.axis.nearest(2144966400 + 21599), 0)
+        self.assertEqual(self.axis.nearest(2144966400 + 21601), 1)
+        np.testing.assert_array_equal(
+            self.axis.nearest(np.array([0, 2144966400 + 43200, 3e9])), [0, 1, 39]
+        )
+
+    def test_date_index(self):
+        self.assertEqual(self.axis.date_index(datetime.datetime(2017, 12, 22, 6)), 2)
+        self.assertEqual(
+            self.axis.date_index(datetime.datetime(2018, 1, 20, tzinfo=pytz.UTC), "M"),
+            22,
+        )
+        self.assertIsNone(self.axis.date_index(datetime.datetime(2018, 1, 10)))
+        self.assertIsNone(self.axis.date_index(datetime.datetime(2018, 2, 1), "M"))
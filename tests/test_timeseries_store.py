@@ -0,0 +1,96 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy as np
+import xarray
+
+from benchmarks import synthetic
+from data import timeseries_store
+from oceannavigator.settings import get_settings
+
+
+class TestTimeseriesStore(unittest.TestCase):
+    def setUp(self):
+        self.path = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.path)
+
+        self.files = synthetic.make_nemo(
+            self.path.joinpath("nemo"), nx=20, ny=16, nz=3, nt=7
+        )
+        self.index = self.path.joinpath("nemo.sqlite3")
+
+        for name, value in [
+            ("timeseries_store_dir", str(self.path.joinpath("stores"))),
+            ("dask_scheduler", "synchronous"),
+        ]:
+            patcher = patch.object(get_settings(), name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        timeseries_store._stores.clear()
+        self.addCleanup(timeseries_store._stores.clear)
+
+        patcher = patch("data.timeseries_store.DatasetConfig")
+        patcher.start().return_value = SimpleNamespace(url=str(self.index))
+        self.addCleanup(patcher.stop)
+
+    def test_update(self):
+        synthetic.make_index(self.index, self.files[:5])
+        self.assertEqual(timeseries_store.update("nemo", ["votemper"], 4, 8), 5)
+
+        synthetic.make_index(self.index, self.files)
+        self.assertEqual(timeseries_store.update("nemo", ["votemper"], 4, 8), 2)
+        self.assertEqual(timeseries_store.update("nemo", ["votemper"], 4, 8), 0)
+
+        with xarray.open_zarr(
+            timeseries_store.store_path("nemo"), decode_times=False
+        ) as store, xarray.open_mfdataset(self.files, decode_times=False) as source:
+            self.assertEqual(store.votemper.encoding["chunks"], (4, 1, 8, 8))
+            np.testing.assert_array_equal(
+                store.time_counter.values, source.time_counter.values
+            )
+            np.testing.assert_array_equal(store.votemper.values, source.votemper.values)
+            self.assertIn("nav_lat", store.coords)
+
+    def test_open_store(self):
+        self.assertIsNone(timeseries_store.open_store("nemo", ["votemper"], [0]))
+
+        synthetic.make_index(self.index, self.files)
+        timeseries_store.update("nemo", ["votemper"], 4, 8)
+        timestamps = synthetic.timestamps(7).tolist()
+
+        dataset = timeseries_store.open_store("nemo", ["votemper"], timestamps[2:6])
+        self.assertEqual(dataset.time_counter.values.tolist(), timestamps[2:6])
+
+        self.assertIsNone(
+            timeseries_store.open_store("nemo", ["vosaline"], timestamps[2:6])
+        )
+        self.assertIsNone(
+            timeseries_store.open_store(
+                "nemo", ["votemper"], [timestamps[-1], timestamps[-1] + 86400]
+            )
+        )
+
+    def test_open_store_cached(self):
+        synthetic.make_index(self.index, self.files[:5])
+        timeseries_store.update("nemo", ["votemper"], 4, 8)
+        timestamps = synthetic.timestamps(7).tolist()
+
+        with patch("xarray.open_zarr", wraps=xarray.open_zarr) as open_zarr:
+            dataset = timeseries_store.open_store("nemo", ["votemper"], timestamps[:2])
+            dataset.close()
+            dataset = timeseries_store.open_store("nemo", ["votemper"], timestamps[2:4])
+            self.assertEqual(open_zarr.call_count, 1)
+            self.assertEqual(dataset.votemper.shape[0], 2)
+
+            # Appending opens the store again
+            synthetic.make_index(self.index, self.files)
+            timeseries_store.update("nemo", ["votemper"], 4, 8)
+            open_zarr.reset_mock()
+            dataset = timeseries_store.open_store("nemo", ["votemper"], timestamps[4:])
+            self.assertEqual(open_zarr.call_count, 1)
+            self.assertEqual(dataset.time_counter.values.tolist(), timestamps[4:])
@@ -0,0 +1,79 @@
+import time
+import unittest
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import oceannavigator.timing as timing
+
+
+@timing.timed("read")
+def _read(seconds):
+    time.sleep(seconds)
+
+
+class TestTiming(unittest.TestCase):
+    def setUp(self):
+        timing._histograms.clear()
+
+    def test_stage_outside_collect(self):
+        with timing.stage("read"):
+            pass
+
+        self.assertIsNone(timing._current.get())
+
+    def test_nested_stages_are_exclusive(self):
+        with timing.collect() as stages:
+            with timing.stage("render"):
+                time.sleep(0.02)
+                _read(0.05)
+
+        self.assertGreaterEqual(stages["read"], 0.05)
+        self.assertGreaterEqual(stages["render"], 0.02)
+        self.assertLess(stages["render"], 0.05)
+
+    def test_timed_call_and_merge(self):
+        result, stages = timing.timed_call(_read, 0.01)
+
+        self.assertIsNone(result)
+        self.assertGreaterEqual(stages["read"], 0.01)
+
+        with timing.collect() as request_stages:
+            timing.merge(stages)
+            timing.merge(stages)
+
+        self.assertAlmostEqual(request_stages["read"], 2 * stages["read"])
+
+    def test_prometheus_text(self):
+        timing.observe("stage", "read", 0.003)
+        timing.observe("stage", "read", 0.3)
+
+        text = timing.prometheus_text()
+
+        self.assertIn("# TYPE navigator_stage_duration_seconds histogram", text)
+        self.assertIn(
+            'navigator_stage_duration_seconds_bucket{stage="read",le="0.001"} 0', text
+        )
+        self.assertIn(
+            'navigator_stage_duration_seconds_bucket{stage="read",le="0.005"} 1', text
+        )
+        self.assertIn(
+            'navigator_stage_duration_seconds_bucket{stage="read",le="+Inf"} 2', text
+        )
+        self.assertIn('navigator_stage_duration_seconds_count{stage="read"} 2', text)
+
+    def test_server_timing_header(self):
+        app = FastAPI()
+        timing.configure_timing(app)
+
+        @app.get("/test/{value}")
+        def endpoint(value: int):
+            _read(0.01)
+            return value
+
+        response = TestClient(app).get("/test/1")
+
+        header = response.headers["Server-Timing"]
+        self.assertRegex(header, r"^read;dur=\d+\.\d, total;dur=\d+\.\d$")
+        self.assertIn(("request", "/test/{value}"), timing._histograms)
+        self.assertIn(("stage", "read"), timing._histograms)
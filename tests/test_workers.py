@@ -0,0 +1,131 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+from fastapi import HTTPException
+
+import oceannavigator.workers as workers
+
+
+def _add(a, b):
+    return a + b
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+class _DisconnectedRequest:
+    async def is_disconnected(self):
+        return True
+
+
+class _DisconnectingRequest:
+    def __init__(self, after):
+        self.disconnect = time.perf_counter() + after
+
+    async def is_disconnected(self):
+        return time.perf_counter() >= self.disconnect
+
+
+class TestWorkers(unittest.TestCase):
+    def setUp(self):
+        workers._limiters.clear()
+        workers._metrics.clear()
+
+    def tearDown(self):
+        workers.shutdown()
+
+    def test_run(self):
+        result = asyncio.run(workers.run("test", None, _add, 1, 2))
+
+        self.assertEqual(result, 3)
+        metrics = workers.metrics()["test"]
+        self.assertEqual(metrics["completed"], 1)
+        self.assertEqual(metrics["pending"], 0)
+
+    def test_run_rejects_when_saturated(self):
+        workers._limiters["test"] = workers._Limiter(1, 1)
+
+        async def run_jobs():
+            return await asyncio.gather(
+                *[workers.run("test", None, _sleep, 0.1) for _ in range(3)],
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(run_jobs())
+
+        rejected = [r for r in results if isinstance(r, HTTPException)]
+        self.assertEqual(len(rejected), 1)
+        self.assertEqual(rejected[0].status_code, 503)
+        self.assertIn("Retry-After", rejected[0].headers)
+
+        metrics = workers.metrics()["test"]
+        self.assertEqual(metrics["completed"], 2)
+        self.assertEqual(metrics["rejected"], 1)
+        self.assertGreater(metrics["queue_wait_seconds_max"], 0.05)
+
+    def test_tiles_do_not_wait_for_plots(self):
+        async def run_jobs():
+            plot = asyncio.ensure_future(workers.run("plot", None, _sleep, 0.5))
+            await asyncio.sleep(0.05)
+
+            started = time.perf_counter()
+            await asyncio.gather(
+                *[workers.run("tile", None, _sleep, 0.1) for _ in range(4)]
+            )
+            elapsed = time.perf_counter() - started
+
+            await plot
+            return elapsed
+
+        # The tiles run side by side in their own pool
+        self.assertLess(asyncio.run(run_jobs()), 0.35)
+
+    def test_run_cancelled_on_disconnect(self):
+        workers._limiters["test"] = workers._Limiter(1, 1)
+
+        async def run_jobs():
+            return await asyncio.gather(
+                workers.run("test", None, _sleep, 0.2),
+                workers.run("test", _DisconnectedRequest(), _sleep, 0.2),
+                return_exceptions=True,
+            )
+
+        results = asyncio.run(run_jobs())
+
+        self.assertEqual(results[0], 0.2)
+        self.assertIsInstance(results[1], asyncio.CancelledError)
+        self.assertEqual(workers.metrics()["test"]["cancelled"], 1)
+
+    @patch.object(workers, "DISCONNECT_POLL_INTERVAL", 0.01)
+    def test_abandoned_job_keeps_its_slot(self):
+        workers._limiters["test"] = workers._Limiter(1, 1)
+        discarded = []
+
+        async def run_jobs():
+            abandoned = asyncio.ensure_future(
+                workers.run(
+                    "test",
+                    _DisconnectingRequest(0.05),
+                    _sleep,
+                    0.3,
+                    discard=discarded.append,
+                )
+            )
+            with self.assertRaises(asyncio.CancelledError):
+                await abandoned
+
+            # The job is still running, so it still holds the only slot
+            self.assertEqual(workers.metrics()["test"]["pending"], 1)
+            self.assertEqual(discarded, [])
+
+            started = time.perf_counter()
+            await workers.run("test", None, _add, 1, 2)
+            return time.perf_counter() - started
+
+        self.assertGreater(asyncio.run(run_jobs()), 0.15)
+        self.assertEqual(discarded, [0.3])
+        self.assertEqual(workers.metrics()["test"]["pending"], 0)
@@ -0,0 +1,276 @@
+"""
+In-memory index of the KML overlay files in settings.overlay_kml_dir.
+
+Each KML file is parsed once and parsed again when its modification time
+changes. The features of a file are projected once per map projection into an
+STRtree, so a viewport query only tests the features whose bounding boxes
+intersect it. Areas are simplified once per projection and resolution level,
+where the level is the resolution requested by the map rounded down to a power
+of two, so the few levels a map zooms through are simplified once.
+"""
+
+import copy
+import math
+import os
+import threading
+import xml.etree.ElementTree as ET
+from typing import List, Union
+
+import numpy as np
+import pyproj
+from shapely import STRtree, box
+from shapely.geometry import LineString, MultiPolygon, Point, Polygon
+from shapely.geometry.polygon import LinearRing
+
+from oceannavigator.settings import get_settings
+
+_lock = threading.Lock()
+# (subdir, file id) -> KMLFile
+_files = {}
+
+
+class KMLFile:
+    """The features of a KML file of points, lines or areas.
+
+    Point and line features are dicts of their name and their coordinates as
+    written in the file. Area features are dicts of their name and a list of
+    (outer ring, [inner rings]) per polygon, in lon/lat.
+    """
+
+    def __init__(self, subdir: str, file_id: str, path: str) -> None:
+        self.subdir = subdir
+        self.file_id = file_id
+        self.mtime = os.path.getmtime(path)
+
+        self._lock = threading.Lock()
+        # projection -> (pyproj.Proj, STRtree of the projected features)
+        self._projected = {}
+        # (projection, level) -> [(coordinates, centroid)] per area
+        self._simplified = {}
+        # simplify -> list_areas result
+        self._areas = {}
+
+        root = ET.parse(path).getroot()
+        self.nsmap = root.tag.split("}", 1)[0] + "}"
+
+        self.name = None
+        for folder in root.iter(self.nsmap + "Folder"):
+            for name in folder.iter(self.nsmap + "name"):
+                self.name = name.text
+                break
+
+        if subdir == "area":
+            self.features = self._parse_areas(root)
+        else:
+            self.features = self._parse_folder(root)
+
+    def _parse_folder(self, root: ET.Element) -> List[dict]:
+        folder = None
+        for doc in root:
+            if "Document" in doc.tag:
+                for folder in doc:
+                    if "Folder" in folder.tag:
+                        break
+
+        features = []
+        name = None
+        for child in folder.iter():
+            if "name" in child.tag:
+                name = child.text
+            if "coordinates" in child.tag:
+                coordinates = [
+                    list(map(float, c.split(","))) for c in child.text.split()
+                ]
+                if self.subdir == "point":
+                    coordinates = coordinates[0]
+
+                features.append({"name": name, "coordinates": coordinates})
+
+        return features
+
+    def _parse_areas(self, root: ET.Element) -> List[dict]:
+        def rings(element: ET.Element, path: str) -> List[np.ndarray]:
+            return [
+                np.array([c.split(",") for c in coords.text.split()]).astype(float)
+                for boundary in element.iter(self.nsmap + path)
+                for coords in boundary.iter(self.nsmap + "coordinates")
+            ]
+
+        features = []
+        for place in root.iter(self.nsmap + "Placemark"):
+            name = None
+            for placename in place.iter(self.nsmap + "name"):
+                name = placename.text
+
+            polygons = []
+            for polygon in place.iter(self.nsmap + "Polygon"):
+                outers = rings(polygon, "outerBoundaryIs")
+                if outers:
+                    polygons.append((outers[-1], rings(polygon, "innerBoundaryIs")))
+
+            features.append({"name": name, "polygons": polygons})
+
+        return features
+
+    def _projection(self, projection: str):
+        with self._lock:
+            projected = self._projected.get(projection)
+            if projected is None:
+                proj = pyproj.Proj(projection)
+                geometries = [self._project(proj, f) for f in self.features]
+                projected = (proj, geometries, STRtree(geometries))
+                self._projected[projection] = projected
+
+        return projected
+
+    def _project(self, proj: pyproj.Proj, feature: dict):
+        if self.subdir == "point":
+            return Point(proj(*feature["coordinates"][:2]))
+
+        if self.subdir == "line":
+            coords = np.array(feature["coordinates"])
+            return LineString(np.column_stack(proj(coords[:, 0], coords[:, 1])))
+
+        polygons = []
+        for outer, inners in feature["polygons"]:
+            polygons.append(
+                Polygon(
+                    np.column_stack(proj(outer[:, 0], outer[:, 1])),
+                    [np.column_stack(proj(i[:, 0], i[:, 1])) for i in inners],
+                )
+            )
+        return MultiPolygon(polygons)
+
+    def query(self, projection: str, extent: Union[str, None]) -> List[int]:
+        """Returns the indexes of the features intersecting a viewport.
+
+        Arguments:
+            * extent -- xmin,ymin,xmax,ymax in the projection, or None for all
+        """
+        if not extent:
+            return list(range(len(self.features)))
+
+        _, _, tree = self._projection(projection)
+        view = box(*map(float, extent.split(",")))
+
+        return sorted(tree.query(view, predicate="intersects").tolist())
+
+    def simplified(self, projection: str, resolution: float) -> List[tuple]:
+        """Returns the GeoJSON MultiPolygon coordinates and lon/lat centroid of
+        each area, simplified for a map resolution in projection units per pixel.
+        """
+        level = 2 ** math.floor(math.log2(max(resolution, 1)))
+        key = (projection, level)
+
+        with self._lock:
+            simplified = self._simplified.get(key)
+        if simplified is not None:
+            return simplified
+
+        proj, geometries, _ = self._projection(projection)
+
+        def unproject(ring) -> list:
+            coords = np.array(ring.coords)
+            return (
+                np.array(proj(coords[:, 0], coords[:, 1], inverse=True))
+                .transpose()
+                .tolist()
+            )
+
+        simplified = []
+        for geometry in geometries:
+            mp = geometry.simplify(level * 1.5)
+            polygons = mp.geoms if isinstance(mp, MultiPolygon) else [mp]
+            coordinates = [
+                [unproject(p.exterior)] + [unproject(i) for i in p.interiors]
+                for p in polygons
+                if not p.is_empty
+            ]
+            centroid = proj(mp.centroid.x, mp.centroid.y, inverse=True)
+            simplified.append((coordinates, centroid))
+
+        with self._lock:
+            self._simplified[key] = simplified
+
+        return simplified
+
+    def list_areas(self, simplify: bool) -> List[dict]:
+        """Returns the areas in the format of utils.misc.list_areas, with
+        [lat, lon] coordinates."""
+        with self._lock:
+            areas = self._areas.get(simplify)
+        if areas is not None:
+            return areas
+
+        areas = []
+        for feature in self.features:
+            outers = [outer[:, [1, 0]].tolist() for outer, _ in feature["polygons"]]
+            inners = [
+                inner[:, [1, 0]].tolist()
+                for _, rings in feature["polygons"]
+                for inner in rings
+            ]
+            if simplify:
+                outers = [list(LinearRing(r).simplify(1.0 / 32).coords) for r in outers]
+                inners = [list(LinearRing(r).simplify(1.0 / 32).coords) for r in inners]
+
+            centroids = [LinearRing(x).centroid for x in outers]
+            areas.append(
+                {
+                    "name": feature["name"],
+                    "polygons": outers,
+                    "innerrings": inners,
+                    "centroids": [(c.y, c.x) for c in centroids],
+                    "key": self.file_id + "/" + feature["name"],
+                }
+            )
+        areas = sorted(areas, key=lambda k: k["name"])
+
+        with self._lock:
+            self._areas[simplify] = areas
+
+        return areas
+
+
+def get_kml(subdir: str, file_id: str) -> KMLFile:
+    """Returns the parsed KML file, parsing it again if it has been modified.
+
+    Raises:
+        FileNotFoundError -- If there's no such file
+        xml.etree.ElementTree.ParseError -- If the file isn't valid XML
+    """
+    path = os.path.join(get_settings().overlay_kml_dir, subdir, f"{file_id}.kml")
+    mtime = os.path.getmtime(path)
+    key = (subdir, file_id)
+
+    with _lock:
+        kml = _files.get(key)
+    if kml is not None and kml.mtime == mtime:
+        return kml
+
+    kml = KMLFile(subdir, file_id, path)
+    with _lock:
+        _files[key] = kml
+
+    return kml
+
+
+def get_area(key: str) -> dict:
+    """Returns a copy of a predefined area of list_areas by its key,
+    e.g. "AZMP_NL_Region_Analysis_Areas/LS1".
+
+    Raises:
+        KeyError -- If the file has no such area
+    """
+    file_id = key.split("/", 1)[0]
+    for area in get_kml("area", file_id).list_areas(False):
+        if area["key"] == key:
+            return copy.deepcopy(area)
+
+    raise KeyError(key)
+
+
+def clear() -> None:
+    """Forgets all parsed files."""
+    with _lock:
+        _files.clear()